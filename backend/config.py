@@ -58,16 +58,141 @@ class Settings(BaseSettings):
     docker_enabled: bool = Field(default=False, description="Enable Docker sandbox")
     sandbox_image: str = Field(default="devpulse-sandbox", description="Docker sandbox image")
     sandbox_timeout: int = Field(default=120, description="Sandbox execution timeout in seconds")
+    tool_output_max_mb: int = Field(
+        default=64,
+        description="Captured output per stream of a tool run in MB, on the host or in a sandbox; the rest is discarded"
+    )
     sandbox_memory_limit: str = Field(default="512m", description="Sandbox memory limit")
+    sandbox_pool_size: int = Field(
+        default=2,
+        description="Number of pre-started sandbox containers (0 starts one read-only mounted container per analysis)"
+    )
+    sandbox_max_jobs_per_container: int = Field(
+        default=20,
+        description="Jobs a pooled sandbox container runs before it is replaced"
+    )
+    sandbox_health_check_interval: int = Field(
+        default=30,
+        description="Seconds an idle pooled container may go unchecked before reuse"
+    )
+    sandbox_scratch_mb: int = Field(
+        default=512,
+        description="Size limit in MB of each writable tmpfs mount (/work and /tmp) of pooled sandbox containers"
+    )
     
     # Analysis Tools
     analysis_timeout: int = Field(default=300, description="Analysis timeout in seconds")
-    max_repo_size_mb: int = Field(default=500, description="Maximum repository size in MB")
-    
+    max_repo_size_mb: int = Field(
+        default=500,
+        description="Maximum size in MB of the files checked out for analysis, estimated before checkout"
+    )
+    sparse_clone: bool = Field(
+        default=True,
+        description="Clone without file contents and fetch only files the analyzers read"
+    )
+    mirror_cache_enabled: bool = Field(
+        default=True,
+        description="Keep a local mirror of each analyzed repository and fetch only changes on re-analysis"
+    )
+    mirror_cache_dir: str = Field(default="./mirrors", description="Directory holding repository mirrors")
+    mirror_cache_max_mb: int = Field(
+        default=2048,
+        description="Maximum total size of repository mirrors in MB; least recently used are evicted"
+    )
+    workspace_dir: Optional[str] = Field(
+        default=None,
+        description="Directory for on-disk analysis workspaces (defaults to the system temp directory)"
+    )
+    workspace_ram_dir: Optional[str] = Field(
+        default="/dev/shm/devpulse",
+        description="RAM-backed (tmpfs) directory for analysis workspaces; unset to always use disk"
+    )
+    workspace_ram_max_mb: int = Field(
+        default=1024,
+        description="Maximum total size of workspaces kept in RAM in MB; further ones go to disk"
+    )
+    workspace_ram_reserve_mb: int = Field(
+        default=200,
+        description="RAM set aside for a new workspace in MB until its actual size is measured"
+    )
+    workspace_max_idle: int = Field(default=8, description="Emptied workspace directories kept for reuse")
+    upload_dir: Optional[str] = Field(
+        default=None,
+        description="Directory for uploaded archives awaiting analysis (defaults to the system temp directory)"
+    )
+    upload_max_mb: int = Field(default=100, description="Maximum size of an uploaded archive in MB")
+    archive_max_entries: int = Field(default=100000, description="Maximum number of entries in an uploaded archive")
+    local_analysis_roots: List[str] = Field(
+        default=[],
+        description="Directories whose contents may be analyzed in place (empty disables local path analysis)"
+    )
+    max_file_size_kb: int = Field(
+        default=2048,
+        description="Source files larger than this are skipped by the analyzers"
+    )
+    complexity_workers: int = Field(
+        default=0,
+        description="Processes used for complexity analysis (0 = one per CPU core)"
+    )
+    network_workers: int = Field(default=8, description="Threads for clones and remote lookups")
+    tool_workers: int = Field(
+        default=0,
+        description="Threads waiting on sandbox containers and running small CPU jobs (0 = one per CPU core)"
+    )
+    io_workers: int = Field(default=8, description="Threads for database and file system work")
+    incremental_analysis: bool = Field(
+        default=True,
+        description="Re-analyze only files changed since the repository's previous report"
+    )
+    report_files_retention: int = Field(
+        default=10,
+        description="Newest reports per repository whose per-file results are kept for incremental analysis"
+    )
+    file_cache_enabled: bool = Field(
+        default=True,
+        description="Cache per-file results by git blob ID across commits and repositories"
+    )
+    file_cache_max_mb: int = Field(default=256, description="Maximum size of the per-file result cache in MB")
+    remote_sha_cache_ttl: int = Field(
+        default=60,
+        description="Seconds a resolved remote HEAD SHA is reused before re-querying"
+    )
+    shard_analysis: bool = Field(
+        default=True,
+        description="Lint subprojects (directories with their own pyproject.toml, setup.py or package.json) "
+                    "as separate shards in parallel and report each one"
+    )
+    shard_workers: int = Field(
+        default=0,
+        description="Pylint processes run in parallel for sharded repositories (0 = one per CPU core)"
+    )
+    history_max_commits: int = Field(default=100, description="Maximum commits one history analysis may cover")
+    history_concurrency: int = Field(
+        default=2,
+        description="Commits of one history analysis linted at the same time"
+    )
+
+    # Job Queue
+    job_workers: int = Field(default=2, description="Number of concurrent analysis workers")
+    job_queue_max_size: int = Field(default=100, description="Maximum number of queued analysis jobs")
+    job_retention_seconds: int = Field(
+        default=3600,
+        description="How long finished jobs remain queryable in seconds"
+    )
+    batch_max_repos: int = Field(default=500, description="Maximum repositories in one batch request")
+    batch_concurrency: int = Field(
+        default=4,
+        description="Jobs all batch requests together keep queued or running at a time"
+    )
+
     # Rate Limiting
     rate_limit_enabled: bool = Field(default=True, description="Enable rate limiting")
     rate_limit_requests: int = Field(default=10, description="Max requests per window")
     rate_limit_window: int = Field(default=60, description="Rate limit window in seconds")
+    batch_rate_limit_repos: int = Field(
+        default=100,
+        description="New analyses a client's batches may start per rate limit window"
+    )
     
     # Logging
     log_level: str = Field(default="INFO", description="Log level")
@@ -1,17 +1,56 @@
 # backend/main.py
 
-from fastapi import FastAPI, Depends, HTTPException
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from typing import List, Optional
+
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
-import traceback
 
-from backend.services.analyzer import analyze_single_repo
 from backend.utils.translator import get_translation
-from backend.services.db_service import init_db, save_report, list_reports, get_report
+from backend.utils.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, MetricFamily
+from backend.utils.exceptions import DevPulseError, PayloadTooLargeError, ValidationError
+from backend.utils.rate_limiter import batch_rate_limiter, rate_limiter
+from backend.utils.validators import validate_github_url, validate_local_path
+from backend.utils.repo_downloader import local_commit_sha
+from backend.services.db_service import init_db, list_reports, get_report, get_report_series
 from backend.services.predictor import load_ml_model
+from backend.services.job_queue import analysis_queue
+from backend.services.batch import run_batch, validate_batch
+from backend.config import get_settings
+from backend.services.analyzer import (
+    MIRROR_STORE,
+    SANDBOX_POOL,
+    WORKSPACES,
+    find_existing_report,
+    resolve_head,
+    start_sandbox_pool,
+    stop_sandbox_pool,
+)
+from backend.services.result_cache import file_cache
+from backend.services.executors import IO_POOL, executor_stats
+from backend.services.file_walker import IGNORE_DIRS
+from backend.services.uploads import discard_upload, receive_upload, upload_dir
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start the analysis workers on the server's event loop
+    await analysis_queue.start()
+    # Batch jobs queued or running at a time, across all batch requests
+    app.state.batch_slots = asyncio.Semaphore(max(1, get_settings().batch_concurrency))
+    await start_sandbox_pool()
+    yield
+    await analysis_queue.stop()
+    await stop_sandbox_pool()
+
 
 # Init app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # Init DB on startup
 init_db() # Run this once to update the schema! If you have old data, you might need to drop the table first.
@@ -27,46 +66,261 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Idle SSE streams send a comment this often so proxies keep them open
+SSE_KEEPALIVE_SECONDS = 15
+
 # Request schema
 class RepoRequest(BaseModel):
     repo_url: str
 
+
+class BatchRequest(BaseModel):
+    repo_urls: List[str]
+
+
+class LocalPathRequest(BaseModel):
+    path: str
+    repo_url: Optional[str] = None
+
+
+class HistoryRequest(BaseModel):
+    repo_url: str
+    commits: int = 20
+
+
+@app.exception_handler(DevPulseError)
+async def devpulse_error_handler(request: Request, exc: DevPulseError):
+    headers = None
+    if "retry_after_seconds" in exc.details:
+        headers = {"Retry-After": str(exc.details["retry_after_seconds"])}
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.message, **exc.to_dict()},
+        headers=headers,
+    )
+
+
+def _client_id(request: Request) -> str:
+    return request.client.host if request.client else "unknown"
+
+
+def client_rate_limit(request: Request) -> None:
+    """Apply the per-client request limit from the rate_limit_* settings."""
+    rate_limiter.check(_client_id(request))
+
 # -------------------------------
 #  ROUTES
 # -------------------------------
 
-# In main.py - update the analyze endpoint
-@app.post("/analyze")
-async def analyze(request: RepoRequest):
+@app.post("/analyze", status_code=202, dependencies=[Depends(client_rate_limit)])
+async def analyze(request: RepoRequest, force: bool = False):
+    """
+    Queue an analysis and return immediately with a job ID to poll.
+
+    If the remote HEAD was already analyzed with the current tool versions the
+    stored report is returned right away (200) unless ``force=true`` is passed.
+    Requests for a commit that is already being analyzed share that job.
+    Clients over their request limit, and submissions while the queue is full,
+    get 429 with a ``Retry-After`` header.
+    """
+    repo_url = validate_github_url(request.repo_url)
+    head_sha = None
+    if not force:
+        head_sha = await resolve_head(repo_url)
+        # An unresolved HEAD is left to the job rather than waiting out a second ls-remote
+        existing = await find_existing_report(repo_url, head_sha) if head_sha else None
+        if existing:
+            print(f"[API] Returning stored report {existing['id']} for: {repo_url}")
+            return JSONResponse(
+                status_code=200,
+                content={"report_id": existing["id"], "cached": True, "results": existing},
+            )
+
+    job = analysis_queue.submit(repo_url, key=(repo_url, head_sha, force), force=force)
+    print(f"[API] Queued analysis job {job.id} for: {repo_url}")
+    return {**job.to_dict(), "status_url": f"/jobs/{job.id}"}
+
+
+async def _submit_source(
+    repo_url: str,
+    commit_sha: Optional[str],
+    force: bool,
+    archive_path: Optional[str] = None,
+    local_path: Optional[str] = None,
+):
+    """
+    Queue the analysis of an upload or local directory, or return its stored report.
+
+    ``commit_sha`` identifies the contents; without it (a local directory
+    with uncommitted changes) nothing is reused or shared. The upload is
+    discarded here unless the queued job takes it over.
+    """
+    keep_upload = False
     try:
-        print(f"[API] Starting analysis for: {request.repo_url}")
-        results = await analyze_single_repo(request.repo_url)
-        
-        # Check if analysis returned valid results
-        if results is None:
-            raise HTTPException(status_code=500, detail="Analysis returned no results")
-        
-        print(f"[API] Analysis completed, saving to DB...")
-        
-        # Save to DB
-        report_id = save_report(
-            results["repo_url"],
-            results["git_sha"],
-            results["radon"],
-            results["cloc"],
-            results["pylint"],
-            results["ai_metrics"],
-            results["code_health_score"],
-            results["historical_risk_score"],
+        if commit_sha and not force:
+            existing = await find_existing_report(repo_url, commit_sha)
+            if existing:
+                print(f"[API] Returning stored report {existing['id']} for: {repo_url}")
+                return JSONResponse(
+                    status_code=200,
+                    content={"report_id": existing["id"], "cached": True, "results": existing},
+                )
+
+        job = analysis_queue.submit(
+            repo_url,
+            key=(repo_url, commit_sha, force) if commit_sha else None,
+            force=force, archive_path=archive_path, local_path=local_path, commit_sha=commit_sha,
         )
-        
-        print(f"[API] Report saved with ID: {report_id}")
-        return {"report_id": report_id, "results": results}
-        
-    except Exception as e:
-        print(f"[API] Analysis endpoint error: {e}")
-        traceback.print_exc()
-        raise HTTPException(status_code=500, detail=str(e))
+        # A request attached to an identical in-flight job leaves its upload unused
+        keep_upload = archive_path is not None and job.options.get("archive_path") == archive_path
+    finally:
+        if archive_path and not keep_upload:
+            await asyncio.get_running_loop().run_in_executor(IO_POOL, discard_upload, archive_path)
+    print(f"[API] Queued analysis job {job.id} for: {repo_url}")
+    return {**job.to_dict(), "status_url": f"/jobs/{job.id}"}
+
+
+@app.post("/analyze/upload", status_code=202, dependencies=[Depends(client_rate_limit)])
+async def analyze_upload(request: Request, repo_url: Optional[str] = None, force: bool = False):
+    """
+    Analyze a zip or tar archive sent as the raw request body.
+
+    The body is streamed to disk as it arrives and the archive is extracted
+    in the job, with the entry count and extracted size limited. The report
+    is filed under ``repo_url`` when given, joining that repository's
+    history, and under ``upload://<digest>`` otherwise. The archive's
+    SHA-256 stands in for the commit, so uploading identical contents again
+    returns the stored report unless ``force=true``.
+    """
+    settings = get_settings()
+    name = validate_github_url(repo_url) if repo_url else None
+    max_bytes = settings.upload_max_mb * 1024 * 1024
+    declared = request.headers.get("content-length", "")
+    if declared.isdigit() and int(declared) > max_bytes:
+        raise PayloadTooLargeError(f"Upload exceeds {settings.upload_max_mb} MB", max_bytes=max_bytes)
+
+    upload = await receive_upload(request.stream(), upload_dir(settings.upload_dir), max_bytes)
+    print(f"[API] Received {upload.format} archive ({upload.size} bytes)")
+    return await _submit_source(
+        name or f"upload://{upload.sha256[:16]}", upload.sha256, force, archive_path=upload.path
+    )
+
+
+@app.post("/analyze/local", status_code=202, dependencies=[Depends(client_rate_limit)])
+async def analyze_local(request: LocalPathRequest, force: bool = False):
+    """
+    Analyze a directory on the server in place, without cloning.
+
+    Meant for CI runners that already have the checkout; only directories
+    under the ``local_analysis_roots`` setting are accepted. The report is
+    filed under ``repo_url`` when given and ``local://<path>`` otherwise.
+    A clean git checkout (no changed or untracked source files) is
+    identified by its HEAD commit and reuses stored reports like a clone
+    would; other directories are always analyzed.
+    """
+    path = validate_local_path(request.path, get_settings().local_analysis_roots)
+    repo_url = validate_github_url(request.repo_url) if request.repo_url else f"local://{path}"
+    commit_sha = await asyncio.get_running_loop().run_in_executor(IO_POOL, local_commit_sha, path, IGNORE_DIRS)
+    return await _submit_source(repo_url, commit_sha, force, local_path=path)
+
+
+@app.post("/analyze/history", status_code=202, dependencies=[Depends(client_rate_limit)])
+async def analyze_history(request: HistoryRequest, force: bool = False):
+    """
+    Queue the analysis of a repository's last ``commits`` commits.
+
+    Each commit gets its own report, with per-commit code health and risk
+    scores; commits already analyzed keep their stored report unless
+    ``force=true``. The job's report is the newest commit's, and the series
+    is read from ``/reports/history``.
+    """
+    repo_url = validate_github_url(request.repo_url)
+    max_commits = get_settings().history_max_commits
+    if not 1 <= request.commits <= max_commits:
+        raise ValidationError(
+            f"commits must be between 1 and {max_commits}", field="commits",
+            details={"max_commits": max_commits}
+        )
+    job = analysis_queue.submit(
+        repo_url, key=(repo_url, "history", request.commits, force),
+        force=force, history_commits=request.commits,
+    )
+    print(f"[API] Queued history job {job.id} for: {repo_url} ({request.commits} commits)")
+    return {**job.to_dict(), "status_url": f"/jobs/{job.id}"}
+
+
+@app.post("/analyze/batch", dependencies=[Depends(client_rate_limit)])
+async def analyze_batch(request: BatchRequest, http_request: Request, force: bool = False):
+    """
+    Analyze many repositories in one call, streaming results as they finish.
+
+    URLs are validated and deduplicated; stored reports are reused unless
+    ``force=true``. The batch counts as one request against the client's rate
+    limit, and each repository that starts a new analysis counts against the
+    client's batch budget; repositories over the budget, or submitted while
+    the queue is full, come back ``deferred`` with ``retry_after_seconds``. The
+    response is newline-delimited JSON: one ``result`` object per repository
+    in completion order, then a ``summary``.
+    """
+    settings = get_settings()
+    validate_batch(request.repo_urls, settings.batch_max_repos)
+    print(f"[API] Batch analysis of {len(request.repo_urls)} repositories")
+    client = _client_id(http_request)
+
+    async def stream():
+        async for event in run_batch(
+            request.repo_urls, analysis_queue, http_request.app.state.batch_slots,
+            force=force, charge=lambda: batch_rate_limiter.check(client)
+        ):
+            yield json.dumps(event) + "\n"
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = analysis_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str, request: Request):
+    """
+    Stream a job's progress as server-sent events.
+
+    Emits ``queued``, ``started``, ``stage_started``/``stage_finished`` (with
+    timings), ``partial_result`` (report sections ready early) and finally
+    ``succeeded`` or ``failed``. Reconnecting clients resume after the
+    ``Last-Event-ID`` header.
+    """
+    job = analysis_queue.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    try:
+        after = int(request.headers.get("last-event-id", 0))
+    except ValueError:
+        after = 0
+
+    async def stream():
+        seen = after
+        while True:
+            events = await job.wait_events(seen, timeout=SSE_KEEPALIVE_SECONDS)
+            if not events:
+                if job.done:
+                    return
+                yield ": keepalive\n\n"
+                continue
+            for event in events:
+                yield f"id: {event['seq']}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+            seen = events[-1]["seq"]
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/reports")
@@ -74,6 +328,12 @@ def reports():
     return list_reports()
 
 
+@app.get("/reports/history")
+def report_history(repo_url: str):
+    """Code health and risk scores of a repository's commits, oldest first."""
+    return get_report_series(validate_github_url(repo_url))
+
+
 @app.get("/reports/{report_id}")
 def report(report_id: int):
     report = get_report(report_id)
@@ -87,6 +347,117 @@ async def status(translations: dict = Depends(get_translation)):
     return {"message": translations["analysis_complete"]}
 
 
+@app.get("/stats")
+def stats():
+    """Runtime statistics of the analysis pipeline."""
+    return {
+        "analysis_queue": analysis_queue.stats(),
+        "executors": executor_stats(),
+        "file_cache": file_cache.stats(),
+        "mirror_cache": MIRROR_STORE.stats() if MIRROR_STORE else None,
+        "sandbox_pool": SANDBOX_POOL.stats() if SANDBOX_POOL else None,
+        "workspaces": WORKSPACES.stats(),
+    }
+
+
+# Per-pool executor values exported on /metrics: stats key, metric name, help, type
+_EXECUTOR_METRICS = [
+    ("workers", "devpulse_executor_workers", "Worker threads or processes of the pool", "gauge"),
+    ("active", "devpulse_executor_active_tasks", "Tasks the pool is running", "gauge"),
+    ("queued", "devpulse_executor_queued_tasks", "Tasks waiting for a free worker", "gauge"),
+    ("completed", "devpulse_executor_completed_tasks_total", "Tasks the pool finished", "counter"),
+    ("failed", "devpulse_executor_failed_tasks_total", "Tasks that raised an exception", "counter"),
+    ("busy_seconds", "devpulse_executor_busy_seconds_total", "Worker time spent running tasks", "counter"),
+    ("avg_queue_seconds", "devpulse_executor_avg_queue_seconds", "Average time tasks waited for a worker", "gauge"),
+    ("utilisation", "devpulse_executor_utilisation", "Share of worker time busy since the pool started", "gauge"),
+]
+
+
+def _hit_ratio(hits: int, misses: int) -> Optional[float]:
+    return hits / (hits + misses) if hits + misses else None
+
+
+def _pipeline_metrics() -> List[MetricFamily]:
+    """Gauges and counters for /metrics, from the same snapshots /stats returns."""
+    queue = analysis_queue.stats()
+    families = [
+        MetricFamily("devpulse_job_queue_depth", "Analysis jobs waiting in the queue").add(queue["depth"]),
+        MetricFamily("devpulse_job_queue_running", "Analysis jobs being run").add(queue["running"]),
+        MetricFamily("devpulse_job_queue_workers", "Analysis queue workers").add(queue["workers"]),
+        MetricFamily(
+            "devpulse_job_queue_rejected_total", "Jobs rejected because the queue was full", "counter"
+        ).add(queue["rejected"]),
+        MetricFamily(
+            "devpulse_job_queue_coalesced_total", "Requests attached to an identical pending job", "counter"
+        ).add(queue["coalesced"]),
+    ]
+
+    pools = executor_stats()
+    for key, name, documentation, kind in _EXECUTOR_METRICS:
+        family = MetricFamily(name, documentation, kind, ["pool"])
+        for pool, snapshot in sorted(pools.items()):
+            family.add(snapshot[key], pool)
+        families.append(family)
+
+    cache = file_cache.stats()
+    hits = MetricFamily("devpulse_file_cache_hits_total", "Per-file results found in the cache", "counter", ["tool"])
+    misses = MetricFamily("devpulse_file_cache_misses_total", "Per-file results not in the cache", "counter", ["tool"])
+    ratio = MetricFamily("devpulse_file_cache_hit_ratio", "Share of cache lookups that were hits", labelnames=["tool"])
+    for tool in sorted(set(cache["hits"]) | set(cache["misses"])):
+        tool_hits, tool_misses = cache["hits"].get(tool, 0), cache["misses"].get(tool, 0)
+        hits.add(tool_hits, tool)
+        misses.add(tool_misses, tool)
+        ratio.add(_hit_ratio(tool_hits, tool_misses), tool)
+    families += [
+        hits, misses, ratio,
+        MetricFamily(
+            "devpulse_file_cache_evictions_total", "Entries evicted from the file cache", "counter"
+        ).add(cache["evictions"]),
+        MetricFamily("devpulse_file_cache_size_bytes", "Size of the file cache").add(cache["size_bytes"]),
+    ]
+
+    if MIRROR_STORE:
+        mirrors = MIRROR_STORE.stats()
+        families += [
+            MetricFamily(
+                "devpulse_mirror_cache_hits_total", "Analyses served from an existing mirror", "counter"
+            ).add(mirrors["hits"]),
+            MetricFamily(
+                "devpulse_mirror_cache_misses_total", "Analyses that had to create a mirror", "counter"
+            ).add(mirrors["misses"]),
+            MetricFamily(
+                "devpulse_mirror_cache_hit_ratio", "Share of analyses served from an existing mirror"
+            ).add(_hit_ratio(mirrors["hits"], mirrors["misses"])),
+            MetricFamily("devpulse_mirror_cache_size_bytes", "Size of the repository mirrors").add(mirrors["size_bytes"]),
+        ]
+    if SANDBOX_POOL:
+        sandbox = SANDBOX_POOL.stats()
+        families += [
+            MetricFamily("devpulse_sandbox_pool_busy", "Pooled sandbox containers in use").add(sandbox["busy"]),
+            MetricFamily("devpulse_sandbox_pool_idle", "Pooled sandbox containers ready").add(sandbox["idle"]),
+            MetricFamily(
+                "devpulse_sandbox_pool_utilisation", "Share of container time busy since the pool started"
+            ).add(sandbox["utilisation"]),
+        ]
+
+    workspaces = WORKSPACES.stats()
+    families.append(
+        MetricFamily("devpulse_workspace_bytes", "Space used by active analysis workspaces", labelnames=["storage"])
+        .add(workspaces["ram_bytes"], "ram")
+        .add(workspaces["disk_bytes"], "disk")
+    )
+    return families
+
+
+REGISTRY.add_collector(_pipeline_metrics)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Stage timing histograms and pipeline statistics in the Prometheus text format."""
+    return PlainTextResponse(REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/upload")
 async def upload(translations: dict = Depends(get_translation)):
     return {"message": translations["upload_prompt"]}
@@ -117,7 +488,6 @@ class TestClass:
         results = {}
         for tool, cmd in [
             ("radon", ["radon", "cc", ".", "-s", "-a"]),
-            ("cloc", ["cloc", ".", "--json"]),
             ("pylint", ["pylint", ".", "-f", "text", "--exit-zero"])
         ]:
             try:
@@ -1,12 +1,12 @@
 # backend/services/analyzer.py (Critical Fixes)
 
 import asyncio
-import tempfile
-import shutil
+import json
 import os
 import sys
-from typing import Dict, Any, Tuple
-from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from importlib import metadata
+from typing import Dict, Any, List, Tuple, Callable, Optional, Set, Union
 
 try:
     import docker 
@@ -22,239 +22,750 @@ except ImportError:
     DOCKER_SANDBOX_ENABLED = False
 
 from backend.services.ai_summary import generate_ai_metrics 
-from backend.utils.repo_downloader import clone_repo 
+from backend.utils.repo_downloader import clone_repo, resolve_remote_head
 from backend.services.predictor import calculate_chs, get_historical_risk_score, extract_features_for_prediction
-from backend.utils.radon_parser import parse_radon_output
-from backend.utils.cloc_parser import parse_cloc_output
-from backend.utils.pylint_parser import parse_pylint_output
+from backend.services.deadline import Deadline
+from backend.services.complexity_engine import format_complexity_summary
+from backend.services.file_metrics import measure_files
+from backend.services.file_walker import IGNORE_DIRS, SourceFile, walk_repository
+from backend.services.line_counter import LINE_COUNTER_VERSION
+from backend.services.incremental import IncrementalPlan, aggregate_records, build_file_records, plan_analysis
+from backend.services.result_cache import config_hash, file_cache
+from backend.services.shards import CACHE_TOOL as SHARD_CACHE_TOOL
+from backend.services.shards import (
+    config_digest, detect_shards, group_by_shard, pack_shards, shard_digests, shard_sections
+)
+from backend.services.mirror_store import mirror_store
+from backend.services.workspace import Workspace, workspace_manager
+from backend.services.executors import IO_POOL, NETWORK_POOL, TOOL_POOL
+from backend.services.process_runner import run_process
+from backend.services.sandbox import SandboxPool, dedicated_session
+from backend.utils.archive import extract_archive
+from backend.utils.metrics import ANALYSIS_STAGE_SECONDS
+from backend.utils.pylint_parser import format_pylint_summary, parse_pylint_json_by_file
+from backend.services.db_service import find_latest_report, find_report, get_report, get_report_files
+from backend.utils.exceptions import RepositoryError, TimeoutError, ValidationError
+from backend.utils.validators import validate_github_url
+from backend.config import get_settings
 
 from dotenv import load_dotenv
 load_dotenv()
 
-EXECUTOR = ThreadPoolExecutor(max_workers=4)
 SANDBOX_IMAGE = os.getenv("SANDBOX_IMAGE", "devpulse-sandbox")
 
+# Bump when parsing or scoring changes so reports from older analyzers are not reused
+ANALYZER_VERSION = "7"
+
+# Explicit file lists above this size fall back to letting the tool traverse,
+# keeping well under the OS argument length limit
+MAX_FILE_ARGS_BYTES = 512 * 1024
+
+MB = 1024 * 1024
+
+# Commit recorded for uploads and local directories whose contents have no known commit
+LOCAL_SHA = "working-tree"
+
+_settings = get_settings()
+SANDBOX_POOL = SandboxPool(
+    DOCKER_CLIENT,
+    SANDBOX_IMAGE,
+    size=_settings.sandbox_pool_size,
+    max_jobs_per_container=_settings.sandbox_max_jobs_per_container,
+    mem_limit=_settings.sandbox_memory_limit,
+    exec_timeout=_settings.sandbox_timeout,
+    health_check_interval=_settings.sandbox_health_check_interval,
+    scratch_mb=_settings.sandbox_scratch_mb,
+    max_output_bytes=_settings.tool_output_max_mb * MB,
+) if DOCKER_SANDBOX_ENABLED and _settings.sandbox_pool_size > 0 else None
+
+MIRROR_STORE = mirror_store if _settings.mirror_cache_enabled else None
+WORKSPACES = workspace_manager
+
 print(f"[SANDBOX] Using Docker image: {SANDBOX_IMAGE}")
 print(f"[SANDBOX] Docker enabled: {DOCKER_SANDBOX_ENABLED}")
 
 
-async def run_sandboxed_command(*args: str, repo_path: str) -> str:
+async def run_sandboxed_command(*args: str, repo_path: str, timeout: Optional[int] = None) -> str:
     """Executes a command inside Docker container or on host."""
-    
+    timeout = timeout or get_settings().sandbox_timeout
+
     if not DOCKER_SANDBOX_ENABLED:
         print(f"[SANDBOX] Running on host: {' '.join(args)}")
-        loop = asyncio.get_running_loop()
-        def _run():
-            try:
-                import subprocess
-                cmd = [str(a) for a in args]
-                use_shell = os.name == 'nt'
-                result = subprocess.run(
-                    cmd, 
-                    capture_output=True, 
-                    text=True, 
-                    cwd=repo_path, 
-                    timeout=120, 
-                    shell=use_shell
-                )
-                if result.returncode != 0 and result.returncode != 1:
-                    # Note: pylint returns non-zero for issues, which is normal
-                    print(f"[SANDBOX] Command returned code {result.returncode}")
-                    print(f"[SANDBOX] stderr: {result.stderr[:500]}")
-                return result.stdout
-            except subprocess.TimeoutExpired:
-                print(f"[SANDBOX] Command timed out")
-                return ""
-            except Exception as e:
-                print(f"[SANDBOX] Host execution error: {e}")
-                return ""
-        return await loop.run_in_executor(EXECUTOR, _run)
+        try:
+            result = await run_process(
+                args,
+                cwd=repo_path,
+                timeout=timeout,
+                max_output_bytes=get_settings().tool_output_max_mb * 1024 * 1024,
+            )
+        except Exception as e:
+            print(f"[SANDBOX] Host execution error: {e}")
+            return ""
+        if result.timed_out:
+            print(f"[SANDBOX] Command timed out")
+            return ""
+        if result.exit_code != 0 and result.exit_code != 1:
+            # Note: pylint returns non-zero for issues, which is normal
+            print(f"[SANDBOX] Command returned code {result.exit_code}")
+            print(f"[SANDBOX] stderr: {result.stderr[:500]}")
+        if result.truncated:
+            print(f"[SANDBOX] Output truncated at {get_settings().tool_output_max_mb} MB")
+        return result.stdout
 
     # Docker execution
-    print(f"[SANDBOX] Running in Docker: {' '.join(args)}")
+    outputs = await run_sandboxed_tools({"command": [str(a) for a in args]}, repo_path, timeout=timeout)
+    return outputs["command"]
+
+
+def _sandbox_session(repo_path: str, exec_timeout: int):
+    """One sandbox container holding the repository for a whole analysis."""
+    settings = get_settings()
+    if SANDBOX_POOL is not None:
+        return SANDBOX_POOL.session(
+            repo_path, exclude_dirs=IGNORE_DIRS, timeout=exec_timeout, exec_timeout=exec_timeout
+        )
+    return dedicated_session(
+        DOCKER_CLIENT, SANDBOX_IMAGE, repo_path,
+        mem_limit=settings.sandbox_memory_limit, exec_timeout=exec_timeout,
+        max_output_bytes=settings.tool_output_max_mb * MB
+    )
+
+
+async def run_sandboxed_tools(
+    commands: Dict[str, Optional[List[str]]],
+    repo_path: str,
+    timeout: Optional[int] = None
+) -> Dict[str, str]:
+    """
+    Run several tool commands for one analysis, concurrently.
+
+    In Docker mode all commands share one sandbox container holding the
+    repository. Outputs come back per tool rather than as one stream.
+
+    Args:
+        commands: Command per tool name; tools with no command are skipped
+        repo_path: Repository the tools analyze
+        timeout: Seconds each tool may run before it is killed
+            (defaults to the ``sandbox_timeout`` setting)
+
+    Returns:
+        Standard output per tool name (empty if the tool failed)
+    """
+    runnable = {tool: cmd for tool, cmd in commands.items() if cmd}
+    if not runnable:
+        return {}
+
+    if not DOCKER_SANDBOX_ENABLED:
+        outputs = await asyncio.gather(
+            *(run_sandboxed_command(*cmd, repo_path=repo_path, timeout=timeout) for cmd in runnable.values())
+        )
+        return dict(zip(runnable, outputs))
+
+    timeout = timeout or get_settings().sandbox_timeout
+    print(f"[SANDBOX] Running in one container: {', '.join(runnable)}")
     loop = asyncio.get_running_loop()
 
     def _run_in_docker():
-        container_repo_path = "/repo"
-        
-        cmd_for_docker = []
-        for arg in args:
-            if arg == '.':
-                cmd_for_docker.append(container_repo_path)
-            elif os.path.isabs(str(arg)) and os.path.abspath(str(arg)) == os.path.abspath(repo_path):
-                cmd_for_docker.append(container_repo_path)
-            else:
-                cmd_for_docker.append(str(arg))
-        
-        print(f"[SANDBOX] Docker command: {cmd_for_docker}")
-        
         try:
             if not os.path.exists(repo_path):
                 raise Exception(f"Repo path does not exist: {repo_path}")
-            
-            try:
-                output = DOCKER_CLIENT.containers.run(
-                    SANDBOX_IMAGE,
-                    command=cmd_for_docker,
-                    volumes={repo_path: {'bind': container_repo_path, 'mode': 'ro'}},
-                    working_dir=container_repo_path,
-                    remove=True,
-                    detach=False,
-                    stdout=True,
-                    stderr=True,
-                    user="root",
-                    mem_limit="512m",
-                    network_mode="none"
-                )
-                
-                if isinstance(output, bytes):
-                    result = output.decode('utf-8', errors='ignore')
-                else:
-                    result = str(output)
-                    
-                print(f"[SANDBOX] Command successful, output length: {len(result)}")
-                return result
-                
-            except docker.errors.ContainerError as e:
-                error_msg = e.stderr.decode('utf-8', errors='ignore') if e.stderr else str(e)
-                print(f"[SANDBOX] Container error (exit {e.exit_status}): {error_msg[:200]}")
-                
-                # For tools like pylint, non-zero exit is normal
-                stdout = getattr(e, 'stdout', b'')
-                if stdout:
-                    return stdout.decode('utf-8', errors='ignore')
-                return ""
-                
-        except docker.errors.ImageNotFound:
-            print(f"[SANDBOX] Image not found: {SANDBOX_IMAGE}")
-            return ""
+
+            with _sandbox_session(repo_path, timeout) as session:
+                results = session.run_tools(runnable)
+
+            outputs = {}
+            for tool, result in results.items():
+                if result.exit_code != 0 and result.exit_code != 1:
+                    # Note: pylint returns non-zero for issues, which is normal
+                    print(f"[SANDBOX] {tool} returned code {result.exit_code}")
+                    print(f"[SANDBOX] stderr: {result.stderr[:500]}")
+                if result.truncated:
+                    print(f"[SANDBOX] {tool} output truncated at {get_settings().tool_output_max_mb} MB")
+                print(f"[SANDBOX] {tool} output length: {len(result.stdout)}")
+                outputs[tool] = result.stdout
+            return outputs
+
         except Exception as e:
             print(f"[SANDBOX] Docker error: {str(e)}")
             import traceback
             traceback.print_exc()
-            return ""
-            
-    return await loop.run_in_executor(EXECUTOR, _run_in_docker)
+            return {tool: "" for tool in commands}
+
+    return await loop.run_in_executor(TOOL_POOL, _run_in_docker)
+
+
+async def start_sandbox_pool() -> None:
+    """Pre-start pooled sandbox containers so the first analysis does not wait for them."""
+    if SANDBOX_POOL is None:
+        return
+    loop = asyncio.get_running_loop()
+    try:
+        await loop.run_in_executor(TOOL_POOL, SANDBOX_POOL.start)
+    except Exception as e:
+        print(f"[SANDBOX] Could not start container pool: {e}")
 
 
-async def clone_repo_async(repo_url: str, dest_dir: str) -> Tuple[str, str]:
+async def stop_sandbox_pool() -> None:
+    """Remove pooled sandbox containers."""
+    if SANDBOX_POOL is None:
+        return
     loop = asyncio.get_running_loop()
-    return await loop.run_in_executor(EXECUTOR, clone_repo, repo_url, dest_dir)
+    await loop.run_in_executor(TOOL_POOL, SANDBOX_POOL.stop)
+
+
+def _package_version(name: str) -> str:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return "unavailable"
+
+
+@lru_cache(maxsize=1)
+def get_tool_versions() -> Dict[str, str]:
+    """
+    Versions of everything that shapes a report.
+
+    A stored report is only reused when it was produced by the same versions.
+    In Docker mode the external tools come from the sandbox image, so the
+    image name stands in for their individual versions. Radon always runs
+    in-process, as does line counting.
+    """
+    versions = {
+        "analyzer": ANALYZER_VERSION,
+        "radon": _package_version("radon"),
+        "line_counter": LINE_COUNTER_VERSION,
+    }
+    if DOCKER_SANDBOX_ENABLED:
+        versions["sandbox_image"] = SANDBOX_IMAGE
+    else:
+        versions["pylint"] = _package_version("pylint")
+    return versions
+
 
+async def resolve_head(repo_url: str) -> Optional[str]:
+    """
+    Resolve the remote HEAD SHA with ls-remote (cached with a TTL).
 
-async def analyze_single_repo(repo_url: str) -> Dict[str, Any]:
-    temp_dir = tempfile.mkdtemp()
+    Returns:
+        Commit SHA, or None if the remote could not be queried
+    """
+    loop = asyncio.get_running_loop()
+    ttl = get_settings().remote_sha_cache_ttl
+    try:
+        return await loop.run_in_executor(NETWORK_POOL, resolve_remote_head, repo_url, ttl)
+    except Exception as e:
+        print(f"[ANALYZER] Could not resolve remote HEAD for {repo_url}: {e}")
+        return None
+
+
+async def find_existing_report(repo_url: str, sha: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Return the stored report for the remote HEAD if it was already analyzed.
+
+    Looks for a report of the HEAD commit produced by the current tool
+    versions.
+
+    Args:
+        repo_url: Normalized repository URL
+        sha: Remote HEAD SHA if already resolved; resolved here otherwise
+
+    Returns:
+        Stored report, or None when the commit needs a fresh analysis
+    """
+    if sha is None:
+        sha = await resolve_head(repo_url)
+    if sha is None:
+        return None
+
+    loop = asyncio.get_running_loop()
+    report_id = await loop.run_in_executor(IO_POOL, find_report, repo_url, sha, get_tool_versions())
+    if report_id is None:
+        return None
+    print(f"[ANALYZER] Reusing report {report_id} for {repo_url}@{sha}")
+    return await loop.run_in_executor(IO_POOL, get_report, report_id)
+
+
+def _file_args(paths: List[str], traverse_args: List[str]) -> List[str]:
+    """Hand walked files to a tool explicitly, or let it traverse for huge trees."""
+    if sum(len(p) + 1 for p in paths) > MAX_FILE_ARGS_BYTES:
+        return traverse_args
+    return paths
+
+
+def pylint_command(lint_paths: List[str]) -> Optional[List[str]]:
+    """Pylint command for the given modules (None if there is nothing to lint)."""
+    if not lint_paths:
+        return None
+    return [
+        sys.executable, "-m", "pylint",
+        "--output-format=json2", "--exit-zero",
+        *_file_args(lint_paths, [".", "--recursive=y", f"--ignore-paths={','.join(IGNORE_DIRS)}"])
+    ]
+
+
+async def clone_repo_async(
+    repo_url: str,
+    dest_dir: str,
+    timeout: Optional[float] = None,
+    max_size_mb: Optional[int] = None
+) -> Tuple[str, str]:
+    settings = get_settings()
+    options: Dict[str, Any] = dict(
+        timeout=timeout, sparse=settings.sparse_clone,
+        exclude_dirs=IGNORE_DIRS, max_size_mb=max_size_mb or settings.max_repo_size_mb
+    )
+    loop = asyncio.get_running_loop()
+    if MIRROR_STORE is not None:
+        # A worktree of the local mirror; release it with release_checkout()
+        repo_url = validate_github_url(repo_url)
+        return await loop.run_in_executor(
+            NETWORK_POOL, partial(MIRROR_STORE.checkout, repo_url, dest_dir, **options)
+        )
+    return await loop.run_in_executor(NETWORK_POOL, partial(clone_repo, repo_url, dest_dir, **options))
+
+
+async def extract_archive_async(
+    archive_path: str,
+    dest_dir: str,
+    timeout: Optional[float] = None,
+    max_bytes: Optional[int] = None
+) -> str:
+    """Extract an uploaded archive into a workspace; returns the root of the extracted tree."""
+    settings = get_settings()
+    loop = asyncio.get_running_loop()
+    root, _ = await loop.run_in_executor(IO_POOL, partial(
+        extract_archive, archive_path, dest_dir,
+        max_bytes=max_bytes or settings.max_repo_size_mb * 1024 * 1024,
+        max_entries=settings.archive_max_entries,
+        exclude_dirs=IGNORE_DIRS, timeout=timeout
+    ))
+    return root
+
+
+async def release_checkout(dest_dir: str) -> None:
+    """Detach a checkout made by ``clone_repo_async`` from its mirror (no-op for plain clones)."""
+    if MIRROR_STORE is not None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(IO_POOL, MIRROR_STORE.release, dest_dir)
+
+
+def _size_exceeded(error: Exception) -> bool:
+    """Whether a checkout or extraction was refused for exceeding its size limit."""
+    details = getattr(error, "details", None) or {}
+    return "max_size_mb" in details or "max_bytes" in details
+
+
+def _report_stage(on_stage: Optional[Callable[[str], None]], stage: str) -> None:
+    """Notify an optional progress callback about the current pipeline stage."""
+    if on_stage is None:
+        return
+    try:
+        on_stage(stage)
+    except Exception as e:
+        print(f"[ANALYZER] Stage callback failed for '{stage}': {e}")
+
+
+def _report_partial(
+    on_partial: Optional[Callable[[str, Dict[str, Any]], None]],
+    section: str,
+    build: Callable[[], Dict[str, Any]]
+) -> None:
+    """Notify an optional callback about a report section that is ready early."""
+    if on_partial is None:
+        return
+    try:
+        on_partial(section, build())
+    except Exception as e:
+        print(f"[ANALYZER] Partial result callback failed for '{section}': {e}")
+
+
+async def _then(awaitable, callback: Callable[[Any], None]):
+    """Await a result and pass it to ``callback`` as soon as it is there."""
+    result = await awaitable
+    callback(result)
+    return result
+
+
+def _radon_totals(radon: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in radon.items() if key != "blocks"}
+
+
+async def _load_previous_files(repo_url: str) -> Tuple[Optional[int], Dict[str, Dict[str, Any]]]:
+    """Per-file records of the newest compatible report, for incremental analysis."""
+    loop = asyncio.get_running_loop()
+    try:
+        report_id = await loop.run_in_executor(
+            IO_POOL, find_latest_report, repo_url, get_tool_versions()
+        )
+        if report_id is None:
+            return None, {}
+        return report_id, await loop.run_in_executor(IO_POOL, get_report_files, report_id)
+    except Exception as e:
+        print(f"[ANALYZER] Could not load previous results, running full analysis: {e}")
+        return None, {}
+
+
+async def _lint_shards(
+    repo_path: str,
+    files: List[SourceFile],
+    plan: IncrementalPlan,
+    roots: List[str],
+    metrics_task: "asyncio.Future[Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]]",
+    timeout: int
+) -> Dict[str, Any]:
+    """
+    Lint a sharded repository, one pylint process per group of shards.
+
+    Shards whose results are in the shard cache are not linted. The cache
+    keys need every module's imports, so this waits for the file metrics
+    first; if they failed, all shards are linted and nothing is cached.
+
+    Returns:
+        ``digests`` (cache key per shard root, empty without imports),
+        ``cached`` (per-file pylint results per cached shard root) and
+        ``outputs`` (the output of each pylint process run)
+    """
+    loop = asyncio.get_running_loop()
+    python = {f.path: f.blob_id for f in files if f.is_python}
+    lint = group_by_shard(plan.lint_paths, roots)
+
+    await asyncio.wait([metrics_task])
+    digests, cached = {}, {}
+    if not metrics_task.cancelled() and metrics_task.exception() is None:
+        complexity, _ = metrics_task.result()
+        imports = {
+            path: (complexity[path] if path in complexity else plan.reused.get(path, {})).get("imports", [])
+            for path in python
+        }
+        digests = shard_digests(group_by_shard(python, roots), python, imports, plan.config)
+        keys = {root: (digests[root], config_hash(get_tool_versions())) for root in lint}
+        hits = await loop.run_in_executor(
+            IO_POOL, file_cache.get_many, SHARD_CACHE_TOOL, ANALYZER_VERSION, list(keys.values())
+        )
+        cached = {root: hits[key] for root, key in keys.items() if key in hits}
+
+    pending = {root: paths for root, paths in lint.items() if root not in cached}
+    workers = get_settings().shard_workers or os.cpu_count() or 1
+    groups = pack_shards(pending, workers)
+    print(f"[ANALYZER] Shards: {len(lint)} to lint, {len(cached)} cached, {len(groups)} pylint processes")
+
+    commands = {f"pylint-{index}": pylint_command(paths) for index, paths in enumerate(groups)}
+    outputs = await run_sandboxed_tools(commands, repo_path, timeout=timeout) if commands else {}
+    return {"digests": digests, "cached": cached, "outputs": [outputs.get(tool, "") for tool in commands]}
+
+
+def _store_shard_results(
+    records: List[Dict[str, Any]],
+    roots: List[str],
+    digests: Dict[str, str],
+    skip: Set[str]
+) -> None:
+    """Cache every fully linted shard's per-file pylint results (except the ``skip`` roots)."""
+    by_root = group_by_shard((r["path"] for r in records if "statements" in r), roots)
+    pylint = {r["path"]: r.get("pylint") for r in records}
+    entries = {}
+    for root, paths in by_root.items():
+        if root in skip or root not in digests or any(pylint[p] is None for p in paths):
+            continue
+        entries[(digests[root], config_hash(get_tool_versions()))] = {p: pylint[p] for p in paths}
+    file_cache.put_many(SHARD_CACHE_TOOL, ANALYZER_VERSION, entries)
+
+
+async def analyze_single_repo(
+    repo_url: str,
+    on_stage: Optional[Callable[[str], None]] = None,
+    incremental: bool = True,
+    on_partial: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    archive_path: Optional[str] = None,
+    local_path: Optional[str] = None,
+    commit_sha: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Clone and analyze a repository.
+
+    With ``archive_path`` the files come from an uploaded archive instead of
+    a clone, and with ``local_path`` an existing directory is analyzed in
+    place; ``repo_url`` then only names the report, and ``commit_sha``
+    identifies the analyzed contents (``LOCAL_SHA`` when unknown).
+
+    With ``incremental`` (and the ``incremental_analysis`` setting) enabled,
+    only files whose contents changed since the newest stored report are
+    re-analyzed; pylint additionally re-checks their importers. The result
+    carries ``file_metrics`` for the caller to store alongside the report.
+
+    ``on_partial`` receives report sections as soon as they are known:
+    ``cloc`` totals and the ``radon`` summary when their tool finishes,
+    then ``pylint`` once its output is parsed.
+
+    The whole analysis runs against the ``analysis_timeout`` deadline. Stages
+    that exceed their share are cancelled and replaced by fallbacks; the
+    result's ``analysis_meta`` lists them under ``incomplete_stages``, along
+    with any tool that failed outright.
+    """
+    deadline = Deadline(get_settings().analysis_timeout)
+    loop = asyncio.get_running_loop()
+    # Local directories are analyzed in place and need no workspace
+    workspace = None if local_path else await loop.run_in_executor(IO_POOL, WORKSPACES.acquire)
     print(f"\n{'='*70}")
     print(f"[ANALYZER] Starting analysis for: {repo_url}")
-    print(f"[ANALYZER] Temp directory: {temp_dir}")
+    if workspace:
+        print(f"[ANALYZER] Workspace: {workspace.path} ({workspace.storage})")
     print(f"{'='*70}\n")
     
     try:
-        # 1. Clone repository
-        print(f"[ANALYZER] Step 1: Cloning repository...")
-        repo_path, commit_sha = await clone_repo_async(repo_url, temp_dir)
-        print(f"[ANALYZER] ✓ Cloned to: {repo_path}")
+        # 1. Clone repository (or extract the upload / use the local directory)
+        if local_path:
+            print(f"[ANALYZER] Step 1: Analyzing local directory in place...")
+            repo_path, commit_sha = local_path, commit_sha or LOCAL_SHA
+        else:
+            # Acquired above whenever there is no local directory
+            assert workspace is not None
+            budget = deadline.budget("clone")
+            if archive_path:
+                print(f"[ANALYZER] Step 1: Extracting uploaded archive...")
+                _report_stage(on_stage, "extracting")
+            else:
+                print(f"[ANALYZER] Step 1: Cloning repository...")
+                _report_stage(on_stage, "cloning")
+
+            async def _fill(dest: str, max_bytes: int) -> Tuple[str, str]:
+                if archive_path:
+                    extracted = await extract_archive_async(archive_path, dest, timeout=budget, max_bytes=max_bytes)
+                    return extracted, commit_sha or LOCAL_SHA
+                return await clone_repo_async(repo_url, dest, timeout=budget, max_size_mb=max_bytes // MB)
+
+            async def _checkout(space: Workspace) -> Tuple[str, str]:
+                # A RAM workspace takes at most what is left of the RAM budget;
+                # files that do not fit are checked out again on disk
+                nonlocal workspace
+                max_bytes = get_settings().max_repo_size_mb * MB
+                allowance = await loop.run_in_executor(IO_POOL, WORKSPACES.ram_allowance, space)
+                if allowance is None or allowance >= max_bytes:
+                    return await _fill(space.path, max_bytes)
+                try:
+                    return await _fill(space.path, max(allowance, MB))
+                except (RepositoryError, ValidationError) as e:
+                    if not _size_exceeded(e):
+                        raise
+                print(f"[ANALYZER] Checkout exceeds the {allowance / MB:.0f} MB left in RAM; using disk")
+                await release_checkout(space.path)
+                workspace = space = await loop.run_in_executor(IO_POOL, WORKSPACES.move_to_disk, space)
+                return await _fill(space.path, max_bytes)
+
+            cloned: Optional[Tuple[str, str]] = await deadline.run(
+                "clone", _checkout(workspace), budget=budget
+            )
+            if cloned is None:
+                step = "Extracting the archive" if archive_path else "Cloning"
+                raise TimeoutError(f"{step} exceeded its {budget:.0f}s budget", timeout_seconds=budget)
+            repo_path, commit_sha = cloned
+            used_bytes = await loop.run_in_executor(IO_POOL, WORKSPACES.measure, workspace)
+            print(f"[ANALYZER] ✓ Checkout size: {used_bytes / MB:.1f} MB in {workspace.storage}")
+        print(f"[ANALYZER] ✓ Files in: {repo_path}")
         print(f"[ANALYZER] ✓ Commit SHA: {commit_sha}\n")
         
         if not repo_path or not os.path.exists(repo_path):
             raise Exception(f"Repository clone failed")
 
-        # 2. Define tool commands
-        # IMPORTANT: Use specific paths and flags that work reliably
+        # 2. Walk the tree once; every analyzer works from this file list
         # Ignore common non-code directories for cleaner results
-        ignore_dirs = ".git,node_modules,venv,.venv,__pycache__,build,dist,.tox,.eggs"
-       
-        radon_cmd = [sys.executable, "-m", "radon", "cc", ".", "-s", "-a", f"--exclude={ignore_dirs}"]
-        cloc_cmd = ["cloc", ".", "--json"]  # cloc is a system binary, no Python needed
-        pylint_cmd = [
-            sys.executable, "-m", "pylint", ".", 
-            "--output-format=text", "--exit-zero", "--recursive=y",
-            f"--ignore-paths={ignore_dirs}"
-        ]
+        max_file_bytes = get_settings().max_file_size_kb * 1024
+        files = await loop.run_in_executor(
+            IO_POOL, walk_repository, repo_path, IGNORE_DIRS, max_file_bytes
+        )
+
+        # Diff against the previous report's per-file results
+        base_report_id: Optional[int] = None
+        previous_files: Dict[str, Dict[str, Any]] = {}
+        if incremental and get_settings().incremental_analysis:
+            base_report_id, previous_files = await _load_previous_files(repo_url)
+        lint_config = await loop.run_in_executor(IO_POOL, config_digest, repo_path)
+        plan = plan_analysis(files, previous_files, lint_config)
+        changed_paths = [f.path for f in plan.changed]
+
+        # Subprojects are linted as separate shards, in parallel
+        shard_roots = detect_shards(f.path for f in files) if get_settings().shard_analysis else []
+        sharded = len(shard_roots) > 1
+
+        # 3. Define tool commands
+        pylint_cmd = pylint_command(plan.lint_paths)
         
         print(f"[ANALYZER] Step 2: Running analysis tools...")
-        print(f"  - Radon: {' '.join(radon_cmd)}")
-        print(f"  - CLOC: {' '.join(cloc_cmd)}")
-        print(f"  - Pylint: {' '.join(pylint_cmd)}\n")
+        _report_stage(on_stage, "running_tools")
+        print(f"  - Files: {len(files)} source, {len(changed_paths)} changed, {len(plan.lint_paths)} to lint")
+        if base_report_id is not None:
+            print(f"  - Incremental: reusing {len(plan.reused)} files from report {base_report_id}")
+        print(f"  - Radon: in-process")
+        print(f"  - Line counts: in-process")
+        print(f"  - Pylint: {'pylint' if pylint_cmd else 'skipped (no Python files to lint)'}")
+        if sharded:
+            print(f"  - Shards: {', '.join(shard_roots)}")
+        print()
         
-        # 3. Run all tools concurrently
+        # 4. Run all tools concurrently (radon through its Python API)
+        pylint_outputs: List[str] = []
+        pylint_out: Union[str, Exception]
+        shard_lint: Optional[Dict[str, Any]] = None
         try:
-            results = await asyncio.gather(
-                run_sandboxed_command(*radon_cmd, repo_path=repo_path),
-                run_sandboxed_command(*cloc_cmd, repo_path=repo_path),
-                run_sandboxed_command(*pylint_cmd, repo_path=repo_path),
-                return_exceptions=True
+            budget = deadline.budget("tools")
+            # Publish the radon and line count sections without waiting for pylint
+            def _metrics_ready(fresh):
+                sections = aggregate_records(build_file_records(files, plan, fresh[0], fresh[1], None))
+                _report_partial(on_partial, "radon", lambda: _radon_totals(sections["radon"]))
+                _report_partial(on_partial, "cloc", lambda: sections["cloc"])
+
+            # Complexity and line counts share one read of each changed file
+            metrics_task = asyncio.ensure_future(
+                _then(measure_files(plan.changed, cache=file_cache), _metrics_ready)
             )
+            if sharded:
+                lint = _lint_shards(
+                    repo_path, files, plan, shard_roots, metrics_task, timeout=max(1, int(budget))
+                )
+            else:
+                lint = run_sandboxed_tools({"pylint": pylint_cmd}, repo_path, timeout=max(1, int(budget)))
+
+            results = await deadline.gather("tools", {
+                "metrics": metrics_task,
+                "pylint": lint,
+            }, fallback=TimeoutError("Stage budget exceeded", timeout_seconds=budget), budget=budget)
             
-            radon_out, cloc_out, pylint_out = results
+            metrics, tool_outputs = results["metrics"], results["pylint"]
+            complexity, loc_by_file = (metrics, metrics) if isinstance(metrics, Exception) else metrics
+            if isinstance(tool_outputs, Exception):
+                pylint_out = tool_outputs
+            elif sharded:
+                pylint_out, shard_lint = "", tool_outputs
+                pylint_outputs = tool_outputs["outputs"]
+            else:
+                pylint_out = output = tool_outputs.get("pylint", "")
+                pylint_outputs = [output] if pylint_cmd else []
             
         except Exception as e:
             print(f"[ANALYZER] ✗ Tool execution failed: {e}")
-            radon_out, cloc_out, pylint_out = "", "", ""
+            complexity, loc_by_file, pylint_out = e, e, e
 
-        # 4. Log raw outputs for debugging
+        # 5. Log raw outputs for debugging
         print(f"[ANALYZER] Step 3: Processing tool outputs...")
-        for name, output in [("Radon", radon_out), ("CLOC", cloc_out), ("Pylint", pylint_out)]:
-            if isinstance(output, Exception):
-                print(f"  ✗ {name}: FAILED - {output}")
-            elif output:
-                print(f"  ✓ {name}: {len(str(output))} chars")
-                print(f"    Preview: {str(output)[:150]}...")
+        # Complexity and line counts come from one pass, so they fail together
+        if isinstance(complexity, Exception):
+            print(f"  ✗ File metrics: FAILED - {complexity}")
+            deadline.mark_incomplete("tools.metrics")
+            complexity = None
+        if isinstance(loc_by_file, Exception):
+            loc_by_file = None
+        if isinstance(pylint_out, Exception):
+            print(f"  ✗ Pylint: FAILED - {pylint_out}")
+        for index, output in enumerate(pylint_outputs):
+            name = f"Pylint [{index + 1}/{len(pylint_outputs)}]" if sharded else "Pylint"
+            if output:
+                print(f"  ✓ {name}: {len(output)} chars")
             else:
                 print(f"  ⚠ {name}: Empty output")
         print()
 
-        # 5. Parse tool outputs
+        # 6. Parse tool outputs
         print(f"[ANALYZER] Step 4: Parsing results...")
-        radon_parsed = parse_radon_output(radon_out if not isinstance(radon_out, Exception) else "")
-        cloc_parsed = parse_cloc_output(cloc_out if not isinstance(cloc_out, Exception) else "")
-        pylint_parsed = parse_pylint_output(pylint_out if not isinstance(pylint_out, Exception) else "")
-        
-        # Ensure required fields exist
-        if not radon_parsed:
-            radon_parsed = {"average_complexity": 0, "total_functions": 0, "blocks": [], "total_complexity": 0}
-        if not cloc_parsed:
-            cloc_parsed = {"code": 0, "comment": 0, "blank": 0, "languages": {}, "total_files": 0}
-        if "score" not in pylint_parsed or pylint_parsed["score"] is None:
-            pylint_parsed["score"] = 5.0
+        with deadline.timed("parsing"):
+            _report_stage(on_stage, "parsing")
+            pylint_by_file: Optional[Dict[str, Dict[str, Any]]]
+            if pylint_cmd is None:
+                pylint_by_file = {}
+            elif isinstance(pylint_out, Exception) or (sharded and shard_lint is None):
+                pylint_by_file = None
+            else:
+                pylint_by_file = {}
+                for cached in (shard_lint or {}).get("cached", {}).values():
+                    pylint_by_file.update(cached)
+                # Each report is decoded in one pass now that pylint has exited
+                for output in pylint_outputs:
+                    by_file = parse_pylint_json_by_file(output)
+                    if by_file is None:
+                        pylint_by_file = None
+                        break
+                    pylint_by_file.update(by_file)
+            if pylint_by_file is None:
+                # Keep a report without lint results out of report reuse
+                deadline.mark_incomplete("tools.pylint")
+
+            records = build_file_records(files, plan, complexity or {}, loc_by_file or {}, pylint_by_file)
+            sections = aggregate_records(records)
+            shards = None
+            if sharded:
+                shard_lint = shard_lint or {}
+                cached_roots = set(shard_lint.get("cached", {}))
+                shards = shard_sections(records, shard_roots, cached_roots)
+                if shard_lint.get("digests"):
+                    await loop.run_in_executor(
+                        IO_POOL, _store_shard_results, records, shard_roots, shard_lint["digests"], cached_roots
+                    )
+            radon_parsed, cloc_parsed, pylint_parsed = sections["radon"], sections["cloc"], sections["pylint"]
+            # Per-file results that are incomplete are not stored for later runs to build on
+            file_metrics = records if complexity is not None and loc_by_file is not None else None
+
+            # Ensure required fields exist
+            if pylint_parsed["score"] is None:
+                pylint_parsed["score"] = 5.0
         
-        print(f"  ✓ Radon: {radon_parsed.get('total_functions', 0)} functions, avg complexity {radon_parsed.get('average_complexity', 0)}")
-        print(f"  ✓ CLOC: {cloc_parsed.get('code', 0)} lines of code, {cloc_parsed.get('total_files', 0)} files")
-        print(f"  ✓ Pylint: Score {pylint_parsed.get('score', 0)}/10\n")
+            print(f"  ✓ Radon: {radon_parsed.get('total_functions', 0)} functions, avg complexity {radon_parsed.get('average_complexity', 0)}")
+            print(f"  ✓ Lines: {cloc_parsed.get('code', 0)} lines of code, {cloc_parsed.get('total_files', 0)} files")
+            print(f"  ✓ Pylint: Score {pylint_parsed.get('score', 0)}/10\n")
+        _report_partial(on_partial, "pylint", lambda: {
+            key: pylint_parsed.get(key) for key in ("score", "total_issues", "issue_counts")
+        })
 
-        parsed = {
+        parsed: Dict[str, Any] = {
             "repo_url": repo_url,
             "git_sha": commit_sha,
             "radon": radon_parsed,
             "cloc": cloc_parsed,
             "pylint": pylint_parsed,
+            "file_metrics": file_metrics,
+            "shards": shards,
+            "incremental": {"base_report_id": base_report_id, **plan.to_dict()},
         }
 
-        # 6. Generate AI metrics
+        ai_fallback = {
+            "ai_probability": 0.0, 
+            "ai_risk_notes": "AI analysis unavailable", 
+            "recommendations": []
+        }
+
+        # 7. Generate AI metrics
         print(f"[ANALYZER] Step 5: Generating AI insights...")
+        _report_stage(on_stage, "ai_insights")
         try:
-            ai_metrics = await generate_ai_metrics(
-                str(radon_out) if radon_out else "", 
-                str(cloc_out) if cloc_out else "", 
-                str(pylint_out) if pylint_out else ""
-            )
+            ai_metrics = await deadline.run("ai", generate_ai_metrics(
+                format_complexity_summary(radon_parsed),
+                json.dumps(cloc_parsed),
+                format_pylint_summary(pylint_parsed)
+            ), fallback=ai_fallback)
             print(f"  ✓ AI Probability: {ai_metrics.get('ai_probability', 0):.2%}")
             print(f"  ✓ Risk Notes: {ai_metrics.get('ai_risk_notes', 'N/A')}\n")
         except Exception as e:
             print(f"  ✗ AI metrics generation failed: {e}\n")
-            ai_metrics = {
-                "ai_probability": 0.0, 
-                "ai_risk_notes": "AI analysis unavailable", 
-                "recommendations": []
-            }
+            ai_metrics = ai_fallback
 
-        # 7. Calculate predictive scores
+        # 8. Calculate predictive scores
         print(f"[ANALYZER] Step 6: Calculating predictive scores...")
-        try:
-            ai_probability = ai_metrics.get("ai_probability", 0.0)
+        _report_stage(on_stage, "scoring")
+        ai_probability = ai_metrics.get("ai_probability", 0.0)
+
+        def _score() -> Tuple[float, float]:
             feature_vector = extract_features_for_prediction(parsed, ai_probability)
             historical_risk = get_historical_risk_score(repo_url, commit_sha, feature_vector)
-            code_health_score = calculate_chs(parsed, ai_probability, historical_risk)
+            for shard in shards or []:
+                shard_risk = get_historical_risk_score(
+                    repo_url, commit_sha, extract_features_for_prediction(shard, ai_probability)
+                )
+                shard["historical_risk_score"] = shard_risk
+                shard["code_health_score"] = calculate_chs(shard, ai_probability, shard_risk)
+            return historical_risk, calculate_chs(parsed, ai_probability, historical_risk)
+
+        try:
+            historical_risk, code_health_score = await deadline.run(
+                "scoring", loop.run_in_executor(TOOL_POOL, _score), fallback=(0.5, 50.0)
+            )
             
             print(f"  ✓ Code Health Score: {code_health_score}/100")
             print(f"  ✓ Historical Risk: {historical_risk:.2%}\n")
@@ -265,13 +776,18 @@ async def analyze_single_repo(repo_url: str) -> Dict[str, Any]:
             historical_risk = 0.5
             code_health_score = 50.0
 
-        # 8. Assemble final results
+        # 9. Assemble final results
         parsed["ai_metrics"] = ai_metrics
         parsed["code_health_score"] = code_health_score
         parsed["historical_risk_score"] = historical_risk
+        parsed["analysis_meta"] = deadline.to_dict()
+        for stage, seconds in parsed["analysis_meta"]["stage_seconds"].items():
+            ANALYSIS_STAGE_SECONDS.observe(seconds, stage=stage)
 
         print(f"{'='*70}")
         print(f"[ANALYZER] ✓ Analysis Complete!")
+        if deadline.incomplete_stages:
+            print(f"  • Incomplete stages: {', '.join(deadline.incomplete_stages)}")
         print(f"  • Code Health Score: {code_health_score}/100")
         print(f"  • AI Code Probability: {ai_probability:.1%}")
         print(f"  • Historical Risk: {historical_risk:.1%}")
@@ -288,6 +804,7 @@ async def analyze_single_repo(repo_url: str) -> Dict[str, Any]:
         
         # Return minimal valid response
         return {
+            "error": str(e),
             "repo_url": repo_url,
             "git_sha": "unknown",
             "radon": {"average_complexity": 0, "total_functions": 0, "blocks": [], "total_complexity": 0},
@@ -295,11 +812,15 @@ async def analyze_single_repo(repo_url: str) -> Dict[str, Any]:
             "pylint": {"score": 0.0, "issues": []},
             "ai_metrics": {"ai_probability": 0.0, "ai_risk_notes": "Analysis failed", "recommendations": []},
             "code_health_score": 0.0,
-            "historical_risk_score": 1.0
+            "historical_risk_score": 1.0,
+            "analysis_meta": deadline.to_dict()
         }
     finally:
         try:
-            shutil.rmtree(temp_dir, ignore_errors=True)
-            print(f"[ANALYZER] Cleaned up: {temp_dir}\n")
+            if workspace:
+                await release_checkout(workspace.path)
+                # Only renames files aside; they are deleted in the background
+                await loop.run_in_executor(IO_POOL, WORKSPACES.release, workspace)
+                print(f"[ANALYZER] Cleaned up: {workspace.path}\n")
         except Exception as e:
             print(f"[ANALYZER] Cleanup warning: {e}\n")
\ No newline at end of file
@@ -0,0 +1,160 @@
+"""
+Batch analysis of many repositories.
+
+Validates and deduplicates a list of repository URLs, answers already
+analyzed commits from stored reports and feeds the rest through the shared
+analysis job queue. Only repositories that start a new job are charged
+against the client's batch budget; stored reports and jobs already in
+flight are free. All batches together keep at most ``batch_concurrency``
+jobs queued or running at a time. Repositories over the client's budget, or
+arriving while the queue is full, are reported as ``deferred`` with a
+``retry_after_seconds`` hint instead of waiting.
+Results are yielded per repository as they finish, followed by a summary.
+"""
+
+import asyncio
+import time
+from collections import Counter
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from backend.services.analyzer import find_existing_report, resolve_head
+from backend.services.job_queue import JobQueue
+from backend.utils.exceptions import DevPulseError, RateLimitError, ValidationError
+from backend.utils.logger import setup_logger
+from backend.utils.validators import validate_github_url
+
+logger = setup_logger(__name__)
+
+
+def _deferred(repo_url: str, error: RateLimitError) -> Dict[str, Any]:
+    return {
+        "repo_url": repo_url,
+        "status": "deferred",
+        "error": error.message,
+        "retry_after_seconds": error.details.get("retry_after_seconds"),
+    }
+
+
+async def _analyze_one(
+    queue: JobQueue,
+    repo_url: str,
+    force: bool,
+    charge: Optional[Callable[[], None]]
+) -> Dict[str, Any]:
+    """Produce a report for one repository and describe the outcome."""
+    try:
+        head_sha = None
+        if not force:
+            head_sha = await resolve_head(repo_url)
+            # An unresolved HEAD is left to the job rather than waiting out a second ls-remote
+            existing = await find_existing_report(repo_url, head_sha) if head_sha else None
+            if existing:
+                return {"repo_url": repo_url, "status": "cached", "report_id": existing["id"]}
+
+        key = (repo_url, head_sha, force)
+        try:
+            if charge is not None and queue.in_flight(key) is None:
+                charge()
+            job = queue.submit(repo_url, key=key, force=force)
+        except RateLimitError as e:
+            # Over budget or queue full: the client resubmits this repository later
+            return _deferred(repo_url, e)
+        await job.wait_done()
+        return {
+            "repo_url": repo_url,
+            "status": job.state.value,
+            "job_id": job.id,
+            "report_id": job.report_id,
+            "error": job.error,
+        }
+    except Exception as e:
+        logger.error(f"Batch analysis of {repo_url} failed: {e}", exc_info=True)
+        return {"repo_url": repo_url, "status": "failed", "error": str(e)}
+
+
+async def run_batch(
+    repo_urls: List[str],
+    queue: JobQueue,
+    slots: asyncio.Semaphore,
+    force: bool = False,
+    charge: Optional[Callable[[], None]] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Analyze many repositories, yielding each result as soon as it is known.
+
+    Args:
+        repo_urls: Repository URLs, possibly with duplicates or invalid entries
+        queue: Job queue that runs the analyses
+        force: Re-analyze even if a stored report exists
+        slots: Jobs queued or running at a time, shared by all batches
+        charge: Counts a repository that starts a new job against the
+            client's batch budget; raises ``RateLimitError`` when the client
+            is over it
+
+    Yields:
+        One ``result`` event per distinct repository (``cached``,
+        ``succeeded``, ``failed``, ``deferred`` or ``invalid``), then one
+        ``summary``
+    """
+    started = time.monotonic()
+    counts: Counter = Counter()
+    unique: Dict[str, None] = {}
+    accepted: List[str] = []
+    for raw_url in repo_urls:
+        try:
+            repo_url = validate_github_url(raw_url)
+        except DevPulseError as e:
+            counts["invalid"] += 1
+            yield {"type": "result", "repo_url": raw_url, "status": "invalid", "error": e.message}
+            continue
+        if repo_url in unique:
+            counts["duplicates"] += 1
+            continue
+        unique[repo_url] = None
+        accepted.append(repo_url)
+
+    async def _bounded(repo_url: str) -> Dict[str, Any]:
+        async with slots:
+            return await _analyze_one(queue, repo_url, force, charge)
+
+    tasks = [asyncio.create_task(_bounded(repo_url)) for repo_url in accepted]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            result = await finished
+            counts[result["status"]] += 1
+            yield {"type": "result", **result}
+    finally:
+        # If the client went away, stop feeding the queue (queued jobs still run)
+        for task in tasks:
+            task.cancel()
+
+    yield {
+        "type": "summary",
+        "requested": len(repo_urls),
+        "unique": len(unique),
+        "duplicates": counts["duplicates"],
+        "invalid": counts["invalid"],
+        "cached": counts["cached"],
+        "succeeded": counts["succeeded"],
+        "failed": counts["failed"],
+        "deferred": counts["deferred"],
+        "elapsed_seconds": round(time.monotonic() - started, 3),
+    }
+
+
+def validate_batch(repo_urls: List[str], max_repos: int) -> None:
+    """
+    Check the size of a batch request.
+
+    Raises:
+        ValidationError: If the batch is empty or too large
+    """
+    if not repo_urls:
+        raise ValidationError("At least one repository URL is required", field="repo_urls")
+    if len(repo_urls) > max_repos:
+        raise ValidationError(
+            f"A batch may contain at most {max_repos} repositories",
+            field="repo_urls",
+            details={"max_repos": max_repos, "requested": len(repo_urls)}
+        )
+
@@ -0,0 +1,234 @@
+"""
+In-process complexity engine built on radon's Python API.
+
+Computes cyclomatic complexity (``cc_visit``) and raw line metrics
+(``radon.raw.analyze``) directly from source, fanning files out over a
+process pool. Results are built in the same structure ``parse_radon_output``
+produces, without running radon as a subprocess or parsing its text output.
+
+The same parse also yields each module's statement count (as pylint counts
+them) and its imports, which incremental analysis uses to merge pylint
+scores and find importers of changed modules.
+
+Per-file results depend only on file contents and are cached by git blob
+ID, so identical files are analyzed once across commits and repositories;
+``backend.services.file_metrics`` runs the engine over walked files.
+"""
+
+import ast
+import asyncio
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Sequence
+
+import radon
+from radon.complexity import cc_rank, cc_visit_ast, sorted_results
+from radon.raw import analyze as raw_analyze
+
+from backend.services.executors import TOOL_POOL, get_cpu_pool
+from backend.services.result_cache import config_hash
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+BLOCK_TYPES = {'F': 'function', 'M': 'method', 'C': 'class'}
+
+# Below this many files the process pool costs more than it saves
+INLINE_FILE_THRESHOLD = 16
+FILES_PER_TASK = 32
+
+# Bump when analyze_blob output changes so cached results are recomputed
+ENGINE_VERSION = "1"
+CACHE_TOOL = "complexity"
+CACHE_TOOL_VERSION = f"radon-{radon.__version__}/engine-{ENGINE_VERSION}"
+# The parser's grammar follows the running interpreter
+CACHE_CONFIG = config_hash("python", sys.version_info[:2])
+
+async def map_in_pool(fn: Callable[[Sequence[Any]], List[Any]], items: Sequence[Any]) -> List[Any]:
+    """
+    Apply a chunk-level worker function over items using the shared CPU process pool.
+
+    Small inputs are processed in a thread instead, where starting or
+    feeding worker processes would cost more than it saves.
+
+    Args:
+        fn: Picklable function mapping a chunk of items to one result per item
+        items: Items to process
+
+    Returns:
+        Results in item order
+    """
+    loop = asyncio.get_running_loop()
+    if len(items) <= INLINE_FILE_THRESHOLD:
+        return await loop.run_in_executor(TOOL_POOL, fn, items)
+    pool = get_cpu_pool()
+    chunks = [items[i:i + FILES_PER_TASK] for i in range(0, len(items), FILES_PER_TASK)]
+    chunk_results = await asyncio.gather(
+        *(loop.run_in_executor(pool, fn, chunk) for chunk in chunks)
+    )
+    return [result for chunk in chunk_results for result in chunk]
+
+
+def _is_docstring(node: ast.stmt) -> bool:
+    return (
+        isinstance(node, ast.Expr)
+        and isinstance(node.value, ast.Constant)
+        and isinstance(node.value.value, str)
+    )
+
+
+def count_statements(tree: ast.Module) -> int:
+    """
+    Count statements the way pylint does for its score.
+
+    Docstrings are not statements to astroid, while except handlers are.
+    """
+    docstrings = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Module, ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            if node.body and _is_docstring(node.body[0]):
+                docstrings.add(id(node.body[0]))
+    return sum(
+        1 for node in ast.walk(tree)
+        if isinstance(node, (ast.stmt, ast.ExceptHandler)) and id(node) not in docstrings
+    )
+
+
+def _import_refs(tree: ast.Module) -> List[List[Any]]:
+    """Imports as written: ``[level, module, names]`` without resolving relative ones."""
+    refs: List[List[Any]] = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            refs.extend([0, alias.name, []] for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            refs.append([node.level, node.module or "", [alias.name for alias in node.names]])
+    return refs
+
+
+def resolve_imports(refs: Iterable[List[Any]], rel_path: str) -> List[str]:
+    """
+    List the dotted module names a file imports.
+
+    Relative imports are resolved against the file's own package; for
+    ``from pkg import name`` both ``pkg`` and ``pkg.name`` are recorded
+    since ``name`` may be a submodule.
+    """
+    package = rel_path[:-3].replace("/", ".").split(".")[:-1]
+    imports = set()
+    for level, module, names in refs:
+        if level:
+            base_parts = package[:max(0, len(package) - level + 1)]
+            base = ".".join(base_parts + ([module] if module else []))
+        else:
+            base = module
+        if base:
+            imports.add(base)
+        imports.update(f"{base}.{name}" if base else name for name in names)
+    return sorted(imports)
+
+
+def analyze_blob(source: str) -> Dict[str, Any]:
+    """
+    Compute path-independent metrics for one Python source file.
+
+    The result depends only on the file contents, so it can be cached by
+    blob ID and shared between files, commits and repositories.
+
+    Returns:
+        Dictionary with ``blocks`` (without file names), ``raw``,
+        ``statements`` and ``import_refs``, or ``error`` if the file could
+        not be parsed
+    """
+    try:
+        tree = ast.parse(source)
+        results = sorted_results(cc_visit_ast(tree))
+        raw = raw_analyze(source)
+    except Exception as e:
+        return {"error": str(e)}
+
+    blocks = [
+        {
+            "name": block.fullname,
+            "complexity": block.complexity,
+            "grade": cc_rank(block.complexity),
+            "type": BLOCK_TYPES.get(block.letter, 'function'),
+            "location": f"{block.lineno}:{block.col_offset}"
+        }
+        for block in results
+    ]
+    return {
+        "blocks": blocks,
+        "raw": {"code": raw.sloc, "comment": raw.comments, "blank": raw.blank},
+        "statements": count_statements(tree),
+        "import_refs": _import_refs(tree),
+    }
+
+
+def bind_result(result: Dict[str, Any], rel_path: str) -> Dict[str, Any]:
+    """Attach a file path to an ``analyze_blob`` result, giving the ``analyze_source`` shape."""
+    if "error" in result:
+        return {"file": rel_path, "error": result["error"]}
+    return {
+        "file": rel_path,
+        "blocks": [{**block, "file": rel_path} for block in result["blocks"]],
+        "raw": dict(result["raw"]),
+        "statements": result["statements"],
+        "imports": resolve_imports(result["import_refs"], rel_path),
+    }
+
+
+def analyze_source(source: str, rel_path: str) -> Dict[str, Any]:
+    """
+    Compute complexity blocks and raw metrics for one Python source file.
+
+    Args:
+        source: File contents
+        rel_path: Repository-relative path used to label blocks
+
+    Returns:
+        Dictionary with ``blocks``, ``raw`` (code/comment/blank),
+        ``statements`` and ``imports``, or ``error`` if the file could not
+        be parsed
+    """
+    return bind_result(analyze_blob(source), rel_path)
+
+
+def build_complexity_result(file_results: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Aggregate per-file results into the radon result structure.
+
+    Returns:
+        Dictionary containing average_complexity, total_functions, blocks
+        and total_complexity
+    """
+    blocks: List[Dict[str, Any]] = []
+    for result in file_results:
+        blocks.extend(result.get("blocks", []))
+
+    total_complexity = sum(block["complexity"] for block in blocks)
+    count = len(blocks)
+    return {
+        "average_complexity": round(total_complexity / count, 2) if count else 0,
+        "total_functions": count,
+        "blocks": blocks,
+        "total_complexity": total_complexity
+    }
+
+
+def format_complexity_summary(radon_result: Dict[str, Any], max_blocks: int = 60) -> str:
+    """
+    Render the most complex blocks in radon's terminal layout.
+
+    Only used to give the AI prompt a compact, familiar view of the results.
+    """
+    blocks = sorted(radon_result.get("blocks", []), key=lambda b: -b["complexity"])[:max_blocks]
+    letters = {v: k for k, v in BLOCK_TYPES.items()}
+    lines = [
+        f"{b['file']}\n    {letters.get(b['type'], 'F')} {b['location']} {b['name']} - "
+        f"{b['grade']} ({b['complexity']})"
+        for b in blocks
+    ]
+    lines.append(
+        f"\n{radon_result.get('total_functions', 0)} blocks analyzed. "
+        f"Average complexity: {radon_result.get('average_complexity', 0)}"
+    )
+    return "\n".join(lines)
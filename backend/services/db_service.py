@@ -4,7 +4,7 @@ import sqlite3
 import json
 import os
 from datetime import datetime
-from typing import Dict, Any
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 
 # Use absolute path to ensure database works regardless of working directory
 _PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -25,12 +25,88 @@ def init_db():
         pylint TEXT,
         ai_metrics TEXT,       -- Replaces ai_summary, stores w2/recommendations
         code_health_score REAL, -- NEW
-        historical_risk_score REAL -- NEW
+        historical_risk_score REAL, -- NEW
+        tool_versions TEXT,    -- Versions of the analyzers that produced the report
+        analysis_meta TEXT     -- Stage timings and stages cut short by the deadline
     )
     """)
+    _add_missing_columns(cur, "reports", {"tool_versions": "TEXT", "analysis_meta": "TEXT", "shards": "TEXT"})
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_reports_repo_sha ON reports (repo_url, git_sha)
+    """)
+    # Per-file results, reused by incremental analysis of later commits
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS report_files (
+        report_id INTEGER,
+        path TEXT,
+        blob_id TEXT,          -- git blob SHA-1 of the analyzed contents
+        metrics TEXT,
+        PRIMARY KEY (report_id, path)
+    )
+    """)
+    # Content-addressed per-file tool results shared across repositories
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS file_cache (
+        blob_id TEXT,
+        tool TEXT,
+        tool_version TEXT,
+        config_hash TEXT,
+        data BLOB,             -- zlib-compressed JSON
+        size INTEGER,
+        last_used REAL,
+        PRIMARY KEY (blob_id, tool, tool_version, config_hash)
+    )
+    """)
+    cur.execute("""
+    CREATE INDEX IF NOT EXISTS idx_file_cache_last_used ON file_cache (last_used)
+    """)
+    # Running entry count and size of file_cache, kept by triggers in the
+    # same transaction as every change, so reading it needs no table scan
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS file_cache_size (
+        id INTEGER PRIMARY KEY CHECK (id = 0),
+        entries INTEGER NOT NULL,
+        bytes INTEGER NOT NULL
+    )
+    """)
+    cur.execute("""
+    INSERT OR IGNORE INTO file_cache_size (id, entries, bytes)
+    SELECT 0, COUNT(*), COALESCE(SUM(size), 0) FROM file_cache
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS file_cache_size_insert AFTER INSERT ON file_cache BEGIN
+        UPDATE file_cache_size SET entries = entries + 1, bytes = bytes + new.size WHERE id = 0;
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS file_cache_size_update AFTER UPDATE OF size ON file_cache BEGIN
+        UPDATE file_cache_size SET bytes = bytes - old.size + new.size WHERE id = 0;
+    END
+    """)
+    cur.execute("""
+    CREATE TRIGGER IF NOT EXISTS file_cache_size_delete AFTER DELETE ON file_cache BEGIN
+        UPDATE file_cache_size SET entries = entries - 1, bytes = bytes - old.size WHERE id = 0;
+    END
+    """)
     conn.commit()
     conn.close()
 
+
+def _add_missing_columns(cur: sqlite3.Cursor, table: str, columns: Dict[str, str]) -> None:
+    """Add columns introduced after a database was first created."""
+    cur.execute(f"PRAGMA table_info({table})")
+    existing = {row[1] for row in cur.fetchall()}
+    for name, column_type in columns.items():
+        if name not in existing:
+            cur.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
+
+def _encode_tool_versions(tool_versions: Optional[Dict[str, str]]) -> Optional[str]:
+    """Serialize tool versions deterministically so they can be compared in SQL."""
+    if tool_versions is None:
+        return None
+    return json.dumps(tool_versions, sort_keys=True)
+
 # Update save_report signature and logic
 def save_report(
     repo_url: str, 
@@ -40,7 +116,10 @@ def save_report(
     pylint: Dict, 
     ai_metrics: Dict, # Changed name
     code_health_score: float, # NEW
-    historical_risk_score: float # NEW
+    historical_risk_score: float, # NEW
+    tool_versions: Optional[Dict[str, str]] = None,
+    analysis_meta: Optional[Dict[str, Any]] = None,
+    shards: Optional[List[Dict[str, Any]]] = None
 ) -> int:
     """Save a report into the SQLite database with new predictive fields."""
     conn = sqlite3.connect(DB_PATH)
@@ -48,9 +127,10 @@ def save_report(
     cur.execute("""
         INSERT INTO reports (
             repo_url, git_sha, timestamp, radon, cloc, pylint, 
-            ai_metrics, code_health_score, historical_risk_score
+            ai_metrics, code_health_score, historical_risk_score, tool_versions,
+            analysis_meta, shards
         )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
     """, (
         repo_url,
         git_sha, # Save Git SHA
@@ -60,7 +140,10 @@ def save_report(
         json.dumps(pylint),
         json.dumps(ai_metrics),
         code_health_score,
-        historical_risk_score
+        historical_risk_score,
+        _encode_tool_versions(tool_versions),
+        json.dumps(analysis_meta) if analysis_meta is not None else None,
+        json.dumps(shards) if shards is not None else None
     ))
     conn.commit()
     report_id = cur.lastrowid
@@ -88,10 +171,176 @@ def get_report(report_id: int):
         "pylint": json.loads(row[6]),
         "ai_metrics": json.loads(row[7]), # ai_summary is now ai_metrics
         "code_health_score": row[8],
-        "historical_risk_score": row[9]
+        "historical_risk_score": row[9],
+        "tool_versions": json.loads(row[10]) if row[10] else None,
+        "analysis_meta": json.loads(row[11]) if row[11] else None,
+        "shards": json.loads(row[12]) if row[12] else None
     }
 
 
+# Reports where a stage was cut short or failed are never reused
+_COMPLETE_REPORT = (
+    "COALESCE(json_array_length(analysis_meta, '$.incomplete_stages'), 0) = 0"
+)
+
+
+# Reports of history analyses, which skip the AI stage and the risk model
+_HISTORY_REPORT = "json_extract(analysis_meta, '$.mode') = 'history'"
+
+
+def find_report(
+    repo_url: str,
+    git_sha: str,
+    tool_versions: Dict[str, str],
+    include_history: bool = False
+) -> Optional[int]:
+    """
+    Find the newest complete report for a commit produced by the given tool versions.
+
+    Args:
+        repo_url: Normalized repository URL
+        git_sha: Commit SHA that was analyzed
+        tool_versions: Analyzer versions the report must have been produced with
+        include_history: Also match reports stored by history analyses
+
+    Returns:
+        Report ID, or None if the commit has not been analyzed with these tools
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    history_filter = "" if include_history else f"AND NOT COALESCE({_HISTORY_REPORT}, 0) "
+    cur.execute(
+        "SELECT id FROM reports WHERE repo_url=? AND git_sha=? AND tool_versions=? "
+        f"AND {_COMPLETE_REPORT} {history_filter}ORDER BY id DESC LIMIT 1",
+        (repo_url, git_sha, _encode_tool_versions(tool_versions))
+    )
+    row = cur.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def find_latest_report(repo_url: str, tool_versions: Dict[str, str]) -> Optional[int]:
+    """
+    Find the newest report for a repository that has per-file results.
+
+    Args:
+        repo_url: Normalized repository URL
+        tool_versions: Analyzer versions the report must have been produced with
+
+    Returns:
+        Report ID, or None if no compatible report exists
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id FROM reports WHERE repo_url=? AND tool_versions=? "
+        "AND EXISTS (SELECT 1 FROM report_files WHERE report_id = reports.id) "
+        "ORDER BY id DESC LIMIT 1",
+        (repo_url, _encode_tool_versions(tool_versions))
+    )
+    row = cur.fetchone()
+    conn.close()
+    return row[0] if row else None
+
+
+def save_report_files(report_id: int, file_metrics: Iterable[Dict[str, Any]]) -> None:
+    """
+    Save per-file results for a report.
+
+    Args:
+        report_id: Report the files belong to
+        file_metrics: Records with ``path`` and ``blob_id`` plus any metrics
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT OR REPLACE INTO report_files (report_id, path, blob_id, metrics) VALUES (?, ?, ?, ?)",
+        (
+            (report_id, record["path"], record["blob_id"], json.dumps(record))
+            for record in file_metrics
+        )
+    )
+    conn.commit()
+    conn.close()
+
+
+def prune_report_files(repo_url: str, keep: int) -> int:
+    """
+    Delete per-file results of all but a repository's newest reports.
+
+    Reports themselves are kept; only incremental analysis and history
+    reruns read per-file results, and both fall back to analyzing files.
+
+    Args:
+        repo_url: Normalized repository URL
+        keep: Number of newest reports with per-file results to keep
+
+    Returns:
+        Number of rows removed
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    cur.execute(
+        "DELETE FROM report_files WHERE report_id IN ("
+        "  SELECT id FROM reports WHERE repo_url=? "
+        "  AND EXISTS (SELECT 1 FROM report_files WHERE report_id = reports.id) "
+        "  ORDER BY id DESC LIMIT -1 OFFSET ?"
+        ")",
+        (repo_url, max(keep, 0))
+    )
+    removed = cur.rowcount
+    conn.commit()
+    conn.close()
+    return removed
+
+
+def get_report_files(report_id: int) -> Dict[str, Dict[str, Any]]:
+    """Retrieve per-file results for a report keyed by path."""
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    cur.execute("SELECT path, metrics FROM report_files WHERE report_id=?", (report_id,))
+    rows = cur.fetchall()
+    conn.close()
+    return {path: json.loads(metrics) for path, metrics in rows}
+
+
+def get_report_series(repo_url: str) -> List[Dict[str, Any]]:
+    """
+    Scores of a repository's commits in commit order.
+
+    Covers reports that record their commit date (those from history
+    analysis), taking the newest report of each commit.
+
+    Args:
+        repo_url: Normalized repository URL
+
+    Returns:
+        Report ID, commit SHA and date, and scores per commit, oldest first
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    cur.execute(
+        "SELECT id, git_sha, json_extract(analysis_meta, '$.commit_date') AS commit_date, "
+        "code_health_score, historical_risk_score FROM reports WHERE id IN ("
+        "  SELECT MAX(id) FROM reports WHERE repo_url=? "
+        "  AND json_extract(analysis_meta, '$.commit_date') IS NOT NULL GROUP BY git_sha"
+        ") ORDER BY commit_date, id",
+        (repo_url,)
+    )
+    rows = cur.fetchall()
+    conn.close()
+    return [
+        {
+            "report_id": r[0],
+            "git_sha": r[1],
+            "commit_date": r[2],
+            "code_health_score": r[3],
+            "historical_risk_score": r[4],
+        }
+        for r in rows
+    ]
+
+
 def list_reports():
     conn = sqlite3.connect(DB_PATH)
     cur = conn.cursor()
@@ -99,4 +348,121 @@ def list_reports():
     cur.execute("SELECT id, repo_url, git_sha, timestamp FROM reports ORDER BY id DESC")
     rows = cur.fetchall()
     conn.close()
-    return [{"id": r[0], "repo_url": r[1], "git_sha": r[2], "timestamp": r[3]} for r in rows]
\ No newline at end of file
+    return [{"id": r[0], "repo_url": r[1], "git_sha": r[2], "timestamp": r[3]} for r in rows]
+
+
+# SQLite limits the number of bound parameters per statement
+_MAX_QUERY_PARAMS = 500
+
+
+def get_cached_results(
+    tool: str,
+    tool_version: str,
+    keys: List[Tuple[str, str]],
+    now: float
+) -> Dict[Tuple[str, str], bytes]:
+    """
+    Look up cached per-file results and mark them as recently used.
+
+    Args:
+        tool: Tool that produced the results
+        tool_version: Version of the tool
+        keys: (blob_id, config_hash) pairs to look up
+        now: Timestamp recorded as the last use of every hit
+
+    Returns:
+        Stored data for the keys that were found
+    """
+    wanted = set(keys)
+    blob_ids = sorted({blob_id for blob_id, _ in wanted})
+    found: Dict[Tuple[str, str], bytes] = {}
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    for i in range(0, len(blob_ids), _MAX_QUERY_PARAMS):
+        chunk = blob_ids[i:i + _MAX_QUERY_PARAMS]
+        cur.execute(
+            f"SELECT blob_id, config_hash, data FROM file_cache WHERE tool=? AND tool_version=? "
+            f"AND blob_id IN ({','.join('?' * len(chunk))})",
+            (tool, tool_version, *chunk)
+        )
+        for blob_id, config_hash, data in cur.fetchall():
+            if (blob_id, config_hash) in wanted:
+                found[(blob_id, config_hash)] = data
+    if found:
+        cur.executemany(
+            "UPDATE file_cache SET last_used=? WHERE blob_id=? AND tool=? AND tool_version=? AND config_hash=?",
+            ((now, blob_id, tool, tool_version, config_hash) for blob_id, config_hash in found)
+        )
+        conn.commit()
+    conn.close()
+    return found
+
+
+def put_cached_results(
+    tool: str,
+    tool_version: str,
+    entries: Dict[Tuple[str, str], bytes],
+    now: float
+) -> int:
+    """
+    Store per-file results keyed by (blob_id, config_hash).
+
+    Returns:
+        Total stored size of the cache in bytes afterwards
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    # An upsert rather than INSERT OR REPLACE: a replaced row fires no delete
+    # trigger, which would leave its size counted twice
+    cur.executemany(
+        "INSERT INTO file_cache "
+        "(blob_id, tool, tool_version, config_hash, data, size, last_used) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (blob_id, tool, tool_version, config_hash) DO UPDATE SET "
+        "data=excluded.data, size=excluded.size, last_used=excluded.last_used",
+        (
+            (blob_id, tool, tool_version, config_hash, data, len(data), now)
+            for (blob_id, config_hash), data in entries.items()
+        )
+    )
+    cur.execute("SELECT bytes FROM file_cache_size WHERE id = 0")
+    size = int(cur.fetchone()[0])
+    conn.commit()
+    conn.close()
+    return size
+
+
+def get_cache_size() -> Tuple[int, int]:
+    """Return the number of cached entries and their total stored size in bytes."""
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    cur.execute("SELECT entries, bytes FROM file_cache_size WHERE id = 0")
+    entries, size = cur.fetchone()
+    conn.close()
+    return entries, size
+
+
+def evict_cached_results(max_bytes: int) -> int:
+    """
+    Delete least recently used cache entries until the cache fits in ``max_bytes``.
+
+    Returns:
+        Number of entries removed
+    """
+    conn = sqlite3.connect(DB_PATH)
+    cur = conn.cursor()
+    cur.execute("SELECT bytes FROM file_cache_size WHERE id = 0")
+    excess = cur.fetchone()[0] - max_bytes
+    removed = 0
+    if excess > 0:
+        cur.execute("SELECT rowid, size FROM file_cache ORDER BY last_used")
+        doomed = []
+        for rowid, size in cur:
+            if excess <= 0:
+                break
+            doomed.append((rowid,))
+            excess -= size
+        cur.executemany("DELETE FROM file_cache WHERE rowid=?", doomed)
+        conn.commit()
+        removed = len(doomed)
+    conn.close()
+    return removed
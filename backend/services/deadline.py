@@ -0,0 +1,184 @@
+"""
+End-to-end analysis deadline.
+
+An analysis gets ``analysis_timeout`` seconds in total. Each pipeline stage
+is given a share of whatever time is left when it starts, so a stage that
+finishes early hands its unused time to the later ones. A stage that runs
+past its budget is cancelled and replaced by a fallback value, and its name
+is recorded so the report can say which parts are incomplete.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Relative weight of each stage, in pipeline order
+STAGE_WEIGHTS: Dict[str, float] = {
+    "clone": 3.0,
+    "tools": 5.0,
+    "ai": 1.5,
+    "scoring": 0.5,
+}
+
+
+class Deadline:
+    """
+    Time budget of one analysis, split across its stages.
+
+    Args:
+        total_seconds: Time the whole analysis may take
+        stage_weights: Relative weight per stage, in pipeline order
+        clock: Monotonic clock, replaceable in tests
+    """
+
+    def __init__(
+        self,
+        total_seconds: float,
+        stage_weights: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.total_seconds = total_seconds
+        self._weights = dict(stage_weights or STAGE_WEIGHTS)
+        self._pending = list(self._weights)
+        self._clock = clock
+        self._started_at = clock()
+        self.stage_seconds: Dict[str, float] = {}
+        self.incomplete_stages: List[str] = []
+
+    def remaining(self) -> float:
+        """Seconds left until the overall deadline (never negative)."""
+        return max(0.0, self.total_seconds - (self._clock() - self._started_at))
+
+    def budget(self, stage: str) -> float:
+        """
+        Start a stage and return its time budget.
+
+        The budget is the stage's weight relative to itself and all stages
+        not yet started, applied to the time remaining.
+
+        Args:
+            stage: Stage name from the stage weights
+
+        Returns:
+            Seconds the stage may take
+        """
+        if stage in self._pending:
+            later = self._pending[self._pending.index(stage):]
+            self._pending.remove(stage)
+        else:
+            later = [stage]
+        total_weight = sum(self._weights.get(name, 1.0) for name in later)
+        return self.remaining() * self._weights.get(stage, 1.0) / total_weight
+
+    def mark_incomplete(self, name: str) -> None:
+        """Record that a stage (or part of one) was cut short or failed."""
+        if name not in self.incomplete_stages:
+            self.incomplete_stages.append(name)
+
+    async def run(
+        self,
+        stage: str,
+        awaitable: Awaitable[Any],
+        fallback: Any = None,
+        budget: Optional[float] = None,
+    ) -> Any:
+        """
+        Run a stage within its budget.
+
+        Args:
+            stage: Stage name
+            awaitable: The stage's work
+            fallback: Result used when the stage runs out of time
+            budget: Budget already taken with ``budget(stage)``, if any
+
+        Returns:
+            The stage's result, or ``fallback`` if it was cancelled
+
+        Raises:
+            Exception: Whatever the stage's work raised
+        """
+        results = await self.gather(stage, {stage: awaitable}, fallback=fallback, budget=budget)
+        if isinstance(results[stage], BaseException):
+            raise results[stage]
+        return results[stage]
+
+    async def gather(
+        self,
+        stage: str,
+        awaitables: Dict[str, Awaitable[Any]],
+        fallback: Any = None,
+        budget: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """
+        Run several parts of a stage concurrently within the stage's budget.
+
+        Parts that finish in time keep their results (exceptions included,
+        as with ``return_exceptions=True``); the rest are cancelled and
+        recorded as ``"<stage>.<part>"``. With several parts, each part's
+        duration is recorded under that name as well.
+
+        Args:
+            stage: Stage name
+            awaitables: Work per part name
+            fallback: Result used for parts that run out of time
+            budget: Budget already taken with ``budget(stage)``, for callers
+                that pass it on (e.g. as a subprocess timeout)
+
+        Returns:
+            Result per part name
+        """
+        if budget is None:
+            budget = self.budget(stage)
+        started = self._clock()
+        tasks = {name: asyncio.ensure_future(aw) for name, aw in awaitables.items()}
+        if len(tasks) > 1:
+            for name, task in tasks.items():
+                def _done(_: "asyncio.Future[Any]", label: str = f"{stage}.{name}") -> None:
+                    self._record(label, started)
+                task.add_done_callback(_done)
+        try:
+            if tasks:
+                await asyncio.wait(tasks.values(), timeout=budget)
+        finally:
+            self._record(stage, started)
+
+        results: Dict[str, Any] = {}
+        for name, task in tasks.items():
+            if task.done():
+                results[name] = task.exception() or task.result()
+                continue
+            task.cancel()
+            label = stage if name == stage else f"{stage}.{name}"
+            logger.warning(
+                f"Analysis stage {label} exceeded its {budget:.1f}s budget",
+                extra={'extra_data': {'stage': label, 'budget_seconds': round(budget, 3)}}
+            )
+            self.mark_incomplete(label)
+            results[name] = fallback
+        return results
+
+    @contextmanager
+    def timed(self, stage: str) -> Iterator[None]:
+        """Record the duration of a step that has no budget of its own."""
+        started = self._clock()
+        try:
+            yield
+        finally:
+            self._record(stage, started)
+
+    def _record(self, stage: str, started: float) -> None:
+        self.stage_seconds[stage] = round(self._clock() - started, 3)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Timing summary stored with the report."""
+        return {
+            "deadline_seconds": self.total_seconds,
+            "elapsed_seconds": round(self._clock() - self._started_at, 3),
+            "stage_seconds": dict(self.stage_seconds),
+            "incomplete_stages": list(self.incomplete_stages),
+        }
@@ -0,0 +1,183 @@
+"""
+Shared executors, one per resource class.
+
+Blocking work is split by what it waits on so that one kind cannot starve
+another: slow clones do not hold up tool runs, and database lookups do not
+queue behind either.
+
+- ``NETWORK_POOL``: clones and remote lookups (threads)
+- ``TOOL_POOL``: waiting on sandbox containers, scoring, and small
+  CPU-bound jobs not worth a process hop (threads, sized to cores); host
+  tool subprocesses are awaited on the event loop and need no thread
+- ``IO_POOL``: SQLite and file system work (threads)
+- ``get_cpu_pool()``: CPU-bound per-file analysis (processes, created on
+  first use)
+
+Every pool records how long tasks waited for a worker and how busy its
+workers were; ``executor_stats()`` reports both.
+"""
+
+import os
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from backend.config import get_settings
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class PoolMetrics:
+    """Thread-safe counters of task queue time and worker busy time."""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._lock = threading.Lock()
+        self._created_at = time.monotonic()
+        self._submitted = 0
+        self._started = 0
+        self._completed = 0
+        self._failed = 0
+        self._queue_seconds = 0.0
+        self._max_queue_seconds = 0.0
+        self._busy_seconds = 0.0
+
+    def submitted(self) -> None:
+        with self._lock:
+            self._submitted += 1
+
+    def started(self, queue_seconds: float) -> None:
+        with self._lock:
+            self._started += 1
+            self._queue_seconds += queue_seconds
+            self._max_queue_seconds = max(self._max_queue_seconds, queue_seconds)
+
+    def finished(self, busy_seconds: float, failed: bool) -> None:
+        with self._lock:
+            self._completed += 1
+            self._failed += failed
+            self._busy_seconds += busy_seconds
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counters plus utilisation since the pool was created."""
+        with self._lock:
+            uptime = time.monotonic() - self._created_at
+            return {
+                "workers": self.workers,
+                "active": self._started - self._completed,
+                "queued": self._submitted - self._started,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_queue_seconds": round(self._queue_seconds / self._started, 4) if self._started else 0.0,
+                "max_queue_seconds": round(self._max_queue_seconds, 4),
+                "busy_seconds": round(self._busy_seconds, 3),
+                "utilisation": round(self._busy_seconds / (uptime * self.workers), 4) if uptime else 0.0,
+            }
+
+
+class InstrumentedThreadPool(ThreadPoolExecutor):
+    """Thread pool that records queue and busy time of every task."""
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers, thread_name_prefix=name)
+        self.name = name
+        self.metrics = PoolMetrics(max_workers)
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        submitted_at = time.monotonic()
+
+        def _timed():
+            started_at = time.monotonic()
+            self.metrics.started(started_at - submitted_at)
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                self.metrics.finished(time.monotonic() - started_at, failed)
+
+        self.metrics.submitted()
+        return super().submit(_timed)
+
+
+def _timed_call(fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]):
+    """Worker-process side of InstrumentedProcessPool: run and time a task."""
+    started_at = time.time()
+    result = fn(*args, **kwargs)
+    return started_at, time.time(), result
+
+
+class InstrumentedProcessPool(ProcessPoolExecutor):
+    """
+    Process pool that records queue and busy time of every task.
+
+    Tasks are timed inside the worker process, so the numbers exclude
+    pickling overhead on the way back.
+    """
+
+    def __init__(self, name: str, max_workers: int):
+        super().__init__(max_workers=max_workers)
+        self.name = name
+        self.metrics = PoolMetrics(max_workers)
+
+    def submit(self, fn: Callable[..., Any], /, *args: Any, **kwargs: Any) -> Future:
+        submitted_at = time.time()
+        inner = super().submit(_timed_call, fn, args, kwargs)
+        outer: Future = Future()
+        self.metrics.submitted()
+
+        def _done(f: Future) -> None:
+            if f.cancelled():
+                self.metrics.started(0.0)
+                self.metrics.finished(0.0, True)
+                outer.cancel()
+                return
+            error = f.exception()
+            if error is not None:
+                self.metrics.started(0.0)
+                self.metrics.finished(0.0, True)
+                if not outer.cancelled():
+                    outer.set_exception(error)
+                return
+            started_at, finished_at, result = f.result()
+            self.metrics.started(max(0.0, started_at - submitted_at))
+            self.metrics.finished(finished_at - started_at, False)
+            if not outer.cancelled():
+                outer.set_result(result)
+
+        inner.add_done_callback(_done)
+        outer.add_done_callback(lambda f: inner.cancel() if f.cancelled() else None)
+        return outer
+
+
+_settings = get_settings()
+_cores = os.cpu_count() or 1
+
+NETWORK_POOL = InstrumentedThreadPool("network", _settings.network_workers)
+TOOL_POOL = InstrumentedThreadPool("tools", _settings.tool_workers or _cores)
+IO_POOL = InstrumentedThreadPool("io", _settings.io_workers)
+
+_cpu_pool: Optional[InstrumentedProcessPool] = None
+_cpu_pool_lock = threading.Lock()
+
+
+def get_cpu_pool() -> InstrumentedProcessPool:
+    """Create the shared process pool on first use."""
+    global _cpu_pool
+    with _cpu_pool_lock:
+        if _cpu_pool is None:
+            workers = get_settings().complexity_workers or _cores
+            _cpu_pool = InstrumentedProcessPool("cpu", workers)
+            logger.info(f"CPU process pool started with {workers} workers")
+        return _cpu_pool
+
+
+def executor_stats() -> Dict[str, Dict[str, Any]]:
+    """Utilisation and queue-time metrics of every pool, keyed by pool name."""
+    pools: List[Union[InstrumentedThreadPool, InstrumentedProcessPool]] = [NETWORK_POOL, TOOL_POOL, IO_POOL]
+    if _cpu_pool is not None:
+        pools.append(_cpu_pool)
+    return {pool.name: pool.metrics.snapshot() for pool in pools}
@@ -0,0 +1,120 @@
+"""
+Complexity and line counts from one read of each file.
+
+The complexity engine and the line counter both work from file contents.
+``measure_files`` looks up both results in the blob-keyed cache and hands
+every file that misses either one to a single worker pass, which reads the
+file once and computes whatever is missing from the same bytes.
+"""
+
+import asyncio
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from backend.services import complexity_engine, line_counter
+from backend.services.complexity_engine import analyze_blob, bind_result, map_in_pool
+from backend.services.executors import IO_POOL
+from backend.services.file_walker import SourceFile
+from backend.services.line_counter import count_file, count_lines
+from backend.services.result_cache import FileResultCache, config_hash
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# A file to measure, with whether it needs complexity analysis and line counting
+MeasureTask = Tuple[SourceFile, bool, bool]
+# The file's complexity result and line counts, each None when not needed
+Measured = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, int]]]
+
+
+def _measure(f: SourceFile, analyze: bool, count: bool) -> Measured:
+    if not analyze and f.on_disk:
+        # Counting alone reads the file itself, memory-mapping large ones
+        return None, count_file(f.abs_path, f.language)
+    data = f.content
+    result = analyze_blob(data.decode("utf-8", errors="replace")) if analyze else None
+    return result, count_lines(data, f.language) if count else None
+
+
+def _measure_chunk(tasks: Sequence[MeasureTask]) -> List[Measured]:
+    """Worker entry point: measure a chunk of files, reading each one here."""
+    return [_measure(*task) for task in tasks]
+
+
+async def measure_files(
+    files: Iterable[SourceFile],
+    cache: Optional[FileResultCache] = None
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Dict[str, Any]]]:
+    """
+    Compute complexity and line counts of walked source files in one pass.
+
+    Each result is computed once per distinct blob (and language, for line
+    counts) and not at all when it is in ``cache``; a file missing both is
+    read once for both.
+
+    Args:
+        files: Files from ``walk_repository``
+        cache: Optional blob-keyed result cache
+
+    Returns:
+        Tuple of (per-file ``analyze_source`` results for Python files,
+        per-file line counts as ``aggregate_loc`` expects), keyed by path
+    """
+    loop = asyncio.get_running_loop()
+    files = list(files)
+    python_files = [f for f in files if f.is_python]
+    loc_keys = {f.path: (f.blob_id, config_hash(f.language)) for f in files}
+
+    blobs: Dict[str, Dict[str, Any]] = {}
+    counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+    if cache is not None:
+        cached = await loop.run_in_executor(
+            IO_POOL, cache.get_many, complexity_engine.CACHE_TOOL, complexity_engine.CACHE_TOOL_VERSION,
+            [(f.blob_id, complexity_engine.CACHE_CONFIG) for f in python_files]
+        )
+        blobs = {blob_id: result for (blob_id, _), result in cached.items()}
+        counts = await loop.run_in_executor(
+            IO_POOL, cache.get_many, line_counter.CACHE_TOOL, line_counter.LINE_COUNTER_VERSION,
+            list(set(loc_keys.values()))
+        )
+
+    tasks: List[MeasureTask] = []
+    analyzing, counting = set(), set()
+    for f in files:
+        analyze = f.is_python and f.blob_id not in blobs and f.blob_id not in analyzing
+        count = loc_keys[f.path] not in counts and loc_keys[f.path] not in counting
+        if analyze:
+            analyzing.add(f.blob_id)
+        if count:
+            counting.add(loc_keys[f.path])
+        if analyze or count:
+            tasks.append((f, analyze, count))
+
+    fresh_blobs: Dict[str, Dict[str, Any]] = {}
+    fresh_counts: Dict[Tuple[str, str], Dict[str, int]] = {}
+    for (f, analyze, count), (result, lines) in zip(tasks, await map_in_pool(_measure_chunk, tasks)):
+        if analyze:
+            fresh_blobs[f.blob_id] = result
+        if count:
+            fresh_counts[loc_keys[f.path]] = lines
+    if cache is not None:
+        entries = {(blob_id, complexity_engine.CACHE_CONFIG): result for blob_id, result in fresh_blobs.items()}
+        await loop.run_in_executor(
+            IO_POOL, cache.put_many, complexity_engine.CACHE_TOOL, complexity_engine.CACHE_TOOL_VERSION, entries
+        )
+        await loop.run_in_executor(
+            IO_POOL, cache.put_many, line_counter.CACHE_TOOL, line_counter.LINE_COUNTER_VERSION, fresh_counts
+        )
+    blobs.update(fresh_blobs)
+    counts.update(fresh_counts)
+
+    complexity = {f.path: bind_result(blobs[f.blob_id], f.path) for f in python_files}
+    loc = {f.path: {"language": f.language, **counts[loc_keys[f.path]]} for f in files}
+    errors = [result for result in complexity.values() if "error" in result]
+    for result in errors[:10]:
+        logger.debug(f"Complexity analysis skipped {result['file']}: {result['error']}")
+
+    logger.info(
+        f"File metrics complete: {len(files)} files, {len(tasks)} read, {len(analyzing)} analyzed, "
+        f"{len(counting)} counted, {len(errors)} unparsable"
+    )
+    return complexity, loc
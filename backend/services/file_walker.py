@@ -0,0 +1,145 @@
+"""
+Single-pass repository file walker.
+
+Enumerates and filters every analyzable file once so the complexity
+engine, line counting and lint candidate selection share one traversal and
+one set of ignore rules. Contents are not kept in memory: a file is read
+from disk when an analyzer needs it, and only its blob ID stays resident.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass, field
+from functools import cached_property
+from typing import BinaryIO, Iterable, List, Optional
+
+from backend.utils.languages import detect_language
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Common non-code directories ignored by every analyzer
+IGNORE_DIRS = [".git", "node_modules", "venv", ".venv", "__pycache__", "build", "dist", ".tox", ".eggs"]
+
+# Bytes inspected when deciding whether a file is binary
+BINARY_SNIFF_BYTES = 8192
+
+# Read size when hashing a file from disk
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def _blob_digest(f: BinaryIO, head: bytes = b"") -> str:
+    """Git blob SHA-1 of an open file, given the ``head`` already read from it."""
+    digest = hashlib.sha1(b"blob %d\0" % os.fstat(f.fileno()).st_size)
+    digest.update(head)
+    for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+@dataclass
+class SourceFile:
+    """
+    An analyzable file.
+
+    Contents are read from ``abs_path`` on each access and not kept. Files
+    that are not on disk, such as blobs read from git history, are created
+    with their contents in ``data`` instead.
+    """
+
+    path: str
+    abs_path: str
+    language: str
+    size: int
+    data: Optional[bytes] = field(default=None, repr=False)
+
+    @property
+    def is_python(self) -> bool:
+        """Whether the file is a Python module (stubs and notebooks excluded)."""
+        return self.path.endswith(".py")
+
+    @property
+    def on_disk(self) -> bool:
+        """Whether the contents are read from ``abs_path``."""
+        return self.data is None
+
+    @property
+    def content(self) -> bytes:
+        """The file contents."""
+        if self.data is not None:
+            return self.data
+        with open(self.abs_path, "rb") as f:
+            return f.read()
+
+    @cached_property
+    def blob_id(self) -> str:
+        """Git blob SHA-1 of the contents, identical to ``git hash-object``."""
+        if self.data is not None:
+            return hashlib.sha1(b"blob %d\0" % len(self.data) + self.data).hexdigest()
+        with open(self.abs_path, "rb") as f:
+            return _blob_digest(f)
+
+
+def walk_repository(
+    repo_path: str,
+    ignore_dirs: Iterable[str] = IGNORE_DIRS,
+    max_file_bytes: Optional[int] = None
+) -> List[SourceFile]:
+    """
+    Collect all recognised source files under a repository.
+
+    Ignored directories are pruned during the walk, files in unknown
+    languages are skipped without being opened, files above
+    ``max_file_bytes`` are dropped after a size check and binaries after
+    reading their first bytes. The rest of each file is only streamed
+    through the hash for its blob ID; contents are left on disk.
+
+    Args:
+        repo_path: Repository root
+        ignore_dirs: Directory names to skip anywhere in the tree
+        max_file_bytes: Skip files larger than this (None for no limit)
+
+    Returns:
+        Source files sorted by repository-relative path
+    """
+    ignored = set(ignore_dirs)
+    files: List[SourceFile] = []
+    skipped = 0
+
+    for root, dirs, filenames in os.walk(repo_path):
+        dirs[:] = sorted(d for d in dirs if d not in ignored)
+        for filename in sorted(filenames):
+            language = detect_language(filename)
+            if language is None:
+                continue
+
+            abs_path = os.path.join(root, filename)
+            if os.path.islink(abs_path) or not os.path.isfile(abs_path):
+                continue
+            try:
+                size = os.path.getsize(abs_path)
+                if max_file_bytes is not None and size > max_file_bytes:
+                    skipped += 1
+                    continue
+                with open(abs_path, "rb") as f:
+                    head = f.read(BINARY_SNIFF_BYTES)
+                    blob_id = None if b"\0" in head else _blob_digest(f, head)
+            except OSError as e:
+                logger.debug(f"Could not read {abs_path}: {e}")
+                skipped += 1
+                continue
+
+            if blob_id is None:
+                skipped += 1
+                continue
+
+            rel_path = os.path.relpath(abs_path, repo_path).replace(os.sep, "/")
+            source = SourceFile(rel_path, abs_path, language, size)
+            source.blob_id = blob_id
+            files.append(source)
+
+    logger.info(
+        f"Walked repository: {len(files)} source files, {skipped} skipped",
+        extra={'extra_data': {'total_bytes': sum(f.size for f in files)}}
+    )
+    return files
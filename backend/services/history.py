@@ -0,0 +1,447 @@
+"""
+Commit-history analysis.
+
+Scores the last N commits of a repository's default branch. Commits are
+planned oldest first, each against the one before it (``plan_analysis``),
+so only the files a commit changed are re-analyzed and pylint re-checks
+only changed modules and their importers; complexity and line counts are
+computed once per distinct file version across the whole history. The
+cost grows with the size of the changes rather than with N times the
+size of the repository.
+
+The history is cloned once and without file contents. File lists come
+from each commit's tree, and the analyzable files of all commits are
+fetched in a single request and read straight from the object store.
+Pylint needs files on disk, so every commit with modules to lint gets a
+sparse worktree of its own; those runs do not depend on each other and
+proceed in parallel, up to ``history_concurrency`` at a time. The fresh
+results are then merged commit by commit and scored.
+
+Commits that already have a complete report with per-file results are not
+analyzed again; their stored records seed the next commit's plan. AI
+insights are not generated per commit: scores are computed with the same
+fallback as an analysis without an AI service.
+"""
+
+import asyncio
+import os
+import shutil
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from git import GitCommandError, Repo
+
+from backend.config import get_settings
+from backend.services.analyzer import WORKSPACES, get_tool_versions, pylint_command, run_sandboxed_tools
+from backend.services.db_service import find_report, get_report_files
+from backend.services.executors import IO_POOL, NETWORK_POOL, TOOL_POOL
+from backend.services.file_metrics import measure_files
+from backend.services.file_walker import BINARY_SNIFF_BYTES, IGNORE_DIRS, SourceFile
+from backend.services.incremental import (
+    IncrementalPlan,
+    aggregate_records,
+    build_file_records,
+    plan_analysis,
+)
+from backend.services.predictor import calculate_chs, extract_features_for_prediction, get_historical_risk_score
+from backend.services.result_cache import file_cache
+from backend.services.shards import PYLINT_CONFIG_FILES, config_digest_of
+from backend.utils.exceptions import RepositoryError
+from backend.utils.languages import detect_language
+from backend.utils.logger import setup_logger
+from backend.utils.pylint_parser import parse_pylint_json_by_file
+from backend.utils.repo_downloader import (
+    add_worktree,
+    blob_sizes,
+    checkout_files,
+    clone_history,
+    fetch_blobs,
+    is_analyzable_path,
+    list_commit_files,
+    read_blobs,
+)
+
+logger = setup_logger(__name__)
+
+HISTORY_AI_METRICS: Dict[str, Any] = {
+    "ai_probability": 0.0,
+    "ai_risk_notes": "AI analysis is not run for commit history",
+    "recommendations": [],
+}
+
+# (path, blob ID) identifying one version of a file
+FileVersion = Tuple[str, str]
+
+
+@dataclass
+class HistoryCommit:
+    """A commit of the analyzed history and what is known about it."""
+
+    sha: str
+    commit_date: str
+    report_id: Optional[int] = None
+    records: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    files: List[SourceFile] = field(default_factory=list)
+    plan: Optional[IncrementalPlan] = None
+    pylint: Optional[Dict[str, Dict[str, Any]]] = None
+    lint_config: Optional[str] = None
+
+    @property
+    def analyzed(self) -> bool:
+        """Whether the commit needs a fresh analysis (it has no stored report)."""
+        return self.report_id is None
+
+
+def _report_stage(on_stage: Optional[Callable[[str], None]], stage: str) -> None:
+    if on_stage is not None:
+        on_stage(stage)
+
+
+def _source_entries(entries: Iterable[Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+    """(blob ID, path, language) of the tree entries ``walk_repository`` would pick up."""
+    ignored = set(IGNORE_DIRS)
+    sources = []
+    for oid, path in entries:
+        language = detect_language(path.rsplit("/", 1)[-1])
+        if language is not None and is_analyzable_path(path, ignored):
+            sources.append((oid, path, language))
+    return sources
+
+
+def load_commit_files(
+    repo_path: str,
+    commits: List[HistoryCommit],
+    max_total_bytes: Optional[int] = None,
+    max_file_bytes: Optional[int] = None,
+    timeout: Optional[float] = None,
+    repo_url: Optional[str] = None
+) -> None:
+    """
+    Fill in the source files of commits from a blobless clone, without checking out.
+
+    Analyzable files of all commits are fetched in one request (tool
+    configuration files too, for the pylint worktrees) and read in one
+    batch. A file version shared by several commits is a single
+    ``SourceFile`` object, read and hashed once. Binaries and files above
+    ``max_file_bytes`` are left out, as ``walk_repository`` does. Each
+    commit's ``lint_config`` is the digest of its root pylint configuration.
+
+    Raises:
+        RepositoryError: If the distinct files of all commits together
+            exceed ``max_total_bytes``
+    """
+    ignored = set(IGNORE_DIRS)
+    listings = {c.sha: list_commit_files(repo_path, c.sha) for c in commits}
+    wanted = sorted({
+        oid for listing in listings.values() for oid, path in listing if is_analyzable_path(path, ignored)
+    })
+    fetch_blobs(repo_path, wanted, timeout)
+    sizes = blob_sizes(repo_path, wanted, timeout)
+
+    total_bytes = sum(sizes.values())
+    if max_total_bytes is not None and total_bytes > max_total_bytes:
+        raise RepositoryError(
+            f"History is too large to analyze: {total_bytes / (1024 * 1024):.0f} MB of distinct files, "
+            f"limit is {max_total_bytes // (1024 * 1024)} MB",
+            repo_url=repo_url,
+            details={'size_mb': round(total_bytes / (1024 * 1024), 1), 'max_size_mb': max_total_bytes // (1024 * 1024)}
+        )
+
+    sources = {sha: _source_entries(listing) for sha, listing in listings.items()}
+    configs = {
+        sha: [(oid, path) for oid, path in listing if path in PYLINT_CONFIG_FILES]
+        for sha, listing in listings.items()
+    }
+    readable = sorted({
+        oid for entries in sources.values() for oid, _, _ in entries
+        if max_file_bytes is None or sizes.get(oid, 0) <= max_file_bytes
+    } | {oid for entries in configs.values() for oid, _ in entries})
+    contents = read_blobs(repo_path, readable, timeout)
+
+    versions: Dict[FileVersion, SourceFile] = {}
+    for commit in commits:
+        commit.lint_config = config_digest_of({path: contents.get(oid, b"") for oid, path in configs[commit.sha]})
+        for oid, path, language in sources[commit.sha]:
+            content = contents.get(oid)
+            if content is None or b"\0" in content[:BINARY_SNIFF_BYTES]:
+                continue
+            if (path, oid) not in versions:
+                # Never checked out, so there is no absolute path to record
+                versions[(path, oid)] = SourceFile(path, path, language, len(content), content)
+            commit.files.append(versions[(path, oid)])
+        commit.files.sort(key=lambda f: f.path)
+
+    logger.info(
+        "Loaded commit files",
+        extra={'extra_data': {
+            'commits': len(commits), 'file_versions': len(versions), 'fetched_bytes': total_bytes
+        }}
+    )
+
+
+def _split_by_path(files: Iterable[SourceFile]) -> List[List[SourceFile]]:
+    """Split file versions into lists without repeated paths, as the analyzers key results by path."""
+    batches: List[List[SourceFile]] = []
+    seen: Dict[str, int] = {}
+    for f in files:
+        index = seen.get(f.path, 0)
+        seen[f.path] = index + 1
+        if index == len(batches):
+            batches.append([])
+        batches[index].append(f)
+    return batches
+
+
+async def analyze_file_versions(
+    files: Iterable[SourceFile]
+) -> Tuple[Dict[FileVersion, Dict[str, Any]], Dict[FileVersion, Dict[str, Any]]]:
+    """
+    Complexity and line counts for distinct file versions.
+
+    Returns:
+        Tuple of (complexity results, line counts), both keyed by
+        (path, blob ID); non-Python files have no complexity result
+    """
+    batches = _split_by_path({id(f): f for f in files}.values())
+    results = await asyncio.gather(*(measure_files(batch, cache=file_cache) for batch in batches))
+    complexity: Dict[FileVersion, Dict[str, Any]] = {}
+    loc: Dict[FileVersion, Dict[str, Any]] = {}
+    for batch, (batch_complexity, batch_loc) in zip(batches, results):
+        for f in batch:
+            if f.path in batch_complexity:
+                complexity[(f.path, f.blob_id)] = batch_complexity[f.path]
+            loc[(f.path, f.blob_id)] = batch_loc[f.path]
+    return complexity, loc
+
+
+def _fresh_results(
+    commit: HistoryCommit,
+    results: Dict[FileVersion, Dict[str, Any]]
+) -> Dict[str, Dict[str, Any]]:
+    """Results for the files a commit changed, keyed by path."""
+    assert commit.plan is not None, "plan_commits has not run"
+    return {f.path: results[(f.path, f.blob_id)] for f in commit.plan.changed if (f.path, f.blob_id) in results}
+
+
+def plan_commits(
+    commits: List[HistoryCommit],
+    complexity: Dict[FileVersion, Dict[str, Any]],
+    loc: Dict[FileVersion, Dict[str, Any]]
+) -> None:
+    """
+    Plan every commit against the one before it, oldest first.
+
+    Plans only depend on blob IDs and imports, which are known before
+    pylint runs, so all commits are planned up front and their pylint
+    runs are independent. Until then, pylint is assumed to succeed.
+    """
+    previous: Dict[str, Dict[str, Any]] = {}
+    for commit in commits:
+        if not commit.analyzed:
+            previous = commit.records
+            continue
+        commit.plan = plan_analysis(commit.files, previous, commit.lint_config)
+        records = build_file_records(
+            commit.files, commit.plan, _fresh_results(commit, complexity), _fresh_results(commit, loc), {}
+        )
+        previous = {record["path"]: record for record in records}
+
+
+def _remove_worktree(repo_path: str, dest: str) -> None:
+    try:
+        Repo(repo_path).git.worktree('remove', '--force', dest)
+    except GitCommandError:
+        # Never added; only files may be left
+        shutil.rmtree(dest, ignore_errors=True)
+
+
+async def _lint_commit(
+    repo_path: str,
+    workspace_path: str,
+    sha: str,
+    lint_paths: List[str],
+    worktree_lock: asyncio.Lock,
+    timeout: int
+) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Run pylint on modules of a commit in a sparse worktree of that commit.
+
+    Returns:
+        Per-file pylint results, or None if pylint failed
+    """
+    loop = asyncio.get_running_loop()
+    dest = os.path.join(workspace_path, "commits", sha)
+    try:
+        # Worktrees are registered in the shared repository one at a time
+        async with worktree_lock:
+            await loop.run_in_executor(IO_POOL, add_worktree, repo_path, dest, sha)
+        # Every analyzable blob was fetched with the files, so this writes files only
+        await loop.run_in_executor(IO_POOL, partial(
+            checkout_files, dest, sparse=True, exclude_dirs=IGNORE_DIRS, timeout=timeout, fetch=False
+        ))
+        outputs = await run_sandboxed_tools({"pylint": pylint_command(lint_paths)}, dest, timeout=timeout)
+        return parse_pylint_json_by_file(outputs.get("pylint", ""))
+    except Exception as e:
+        print(f"[HISTORY] ✗ Pylint failed for {sha[:12]}: {e}")
+        return None
+    finally:
+        async with worktree_lock:
+            await loop.run_in_executor(IO_POOL, _remove_worktree, repo_path, dest)
+
+
+def _score(parsed: Dict[str, Any]) -> Tuple[float, float]:
+    ai_probability = HISTORY_AI_METRICS["ai_probability"]
+    feature_vector = extract_features_for_prediction(parsed, ai_probability)
+    historical_risk = get_historical_risk_score(parsed["repo_url"], parsed["git_sha"], feature_vector)
+    return historical_risk, calculate_chs(parsed, ai_probability, historical_risk)
+
+
+async def _load_stored_reports(repo_url: str, commits: List[HistoryCommit]) -> None:
+    """Mark commits with a complete stored report and per-file results as already analyzed."""
+    loop = asyncio.get_running_loop()
+    tool_versions = get_tool_versions()
+    for commit in commits:
+        report_id = await loop.run_in_executor(
+            IO_POOL, partial(find_report, repo_url, commit.sha, tool_versions, include_history=True)
+        )
+        if report_id is None:
+            continue
+        records = await loop.run_in_executor(IO_POOL, get_report_files, report_id)
+        if records:
+            commit.report_id, commit.records = report_id, records
+
+
+def _format_date(timestamp: int) -> str:
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+async def analyze_history(
+    repo_url: str,
+    commits: int,
+    on_stage: Optional[Callable[[str], None]] = None,
+    reuse_reports: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    Analyze the last ``commits`` commits of a repository.
+
+    Args:
+        repo_url: Repository URL
+        commits: Number of first-parent commits to analyze, counting back from HEAD
+        on_stage: Optional callback receiving the current pipeline stage
+        reuse_reports: Skip commits that already have a stored report
+
+    Returns:
+        One entry per commit, oldest first. Commits with a stored report
+        give ``git_sha``, ``commit_date`` and ``report_id``; the others
+        give a result like ``analyze_single_repo``'s (without a
+        ``report_id``), for the caller to store in this order.
+
+    Raises:
+        RepositoryError: If the repository cannot be cloned or is too large
+    """
+    settings = get_settings()
+    timeout = settings.analysis_timeout
+    loop = asyncio.get_running_loop()
+    workspace = await loop.run_in_executor(IO_POOL, WORKSPACES.acquire)
+    repo_path = os.path.join(workspace.path, "repo")
+    print(f"[HISTORY] Analyzing the last {commits} commits of {repo_url} in {workspace.path}")
+
+    try:
+        _report_stage(on_stage, "cloning")
+        history = await loop.run_in_executor(
+            NETWORK_POOL, partial(clone_history, repo_url, repo_path, commits, timeout=timeout)
+        )
+        ordered = [HistoryCommit(sha, _format_date(timestamp)) for sha, timestamp in reversed(history)]
+
+        if reuse_reports:
+            _report_stage(on_stage, "checking_cache")
+            await _load_stored_reports(repo_url, ordered)
+        pending = [c for c in ordered if c.analyzed]
+        worktree_lock = asyncio.Lock()
+        print(f"[HISTORY] {len(ordered)} commits, {len(pending)} to analyze")
+
+        if pending:
+            _report_stage(on_stage, "running_tools")
+            await loop.run_in_executor(NETWORK_POOL, partial(
+                load_commit_files, repo_path, pending,
+                max_total_bytes=settings.max_repo_size_mb * 1024 * 1024,
+                max_file_bytes=settings.max_file_size_kb * 1024,
+                timeout=timeout, repo_url=repo_url
+            ))
+            await loop.run_in_executor(IO_POOL, WORKSPACES.measure, workspace)
+
+            complexity, loc = await analyze_file_versions(f for c in pending for f in c.files)
+            plan_commits(ordered, complexity, loc)
+
+            limit = asyncio.Semaphore(max(1, settings.history_concurrency))
+
+            async def _lint(commit: HistoryCommit) -> None:
+                assert commit.plan is not None, "plan_commits has not run"
+                if not commit.plan.lint_paths:
+                    commit.pylint = {}
+                    return
+                async with limit:
+                    commit.pylint = await _lint_commit(
+                        repo_path, workspace.path, commit.sha, commit.plan.lint_paths, worktree_lock, timeout
+                    )
+
+            await asyncio.gather(*(_lint(c) for c in pending))
+
+        _report_stage(on_stage, "scoring")
+        results = []
+        previous: Dict[str, Dict[str, Any]] = {}
+        for position, commit in enumerate(ordered):
+            if not commit.analyzed:
+                previous = commit.records
+                results.append({
+                    "git_sha": commit.sha, "commit_date": commit.commit_date, "report_id": commit.report_id
+                })
+                continue
+
+            # Re-plan against the records as actually merged: modules whose
+            # pylint run failed in the commit before are linted here as well
+            plan = plan_analysis(commit.files, previous, commit.lint_config)
+            assert commit.plan is not None, "plan_commits has not run"
+            missing = sorted(set(plan.lint_paths) - set(commit.plan.lint_paths))
+            if missing and commit.pylint is not None:
+                print(f"[HISTORY] Linting {len(missing)} modules without results at {commit.sha[:12]}")
+                more = await _lint_commit(repo_path, workspace.path, commit.sha, missing, worktree_lock, timeout)
+                commit.pylint = None if more is None else {**commit.pylint, **more}
+            file_metrics = build_file_records(
+                commit.files, plan, _fresh_results(commit, complexity), _fresh_results(commit, loc), commit.pylint
+            )
+            previous = {record["path"]: record for record in file_metrics}
+            sections = aggregate_records(file_metrics)
+            if sections["pylint"]["score"] is None:
+                sections["pylint"]["score"] = 5.0
+
+            parsed: Dict[str, Any] = {
+                "repo_url": repo_url,
+                "git_sha": commit.sha,
+                "commit_date": commit.commit_date,
+                **sections,
+                "file_metrics": file_metrics,
+                "ai_metrics": dict(HISTORY_AI_METRICS),
+            }
+            historical_risk, code_health_score = await loop.run_in_executor(TOOL_POOL, _score, parsed)
+            parsed["code_health_score"] = code_health_score
+            parsed["historical_risk_score"] = historical_risk
+            parsed["analysis_meta"] = {
+                "mode": "history",
+                "commit_date": commit.commit_date,
+                "history_position": position,
+                "history_commits": len(ordered),
+                "incremental": plan.to_dict(),
+                "incomplete_stages": [] if commit.pylint is not None else ["tools"],
+            }
+            results.append(parsed)
+            print(
+                f"[HISTORY] ✓ {commit.sha[:12]} ({commit.commit_date}): CHS {code_health_score}, "
+                f"{len(plan.changed)} changed, {len(plan.lint_paths)} linted"
+            )
+        return results
+    finally:
+        # Only renames files aside; they are deleted in the background
+        await loop.run_in_executor(IO_POOL, WORKSPACES.release, workspace)
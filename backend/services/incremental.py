@@ -0,0 +1,199 @@
+"""
+Incremental analysis between commits.
+
+Per-file results of the previous report are stored with the git blob ID of
+the file they were computed from. A new commit only needs complexity and
+line counts for files whose blob changed, and pylint only for changed
+modules plus the modules that import them, directly or through other
+modules (pylint's inference follows imports transitively, so an importer's
+messages can change without its own contents changing). Pylint results
+also record the digest of the pylint configuration they were produced
+with; when the configuration changed every module is linted again.
+Everything else is merged from the stored records, and the report is
+aggregated from the merged per-file records exactly as a full run is.
+"""
+
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from backend.services.complexity_engine import build_complexity_result
+from backend.services.file_walker import SourceFile
+from backend.utils.cloc_parser import aggregate_loc
+from backend.utils.logger import setup_logger
+from backend.utils.pylint_parser import build_pylint_result
+
+logger = setup_logger(__name__)
+
+
+@dataclass
+class IncrementalPlan:
+    """Which files must be re-analyzed and which stored records carry over."""
+
+    changed: List[SourceFile]
+    lint_paths: List[str]
+    reused: Dict[str, Dict[str, Any]]
+    deleted: List[str] = field(default_factory=list)
+    config: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, int]:
+        """Summary counts for logs and the report."""
+        return {
+            "changed_files": len(self.changed),
+            "reused_files": len(self.reused),
+            "deleted_files": len(self.deleted),
+            "linted_files": len(self.lint_paths),
+        }
+
+
+def module_name(path: str) -> str:
+    """Dotted module name for a Python file path (packages map to their directory)."""
+    parts = path[:-3].split("/")
+    if parts[-1] == "__init__":
+        parts = parts[:-1]
+    return ".".join(parts)
+
+
+def module_index(paths: Iterable[str]) -> Dict[str, Set[str]]:
+    """
+    Python file paths by every name an import may refer to them with.
+
+    Repositories are not always laid out with the import root at the top
+    (``src/`` layouts, nested projects), so a module is indexed under every
+    dotted suffix of its path. Over-matching only costs an extra lint.
+    """
+    by_name: Dict[str, Set[str]] = defaultdict(set)
+    for path in paths:
+        parts = module_name(path).split(".")
+        for start in range(len(parts)):
+            by_name[".".join(parts[start:])].add(path)
+    return by_name
+
+
+def plan_analysis(
+    files: List[SourceFile],
+    previous: Dict[str, Dict[str, Any]],
+    config: Optional[str] = None
+) -> IncrementalPlan:
+    """
+    Diff walked files against the previous report's per-file records.
+
+    Args:
+        files: Files from ``walk_repository`` for the new commit
+        previous: Stored records keyed by path (empty for a full run)
+        config: Digest of the commit's pylint configuration; records linted
+            with another configuration are linted again
+
+    Returns:
+        Plan listing changed files, Python paths to lint and reused records
+    """
+    changed: List[SourceFile] = []
+    reused: Dict[str, Dict[str, Any]] = {}
+    for f in files:
+        record = previous.get(f.path)
+        if record and record.get("blob_id") == f.blob_id:
+            reused[f.path] = record
+        else:
+            changed.append(f)
+
+    current_paths = {f.path for f in files}
+    deleted = sorted(path for path in previous if path not in current_paths)
+
+    lint = {f.path for f in changed if f.is_python}
+    lint.update(
+        path for path, record in reused.items()
+        if path.endswith(".py") and (
+            record.get("pylint") is None or (config is not None and record.get("pylint_config") != config)
+        )
+    )
+
+    # Follow imports backwards from every changed or deleted module
+    touched = [f.path for f in changed if f.is_python] + [path for path in deleted if path.endswith(".py")]
+    by_name = module_index(touched + [path for path in reused if path.endswith(".py")])
+    importers: Dict[str, Set[str]] = defaultdict(set)
+    for path, record in reused.items():
+        for name in record.get("imports", []):
+            for dependency in by_name.get(name, ()):
+                importers[dependency].add(path)
+    queue, seen = deque(touched), set(touched)
+    while queue:
+        for importer in importers.get(queue.popleft(), ()):
+            if importer not in seen:
+                seen.add(importer)
+                lint.add(importer)
+                queue.append(importer)
+
+    plan = IncrementalPlan(
+        changed=changed, lint_paths=sorted(lint), reused=reused, deleted=deleted, config=config
+    )
+    logger.info("Incremental plan computed", extra={'extra_data': plan.to_dict()})
+    return plan
+
+
+def build_file_records(
+    files: List[SourceFile],
+    plan: IncrementalPlan,
+    complexity: Dict[str, Dict[str, Any]],
+    loc: Dict[str, Dict[str, Any]],
+    pylint: Optional[Dict[str, Dict[str, Any]]]
+) -> List[Dict[str, Any]]:
+    """
+    Merge fresh per-file results with reused records.
+
+    Args:
+        files: All walked files, in report order
+        plan: Plan the fresh results were computed for
+        complexity: Fresh ``analyze_source`` results keyed by path
+        loc: Fresh per-file line counts keyed by path
+        pylint: Fresh per-file pylint results, or None if pylint did not run
+
+    Returns:
+        One record per walked file
+    """
+    lint_paths = set(plan.lint_paths)
+    records = []
+    for f in files:
+        record = dict(plan.reused.get(f.path) or {"path": f.path, "blob_id": f.blob_id, "language": f.language})
+
+        if f.path not in plan.reused:
+            result = complexity.get(f.path, {})
+            record["loc"] = loc.get(f.path)
+            if record["loc"] is None and result.get("raw"):
+                # No line counter output for this file: use radon's raw metrics
+                record["loc"] = {"language": f.language, **result["raw"]}
+            if f.is_python:
+                record["blocks"] = result.get("blocks", [])
+                record["statements"] = result.get("statements", 0)
+                record["imports"] = result.get("imports", [])
+
+        if f.path in lint_paths:
+            record["pylint"] = (
+                pylint.get(f.path, {"issues": [], "counts": {}}) if pylint is not None else None
+            )
+            record["pylint_config"] = plan.config
+        records.append(record)
+    return records
+
+
+def aggregate_records(records: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """
+    Build the radon, cloc and pylint report sections from per-file records.
+
+    Returns:
+        Dictionary with ``radon``, ``cloc`` and ``pylint`` results in the
+        shapes the parsers produce
+    """
+    python_records = [r for r in records if "statements" in r]
+    radon = build_complexity_result(python_records)
+    cloc = aggregate_loc({r["path"]: r["loc"] for r in records if r.get("loc")})
+
+    pylint: Dict[str, Any]
+    if any(r.get("pylint") is None for r in python_records):
+        # Pylint did not produce results for every module
+        pylint = {"score": None, "issues": [], "issue_counts": {}, "total_issues": 0}
+    else:
+        pylint = build_pylint_result(
+            (r["pylint"] for r in python_records),
+            sum(r["statements"] for r in python_records)
+        )
+    return {"radon": radon, "cloc": cloc, "pylint": pylint}
@@ -0,0 +1,516 @@
+"""
+Asynchronous analysis job queue.
+
+Accepts analysis submissions immediately and drains them with a bounded
+pool of asyncio workers, tracking state, pipeline stage and the final
+report ID for every job so clients can poll instead of holding a
+connection open for the whole pipeline.
+
+The queue doubles as admission control: at most ``job_workers`` analyses
+run at once, at most ``job_queue_max_size`` wait, and submissions beyond
+that are rejected with a ``Retry-After`` estimated from how long recent
+jobs took. Submissions with the key of a job still queued or running are
+attached to that job instead of starting another analysis.
+
+Every job also keeps an ordered log of typed events (stage started and
+finished, partial results, completion) that clients can follow live.
+"""
+
+import asyncio
+import math
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from functools import partial
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional
+
+from backend.config import get_settings
+from backend.services.analyzer import (
+    analyze_single_repo,
+    find_existing_report,
+    get_tool_versions,
+)
+from backend.services.db_service import prune_report_files, save_report, save_report_files
+from backend.services.executors import IO_POOL
+from backend.services.history import analyze_history
+from backend.services.uploads import discard_upload
+from backend.utils.exceptions import AnalysisError, RateLimitError
+from backend.utils.logger import setup_logger
+from backend.utils.metrics import JOB_DURATION_SECONDS, JOB_QUEUE_WAIT_SECONDS, JOB_STAGE_SECONDS
+
+logger = setup_logger(__name__)
+
+# Weight of the newest observation in the moving averages of job timings
+EWMA_ALPHA = 0.2
+
+# Retry-After used before any job has finished
+DEFAULT_RETRY_AFTER_SECONDS = 30
+
+
+def _ewma(average: Optional[float], value: float) -> float:
+    """Fold a new observation into an exponentially weighted moving average."""
+    if average is None:
+        return value
+    return average + EWMA_ALPHA * (value - average)
+
+
+class JobState(str, Enum):
+    """Lifecycle states of an analysis job."""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """A single queued analysis request and its progress."""
+
+    id: str
+    repo_url: str
+    options: Dict[str, Any] = field(default_factory=dict)
+    state: JobState = JobState.QUEUED
+    stage: Optional[str] = None
+    report_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    stage_seconds: Dict[str, float] = field(default_factory=dict)
+    key: Optional[Hashable] = None
+    coalesced_requests: int = 0
+    events: List[Dict[str, Any]] = field(default_factory=list, repr=False)
+    _stage_started_at: Optional[float] = field(default=None, repr=False)
+    _new_events: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+
+    @property
+    def done(self) -> bool:
+        """Whether the job reached a terminal state."""
+        return self.state in (JobState.SUCCEEDED, JobState.FAILED)
+
+    def set_stage(self, stage: str) -> None:
+        """Record the pipeline stage the job is currently in."""
+        now = time.time()
+        self.end_stage(now)
+        self.stage = stage
+        self._stage_started_at = now
+        self.emit("stage_started", stage=stage)
+
+    def end_stage(self, now: float) -> None:
+        """Add the time spent in the current stage to ``stage_seconds``."""
+        if self.stage is not None and self._stage_started_at is not None:
+            seconds = now - self._stage_started_at
+            self.stage_seconds[self.stage] = self.stage_seconds.get(self.stage, 0.0) + seconds
+            self.emit("stage_finished", stage=self.stage, seconds=round(seconds, 3))
+        self._stage_started_at = None
+
+    def publish_partial(self, section: str, data: Dict[str, Any]) -> None:
+        """Publish a report section that is ready before the whole report."""
+        self.emit("partial_result", section=section, data=data)
+
+    def emit(self, event_type: str, **data: Any) -> None:
+        """Append an event to the job's log and wake up waiting readers."""
+        self.events.append({
+            "seq": len(self.events) + 1,
+            "type": event_type,
+            "time": time.time(),
+            **data,
+        })
+        self._new_events.set()
+        self._new_events = asyncio.Event()
+
+    async def wait_done(self) -> None:
+        """Wait until the job reached a terminal state."""
+        seen = len(self.events)
+        while not self.done:
+            seen += len(await self.wait_events(seen))
+
+    async def wait_events(self, after: int, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Return events newer than ``after``, waiting for one if there are none yet.
+
+        Args:
+            after: Sequence number of the last event the reader has seen
+            timeout: Longest time to wait for a new event
+
+        Returns:
+            New events, or an empty list if the job is done or the timeout expired
+        """
+        if len(self.events) <= after and not self.done:
+            try:
+                await asyncio.wait_for(self._new_events.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self.events[after:]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert job to dictionary for API responses."""
+        return {
+            "job_id": self.id,
+            "repo_url": self.repo_url,
+            "state": self.state.value,
+            "stage": self.stage,
+            "report_id": self.report_id,
+            "error": self.error,
+            "coalesced_requests": self.coalesced_requests,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+
+
+JobHandler = Callable[[Job], Awaitable[int]]
+
+
+class JobQueue:
+    """Bounded FIFO of analysis jobs drained by a fixed number of workers."""
+
+    def __init__(
+        self,
+        handler: JobHandler,
+        workers: int,
+        max_size: int,
+        retention_seconds: int
+    ):
+        """
+        Initialize job queue.
+
+        Args:
+            handler: Coroutine that runs a job and returns its report ID
+            workers: Number of jobs processed concurrently
+            max_size: Maximum number of jobs waiting to start
+            retention_seconds: How long finished jobs stay queryable
+        """
+        self._handler = handler
+        self._worker_count = max(1, workers)
+        self._retention_seconds = retention_seconds
+        self._max_size = max_size
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self._workers: List[asyncio.Task] = []
+        self._jobs: Dict[str, Job] = {}
+        self._in_flight: Dict[Hashable, Job] = {}
+        self._running = 0
+        self._rejected = 0
+        self._coalesced = 0
+        self._avg_wait: Optional[float] = None
+        self._avg_run: Optional[float] = None
+        self._avg_stage: Dict[str, float] = {}
+
+    async def start(self) -> None:
+        """Start the worker tasks on the running event loop."""
+        if self._workers:
+            return
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"analysis-worker-{i}")
+            for i in range(self._worker_count)
+        ]
+        logger.info(f"Job queue started with {self._worker_count} workers")
+
+    async def stop(self) -> None:
+        """Cancel the worker tasks and wait for them to exit."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        logger.info("Job queue stopped")
+
+    def submit(self, repo_url: str, key: Optional[Hashable] = None, **options: Any) -> Job:
+        """
+        Enqueue a new analysis job.
+
+        Args:
+            repo_url: Repository to analyze
+            key: Identity of the analysis; while a job with the same key is
+                queued or running, it is returned instead of a new job
+            **options: Extra parameters forwarded to the handler
+
+        Returns:
+            The queued job, or the in-flight job with the same key
+
+        Raises:
+            RateLimitError: If the queue is full, with the estimated
+                seconds until a slot frees up as ``retry_after``
+        """
+        self._prune()
+        if key is not None and key in self._in_flight:
+            job = self._in_flight[key]
+            job.coalesced_requests += 1
+            self._coalesced += 1
+            logger.info(f"Attached request for {repo_url} to in-flight job {job.id}")
+            return job
+
+        job = Job(id=uuid.uuid4().hex, repo_url=repo_url, options=options, key=key)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            self._rejected += 1
+            raise RateLimitError(
+                "Analysis queue is full, please retry later",
+                retry_after=self.retry_after(),
+                details={"queue_size": self._queue.qsize()}
+            )
+        self._jobs[job.id] = job
+        if key is not None:
+            self._in_flight[key] = job
+        job.emit("queued", repo_url=repo_url)
+        logger.info(f"Queued analysis job {job.id} for {repo_url}")
+        return job
+
+    def in_flight(self, key: Hashable) -> Optional[Job]:
+        """The queued or running job with this key, if any."""
+        return self._in_flight.get(key)
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Look up a job by ID."""
+        return self._jobs.get(job_id)
+
+    @property
+    def depth(self) -> int:
+        """Number of jobs waiting for a worker."""
+        return self._queue.qsize()
+
+    def retry_after(self) -> int:
+        """Seconds until a worker is expected to take the next job off a full queue."""
+        if self._avg_run is None:
+            return DEFAULT_RETRY_AFTER_SECONDS
+        return max(1, math.ceil(self._avg_run / self._worker_count))
+
+    def estimated_wait(self) -> float:
+        """Seconds a job submitted now is expected to wait before it starts."""
+        if self._avg_run is None:
+            return 0.0
+        waves = (self.depth + self._running) // self._worker_count
+        return waves * self._avg_run
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth, concurrency and moving averages of job timings."""
+        def _round(value: Optional[float]) -> Optional[float]:
+            return round(value, 3) if value is not None else None
+
+        return {
+            "workers": self._worker_count,
+            "running": self._running,
+            "depth": self.depth,
+            "max_size": self._max_size,
+            "rejected": self._rejected,
+            "coalesced": self._coalesced,
+            "avg_wait_seconds": _round(self._avg_wait),
+            "avg_run_seconds": _round(self._avg_run),
+            "avg_stage_seconds": {stage: _round(v) for stage, v in self._avg_stage.items()},
+            "estimated_wait_seconds": _round(self.estimated_wait()),
+        }
+
+    async def _worker(self, worker_id: int) -> None:
+        """Pull jobs off the queue forever."""
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            finally:
+                self._queue.task_done()
+
+    async def _run(self, job: Job) -> None:
+        """Execute a single job and record its outcome."""
+        job.state = JobState.RUNNING
+        started = job.started_at = time.time()
+        self._running += 1
+        self._avg_wait = _ewma(self._avg_wait, started - job.created_at)
+        JOB_QUEUE_WAIT_SECONDS.observe(started - job.created_at)
+        job.emit("started")
+        logger.info(f"Starting analysis job {job.id}")
+        try:
+            job.report_id = await self._handler(job)
+            job.state = JobState.SUCCEEDED
+        except asyncio.CancelledError:
+            job.state = JobState.FAILED
+            job.error = "Job was cancelled"
+            raise
+        except Exception as e:
+            logger.error(f"Analysis job {job.id} failed: {e}", exc_info=True)
+            job.state = JobState.FAILED
+            job.error = str(e)
+        finally:
+            finished = job.finished_at = time.time()
+            if job.key is not None:
+                self._in_flight.pop(job.key, None)
+            self._running -= 1
+            self._observe(job, finished, finished - started)
+            if job.state == JobState.SUCCEEDED:
+                job.emit("succeeded", report_id=job.report_id)
+            else:
+                job.emit("failed", error=job.error)
+            logger.info(
+                f"Analysis job {job.id} finished",
+                extra={'extra_data': {
+                    'state': job.state.value,
+                    'duration_seconds': round(finished - started, 3)
+                }}
+            )
+
+    def _observe(self, job: Job, finished: float, duration: float) -> None:
+        """Update the timing averages from a job that ran ``duration`` seconds until ``finished``."""
+        job.end_stage(finished)
+        if job.state == JobState.SUCCEEDED:
+            self._avg_run = _ewma(self._avg_run, duration)
+        JOB_DURATION_SECONDS.observe(duration, state=job.state.value)
+        for stage, seconds in job.stage_seconds.items():
+            self._avg_stage[stage] = _ewma(self._avg_stage.get(stage), seconds)
+            JOB_STAGE_SECONDS.observe(seconds, stage=stage)
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention window."""
+        cutoff = time.time() - self._retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.done and job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+async def run_analysis_job(job: Job) -> int:
+    """
+    Run the full analysis pipeline for a job and persist the report.
+
+    Unless the job was submitted with ``force``, a report already stored for
+    the remote HEAD is reused instead of re-running the pipeline, and other
+    commits are analyzed incrementally from the newest stored report.
+
+    Jobs submitted with an ``archive_path`` or ``local_path`` analyze that
+    upload or directory instead of cloning; their ``commit_sha`` option
+    (if any) takes the place of the remote HEAD. The uploaded archive is
+    deleted when the job ends. Jobs with ``history_commits`` analyze that
+    many recent commits (see ``run_history_job``).
+
+    Args:
+        job: Job to execute
+
+    Returns:
+        ID of the saved report
+
+    Raises:
+        AnalysisError: If the analysis could not produce a report
+    """
+    if job.options.get("history_commits"):
+        return await run_history_job(job)
+
+    archive_path = job.options.get("archive_path")
+    local_path = job.options.get("local_path")
+    commit_sha = job.options.get("commit_sha")
+    try:
+        if not job.options.get("force") and (commit_sha or not (archive_path or local_path)):
+            job.set_stage("checking_cache")
+            existing = await find_existing_report(job.repo_url, commit_sha)
+            if existing:
+                return int(existing["id"])
+
+        results = await analyze_single_repo(
+            job.repo_url,
+            on_stage=job.set_stage,
+            incremental=not job.options.get("force"),
+            on_partial=job.publish_partial,
+            archive_path=archive_path,
+            local_path=local_path,
+            commit_sha=commit_sha,
+        )
+    finally:
+        if archive_path:
+            await asyncio.get_running_loop().run_in_executor(IO_POOL, discard_upload, archive_path)
+    if results is None:
+        raise AnalysisError("Analysis returned no results")
+    if results.get("error"):
+        raise AnalysisError(results["error"])
+
+    job.set_stage("saving")
+    loop = asyncio.get_running_loop()
+    report_id = await loop.run_in_executor(IO_POOL, partial(
+        save_report,
+        results["repo_url"],
+        results["git_sha"],
+        results["radon"],
+        results["cloc"],
+        results["pylint"],
+        results["ai_metrics"],
+        results["code_health_score"],
+        results["historical_risk_score"],
+        tool_versions=get_tool_versions(),
+        analysis_meta=results.get("analysis_meta"),
+        shards=results.get("shards"),
+    ))
+    if results.get("file_metrics"):
+        await loop.run_in_executor(IO_POOL, save_report_files, report_id, results["file_metrics"])
+        await loop.run_in_executor(
+            IO_POOL, prune_report_files, results["repo_url"], get_settings().report_files_retention
+        )
+    return report_id
+
+
+async def run_history_job(job: Job) -> int:
+    """
+    Analyze a repository's recent commits and store a report for each.
+
+    Reports are saved oldest first, so the newest commit gets the newest
+    report and later analyses build on it. A ``commit_scored`` event is
+    emitted per commit. Commits with a stored report keep it unless the job
+    was submitted with ``force``.
+
+    Args:
+        job: Job with the ``history_commits`` option
+
+    Returns:
+        ID of the newest commit's report
+    """
+    results = await analyze_history(
+        job.repo_url,
+        job.options["history_commits"],
+        on_stage=job.set_stage,
+        reuse_reports=not job.options.get("force"),
+    )
+    if not results:
+        raise AnalysisError("Repository has no commits to analyze")
+
+    job.set_stage("saving")
+    loop = asyncio.get_running_loop()
+    # results is not empty, so the loop always sets the newest report's ID
+    report_id = 0
+    for commit in results:
+        stored = commit.get("report_id") is not None
+        if stored:
+            report_id = int(commit["report_id"])
+        else:
+            report_id = await loop.run_in_executor(IO_POOL, partial(
+                save_report,
+                commit["repo_url"],
+                commit["git_sha"],
+                commit["radon"],
+                commit["cloc"],
+                commit["pylint"],
+                commit["ai_metrics"],
+                commit["code_health_score"],
+                commit["historical_risk_score"],
+                tool_versions=get_tool_versions(),
+                analysis_meta=commit["analysis_meta"],
+            ))
+            await loop.run_in_executor(IO_POOL, save_report_files, report_id, commit["file_metrics"])
+        job.emit(
+            "commit_scored",
+            git_sha=commit["git_sha"],
+            commit_date=commit["commit_date"],
+            report_id=report_id,
+            reused=stored,
+        )
+    # Keep the per-file results of the series just stored for reruns
+    keep = max(get_settings().report_files_retention, len(results))
+    await loop.run_in_executor(IO_POOL, prune_report_files, job.repo_url, keep)
+    return report_id
+
+
+_settings = get_settings()
+analysis_queue = JobQueue(
+    run_analysis_job,
+    workers=_settings.job_workers,
+    max_size=_settings.job_queue_max_size,
+    retention_seconds=_settings.job_retention_seconds,
+)
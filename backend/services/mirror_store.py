@@ -0,0 +1,330 @@
+"""
+Persistent local mirrors of analyzed repositories.
+
+Each repository gets one bare, blobless mirror under the store's root. The
+first analysis clones it; later ones only fetch what changed upstream.
+Jobs never work in the mirror itself: each gets a detached worktree of the
+fetched commit, populated with ``checkout_files`` (so sparse checkout and
+the size limit apply as for a fresh clone), and blobs fetched for one job
+stay in the mirror for the next.
+
+Writes to one mirror (fetches, adding and removing worktrees) are
+serialised by a per-mirror lock; checking files out into a worktree and
+different repositories proceed in parallel. A mirror is measured again
+only after a fetch that brought something new. When the store outgrows its
+size budget, the least recently used mirrors without active worktrees are
+deleted.
+
+Methods perform blocking git and file system work; call them from an
+executor.
+"""
+
+import hashlib
+import os
+import re
+import shutil
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from git import Git, GitCommandError, Repo
+
+from backend.config import get_settings
+from backend.utils.exceptions import RepositoryError
+from backend.utils.logger import setup_logger
+from backend.utils.repo_downloader import GIT_ENV, checkout_files
+
+logger = setup_logger(__name__)
+
+# Ref in each mirror holding the most recently fetched remote HEAD
+HEAD_REF = "refs/devpulse/head"
+
+
+def _directory_size(path: str) -> int:
+    """Total size of the files under a directory."""
+    total = 0
+    for root, _, names in os.walk(path):
+        for name in names:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+class MirrorStore:
+    """
+    Bare repository mirrors with per-job worktrees and LRU eviction.
+
+    Args:
+        root: Directory holding the mirrors (created on first use)
+        max_bytes: Size budget for all mirrors together
+        shallow: Keep only the latest commit's history in each mirror
+    """
+
+    def __init__(self, root: str, max_bytes: int, shallow: bool = True):
+        self.root = os.path.abspath(root)
+        self.max_bytes = max_bytes
+        self.shallow = shallow
+        self._lock = threading.Lock()
+        self._mirror_locks: Dict[str, threading.Lock] = {}
+        self._sizes: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self._in_use: Counter = Counter()
+        self._worktrees: Dict[str, str] = {}
+        self._scanned = False
+        self._counts: Counter = Counter()
+
+    def mirror_path(self, repo_url: str) -> str:
+        """Directory of a repository's mirror, named after the repository and a hash of its URL."""
+        url = repo_url.rstrip("/")
+        name = re.sub(r"[^A-Za-z0-9._-]+", "_", "/".join(url.split("/")[-2:]))[-60:]
+        digest = hashlib.sha1(url.encode("utf-8")).hexdigest()[:12]
+        return os.path.join(self.root, f"{name}-{digest}.git")
+
+    def checkout(
+        self,
+        repo_url: str,
+        dest: str,
+        timeout: Optional[float] = None,
+        sparse: bool = False,
+        exclude_dirs: Iterable[str] = (),
+        max_size_mb: Optional[int] = None,
+    ) -> Tuple[str, str]:
+        """
+        Update a repository's mirror and check out its HEAD into a new worktree.
+
+        Args:
+            repo_url: Repository URL (validated by the caller)
+            dest: Empty or missing directory for the worktree
+            timeout: Seconds the whole operation may take
+            sparse: Fetch and check out only files the analyzers read
+            exclude_dirs: Directory names left out of a sparse checkout
+            max_size_mb: Refuse to check out more than this many MB of files
+
+        Returns:
+            Tuple of (worktree path, commit SHA), like ``clone_repo``
+
+        Raises:
+            RepositoryError: If fetching or checking out fails, or the
+                checkout would exceed ``max_size_mb``
+        """
+        started = time.monotonic()
+
+        def _remaining() -> Optional[float]:
+            if timeout is None:
+                return None
+            return max(1.0, timeout - (time.monotonic() - started))
+
+        path = self.mirror_path(repo_url)
+        dest = os.path.abspath(dest)
+        self._scan()
+        with self._lock:
+            # Counted before touching the mirror so eviction leaves it alone
+            self._in_use[path] += 1
+        mirror_lock = self._mirror_lock(path)
+        # Measured unless the checkout succeeds without fetching anything
+        grew = True
+        try:
+            with mirror_lock:
+                updated = self._update(repo_url, path, _remaining())
+                repo = Repo(path)
+                repo.git.worktree('prune')
+                repo.git.worktree('add', '-q', '--detach', '--no-checkout', dest, HEAD_REF)
+                with self._lock:
+                    self._worktrees[dest] = path
+                    self._last_used[path] = time.time()
+                os.utime(path)
+
+            # Blob fetches write to the mirror, and shallow repositories
+            # allow one fetch at a time, so only those take the lock again
+            stats = checkout_files(
+                dest, sparse=sparse, exclude_dirs=exclude_dirs, max_size_mb=max_size_mb,
+                timeout=_remaining(), repo_url=repo_url, fetch_lock=mirror_lock
+            )
+            commit_sha = Repo(dest).head.commit.hexsha
+            grew = updated or stats['blobs_fetched'] > 0
+        except GitCommandError as e:
+            self._abandon(path, dest)
+            logger.error(f"Mirror checkout of {repo_url} failed: {e}")
+            raise RepositoryError(
+                f"Failed to check out repository: {str(e)}",
+                repo_url=repo_url,
+                details={'git_error': str(e)}
+            )
+        except Exception:
+            self._abandon(path, dest)
+            raise
+        finally:
+            if grew:
+                self._refresh_size(path)
+            self._evict()
+
+        logger.info(
+            f"Checked out {repo_url} from mirror",
+            extra={'extra_data': {
+                'commit_sha': commit_sha,
+                'mirror': os.path.basename(path),
+                **stats,
+                'seconds': round(time.monotonic() - started, 3)
+            }}
+        )
+        return dest, commit_sha
+
+    def release(self, dest: str) -> None:
+        """
+        Remove a worktree created by ``checkout``.
+
+        Does nothing for directories that are not worktrees of this store,
+        so it is safe to call on every cleanup path.
+        """
+        dest = os.path.abspath(dest)
+        with self._lock:
+            path = self._worktrees.pop(dest, None)
+        if path is None:
+            return
+        try:
+            with self._mirror_lock(path):
+                if os.path.isdir(path):
+                    Repo(path).git.worktree('remove', '--force', dest)
+        except GitCommandError as e:
+            # Already deleted; its registration goes with the next prune
+            logger.debug(f"Could not remove worktree {dest}: {e}")
+        finally:
+            with self._lock:
+                self._done_with(path)
+
+    def _mirror_lock(self, path: str) -> threading.Lock:
+        """The lock serialising writes to one mirror."""
+        with self._lock:
+            return self._mirror_locks.setdefault(path, threading.Lock())
+
+    def _abandon(self, path: str, dest: str) -> None:
+        """Undo a failed checkout: remove its worktree, or just stop counting it as in use."""
+        with self._lock:
+            registered = dest in self._worktrees
+            if not registered:
+                self._done_with(path)
+        if registered:
+            self.release(dest)
+
+    def _done_with(self, path: str) -> None:
+        """Drop one use of a mirror; call with ``_lock`` held."""
+        self._in_use[path] -= 1
+        if self._in_use[path] <= 0:
+            del self._in_use[path]
+
+    def stats(self) -> Dict[str, Any]:
+        """Mirror count and size, and hit/miss/eviction counters since startup."""
+        self._scan()
+        with self._lock:
+            return {
+                "mirrors": len(self._sizes),
+                "size_bytes": sum(self._sizes.values()),
+                "max_bytes": self.max_bytes,
+                "active_worktrees": len(self._worktrees),
+                "hits": self._counts["hits"],
+                "misses": self._counts["misses"],
+                "evictions": self._counts["evictions"],
+            }
+
+    def _update(self, repo_url: str, path: str, timeout: Optional[float]) -> bool:
+        """
+        Fetch the remote HEAD into an existing mirror, or create the mirror.
+
+        Returns:
+            Whether the mirror changed: it was created or the remote HEAD moved
+        """
+        depth = ['--depth', '1'] if self.shallow else []
+        if os.path.isdir(path):
+            try:
+                repo = Repo(path)
+                before = repo.git.rev_parse(HEAD_REF)
+                repo.git.fetch(
+                    *depth, '--no-tags', 'origin', f'+HEAD:{HEAD_REF}',
+                    kill_after_timeout=timeout, env=GIT_ENV
+                )
+                with self._lock:
+                    self._counts["hits"] += 1
+                return bool(repo.git.rev_parse(HEAD_REF) != before)
+            except GitCommandError as e:
+                if not self._is_unused(path):
+                    raise
+                logger.warning(f"Fetching into mirror {path} failed, recreating it: {e}")
+                shutil.rmtree(path, ignore_errors=True)
+
+        os.makedirs(self.root, exist_ok=True)
+        try:
+            Git().clone(
+                '--bare', '--filter=blob:none', '--single-branch', *depth, '--', repo_url, path,
+                kill_after_timeout=timeout, env=GIT_ENV
+            )
+            Repo(path).git.update_ref(HEAD_REF, 'HEAD')
+        except Exception:
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        with self._lock:
+            self._counts["misses"] += 1
+        return True
+
+    def _is_unused(self, path: str) -> bool:
+        """Whether only the caller uses a mirror (no other job has a worktree in it)."""
+        with self._lock:
+            return self._in_use[path] <= 1 and path not in self._worktrees.values()
+
+    def _scan(self) -> None:
+        """Pick up mirrors left by earlier runs, ordered by their last use."""
+        with self._lock:
+            if self._scanned:
+                return
+            self._scanned = True
+        if not os.path.isdir(self.root):
+            return
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.name.endswith(".git"):
+                size = _directory_size(entry.path)
+                with self._lock:
+                    self._sizes.setdefault(entry.path, size)
+                    self._last_used.setdefault(entry.path, entry.stat().st_mtime)
+
+    def _refresh_size(self, path: str) -> None:
+        size = _directory_size(path) if os.path.isdir(path) else None
+        with self._lock:
+            if size is None:
+                self._sizes.pop(path, None)
+                self._last_used.pop(path, None)
+            else:
+                self._sizes[path] = size
+
+    def _evict(self) -> None:
+        """Delete least recently used idle mirrors until the store fits its budget."""
+        with self._lock:
+            total = sum(self._sizes.values())
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for path in sorted(self._sizes, key=lambda p: self._last_used.get(p, 0.0)):
+                if total <= self.max_bytes:
+                    break
+                if self._in_use[path] > 0:
+                    continue
+                total -= self._sizes.pop(path)
+                self._last_used.pop(path, None)
+                self._counts["evictions"] += 1
+                victims.append(path)
+        for path in victims:
+            with self._mirror_lock(path):
+                with self._lock:
+                    if self._in_use[path] > 0:
+                        # A job picked it up again since it was chosen
+                        continue
+                logger.info(f"Evicting mirror {os.path.basename(path)}")
+                shutil.rmtree(path, ignore_errors=True)
+
+
+_settings = get_settings()
+mirror_store = MirrorStore(
+    root=_settings.mirror_cache_dir,
+    max_bytes=_settings.mirror_cache_max_mb * 1024 * 1024,
+)
@@ -0,0 +1,142 @@
+"""
+Asynchronous subprocess runner for host-mode tool execution.
+
+Runs a command with ``asyncio.create_subprocess_exec`` so waiting on it
+takes no executor thread. Output is read in fixed-size chunks into spooled
+temporary files that move to disk past ``SPOOL_MEMORY_BYTES``, and capture
+stops at a configurable cap, so a tool printing gigabytes cannot exhaust
+memory. The command runs in its own process group; on timeout or
+cancellation the whole group is killed, including any children the tool
+started.
+"""
+
+import asyncio
+import os
+import signal
+import tempfile
+from dataclasses import dataclass
+from typing import IO, Optional, Sequence
+
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+READ_CHUNK_BYTES = 64 * 1024
+# Captured output beyond this is kept on disk instead of in memory
+SPOOL_MEMORY_BYTES = 1024 * 1024
+# How long to wait for pipes to close after a kill; a descendant that left
+# the process group could otherwise keep them open indefinitely
+KILL_GRACE_SECONDS = 5
+
+
+@dataclass
+class ProcessResult:
+    """Outcome of a finished (or killed) process."""
+
+    exit_code: Optional[int]
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    truncated: bool = False
+
+
+async def _pump(stream: asyncio.StreamReader, sink: IO[bytes], max_bytes: int) -> bool:
+    """
+    Copy a stream into a sink until EOF, keeping at most ``max_bytes``.
+
+    The stream is always read to the end so the process never blocks on a
+    full pipe.
+
+    Returns:
+        Whether output was dropped because of the cap
+    """
+    kept = 0
+    truncated = False
+    while True:
+        chunk = await stream.read(READ_CHUNK_BYTES)
+        if not chunk:
+            return truncated
+        if kept < max_bytes:
+            chunk = chunk[:max_bytes - kept]
+            sink.write(chunk)
+            kept += len(chunk)
+        else:
+            truncated = True
+
+
+def _kill_group(process: asyncio.subprocess.Process) -> None:
+    """Kill a process and everything left in its process group."""
+    try:
+        if os.name == "nt":
+            process.kill()
+        else:
+            os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+
+def _read_back(sink: IO[bytes]) -> str:
+    sink.seek(0)
+    return sink.read().decode("utf-8", errors="ignore")
+
+
+async def run_process(
+    cmd: Sequence[str],
+    cwd: Optional[str] = None,
+    timeout: Optional[float] = None,
+    max_output_bytes: int = 64 * 1024 * 1024,
+) -> ProcessResult:
+    """
+    Run a command and capture its output without blocking a thread.
+
+    Args:
+        cmd: Program and arguments (no shell)
+        cwd: Working directory
+        timeout: Seconds before the process group is killed (no limit if None)
+        max_output_bytes: Cap on captured bytes per stream; the rest is discarded
+
+    Returns:
+        Exit code and captured output; ``timed_out`` is set if the process
+        was killed for running too long
+    """
+    process = await asyncio.create_subprocess_exec(
+        *[str(arg) for arg in cmd],
+        cwd=cwd,
+        stdin=asyncio.subprocess.DEVNULL,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        start_new_session=os.name != "nt",
+    )
+    with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as out, \
+            tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY_BYTES) as err:
+        # Both are pipes, as requested above
+        assert process.stdout is not None and process.stderr is not None
+        pumps = asyncio.gather(
+            _pump(process.stdout, out, max_output_bytes),
+            _pump(process.stderr, err, max_output_bytes),
+        )
+        timed_out = False
+        try:
+            out_truncated, err_truncated = await asyncio.wait_for(asyncio.shield(pumps), timeout)
+        except asyncio.TimeoutError:
+            timed_out = True
+            logger.warning(f"Process timed out after {timeout}s, killing its group: {list(cmd)[:3]}")
+            _kill_group(process)
+            try:
+                out_truncated, err_truncated = await asyncio.wait_for(pumps, KILL_GRACE_SECONDS)
+            except asyncio.TimeoutError:
+                out_truncated = err_truncated = True
+        except asyncio.CancelledError:
+            _kill_group(process)
+            pumps.cancel()
+            await process.wait()
+            raise
+        exit_code = await process.wait()
+
+        return ProcessResult(
+            exit_code=exit_code,
+            stdout=_read_back(out),
+            stderr=_read_back(err),
+            timed_out=timed_out,
+            truncated=out_truncated or err_truncated,
+        )
@@ -0,0 +1,133 @@
+"""
+Content-addressed cache of per-file tool results.
+
+Results that depend only on a file's contents are stored under the file's
+git blob ID together with the tool, its version and a hash of the
+configuration that shaped the result. Vendored files, forks and unchanged
+files in new commits therefore share entries across repositories. Entries
+are kept as zlib-compressed JSON and evicted least-recently-used once the
+cache outgrows its size budget.
+"""
+
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import Counter
+from typing import Any, Dict, List, Tuple
+
+from backend.config import get_settings
+from backend.services.db_service import (
+    evict_cached_results,
+    get_cache_size,
+    get_cached_results,
+    put_cached_results,
+)
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Cache key: (blob_id, config_hash)
+CacheKey = Tuple[str, str]
+
+
+def config_hash(*parts: Any) -> str:
+    """Stable short hash of the configuration that shaped a result."""
+    return hashlib.sha1(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+class FileResultCache:
+    """
+    Persistent per-file result cache with hit/miss accounting.
+
+    Methods perform blocking SQLite I/O; call them from an executor.
+    """
+
+    def __init__(self, max_bytes: int, enabled: bool = True):
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._hits: Counter = Counter()
+        self._misses: Counter = Counter()
+        self._evictions = 0
+
+    def get_many(self, tool: str, tool_version: str, keys: List[CacheKey]) -> Dict[CacheKey, Any]:
+        """
+        Fetch cached results.
+
+        Args:
+            tool: Tool name
+            tool_version: Version of the tool that must have produced the results
+            keys: (blob_id, config_hash) pairs
+
+        Returns:
+            Decoded results for the keys that were cached
+        """
+        if not self.enabled or not keys:
+            return {}
+        try:
+            stored = get_cached_results(tool, tool_version, keys, time.time())
+        except Exception as e:
+            logger.warning(f"File cache lookup failed: {e}")
+            stored = {}
+
+        results = {}
+        for key, data in stored.items():
+            try:
+                results[key] = json.loads(zlib.decompress(data))
+            except (zlib.error, ValueError) as e:
+                logger.warning(f"Discarding corrupt file cache entry {key[0]}: {e}")
+
+        unique = len(set(keys))
+        with self._lock:
+            self._hits[tool] += len(results)
+            self._misses[tool] += unique - len(results)
+        return results
+
+    def put_many(self, tool: str, tool_version: str, results: Dict[CacheKey, Any]) -> None:
+        """Store results and evict old entries if the cache is over budget."""
+        if not self.enabled or not results:
+            return
+        entries = {
+            key: zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"))
+            for key, value in results.items()
+        }
+        try:
+            size = put_cached_results(tool, tool_version, entries, time.time())
+            removed = evict_cached_results(self.max_bytes) if size > self.max_bytes else 0
+        except Exception as e:
+            logger.warning(f"File cache store failed: {e}")
+            return
+        if removed:
+            with self._lock:
+                self._evictions += removed
+            logger.info(f"File cache evicted {removed} entries")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters since startup plus the current size of the cache."""
+        try:
+            entries, size = get_cache_size()
+        except Exception:
+            entries, size = None, None
+        with self._lock:
+            hits, misses = dict(self._hits), dict(self._misses)
+            evictions = self._evictions
+        lookups = sum(hits.values()) + sum(misses.values())
+        return {
+            "enabled": self.enabled,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": round(sum(hits.values()) / lookups, 4) if lookups else None,
+            "evictions": evictions,
+            "entries": entries,
+            "size_bytes": size,
+            "max_bytes": self.max_bytes,
+        }
+
+
+_settings = get_settings()
+file_cache = FileResultCache(
+    max_bytes=_settings.file_cache_max_mb * 1024 * 1024,
+    enabled=_settings.file_cache_enabled,
+)
@@ -0,0 +1,489 @@
+"""
+Warm pool of sandbox containers.
+
+Instead of creating, starting and removing a container for every tool
+invocation, a fixed number of long-lived sandbox containers (the image
+idles on ``tail -f /dev/null``) are started once and handed out to jobs.
+Each analysis copies its files into a private work directory inside one
+container, runs all of its tools there concurrently with ``exec``, and
+removes the directory afterwards. Containers are health-checked before
+reuse and replaced after a configurable number of jobs or on any failure,
+so state cannot build up.
+
+Because a repository's own configuration runs code during linting (a
+``.pylintrc`` may set an ``init-hook`` or ``load-plugins``), pooled
+containers run as an unprivileged user on a read-only root filesystem;
+only the tmpfs mounts at ``/work`` and ``/tmp`` are writable, and each is
+limited in size. After every job the container's processes are killed and
+both mounts emptied, so nothing one repository leaves behind reaches the
+next. A container that cannot be reset is replaced. Command output is
+streamed out of the container and capture stops at a cap, as for host
+runs, so a tool printing gigabytes cannot exhaust the server's memory.
+
+Without a pool, ``dedicated_session`` starts a single container per
+analysis with the repository mounted read-only instead.
+"""
+
+import os
+import tarfile
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+from backend.utils.exceptions import TimeoutError
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Per-job work directories live under this path inside pooled containers
+WORK_ROOT = "/work"
+
+# Writable tmpfs mounts of pooled containers; the rest of the filesystem is read-only
+SCRATCH_DIRS = (WORK_ROOT, "/tmp")
+
+# Unprivileged user (nobody) that pooled containers and copied files belong to
+SANDBOX_UID = 65534
+
+SCRATCH_MOUNT_OPTIONS = f"rw,nosuid,nodev,uid={SANDBOX_UID},gid={SANDBOX_UID},mode=0700,size={{size_mb}}m"
+
+# Run between jobs: stop whatever a job left running and empty the scratch mounts
+RESET_COMMAND = ["sh", "-c", "kill -9 -1 2>/dev/null; find " + " ".join(SCRATCH_DIRS) + " -mindepth 1 -delete"]
+
+# Read-only mount point of the repository in dedicated containers
+REPO_MOUNT = "/repo"
+
+# Exit status of coreutils ``timeout`` when the command ran too long
+TIMEOUT_EXIT_CODE = 124
+
+# Default cap on captured bytes per output stream of a command
+MAX_OUTPUT_BYTES = 64 * 1024 * 1024
+
+
+@dataclass
+class PooledContainer:
+    """A running sandbox container and its usage."""
+
+    container: Any
+    created_at: float = field(default_factory=time.monotonic)
+    last_checked: float = field(default_factory=time.monotonic)
+    jobs: int = 0
+
+    @property
+    def id(self) -> str:
+        return str(self.container.id)[:12]
+
+
+@dataclass
+class ExecResult:
+    """Output of a command run in a sandbox container."""
+
+    exit_code: int
+    stdout: str
+    stderr: str
+    truncated: bool = False
+
+
+def _tar_directory(repo_path: str, exclude_dirs: Sequence[str]) -> "tempfile.SpooledTemporaryFile":
+    """Pack a directory into a tar stream, spilling to disk for large trees."""
+    excluded = set(exclude_dirs)
+    archive = tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024)
+
+    def _filter(info: tarfile.TarInfo) -> Optional[tarfile.TarInfo]:
+        if excluded.intersection(info.name.split("/")):
+            return None
+        # Owned by the sandbox user so jobs can read their copy and remove it
+        info.uid = info.gid = SANDBOX_UID
+        info.uname = info.gname = "nobody"
+        return info
+
+    with tarfile.open(fileobj=archive, mode="w") as tar:
+        tar.add(repo_path, arcname=".", filter=_filter)
+    archive.seek(0)
+    return archive
+
+
+class SandboxPool:
+    """
+    Fixed-size pool of pre-started sandbox containers.
+
+    All methods block on Docker API calls; call them from an executor.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        image: str,
+        size: int,
+        max_jobs_per_container: int,
+        mem_limit: str,
+        exec_timeout: int,
+        health_check_interval: float = 30.0,
+        scratch_mb: int = 512,
+        max_output_bytes: int = MAX_OUTPUT_BYTES,
+    ):
+        self.client = client
+        self.image = image
+        self.size = size
+        self.max_jobs_per_container = max_jobs_per_container
+        self.mem_limit = mem_limit
+        self.exec_timeout = exec_timeout
+        self.health_check_interval = health_check_interval
+        self.scratch_mb = scratch_mb
+        self.max_output_bytes = max_output_bytes
+
+        self._idle: List[PooledContainer] = []
+        self._busy: Dict[str, PooledContainer] = {}
+        # Containers owned by the pool: idle, busy or being created
+        self._live = 0
+        self._cond = threading.Condition()
+        self._started = False
+        self._started_at: Optional[float] = None
+        self._stats = {
+            "jobs": 0,
+            "failed_jobs": 0,
+            "containers_created": 0,
+            "containers_recycled": 0,
+            "unhealthy": 0,
+            "busy_seconds": 0.0,
+            "wait_seconds": 0.0,
+        }
+
+    def start(self) -> None:
+        """Start the pool's containers (idempotent)."""
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+            self._started_at = time.monotonic()
+        self._fill()
+        logger.info(
+            f"Sandbox pool started with {len(self._idle)} of {self.size} containers",
+            extra={'extra_data': {'image': self.image}}
+        )
+
+    def stop(self) -> None:
+        """Remove all idle containers; busy ones are removed when released."""
+        with self._cond:
+            self._started = False
+            idle, self._idle = self._idle, []
+            self._live -= len(idle)
+        for pooled in idle:
+            self._destroy(pooled)
+        logger.info("Sandbox pool stopped")
+
+    def _create(self) -> PooledContainer:
+        """Start a container; the caller must have reserved a slot in ``_live``."""
+        try:
+            container = self.client.containers.run(
+                self.image,
+                detach=True,
+                remove=True,
+                user=f"{SANDBOX_UID}:{SANDBOX_UID}",
+                read_only=True,
+                tmpfs={path: SCRATCH_MOUNT_OPTIONS.format(size_mb=self.scratch_mb) for path in SCRATCH_DIRS},
+                # Tools keep their caches (e.g. pylint's stats) in the scratch space
+                environment={"HOME": "/tmp", "PYLINTHOME": "/tmp/pylint"},
+                mem_limit=self.mem_limit,
+                network_mode="none",
+                labels={"devpulse.sandbox": "pool"},
+            )
+        except Exception:
+            with self._cond:
+                self._live -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats["containers_created"] += 1
+        return PooledContainer(container)
+
+    def _fill(self) -> None:
+        """Start containers until the pool is back at its configured size."""
+        while True:
+            with self._cond:
+                if not self._started or self._live >= self.size:
+                    return
+                self._live += 1
+            try:
+                pooled = self._create()
+            except Exception as e:
+                logger.error(f"Could not start sandbox container: {e}")
+                return
+            with self._cond:
+                self._idle.append(pooled)
+                self._cond.notify()
+
+    def _destroy(self, pooled: PooledContainer) -> None:
+        try:
+            pooled.container.remove(force=True)
+        except Exception as e:
+            logger.warning(f"Could not remove sandbox container {pooled.id}: {e}")
+
+    def _is_healthy(self, pooled: PooledContainer) -> bool:
+        """Check a container is still running and can execute commands."""
+        if time.monotonic() - pooled.last_checked < self.health_check_interval:
+            return True
+        try:
+            pooled.container.reload()
+            if pooled.container.status != "running":
+                return False
+            healthy = bool(pooled.container.exec_run(["true"]).exit_code == 0)
+        except Exception as e:
+            logger.warning(f"Sandbox container {pooled.id} health check failed: {e}")
+            return False
+        pooled.last_checked = time.monotonic()
+        return healthy
+
+    def _reset(self, pooled: PooledContainer) -> bool:
+        """Kill a finished job's processes and empty the scratch mounts."""
+        try:
+            return bool(pooled.container.exec_run(RESET_COMMAND).exit_code == 0)
+        except Exception as e:
+            logger.warning(f"Sandbox container {pooled.id} could not be reset: {e}")
+            return False
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None) -> Iterator[PooledContainer]:
+        """
+        Borrow a healthy container for one job.
+
+        The container is reset and returned to the pool afterwards, or
+        replaced when it reached its job limit, the job failed or the reset
+        did not succeed.
+
+        Raises:
+            TimeoutError: If no container became free within ``timeout`` seconds
+        """
+        self.start()
+        waited_from = time.monotonic()
+        while True:
+            with self._cond:
+                available = self._cond.wait_for(
+                    lambda: self._idle or self._live < self.size, timeout=timeout
+                )
+                if not available:
+                    raise TimeoutError("No sandbox container became available", timeout_seconds=timeout)
+                pooled = self._idle.pop() if self._idle else None
+                if pooled is None:
+                    # A container failed to start earlier; start one now
+                    self._live += 1
+            if pooled is None:
+                pooled = self._create()
+                break
+            if self._is_healthy(pooled):
+                break
+            with self._cond:
+                self._stats["unhealthy"] += 1
+            self._replace(pooled)
+
+        began = time.monotonic()
+        with self._cond:
+            self._busy[pooled.id] = pooled
+            self._stats["wait_seconds"] += began - waited_from
+
+        ok = False
+        try:
+            yield pooled
+            ok = True
+        finally:
+            pooled.jobs += 1
+            # Nothing a job leaves behind may reach the next job in this container
+            clean = ok and self._reset(pooled)
+            with self._cond:
+                self._busy.pop(pooled.id, None)
+                self._stats["jobs"] += 1
+                self._stats["busy_seconds"] += time.monotonic() - began
+                if ok:
+                    # A job that ran to completion doubles as a health check
+                    pooled.last_checked = time.monotonic()
+                else:
+                    self._stats["failed_jobs"] += 1
+                keep = clean and self._started and pooled.jobs < self.max_jobs_per_container
+                if keep:
+                    self._idle.append(pooled)
+                    self._cond.notify()
+            if not keep:
+                self._replace(pooled)
+
+    def _replace(self, pooled: PooledContainer) -> None:
+        """Destroy a container and start a fresh one in its place."""
+        self._destroy(pooled)
+        with self._cond:
+            self._live -= 1
+            self._stats["containers_recycled"] += 1
+        self._fill()
+
+    @contextmanager
+    def session(
+        self,
+        repo_path: str,
+        exclude_dirs: Sequence[str] = (".git",),
+        timeout: Optional[float] = None,
+        exec_timeout: Optional[int] = None,
+    ) -> Iterator["SandboxSession"]:
+        """
+        Borrow a container and copy a directory into it for one analysis.
+
+        Every tool of the analysis runs against the same copy in the same
+        container; the copy is removed when the session ends.
+
+        Args:
+            repo_path: Host directory to copy into the container
+            exclude_dirs: Directory names left out of the copy
+            timeout: Seconds to wait for a free container
+            exec_timeout: Seconds each command may run (defaults to the pool's)
+        """
+        work_dir = f"{WORK_ROOT}/{uuid.uuid4().hex}"
+        with self.acquire(timeout=timeout) as pooled:
+            container = pooled.container
+            container.exec_run(["mkdir", "-p", work_dir])
+            try:
+                with _tar_directory(repo_path, exclude_dirs) as archive:
+                    if not container.put_archive(work_dir, archive):
+                        raise RuntimeError(f"Copying files into sandbox container {pooled.id} failed")
+                yield SandboxSession(
+                    container, work_dir, repo_path, exec_timeout or self.exec_timeout, self.max_output_bytes
+                )
+            finally:
+                container.exec_run(["rm", "-rf", work_dir])
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool size, current use and utilisation since the pool started."""
+        with self._cond:
+            stats = dict(self._stats)
+            idle, busy = len(self._idle), len(self._busy)
+            uptime = time.monotonic() - self._started_at if self._started_at else 0.0
+        capacity = uptime * self.size
+        stats.update({
+            "size": self.size,
+            "idle": idle,
+            "busy": busy,
+            "utilisation": round(stats["busy_seconds"] / capacity, 4) if capacity else 0.0,
+            "avg_wait_seconds": round(stats["wait_seconds"] / stats["jobs"], 4) if stats["jobs"] else 0.0,
+        })
+        stats["busy_seconds"] = round(stats["busy_seconds"], 3)
+        stats["wait_seconds"] = round(stats["wait_seconds"], 3)
+        return stats
+
+
+class SandboxSession:
+    """
+    A sandbox container prepared with one analysis' files.
+
+    Commands run with the prepared directory as working directory; any
+    argument equal to the host path of the files refers to it as well.
+    """
+
+    def __init__(
+        self,
+        container: Any,
+        work_dir: str,
+        repo_path: str,
+        exec_timeout: int,
+        max_output_bytes: int = MAX_OUTPUT_BYTES,
+    ):
+        self.container = container
+        self.work_dir = work_dir
+        self.repo_path = os.path.abspath(repo_path)
+        self.exec_timeout = exec_timeout
+        self.max_output_bytes = max_output_bytes
+
+    def exec(self, cmd: Sequence[str]) -> ExecResult:
+        """
+        Run one command in the container and wait for it.
+
+        Output is streamed from the container and at most
+        ``max_output_bytes`` of each stream is kept; the rest is read and
+        discarded, and ``truncated`` is set.
+        """
+        args = [
+            self.work_dir if os.path.abspath(str(arg)) == self.repo_path else str(arg)
+            for arg in cmd
+        ]
+        api = self.container.client.api
+        exec_id = api.exec_create(
+            self.container.id, ["timeout", str(self.exec_timeout), *args], workdir=self.work_dir
+        )["Id"]
+        stdout, stderr = bytearray(), bytearray()
+        truncated = False
+        for chunks in api.exec_start(exec_id, stream=True, demux=True):
+            for sink, chunk in zip((stdout, stderr), chunks):
+                if not chunk:
+                    continue
+                room = max(0, self.max_output_bytes - len(sink))
+                truncated = truncated or len(chunk) > room
+                sink += chunk[:room]
+        exit_code = api.exec_inspect(exec_id)["ExitCode"]
+        if exit_code == TIMEOUT_EXIT_CODE:
+            logger.warning(f"Sandbox command timed out after {self.exec_timeout}s: {args[:3]}")
+        if truncated:
+            logger.warning(f"Sandbox command output truncated at {self.max_output_bytes} bytes: {args[:3]}")
+        return ExecResult(
+            exit_code=exit_code,
+            stdout=stdout.decode("utf-8", errors="ignore"),
+            stderr=stderr.decode("utf-8", errors="ignore"),
+            truncated=truncated,
+        )
+
+    def run_tools(self, commands: Dict[str, Sequence[str]]) -> Dict[str, ExecResult]:
+        """
+        Run several tools concurrently in the container.
+
+        Args:
+            commands: Command per tool name
+
+        Returns:
+            Result per tool name; a tool whose exec failed gets exit code -1
+            and the error as stderr, without affecting the others
+        """
+        if not commands:
+            return {}
+        with ThreadPoolExecutor(max_workers=len(commands)) as executor:
+            futures = {tool: executor.submit(self.exec, cmd) for tool, cmd in commands.items()}
+        results = {}
+        for tool, future in futures.items():
+            try:
+                results[tool] = future.result()
+            except Exception as e:
+                logger.warning(f"Sandbox tool {tool} failed: {e}")
+                results[tool] = ExecResult(exit_code=-1, stdout="", stderr=f"{type(e).__name__}: {e}")
+        return results
+
+
+@contextmanager
+def dedicated_session(
+    client: Any,
+    image: str,
+    repo_path: str,
+    mem_limit: str,
+    exec_timeout: int,
+    max_output_bytes: int = MAX_OUTPUT_BYTES,
+) -> Iterator[SandboxSession]:
+    """
+    Start one container for one analysis with the repository mounted read-only.
+
+    Used when no warm pool is configured. All of the analysis' tools run in
+    this single container, which is removed afterwards.
+    """
+    container = client.containers.run(
+        image,
+        detach=True,
+        remove=True,
+        user="root",
+        mem_limit=mem_limit,
+        network_mode="none",
+        volumes={os.path.abspath(repo_path): {"bind": REPO_MOUNT, "mode": "ro"}},
+        working_dir=REPO_MOUNT,
+        labels={"devpulse.sandbox": "analysis"},
+    )
+    try:
+        yield SandboxSession(container, REPO_MOUNT, repo_path, exec_timeout, max_output_bytes)
+    finally:
+        try:
+            container.remove(force=True)
+        except Exception as e:
+            logger.warning(f"Could not remove sandbox container {container.id[:12]}: {e}")
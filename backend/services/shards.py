@@ -0,0 +1,194 @@
+"""
+Monorepo shards.
+
+Subprojects of a repository, directories with their own ``pyproject.toml``,
+``setup.py`` or ``package.json``, are analyzed as shards. Every file
+belongs to the innermost subproject containing it; files outside all of
+them belong to the root shard. Pylint runs as one process per group of
+shards, the groups in parallel, so linting a monorepo uses every core
+instead of one; radon and line counting already run on all of them. Each
+shard gets its own report section, aggregated from the same per-file
+records as the whole report.
+
+A shard's pylint results are also cached on their own, keyed by a digest
+of the shard's Python files, the modules elsewhere in the repository they
+import (pylint's inference crosses module boundaries) and the pylint
+configuration at the repository root. A shard whose digest is unchanged is
+not linted again, whichever report or repository its results came from.
+"""
+
+import hashlib
+import os
+import posixpath
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from backend.services.incremental import aggregate_records, module_index
+
+# Files that make a directory a subproject
+SHARD_MARKERS = ("pyproject.toml", "setup.py", "package.json")
+
+# Root of the shard holding files outside every subproject
+ROOT_SHARD = "."
+
+# Files at the repository root that may configure pylint
+PYLINT_CONFIG_FILES = ("pylintrc", ".pylintrc", "pyproject.toml", "setup.cfg", "tox.ini")
+
+# File cache tool name for whole-shard pylint results
+CACHE_TOOL = "pylint-shard"
+
+
+def detect_shards(paths: Iterable[str]) -> List[str]:
+    """
+    Shard roots of a repository.
+
+    Args:
+        paths: Repository-relative paths of the walked files
+
+    Returns:
+        Sorted subproject directories, always including ``ROOT_SHARD``
+    """
+    roots = {ROOT_SHARD}
+    for path in paths:
+        if posixpath.basename(path) in SHARD_MARKERS:
+            roots.add(posixpath.dirname(path) or ROOT_SHARD)
+    return sorted(roots)
+
+
+def shard_of(path: str, roots: Set[str]) -> str:
+    """Root of the innermost shard containing a path."""
+    directory = posixpath.dirname(path)
+    while directory:
+        if directory in roots:
+            return directory
+        directory = posixpath.dirname(directory)
+    return ROOT_SHARD
+
+
+def group_by_shard(paths: Iterable[str], roots: Iterable[str]) -> Dict[str, List[str]]:
+    """Paths grouped by shard root (shards without paths are left out)."""
+    root_set = set(roots)
+    groups: Dict[str, List[str]] = defaultdict(list)
+    for path in paths:
+        groups[shard_of(path, root_set)].append(path)
+    return dict(groups)
+
+
+def config_digest(repo_path: str) -> str:
+    """Digest of the pylint configuration files at the repository root."""
+    contents = {}
+    for name in PYLINT_CONFIG_FILES:
+        try:
+            with open(os.path.join(repo_path, name), "rb") as f:
+                contents[name] = f.read()
+        except OSError:
+            continue
+    return config_digest_of(contents)
+
+
+def config_digest_of(contents: Dict[str, bytes]) -> str:
+    """
+    Digest of the pylint configuration from the contents of root files.
+
+    Args:
+        contents: Contents by file name of the ``PYLINT_CONFIG_FILES`` present
+    """
+    digest = hashlib.sha1()
+    for name in PYLINT_CONFIG_FILES:
+        if name in contents:
+            digest.update(f"{name}\0{len(contents[name])}\0".encode("utf-8"))
+            digest.update(contents[name])
+    return digest.hexdigest()
+
+
+def shard_digests(
+    shards: Dict[str, List[str]],
+    blob_ids: Dict[str, str],
+    imports: Dict[str, List[str]],
+    config: Optional[str]
+) -> Dict[str, str]:
+    """
+    Cache keys of shards' pylint results.
+
+    Imports are matched to modules the way ``plan_analysis`` matches them,
+    through ``module_index``, so a dependency is never missed; over-matching
+    only makes a key change more often than it has to.
+
+    Args:
+        shards: Python file paths per shard root
+        blob_ids: Blob ID of every Python file in the repository
+        imports: Imported module names per Python file
+        config: ``config_digest`` of the repository, if it was computed
+
+    Returns:
+        Digest per shard root
+    """
+    by_name = module_index(blob_ids)
+    digests = {}
+    for root, paths in shards.items():
+        members = set(paths)
+        dependencies = {
+            dependency
+            for path in paths
+            for name in imports.get(path, [])
+            for dependency in by_name.get(name, ())
+        }
+        digest = hashlib.sha1(f"{config}\n".encode("utf-8"))
+        for path in sorted(members | dependencies):
+            role = "file" if path in members else "dependency"
+            digest.update(f"{role}\0{path}\0{blob_ids[path]}\n".encode("utf-8"))
+        digests[root] = digest.hexdigest()
+    return digests
+
+
+def pack_shards(shards: Dict[str, List[str]], workers: int) -> List[List[str]]:
+    """
+    Spread shards' lint paths over at most ``workers`` pylint processes.
+
+    Largest shards are placed first, each into the process with the fewest
+    paths so far, which keeps the processes about equally long.
+
+    Returns:
+        Sorted paths per process (no empty processes)
+    """
+    groups: List[List[str]] = [[] for _ in range(max(1, min(workers, len(shards))))]
+    for root in sorted(shards, key=lambda r: (-len(shards[r]), r)):
+        min(groups, key=len).extend(shards[root])
+    return [sorted(group) for group in groups if group]
+
+
+def shard_sections(
+    records: List[Dict[str, Any]],
+    roots: Iterable[str],
+    cached: Optional[Set[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Per-shard report sections from the merged per-file records.
+
+    Args:
+        records: Per-file records of the whole repository
+        roots: Shard roots from ``detect_shards``
+        cached: Roots whose pylint results came from the shard cache
+
+    Returns:
+        One entry per shard with files, ordered by root. Scores are added
+        by the caller.
+    """
+    root_set = set(roots)
+    by_root: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+    for record in records:
+        by_root[shard_of(record["path"], root_set)].append(record)
+
+    sections = []
+    for root in sorted(by_root):
+        aggregated = aggregate_records(by_root[root])
+        pylint = aggregated["pylint"]
+        sections.append({
+            "root": root,
+            "files": len(by_root[root]),
+            "radon": {key: value for key, value in aggregated["radon"].items() if key != "blocks"},
+            "cloc": aggregated["cloc"],
+            "pylint": {key: pylint.get(key) for key in ("score", "total_issues", "issue_counts")},
+            "pylint_cached": root in (cached or set()),
+        })
+    return sections
@@ -0,0 +1,109 @@
+"""
+Receiving uploaded source archives.
+
+Request bodies are written to a file in the upload directory chunk by chunk
+as they arrive, never held in memory as a whole, and hashed on the way so
+that identical uploads map to the same report. File writes run on the I/O
+pool rather than the event loop.
+"""
+
+import asyncio
+import hashlib
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import IO, Any, AsyncIterator, Optional
+
+from backend.services.executors import IO_POOL
+from backend.utils.archive import archive_format
+from backend.utils.exceptions import PayloadTooLargeError
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+# Request body chunks are gathered into writes of about this size
+WRITE_SIZE = 1024 * 1024
+
+
+@dataclass
+class Upload:
+    """An uploaded archive stored on disk."""
+
+    path: str
+    sha256: str
+    size: int
+    format: str
+
+
+def upload_dir(configured: Optional[str]) -> str:
+    """Directory for uploads: the configured one, or one under the system temp directory."""
+    return configured or os.path.join(tempfile.gettempdir(), "devpulse-uploads")
+
+
+def _open_upload(directory: str) -> IO[bytes]:
+    os.makedirs(directory, exist_ok=True)
+    return tempfile.NamedTemporaryFile(prefix="upload-", suffix=".archive", dir=directory, delete=False)
+
+
+def _write(out: IO[bytes], digest: Any, data: bytes) -> None:
+    digest.update(data)
+    out.write(data)
+
+
+def discard_upload(path: str) -> None:
+    """Delete an uploaded archive (no error if it is already gone)."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def receive_upload(chunks: AsyncIterator[bytes], directory: str, max_bytes: int) -> Upload:
+    """
+    Stream a request body into a file.
+
+    Args:
+        chunks: Body chunks as they arrive
+        directory: Directory to store the upload in
+        max_bytes: Maximum size of the upload
+
+    Returns:
+        The stored upload; delete it with ``discard_upload`` when done
+
+    Raises:
+        PayloadTooLargeError: If the body exceeds ``max_bytes``
+        ValidationError: If the body is not a zip or tar archive
+    """
+    loop = asyncio.get_running_loop()
+    digest = hashlib.sha256()
+    out = await loop.run_in_executor(IO_POOL, _open_upload, directory)
+    size = 0
+    pending = []
+    pending_bytes = 0
+    try:
+        async for chunk in chunks:
+            size += len(chunk)
+            if size > max_bytes:
+                raise PayloadTooLargeError(
+                    f"Upload exceeds {max_bytes // (1024 * 1024)} MB", max_bytes=max_bytes
+                )
+            pending.append(chunk)
+            pending_bytes += len(chunk)
+            if pending_bytes >= WRITE_SIZE:
+                data = b"".join(pending)
+                pending, pending_bytes = [], 0
+                await loop.run_in_executor(IO_POOL, _write, out, digest, data)
+        await loop.run_in_executor(IO_POOL, _write, out, digest, b"".join(pending))
+        await loop.run_in_executor(IO_POOL, out.close)
+        archive = await loop.run_in_executor(IO_POOL, archive_format, out.name)
+    except BaseException:
+        # Also on cancellation (client disconnected), so no awaiting here
+        out.close()
+        discard_upload(out.name)
+        raise
+
+    logger.info(
+        f"Received upload {os.path.basename(out.name)}",
+        extra={'extra_data': {'bytes': size, 'format': archive}}
+    )
+    return Upload(path=out.name, sha256=digest.hexdigest(), size=size, format=archive)
@@ -0,0 +1,375 @@
+"""
+Scratch directories for analyses.
+
+Each analysis checks its repository out into a workspace handed out by the
+``WorkspaceManager``. Workspaces are placed in a RAM-backed (tmpfs)
+directory while the RAM budget allows, and on disk otherwise. Because a
+checkout's size is only known once it exists, every RAM workspace first
+reserves a fixed amount of the budget. Before checking out, the caller
+claims the rest of the budget with ``ram_allowance`` and passes it on as the
+checkout's size limit; a checkout that does not fit is redone in a disk
+workspace from ``move_to_disk``. ``measure`` replaces the reservation with
+the measured size.
+
+Releasing a workspace never deletes files on the caller's thread: its
+contents are renamed into a trash directory on the same file system and a
+single background thread deletes them. The emptied directory is kept for
+the next analysis.
+
+Methods other than ``stats`` touch the file system; call them from an
+executor.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from backend.config import get_settings
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+RAM = "ram"
+DISK = "disk"
+
+# Directory in each root that deleted workspace contents are moved to
+TRASH_DIR = ".trash"
+
+# File system types that keep their files in memory
+RAM_FILESYSTEMS = ("tmpfs", "ramfs")
+
+
+def _usage(path: str) -> int:
+    """Bytes allocated to the files under a directory (not following symlinks)."""
+    total = 0
+    for root, dirs, names in os.walk(path):
+        for name in dirs + names:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_blocks * 512
+            except OSError:
+                pass
+    return total
+
+
+def _is_ram_backed(path: str) -> bool:
+    """Whether a directory lives on an in-memory file system."""
+    path = os.path.realpath(path)
+    best, fstype = "", None
+    try:
+        with open("/proc/mounts", encoding="utf-8") as mounts:
+            for line in mounts:
+                fields = line.split()
+                if len(fields) < 3:
+                    continue
+                mount_point = fields[1].replace("\\040", " ")
+                inside = path == mount_point or path.startswith(mount_point.rstrip("/") + "/")
+                if inside and len(mount_point) >= len(best):
+                    best, fstype = mount_point, fields[2]
+    except OSError:
+        return False
+    return fstype in RAM_FILESYSTEMS
+
+
+def _owner_alive(name: str) -> bool:
+    """Whether the process that created a ``<prefix>-<pid>-...`` entry is still running."""
+    parts = name.split("-")
+    try:
+        pid = int(parts[1] if name.startswith("ws-") else parts[0])
+    except (IndexError, ValueError):
+        return False
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+@dataclass
+class Workspace:
+    """A scratch directory lent to one analysis."""
+
+    path: str
+    storage: str
+    reserved_bytes: int = 0
+    used_bytes: int = 0
+    acquired_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def ram_bytes(self) -> int:
+        """RAM budget this workspace counts against (zero on disk)."""
+        return max(self.reserved_bytes, self.used_bytes) if self.storage == RAM else 0
+
+
+class WorkspaceManager:
+    """
+    Hands out workspaces in RAM or on disk and deletes their contents in the background.
+
+    Args:
+        disk_root: Directory for on-disk workspaces
+        ram_root: Directory on a tmpfs for in-memory workspaces, or None
+        ram_max_bytes: Total size of the workspaces kept in RAM
+        ram_reserve_bytes: RAM counted for a workspace until it is measured
+        max_idle: Emptied directories kept for reuse per storage
+    """
+
+    def __init__(
+        self,
+        disk_root: str,
+        ram_root: Optional[str] = None,
+        ram_max_bytes: int = 0,
+        ram_reserve_bytes: int = 0,
+        max_idle: int = 8,
+    ):
+        self.disk_root = os.path.abspath(disk_root)
+        self.ram_root = os.path.abspath(ram_root) if ram_root and ram_max_bytes > 0 else None
+        self.ram_max_bytes = ram_max_bytes
+        self.ram_reserve_bytes = ram_reserve_bytes
+        self.max_idle = max_idle
+        self._lock = threading.Condition()
+        self._active: Dict[str, Workspace] = {}
+        self._idle: Dict[str, List[str]] = {RAM: [], DISK: []}
+        self._pending_deletions = 0
+        self._prepared = False
+        self._reaper: Optional[ThreadPoolExecutor] = None
+        self._counts: Counter = Counter()
+
+    def _root(self, storage: str) -> str:
+        if storage == RAM and self.ram_root is not None:
+            return self.ram_root
+        return self.disk_root
+
+    def _prepare(self) -> None:
+        """Create the roots on first use and queue leftovers of dead processes for deletion."""
+        with self._lock:
+            if self._prepared:
+                return
+            self._prepared = True
+        if self.ram_root is not None:
+            try:
+                os.makedirs(os.path.join(self.ram_root, TRASH_DIR), exist_ok=True)
+                ram_backed = _is_ram_backed(self.ram_root)
+            except OSError as e:
+                logger.warning(f"Cannot use {self.ram_root} for workspaces: {e}")
+                ram_backed = False
+            if not ram_backed:
+                logger.warning(f"{self.ram_root} is not RAM-backed; workspaces will use disk")
+                self.ram_root = None
+        os.makedirs(os.path.join(self.disk_root, TRASH_DIR), exist_ok=True)
+
+        for root in filter(None, (self.ram_root, self.disk_root)):
+            trash_root = os.path.join(root, TRASH_DIR)
+            stale = [entry.path for entry in os.scandir(root) if entry.name.startswith("ws-")]
+            stale += [entry.path for entry in os.scandir(trash_root)]
+            stale = [path for path in stale if not _owner_alive(os.path.basename(path))]
+            for path in stale:
+                self._schedule_delete(path)
+
+    def acquire(self, storage: Optional[str] = None) -> Workspace:
+        """
+        Lend out an empty directory, in RAM if the budget allows.
+
+        Args:
+            storage: ``DISK`` to skip RAM; by default RAM is tried first
+
+        Returns:
+            The workspace; hand it back with ``release``
+        """
+        self._prepare()
+        with self._lock:
+            if storage != DISK:
+                storage = RAM if self._ram_fits(self.ram_reserve_bytes) else DISK
+            path = self._idle[storage].pop() if self._idle[storage] else None
+            self._counts[f"{storage}_workspaces"] += 1
+            if storage == DISK and self.ram_root is not None:
+                self._counts["ram_fallbacks"] += 1
+            if path is None:
+                path = tempfile.mkdtemp(prefix=f"ws-{os.getpid()}-", dir=self._root(storage))
+            else:
+                self._counts["recycled"] += 1
+            workspace = Workspace(
+                path, storage, reserved_bytes=self.ram_reserve_bytes if storage == RAM else 0
+            )
+            self._active[path] = workspace
+        return workspace
+
+    def _ram_fits(self, reserve: int) -> bool:
+        """Whether another workspace fits in the RAM budget; call with ``_lock`` held."""
+        if self.ram_root is None:
+            return False
+        used = sum(workspace.ram_bytes for workspace in self._active.values())
+        if used + reserve > self.ram_max_bytes:
+            return False
+        try:
+            stat = os.statvfs(self.ram_root)
+        except OSError:
+            return False
+        return reserve <= stat.f_bavail * stat.f_frsize
+
+    def ram_allowance(self, workspace: Workspace) -> Optional[int]:
+        """
+        Claim the RAM a workspace may fill before it is measured.
+
+        The workspace's reservation grows to whatever of the RAM budget (and
+        of the tmpfs) other workspaces do not use, so concurrent checkouts
+        cannot be promised the same memory.
+
+        Returns:
+            Bytes the workspace may hold, or None for a disk workspace
+        """
+        if workspace.storage != RAM:
+            return None
+        with self._lock:
+            others = sum(w.ram_bytes for path, w in self._active.items() if path != workspace.path)
+            allowance = self.ram_max_bytes - others
+            try:
+                stat = os.statvfs(workspace.path)
+                allowance = min(allowance, stat.f_bavail * stat.f_frsize + workspace.used_bytes)
+            except OSError:
+                pass
+            allowance = max(allowance, workspace.reserved_bytes)
+            workspace.reserved_bytes = allowance
+        return allowance
+
+    def move_to_disk(self, workspace: Workspace) -> Workspace:
+        """
+        Swap a RAM workspace whose contents did not fit for an empty disk one.
+
+        The RAM workspace is released (its contents are deleted in the
+        background) and its reservation returned to the budget.
+        """
+        self.release(workspace)
+        return self.acquire(DISK)
+
+    def measure(self, workspace: Workspace) -> int:
+        """Record and return the space a workspace's files take up, dropping its reservation."""
+        used = _usage(workspace.path) if os.path.isdir(workspace.path) else 0
+        with self._lock:
+            workspace.used_bytes = used
+            workspace.reserved_bytes = 0
+        return used
+
+    def release(self, workspace: Workspace) -> None:
+        """
+        Take a workspace back and queue its contents for deletion.
+
+        Returns immediately; files are deleted by a background thread. Does
+        nothing for a workspace that was already released.
+        """
+        with self._lock:
+            if self._active.pop(workspace.path, None) is None:
+                return
+            keep = len(self._idle[workspace.storage]) < self.max_idle
+        logger.info(
+            f"Released workspace {os.path.basename(workspace.path)}",
+            extra={'extra_data': {
+                'storage': workspace.storage,
+                'used_bytes': workspace.used_bytes,
+                'seconds': round(time.monotonic() - workspace.acquired_at, 3)
+            }}
+        )
+
+        trash_root = os.path.join(self._root(workspace.storage), TRASH_DIR)
+        try:
+            if not keep:
+                self._move_to_trash(workspace.path, trash_root)
+                return
+            if os.path.isdir(workspace.path):
+                entries = os.listdir(workspace.path)
+                if entries:
+                    trash = tempfile.mkdtemp(prefix=f"{os.getpid()}-", dir=trash_root)
+                    for name in entries:
+                        os.rename(os.path.join(workspace.path, name), os.path.join(trash, name))
+                    self._schedule_delete(trash)
+            else:
+                # Removed by its user (a mirror worktree is deleted with git)
+                os.mkdir(workspace.path)
+        except OSError as e:
+            logger.warning(f"Could not empty workspace {workspace.path}: {e}")
+            self._schedule_delete(workspace.path)
+            return
+        with self._lock:
+            self._idle[workspace.storage].append(workspace.path)
+
+    def _move_to_trash(self, path: str, trash_root: str) -> None:
+        if not os.path.exists(path):
+            return
+        target = os.path.join(trash_root, f"{os.getpid()}-{os.path.basename(path)}")
+        os.rename(path, target)
+        self._schedule_delete(target)
+
+    def _schedule_delete(self, path: str) -> None:
+        with self._lock:
+            self._pending_deletions += 1
+            if self._reaper is None:
+                self._reaper = ThreadPoolExecutor(max_workers=1, thread_name_prefix="workspace-reaper")
+            reaper = self._reaper
+        reaper.submit(self._delete, path)
+
+    def _delete(self, path: str) -> None:
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            with self._lock:
+                self._pending_deletions -= 1
+                self._counts["deleted"] += 1
+                self._lock.notify_all()
+
+    def wait_for_deletions(self, timeout: Optional[float] = None) -> bool:
+        """Block until queued deletions finish; returns False on timeout."""
+        with self._lock:
+            return self._lock.wait_for(lambda: self._pending_deletions == 0, timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Space used by each active workspace and totals per storage.
+
+        Sizes are as of the workspace's last ``measure``; RAM workspaces that
+        were not measured yet count with their reservation.
+        """
+        now = time.monotonic()
+        with self._lock:
+            active = list(self._active.values())
+            return {
+                "ram_root": self.ram_root,
+                "disk_root": self.disk_root,
+                "ram_max_bytes": self.ram_max_bytes if self.ram_root else 0,
+                "ram_bytes": sum(workspace.ram_bytes for workspace in active),
+                "disk_bytes": sum(workspace.used_bytes for workspace in active if workspace.storage == DISK),
+                "workspaces": [
+                    {
+                        "name": os.path.basename(workspace.path),
+                        "storage": workspace.storage,
+                        "used_bytes": workspace.used_bytes,
+                        "reserved_bytes": workspace.reserved_bytes,
+                        "age_seconds": round(now - workspace.acquired_at, 3),
+                    }
+                    for workspace in active
+                ],
+                "idle": {storage: len(paths) for storage, paths in self._idle.items()},
+                "pending_deletions": self._pending_deletions,
+                "deleted": self._counts["deleted"],
+                "recycled": self._counts["recycled"],
+                "ram_workspaces": self._counts["ram_workspaces"],
+                "disk_workspaces": self._counts["disk_workspaces"],
+                "ram_fallbacks": self._counts["ram_fallbacks"],
+            }
+
+
+_settings = get_settings()
+workspace_manager = WorkspaceManager(
+    disk_root=_settings.workspace_dir or os.path.join(tempfile.gettempdir(), "devpulse-workspaces"),
+    ram_root=_settings.workspace_ram_dir,
+    ram_max_bytes=_settings.workspace_ram_max_mb * 1024 * 1024,
+    ram_reserve_bytes=_settings.workspace_ram_reserve_mb * 1024 * 1024,
+    max_idle=_settings.workspace_max_idle,
+)
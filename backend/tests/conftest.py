@@ -4,13 +4,39 @@ Pytest configuration and shared fixtures for DevPulse tests.
 Provides common test fixtures, mock data, and setup/teardown logic.
 """
 
+import os
 import pytest
+import subprocess
 import tempfile
 import shutil
-from typing import Generator
+from typing import Callable, Dict, Generator, Optional, Tuple
 from fastapi.testclient import TestClient
 from backend.main import app
 from backend.config import reload_settings
+from backend.services import db_service
+from backend.utils import repo_downloader
+from backend.utils.rate_limiter import batch_rate_limiter, rate_limiter
+
+
+def _git(cwd: str, *args: str, env: Optional[Dict[str, str]] = None) -> str:
+    """Run git with a fixed identity and return its stripped output."""
+    return subprocess.run(
+        ["git", "-c", "user.email=dev@example.com", "-c", "user.name=dev", *args],
+        cwd=cwd, env=env, check=True, capture_output=True, text=True,
+    ).stdout.strip()
+
+
+def _commit_files(work: str, files: Dict[str, bytes], date: Optional[str] = None) -> str:
+    """Write files into a working copy and commit them; returns the new HEAD SHA."""
+    for rel_path, content in files.items():
+        path = os.path.join(work, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(content)
+    _git(work, "add", "-A")
+    env = {**os.environ, "GIT_AUTHOR_DATE": date, "GIT_COMMITTER_DATE": date} if date else None
+    _git(work, "commit", "-qm", "change", env=env)
+    return _git(work, "rev-parse", "HEAD")
 
 
 @pytest.fixture
@@ -27,6 +53,52 @@ def temp_dir() -> Generator[str, None, None]:
     shutil.rmtree(tmpdir, ignore_errors=True)
 
 
+@pytest.fixture
+def temp_db(temp_dir, monkeypatch) -> str:
+    """Point the database service at an empty temporary database."""
+    monkeypatch.setattr(db_service, "DB_PATH", os.path.join(temp_dir, "test.db"))
+    db_service.init_db()
+    return db_service.DB_PATH
+
+
+@pytest.fixture
+def git() -> Callable[..., str]:
+    """Provide ``git(cwd, *args, env=None)``, returning git's stripped output."""
+    return _git
+
+
+@pytest.fixture
+def commit_files() -> Callable[..., str]:
+    """Provide ``commit_files(work, files, date=None)``, returning the new HEAD SHA."""
+    return _commit_files
+
+
+@pytest.fixture
+def make_remote(temp_dir, mocker) -> Callable[..., Tuple[str, str, str]]:
+    """
+    Create repositories served from a local bare clone.
+
+    ``make_remote(name, files, date=None)`` commits ``files`` to a new working
+    copy and returns (file:// URL, working copy, HEAD SHA). The served clone
+    allows blobless clones and fetching by SHA, later commits reach it with
+    ``git push -q origin HEAD``, and URL validation lets its URL through.
+    """
+    mocker.patch.object(repo_downloader, "validate_github_url", side_effect=lambda url: url)
+
+    def _make(name: str, files: Dict[str, bytes], date: Optional[str] = None) -> Tuple[str, str, str]:
+        work = os.path.join(temp_dir, "work", name)
+        os.makedirs(work)
+        _git(work, "init", "-q")
+        sha = _commit_files(work, files, date)
+        served = os.path.join(temp_dir, "served", f"{name}.git")
+        _git(temp_dir, "clone", "-q", "--bare", work, served)
+        for option in ("uploadpack.allowFilter", "uploadpack.allowAnySHA1InWant"):
+            _git(served, "config", option, "true")
+        _git(work, "remote", "add", "origin", served)
+        return "file://" + served, work, sha
+    return _make
+
+
 @pytest.fixture
 def mock_radon_output() -> str:
     """Provide mock radon cc output."""
@@ -140,3 +212,13 @@ def reset_settings():
     reload_settings()
     yield
     reload_settings()
+
+
+@pytest.fixture(autouse=True)
+def reset_rate_limiter():
+    """Start each test with no requests counted against the test client."""
+    rate_limiter.reset()
+    batch_rate_limiter.reset()
+    yield
+    rate_limiter.reset()
+    batch_rate_limiter.reset()
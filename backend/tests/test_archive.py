@@ -0,0 +1,143 @@
+"""
+Unit tests for uploaded archive extraction.
+
+Tests format detection, file selection, unsafe entries and the entry-count
+and size limits for zip and tar archives.
+"""
+
+import io
+import os
+import tarfile
+import zipfile
+import pytest
+from backend.utils.archive import archive_format, extract_archive, file_digest
+from backend.utils.exceptions import ValidationError
+
+MB = 1024 * 1024
+
+
+def _files(path):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), path).replace(os.sep, "/")
+        for root, _, names in os.walk(path)
+        for name in names
+    )
+
+
+def _zip(path, entries):
+    with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, content in entries.items():
+            archive.writestr(name, content)
+    return path
+
+
+def _tar(path, entries, mode="w:gz"):
+    with tarfile.open(path, mode) as archive:
+        for name, content in entries.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(content)
+            archive.addfile(info, io.BytesIO(content))
+    return path
+
+
+@pytest.fixture
+def dest(temp_dir):
+    path = os.path.join(temp_dir, "dest")
+    os.makedirs(path)
+    return path
+
+
+class TestExtractArchive:
+    """Tests for extract_archive."""
+
+    @pytest.mark.parametrize("make", [_zip, _tar])
+    def test_extracts_analyzable_files(self, make, temp_dir, dest):
+        """Test only source files outside excluded directories are extracted."""
+        archive = make(os.path.join(temp_dir, "upload"), {
+            "app.py": b"print(1)\n",
+            "pkg/util.js": b"module.exports = 1;\n",
+            "logo.png": b"\x89PNG",
+            "node_modules/lib/index.js": b"module.exports = 2;\n",
+        })
+
+        root, stats = extract_archive(archive, dest, max_bytes=MB, max_entries=100, exclude_dirs=["node_modules"])
+
+        assert root == dest
+        assert _files(dest) == ["app.py", "pkg/util.js"]
+        assert stats == {"entries": 4, "files_extracted": 2, "bytes_extracted": 29}
+
+    def test_single_top_level_directory_is_root(self, temp_dir, dest):
+        """Test archives wrapping everything in one directory (GitHub style) are rooted inside it."""
+        archive = _zip(os.path.join(temp_dir, "upload.zip"), {
+            "repo-main/README.md": b"# repo\n",
+            "repo-main/src/app.py": b"print(1)\n",
+        })
+
+        root, _ = extract_archive(archive, dest, max_bytes=MB, max_entries=100)
+
+        assert root == os.path.join(dest, "repo-main")
+        assert "src/app.py" in _files(root)
+
+    def test_top_level_files_keep_destination_root(self, temp_dir, dest):
+        """Test a single package directory next to top-level files is not mistaken for a wrapper."""
+        archive = _tar(os.path.join(temp_dir, "upload.tar.gz"), {
+            "LICENSE": b"MIT\n",
+            "pkg/app.py": b"print(1)\n",
+        })
+
+        root, _ = extract_archive(archive, dest, max_bytes=MB, max_entries=100)
+
+        assert root == dest
+        assert _files(dest) == ["pkg/app.py"]
+
+    def test_unsafe_entries_skipped(self, temp_dir, dest):
+        """Test entries escaping the destination and links are not extracted."""
+        path = os.path.join(temp_dir, "upload.tar")
+        with tarfile.open(path, "w") as archive:
+            for name in ("../evil.py", "/abs.py", "ok.py"):
+                info = tarfile.TarInfo(name)
+                info.size = 3
+                archive.addfile(info, io.BytesIO(b"x=1"))
+            link = tarfile.TarInfo("link.py")
+            link.type = tarfile.SYMTYPE
+            link.linkname = "/etc/passwd"
+            archive.addfile(link)
+
+        root, stats = extract_archive(path, dest, max_bytes=MB, max_entries=100)
+
+        assert _files(dest) == ["ok.py"]
+        assert not os.path.exists(os.path.join(temp_dir, "evil.py"))
+        assert stats["files_extracted"] == 1
+
+    def test_entry_limit(self, temp_dir, dest):
+        """Test archives with too many entries are rejected."""
+        archive = _tar(os.path.join(temp_dir, "upload.tgz"), {f"f{n}.py": b"" for n in range(11)})
+
+        with pytest.raises(ValidationError, match="more than 10 entries"):
+            extract_archive(archive, dest, max_bytes=MB, max_entries=10)
+
+    def test_size_limit_counts_decompressed_bytes(self, temp_dir, dest):
+        """Test highly compressed contents are cut off at the byte limit."""
+        archive = _zip(os.path.join(temp_dir, "bomb.zip"), {"big.py": b"0" * (4 * MB)})
+        assert os.path.getsize(archive) < 64 * 1024
+
+        with pytest.raises(ValidationError, match="exceed 1 MB"):
+            extract_archive(archive, dest, max_bytes=MB, max_entries=10)
+
+    def test_not_an_archive(self, temp_dir, dest):
+        """Test other uploads are rejected."""
+        path = os.path.join(temp_dir, "upload.txt")
+        with open(path, "wb") as f:
+            f.write(b"just text\n")
+
+        with pytest.raises(ValidationError):
+            archive_format(path)
+        with pytest.raises(ValidationError):
+            extract_archive(path, dest, max_bytes=MB, max_entries=10)
+
+    def test_file_digest(self, temp_dir):
+        """Test the digest is the SHA-256 of the contents."""
+        path = os.path.join(temp_dir, "data")
+        with open(path, "wb") as f:
+            f.write(b"abc")
+        assert file_digest(path) == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
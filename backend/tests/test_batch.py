@@ -0,0 +1,179 @@
+"""
+Unit tests for batch analysis.
+
+Tests deduplication, reuse of stored reports, the concurrency cap shared
+by batches, deferring repositories on a full job queue and charging only
+repositories that start a new job against the client's batch budget.
+"""
+
+import asyncio
+import pytest
+from backend.services import batch
+from backend.services.batch import run_batch
+from backend.services.job_queue import JobQueue
+from backend.utils.rate_limiter import RateLimiter
+
+
+async def _collect(events):
+    return [event async for event in events]
+
+
+@pytest.fixture
+def no_stored_reports(mocker):
+    """Resolve every HEAD to a fixed SHA with no stored report."""
+    mocker.patch.object(batch, "resolve_head", return_value="abc123")
+    return mocker.patch.object(batch, "find_existing_report", return_value=None)
+
+
+@pytest.mark.asyncio
+class TestRunBatch:
+    """Tests for run_batch."""
+
+    async def test_dedupes_and_reports_each_repo(self, no_stored_reports):
+        """Test duplicates run once, invalid URLs are reported and a summary ends the stream."""
+        analyzed = []
+
+        async def handler(job):
+            analyzed.append(job.repo_url)
+            return len(analyzed)
+
+        queue = JobQueue(handler, workers=2, max_size=10, retention_seconds=60)
+        await queue.start()
+        try:
+            events = await _collect(run_batch([
+                "https://github.com/owner/a",
+                "https://github.com/owner/a/",
+                "https://github.com/owner/b",
+                "not-a-url",
+            ], queue, asyncio.Semaphore(2)))
+        finally:
+            await queue.stop()
+
+        results = {e["repo_url"]: e for e in events if e["type"] == "result"}
+        assert sorted(analyzed) == ["https://github.com/owner/a", "https://github.com/owner/b"]
+        assert results["not-a-url"]["status"] == "invalid"
+        assert results["https://github.com/owner/a"]["status"] == "succeeded"
+        summary = events[-1]
+        assert summary["type"] == "summary"
+        assert (summary["requested"], summary["unique"], summary["duplicates"]) == (4, 2, 1)
+        assert (summary["succeeded"], summary["invalid"]) == (2, 1)
+
+    async def test_stored_reports_reused(self, mocker):
+        """Test repositories with a stored report for their HEAD are not queued."""
+        mocker.patch.object(batch, "resolve_head", return_value="abc123")
+        mocker.patch.object(batch, "find_existing_report", return_value={"id": 9})
+        async def handler(job):
+            raise AssertionError("stored reports are not analyzed again")
+
+        queue = JobQueue(handler, workers=1, max_size=10, retention_seconds=60)
+
+        events = await _collect(run_batch(["https://github.com/owner/a"], queue, asyncio.Semaphore(1)))
+
+        assert events[0]["status"] == "cached" and events[0]["report_id"] == 9
+        assert queue.depth == 0
+
+    async def test_unresolved_head_not_looked_up(self, mocker):
+        """Test a HEAD that cannot be resolved is queued without a stored-report lookup."""
+        mocker.patch.object(batch, "resolve_head", return_value=None)
+        lookup = mocker.patch.object(batch, "find_existing_report")
+
+        async def handler(job):
+            return 1
+
+        queue = JobQueue(handler, workers=1, max_size=10, retention_seconds=60)
+        await queue.start()
+        try:
+            events = await _collect(run_batch(["https://github.com/owner/a"], queue, asyncio.Semaphore(1)))
+        finally:
+            await queue.stop()
+
+        assert events[0]["status"] == "succeeded"
+        lookup.assert_not_called()
+
+    async def test_concurrency_cap(self, no_stored_reports):
+        """Test batches never have more jobs in flight than their shared slots."""
+        running = []
+        peak = []
+
+        async def handler(job):
+            running.append(job)
+            peak.append(len(running))
+            await asyncio.sleep(0.01)
+            running.remove(job)
+            return 1
+
+        queue = JobQueue(handler, workers=8, max_size=10, retention_seconds=60)
+        slots = asyncio.Semaphore(3)
+        await queue.start()
+        try:
+            first = [f"https://github.com/owner/repo{i}" for i in range(6)]
+            second = [f"https://github.com/other/repo{i}" for i in range(6)]
+            results = await asyncio.wait_for(asyncio.gather(
+                _collect(run_batch(first, queue, slots=slots)),
+                _collect(run_batch(second, queue, slots=slots)),
+            ), 5)
+        finally:
+            await queue.stop()
+
+        assert [events[-1]["succeeded"] for events in results] == [6, 6]
+        assert max(peak) <= 3
+
+    async def test_full_queue_defers(self, no_stored_reports):
+        """Test repositories that find the queue full are deferred instead of waited on."""
+        release = asyncio.Event()
+
+        async def handler(job):
+            await release.wait()
+            return 1
+
+        queue = JobQueue(handler, workers=1, max_size=1, retention_seconds=60)
+        await queue.start()
+        urls = [f"https://github.com/owner/repo{i}" for i in range(4)]
+        try:
+            stream = run_batch(urls, queue, slots=asyncio.Semaphore(4))
+            first = await asyncio.wait_for(stream.__anext__(), 5)
+            release.set()
+            events = [first] + await asyncio.wait_for(_collect(stream), 5)
+        finally:
+            await queue.stop()
+
+        # One job running and one queued at most; the others are not waited on
+        deferred = [e for e in events if e.get("status") == "deferred"]
+        assert first["status"] == "deferred"
+        assert len(deferred) >= 2 and all(e["retry_after_seconds"] >= 1 for e in deferred)
+        assert events[-1]["succeeded"] + events[-1]["deferred"] == 4
+
+    async def test_only_new_jobs_charged(self, mocker):
+        """Test stored reports and jobs in flight are free, and only new jobs over the budget are deferred."""
+        mocker.patch.object(batch, "resolve_head", return_value="abc123")
+        stored = {"https://github.com/owner/stored": {"id": 9}}
+        mocker.patch.object(batch, "find_existing_report", side_effect=lambda url, sha: stored.get(url))
+        limiter = RateLimiter(max_requests=2, window_seconds=60)
+        release = asyncio.Event()
+
+        async def handler(job):
+            await release.wait()
+            return 1
+
+        queue = JobQueue(handler, workers=1, max_size=10, retention_seconds=60)
+        await queue.start()
+        in_flight = "https://github.com/owner/running"
+        running = queue.submit(in_flight, key=(in_flight, "abc123", False))
+        try:
+            stream = run_batch(
+                ["https://github.com/owner/stored", "https://github.com/owner/running",
+                 "https://github.com/owner/a", "https://github.com/owner/a", "https://github.com/owner/b",
+                 "https://github.com/owner/c"],
+                queue, slots=asyncio.Semaphore(8), charge=lambda: limiter.check("client"),
+            )
+            events = [await asyncio.wait_for(stream.__anext__(), 5) for _ in range(2)]
+            release.set()
+            events += await asyncio.wait_for(_collect(stream), 5)
+        finally:
+            await queue.stop()
+
+        results = {e["repo_url"]: e["status"] for e in events if e["type"] == "result"}
+        assert results.pop("https://github.com/owner/stored") == "cached"
+        assert results.pop("https://github.com/owner/running") == "succeeded" and running.coalesced_requests == 1
+        assert sorted(results.values()) == ["deferred", "succeeded", "succeeded"]
+        assert events[-1]["deferred"] == 1 and events[-1]["duplicates"] == 1
@@ -0,0 +1,121 @@
+"""
+Unit tests for the in-process complexity engine.
+
+Tests that radon's Python API results match the structure produced by
+the radon text parser.
+"""
+
+import os
+import pytest
+from backend.services.file_metrics import measure_files
+from backend.services.file_walker import walk_repository
+from backend.services.complexity_engine import (
+    analyze_source,
+    build_complexity_result,
+    format_complexity_summary,
+)
+from backend.utils.radon_parser import parse_radon_output
+
+SAMPLE_SOURCE = """
+class Greeter:
+    def greet(self, name):
+        if name:
+            return f"Hello {name}"
+        return "Hello"
+
+
+def loop(items):
+    for item in items:
+        if item:
+            print(item)
+"""
+
+
+def _write(root, rel_path, content):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestAnalyzeSource:
+    """Tests for single-file analysis."""
+
+    def test_blocks(self):
+        """Test blocks carry the same fields as parsed radon output."""
+        result = analyze_source(SAMPLE_SOURCE, "pkg/greeter.py")
+        blocks = {b["name"]: b for b in result["blocks"]}
+
+        assert set(blocks) == {"Greeter", "Greeter.greet", "loop"}
+        assert blocks["Greeter.greet"]["type"] == "method"
+        assert blocks["Greeter.greet"]["location"] == "3:4"
+        assert blocks["loop"] == {
+            "name": "loop",
+            "complexity": 3,
+            "grade": "A",
+            "type": "function",
+            "file": "pkg/greeter.py",
+            "location": "9:0",
+        }
+
+    def test_raw_metrics(self):
+        """Test raw line metrics are reported."""
+        result = analyze_source("# comment\n\nx = 1\n", "a.py")
+        assert result["raw"] == {"code": 1, "comment": 1, "blank": 1}
+
+    def test_syntax_error(self):
+        """Test unparsable files are reported instead of raising."""
+        result = analyze_source("def broken(:\n", "bad.py")
+        assert "error" in result
+
+
+class TestBuildResult:
+    """Tests for result aggregation."""
+
+    def test_matches_text_parser(self, mock_radon_output):
+        """Test aggregation matches parse_radon_output for the same blocks."""
+        parsed = parse_radon_output(mock_radon_output)
+        rebuilt = build_complexity_result([{"blocks": parsed["blocks"]}])
+        assert rebuilt == parsed
+
+    def test_empty(self):
+        """Test aggregation of no files."""
+        result = build_complexity_result([])
+        assert result["total_functions"] == 0
+        assert result["average_complexity"] == 0
+
+    def test_summary_format_is_parsable(self):
+        """Test the prompt summary uses radon's terminal layout."""
+        result = build_complexity_result([analyze_source(SAMPLE_SOURCE, "greeter.py")])
+        reparsed = parse_radon_output(format_complexity_summary(result))
+        assert reparsed["total_complexity"] == result["total_complexity"]
+
+
+@pytest.mark.asyncio
+class TestMeasureFiles:
+    """Tests for repository-level analysis."""
+
+    async def test_only_walked_python_files(self, temp_dir):
+        """Test ignored directories and non-Python files are not analyzed."""
+        _write(temp_dir, "pkg/greeter.py", SAMPLE_SOURCE)
+        _write(temp_dir, "node_modules/vendored.py", "def vendored():\n    pass\n")
+        _write(temp_dir, "web/app.js", "function app() { return 1; }\n")
+
+        results, _ = await measure_files(walk_repository(temp_dir, ["node_modules"]))
+
+        assert list(results) == ["pkg/greeter.py"]
+        assert {b["file"] for b in results["pkg/greeter.py"]["blocks"]} == {"pkg/greeter.py"}
+
+    async def test_process_pool_matches_inline(self, temp_dir):
+        """Test large trees analyzed in the process pool give the same totals."""
+        for i in range(40):
+            _write(temp_dir, f"mod_{i}.py", SAMPLE_SOURCE)
+
+        results, _ = await measure_files(walk_repository(temp_dir, []))
+        radon_result = build_complexity_result(results.values())
+        single = analyze_source(SAMPLE_SOURCE, "x.py")
+
+        assert len(results) == 40
+        assert all(result["raw"] == single["raw"] for result in results.values())
+        assert radon_result["total_functions"] == 40 * len(single["blocks"])
+        assert radon_result["total_complexity"] == 40 * sum(b["complexity"] for b in single["blocks"])
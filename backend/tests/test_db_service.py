@@ -0,0 +1,135 @@
+"""
+Unit tests for the database service.
+
+Tests report persistence and lookup against a temporary SQLite database.
+"""
+
+from backend.services import db_service
+
+
+def _save(mock_analysis_result, git_sha="abc123", tool_versions=None, analysis_meta=None):
+    r = mock_analysis_result
+    return db_service.save_report(
+        r["repo_url"], git_sha, r["radon"], r["cloc"], r["pylint"],
+        r["ai_metrics"], r["code_health_score"], r["historical_risk_score"],
+        tool_versions=tool_versions, analysis_meta=analysis_meta,
+    )
+
+
+class TestFindReport:
+    """Tests for reusing reports by commit and tool versions."""
+
+    def test_finds_matching_report(self, temp_db, mock_analysis_result):
+        """Test a report is found for the same commit and tool versions."""
+        versions = {"radon": "6.0.1", "pylint": "3.3.2"}
+        report_id = _save(mock_analysis_result, tool_versions=versions)
+
+        # Key order must not matter
+        found = db_service.find_report(
+            mock_analysis_result["repo_url"], "abc123", {"pylint": "3.3.2", "radon": "6.0.1"}
+        )
+        assert found == report_id
+        assert db_service.get_report(found)["tool_versions"] == versions
+
+    def test_different_sha_not_found(self, temp_db, mock_analysis_result):
+        """Test a report for another commit is not reused."""
+        versions = {"radon": "6.0.1"}
+        _save(mock_analysis_result, tool_versions=versions)
+
+        assert db_service.find_report(mock_analysis_result["repo_url"], "def456", versions) is None
+
+    def test_different_tool_versions_not_found(self, temp_db, mock_analysis_result):
+        """Test a report produced by other tool versions is not reused."""
+        _save(mock_analysis_result, tool_versions={"radon": "5.0.0"})
+
+        found = db_service.find_report(
+            mock_analysis_result["repo_url"], "abc123", {"radon": "6.0.1"}
+        )
+        assert found is None
+
+    def test_newest_report_wins(self, temp_db, mock_analysis_result):
+        """Test the most recent matching report is returned."""
+        versions = {"radon": "6.0.1"}
+        _save(mock_analysis_result, tool_versions=versions)
+        newest = _save(mock_analysis_result, tool_versions=versions)
+
+        assert db_service.find_report(mock_analysis_result["repo_url"], "abc123", versions) == newest
+
+    def test_partial_report_not_reused(self, temp_db, mock_analysis_result):
+        """Test a report with stages cut short by the deadline is not reused."""
+        versions = {"radon": "6.0.1"}
+        complete = _save(mock_analysis_result, tool_versions=versions,
+                         analysis_meta={"incomplete_stages": []})
+        partial = _save(mock_analysis_result, tool_versions=versions,
+                        analysis_meta={"incomplete_stages": ["ai"]})
+
+        assert db_service.find_report(mock_analysis_result["repo_url"], "abc123", versions) == complete
+        assert db_service.get_report(partial)["analysis_meta"] == {"incomplete_stages": ["ai"]}
+
+    def test_history_report_not_reused(self, temp_db, mock_analysis_result):
+        """Test reports of history analyses are only found when asked for."""
+        versions = {"radon": "6.0.1"}
+        history = _save(mock_analysis_result, tool_versions=versions,
+                        analysis_meta={"incomplete_stages": [], "mode": "history"})
+        repo_url = mock_analysis_result["repo_url"]
+
+        assert db_service.find_report(repo_url, "abc123", versions) is None
+        assert db_service.find_report(repo_url, "abc123", versions, include_history=True) == history
+
+    def test_shard_sections_stored(self, temp_db, mock_analysis_result):
+        """Test per-shard sections are stored with the report, and absent for unsharded ones."""
+        r = mock_analysis_result
+        shards = [{"root": ".", "files": 2, "code_health_score": 71.5}]
+        sharded = db_service.save_report(
+            r["repo_url"], "abc123", r["radon"], r["cloc"], r["pylint"],
+            r["ai_metrics"], r["code_health_score"], r["historical_risk_score"], shards=shards,
+        )
+
+        assert db_service.get_report(sharded)["shards"] == shards
+        assert db_service.get_report(_save(r))["shards"] is None
+
+
+class TestReportFiles:
+    """Tests for per-file results used by incremental analysis."""
+
+    def test_round_trip(self, temp_db, mock_analysis_result):
+        """Test per-file records are stored and returned by path."""
+        report_id = _save(mock_analysis_result, tool_versions={"radon": "6.0.1"})
+        record = {"path": "pkg/a.py", "blob_id": "f00d", "statements": 3, "pylint": None}
+
+        db_service.save_report_files(report_id, [record])
+
+        assert db_service.get_report_files(report_id) == {"pkg/a.py": record}
+
+    def test_latest_report_requires_file_results(self, temp_db, mock_analysis_result):
+        """Test only reports with per-file results can seed incremental runs."""
+        versions = {"radon": "6.0.1"}
+        with_files = _save(mock_analysis_result, git_sha="abc123", tool_versions=versions)
+        db_service.save_report_files(with_files, [{"path": "a.py", "blob_id": "1"}])
+        _save(mock_analysis_result, git_sha="def456", tool_versions=versions)
+
+        repo_url = mock_analysis_result["repo_url"]
+        assert db_service.find_latest_report(repo_url, versions) == with_files
+        assert db_service.find_latest_report(repo_url, {"radon": "5.0.0"}) is None
+
+
+class TestPruneReportFiles:
+    """Tests for the retention of per-file results."""
+
+    def test_keeps_newest_reports_of_repository(self, temp_db, mock_analysis_result):
+        """Test only the newest reports of a repository keep their per-file results."""
+        record = {"path": "a.py", "blob_id": "b1"}
+        ids = [_save(mock_analysis_result) for _ in range(3)]
+        for report_id in ids:
+            db_service.save_report_files(report_id, [record])
+        other = db_service.save_report(
+            "https://github.com/other/repo", "abc123", {}, {}, {}, {}, 50.0, 0.0
+        )
+        db_service.save_report_files(other, [record])
+
+        assert db_service.prune_report_files(mock_analysis_result["repo_url"], 2) == 1
+
+        assert db_service.get_report_files(ids[0]) == {}
+        assert [bool(db_service.get_report_files(i)) for i in ids[1:]] == [True, True]
+        assert db_service.get_report_files(other) == {"a.py": record}
+        assert db_service.get_report(ids[0]) is not None
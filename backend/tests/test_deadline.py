@@ -0,0 +1,116 @@
+"""
+Unit tests for the analysis deadline.
+
+Tests how stage budgets are derived from the remaining time and that
+stages running past their budget are cancelled and recorded.
+"""
+
+import asyncio
+import pytest
+from backend.services.deadline import Deadline
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestBudget:
+    """Tests for stage budgets."""
+
+    def test_split_by_weight(self):
+        """Test each stage gets its weight's share of the time left."""
+        deadline = Deadline(100, {"clone": 1, "tools": 3}, clock=FakeClock())
+        assert deadline.budget("clone") == 25
+        assert deadline.budget("tools") == 100
+
+    def test_unused_time_passes_to_later_stages(self):
+        """Test a stage that finished early leaves its time to the next ones."""
+        clock = FakeClock()
+        deadline = Deadline(100, {"clone": 2, "tools": 1, "ai": 1}, clock=clock)
+        assert deadline.budget("clone") == 50
+        clock.now = 10
+        assert deadline.budget("tools") == 45
+        clock.now = 95
+        assert deadline.budget("ai") == 5
+
+    def test_nothing_left_after_deadline(self):
+        """Test stages started after the deadline get no time."""
+        clock = FakeClock()
+        deadline = Deadline(10, clock=clock)
+        clock.now = 30
+        assert deadline.remaining() == 0
+        assert deadline.budget("ai") == 0
+
+
+@pytest.mark.asyncio
+class TestRun:
+    """Tests for running stages against their budgets."""
+
+    async def test_completed_stage_returns_result(self):
+        """Test a stage within budget returns its result and is not recorded."""
+        deadline = Deadline(5, {"ai": 1})
+
+        assert await deadline.run("ai", asyncio.sleep(0, result="ok")) == "ok"
+        assert deadline.to_dict()["incomplete_stages"] == []
+
+    async def test_straggler_cancelled(self):
+        """Test a stage past its budget is cancelled and replaced by the fallback."""
+        deadline = Deadline(0.05, {"ai": 1})
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        assert await deadline.run("ai", slow(), fallback="fallback") == "fallback"
+        await asyncio.sleep(0)
+        assert cancelled.is_set()
+        assert deadline.incomplete_stages == ["ai"]
+
+    async def test_stage_errors_propagate(self):
+        """Test an exception raised by a stage is raised by run."""
+        async def fail():
+            raise ValueError("boom")
+
+        with pytest.raises(ValueError):
+            await Deadline(5, {"clone": 1}).run("clone", fail())
+
+    async def test_gather_keeps_finished_parts(self):
+        """Test parts that finished in time keep their results."""
+        deadline = Deadline(0.05, {"tools": 1})
+
+        results = await deadline.gather("tools", {
+            "radon": asyncio.sleep(0, result={"a.py": {}}),
+            "pylint": asyncio.sleep(10),
+        })
+
+        assert results == {"radon": {"a.py": {}}, "pylint": None}
+        assert deadline.to_dict()["incomplete_stages"] == ["tools.pylint"]
+        assert "tools" in deadline.to_dict()["stage_seconds"]
+
+    async def test_part_and_step_durations_recorded(self):
+        """Test each part of a gathered stage and each timed step get their own duration."""
+        clock = FakeClock()
+        deadline = Deadline(100, {"tools": 1}, clock=clock)
+
+        async def part(seconds, turns):
+            for _ in range(turns):
+                await asyncio.sleep(0)
+            clock.now += seconds
+
+        await deadline.gather("tools", {"metrics": part(1, 1), "pylint": part(4, 3)})
+        with deadline.timed("parsing"):
+            clock.now += 2
+
+        assert deadline.to_dict()["stage_seconds"] == {
+            "tools.metrics": 1, "tools.pylint": 5, "tools": 5, "parsing": 2
+        }
@@ -0,0 +1,68 @@
+"""
+Unit tests for the instrumented executors.
+
+Tests that thread and process pools return results unchanged and record
+queue time, busy time and failures.
+"""
+
+import asyncio
+import math
+import threading
+import time
+import pytest
+from backend.services.executors import InstrumentedProcessPool, InstrumentedThreadPool
+
+
+class TestInstrumentedThreadPool:
+    """Tests for InstrumentedThreadPool."""
+
+    def test_records_queue_and_busy_time(self):
+        """Test tasks waiting for the only worker show up as queue time."""
+        pool = InstrumentedThreadPool("test", 1)
+        release = threading.Event()
+        try:
+            blocker = pool.submit(release.wait)
+            waiting = pool.submit(lambda x: x * 2, 21)
+            time.sleep(0.05)
+            assert pool.metrics.snapshot()["queued"] == 1
+            release.set()
+            assert waiting.result(timeout=2) == 42
+            blocker.result(timeout=2)
+        finally:
+            pool.shutdown()
+
+        stats = pool.metrics.snapshot()
+        assert stats["completed"] == 2 and stats["active"] == 0 and stats["queued"] == 0
+        assert stats["max_queue_seconds"] >= 0.05
+        assert stats["busy_seconds"] >= 0.05
+        assert 0 < stats["utilisation"] <= 1
+
+    def test_failures_counted(self):
+        """Test exceptions propagate and are counted as failed tasks."""
+        pool = InstrumentedThreadPool("test", 1)
+        try:
+            with pytest.raises(ZeroDivisionError):
+                pool.submit(lambda: 1 / 0).result(timeout=2)
+        finally:
+            pool.shutdown()
+        assert pool.metrics.snapshot()["failed"] == 1
+
+
+@pytest.mark.asyncio
+class TestInstrumentedProcessPool:
+    """Tests for InstrumentedProcessPool."""
+
+    async def test_results_and_errors_through_event_loop(self):
+        """Test results and exceptions come back through run_in_executor."""
+        pool = InstrumentedProcessPool("test", 1)
+        loop = asyncio.get_running_loop()
+        try:
+            assert await loop.run_in_executor(pool, math.factorial, 5) == 120
+            with pytest.raises(ValueError):
+                await loop.run_in_executor(pool, math.sqrt, -1)
+        finally:
+            pool.shutdown()
+
+        stats = pool.metrics.snapshot()
+        assert stats["completed"] == 2 and stats["failed"] == 1
+        assert stats["active"] == 0 and stats["queued"] == 0
@@ -0,0 +1,63 @@
+"""
+Unit tests for the shared file metrics pass.
+
+Tests that complexity analysis and line counting read each file once and
+only compute what the result cache is missing.
+"""
+
+import os
+import pytest
+from backend.services import file_metrics, line_counter
+from backend.services.complexity_engine import analyze_source
+from backend.services.file_walker import walk_repository
+from backend.services.line_counter import count_lines
+from backend.services.result_cache import FileResultCache
+
+SOURCE = b"def f(x):\n    # branch\n    if x:\n        return 1\n    return 0\n"
+
+
+def _write(root, rel_path, content):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+@pytest.mark.asyncio
+class TestMeasureFiles:
+    """Tests for measure_files."""
+
+    async def test_python_files_read_once(self, temp_dir, mocker):
+        """Test a Python file is read once for both its complexity and its line counts."""
+        _write(temp_dir, "mod.py", SOURCE)
+        _write(temp_dir, "app.js", b"// entry\nrun();\n")
+        files = walk_repository(temp_dir, [])
+        opened = mocker.patch("builtins.open", side_effect=open)
+        spy = mocker.spy(file_metrics, "_measure_chunk")
+
+        complexity, loc = await file_metrics.measure_files(files)
+
+        assert [call.args[0] for call in opened.call_args_list] == [
+            os.path.join(temp_dir, "app.js"), os.path.join(temp_dir, "mod.py")
+        ]
+        assert [(f.path, analyze, count) for f, analyze, count in spy.call_args.args[0]] == [
+            ("app.js", False, True), ("mod.py", True, True)
+        ]
+        assert complexity == {"mod.py": analyze_source(SOURCE.decode(), "mod.py")}
+        assert loc["mod.py"] == {"language": "Python", **count_lines(SOURCE, "Python")}
+        assert loc["app.js"] == {"language": "JavaScript", "code": 1, "comment": 1, "blank": 0}
+
+    async def test_counting_alone_uses_mmap(self, temp_db, temp_dir, monkeypatch, mocker):
+        """Test a file whose complexity is cached is only counted, through mmap when large."""
+        _write(temp_dir, "big.py", SOURCE * 50)
+        cache = FileResultCache(max_bytes=1024 * 1024)
+        await file_metrics.measure_files(walk_repository(temp_dir, []), cache=cache)
+        monkeypatch.setattr(line_counter, "LINE_COUNTER_VERSION", "test")
+        monkeypatch.setattr(line_counter, "MMAP_THRESHOLD_BYTES", 1)
+        spy = mocker.spy(line_counter.mmap, "mmap")
+
+        complexity, loc = await file_metrics.measure_files(walk_repository(temp_dir, []), cache=cache)
+
+        assert spy.call_count == 1
+        assert complexity["big.py"] == analyze_source((SOURCE * 50).decode(), "big.py")
+        assert loc["big.py"] == {"language": "Python", **count_lines(SOURCE * 50, "Python")}
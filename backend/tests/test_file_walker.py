@@ -0,0 +1,87 @@
+"""
+Unit tests for the single-pass file walker.
+
+Tests filtering rules and language detection.
+"""
+
+import os
+import subprocess
+from backend.services import file_walker
+from backend.services.file_walker import SourceFile, walk_repository
+from backend.utils.languages import detect_language
+
+
+def _write(root, rel_path, content=b"x = 1\n"):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+class TestWalkRepository:
+    """Tests for walk_repository."""
+
+    def test_collects_source_files(self, temp_dir):
+        """Test recognised files are collected with their language."""
+        _write(temp_dir, "pkg/module.py", b"print('hi')\n")
+        _write(temp_dir, "web/app.js", b"console.log(1);\n")
+
+        files = walk_repository(temp_dir)
+
+        assert [f.path for f in files] == ["pkg/module.py", "web/app.js"]
+        assert files[0].language == "Python"
+        assert files[0].content == b"print('hi')\n"
+        assert files[0].is_python
+        assert not files[1].is_python
+
+    def test_ignored_dirs_are_pruned(self, temp_dir):
+        """Test ignored directories are skipped at any depth."""
+        _write(temp_dir, "node_modules/lib/index.js")
+        _write(temp_dir, "src/.venv/site.py")
+        _write(temp_dir, "src/main.py")
+
+        assert [f.path for f in walk_repository(temp_dir)] == ["src/main.py"]
+
+    def test_unknown_binary_and_large_files_skipped(self, temp_dir):
+        """Test unrecognised, binary and oversized files are dropped."""
+        _write(temp_dir, "image.png", b"\x89PNG")
+        _write(temp_dir, "blob.py", b"abc\0def")
+        _write(temp_dir, "big.py", b"x = 1\n" * 1000)
+        _write(temp_dir, "small.py")
+
+        files = walk_repository(temp_dir, max_file_bytes=100)
+
+        assert [f.path for f in files] == ["small.py"]
+
+    def test_contents_read_from_disk(self, temp_dir, monkeypatch):
+        """Test walked files keep no contents and hash them from disk like git."""
+        _write(temp_dir, "pkg/module.py", b"x = 1\n" * 1000)
+        monkeypatch.setattr(file_walker, "HASH_CHUNK_BYTES", 7)
+
+        walked = walk_repository(temp_dir)[0]
+        assert walked.on_disk and walked.data is None
+
+        path = os.path.join(temp_dir, "pkg/module.py")
+        expected = subprocess.run(["git", "hash-object", path], capture_output=True, text=True, check=True).stdout.strip()
+        assert walked.blob_id == expected
+        assert SourceFile("pkg/module.py", "pkg/module.py", "Python", 6000, b"x = 1\n" * 1000).blob_id == expected
+
+        _write(temp_dir, "pkg/module.py", b"y = 2\n")
+        assert walked.content == b"y = 2\n"
+
+
+class TestDetectLanguage:
+    """Tests for language detection."""
+
+    def test_by_extension(self):
+        """Test detection by (case-insensitive) extension."""
+        assert detect_language("a/b/c.py") == "Python"
+        assert detect_language("App.TSX") == "TypeScript"
+
+    def test_by_filename(self):
+        """Test detection of well-known file names."""
+        assert detect_language("docker/Dockerfile") == "Dockerfile"
+
+    def test_unknown(self):
+        """Test unrecognised files return None."""
+        assert detect_language("data.bin") is None
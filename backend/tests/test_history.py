@@ -0,0 +1,158 @@
+"""
+Unit tests for commit-history analysis.
+
+Tests per-commit planning against the previous commit, shared file
+versions, pylint runs in per-commit worktrees, reuse of stored reports and
+the stored score series, against a local file:// remote. Pylint itself is
+replaced by a recorder of what it would have linted.
+"""
+
+import json
+import os
+from typing import cast
+from unittest.mock import Mock
+import pytest
+from backend.services import history
+from backend.services.analyzer import find_existing_report
+from backend.services.db_service import get_report, get_report_files, get_report_series
+from backend.services.history import HistoryCommit, analyze_history, load_commit_files
+from backend.services.job_queue import Job, run_history_job
+from backend.utils import repo_downloader
+
+
+@pytest.fixture
+def remote(make_remote, git, commit_files):
+    """A served repository with three commits; returns (file:// URL, SHAs oldest first)."""
+    url, work, first = make_remote("repo", {
+        "pkg/core.py": b"def add(a, b):\n    return a + b\n",
+        "pkg/cli.py": b"from pkg.core import add\n\nprint(add(1, 2))\n",
+        "pkg/util.py": b"X = 1\n",
+        "web/app.js": b"console.log(1);\n",
+        "logo.png": b"\x89PNG\0",
+    }, "2024-01-01T00:00:00Z")
+    shas = [
+        first,
+        commit_files(work, {"pkg/util.py": b"X = 2\n"}, "2024-01-02T00:00:00Z"),
+        commit_files(work, {"pkg/core.py": b"def add(a, b):\n    if a:\n        return a + b\n    return b\n"},
+                     "2024-01-03T00:00:00Z"),
+    ]
+    git(work, "push", "-q", "origin", "HEAD")
+    return url, shas
+
+
+@pytest.fixture
+def pylint_runs(mocker):
+    """Record each pylint run as (files checked out in its worktree, paths linted)."""
+    runs = []
+
+    async def _run(commands, repo_path, timeout=None):
+        checked_out = sorted(
+            os.path.relpath(os.path.join(root, name), repo_path).replace(os.sep, "/")
+            for root, _, names in os.walk(repo_path)
+            for name in names
+            if name != ".git"
+        )
+        paths = [arg for arg in commands["pylint"] if arg.endswith(".py")]
+        runs.append((checked_out, paths))
+        return {"pylint": json.dumps({"messages": [], "statistics": {"score": 10.0}}, indent=2)}
+
+    mocker.patch.object(history, "run_sandboxed_tools", side_effect=_run)
+    return runs
+
+
+@pytest.mark.asyncio
+class TestAnalyzeHistory:
+    """Tests for analyze_history."""
+
+    async def test_commits_analyzed_against_their_predecessor(self, remote, pylint_runs, temp_db):
+        """Test each commit only re-analyzes and re-lints what changed since the commit before."""
+        url, shas = remote
+
+        results = await analyze_history(url, 5)
+
+        assert [r["git_sha"] for r in results] == shas
+        assert [r["commit_date"] for r in results] == [
+            "2024-01-01T00:00:00+00:00", "2024-01-02T00:00:00+00:00", "2024-01-03T00:00:00+00:00"
+        ]
+        changed = [r["analysis_meta"]["incremental"]["changed_files"] for r in results]
+        assert changed == [4, 1, 1]
+        # The change to core.py also re-lints cli.py, which imports it
+        assert sorted(paths for _, paths in pylint_runs) == [
+            ["pkg/cli.py", "pkg/core.py"],
+            ["pkg/cli.py", "pkg/core.py", "pkg/util.py"],
+            ["pkg/util.py"],
+        ]
+        checked_out, _ = pylint_runs[0]
+        assert "logo.png" not in checked_out and "pkg/util.py" in checked_out
+
+        assert results[2]["radon"]["total_functions"] == 1
+        assert results[2]["radon"]["total_complexity"] > results[1]["radon"]["total_complexity"]
+        assert all(r["analysis_meta"]["incomplete_stages"] == [] for r in results)
+
+    async def test_failed_pylint_run_is_incomplete_and_relinted(self, remote, pylint_runs, mocker, temp_db):
+        """Test a commit whose pylint failed is marked incomplete and its modules are linted again next commit."""
+        url, shas = remote
+        record = cast(Mock, history.run_sandboxed_tools).side_effect
+
+        async def _fail_first(commands, repo_path, timeout=None):
+            if os.path.basename(repo_path) == shas[0]:
+                raise RuntimeError("pylint crashed")
+            return await record(commands, repo_path, timeout=timeout)
+
+        mocker.patch.object(history, "run_sandboxed_tools", side_effect=_fail_first)
+
+        results = await analyze_history(url, 3)
+
+        assert results[0]["analysis_meta"]["incomplete_stages"] == ["tools"]
+        assert results[1]["analysis_meta"]["incomplete_stages"] == []
+        assert results[1]["pylint"]["score"] is not None
+        assert all(r["file_metrics"][0]["pylint"] is not None for r in results[1:])
+
+    async def test_history_job_stores_series_and_reuses_it(self, remote, pylint_runs, temp_db):
+        """Test a history job stores one report per commit, oldest first, and a rerun reuses them."""
+        url, shas = remote
+        job = Job(id="job", repo_url=url, options={"history_commits": 3})
+
+        report_id = await run_history_job(job)
+
+        series = get_report_series(url)
+        assert [entry["git_sha"] for entry in series] == shas
+        assert series[-1]["report_id"] == report_id
+        assert get_report(report_id)["analysis_meta"]["mode"] == "history"
+        assert "pkg/core.py" in get_report_files(report_id)
+        scored = [e for e in job.events if e["type"] == "commit_scored"]
+        assert [e["reused"] for e in scored] == [False, False, False]
+
+        pylint_runs.clear()
+        again = Job(id="again", repo_url=url, options={"history_commits": 3})
+        assert await run_history_job(again) == report_id
+        assert pylint_runs == []
+        assert len(get_report_series(url)) == 3
+
+    async def test_history_report_not_served_for_analysis(self, remote, pylint_runs, temp_db):
+        """Test a plain analysis of HEAD does not reuse the report a history run stored."""
+        url, shas = remote
+        await run_history_job(Job(id="job", repo_url=url, options={"history_commits": 1}))
+
+        assert await find_existing_report(url, sha=shas[-1]) is None
+
+
+class TestLoadCommitFiles:
+    """Tests for load_commit_files."""
+
+    def test_file_versions_shared_and_binaries_skipped(self, remote, temp_dir, git):
+        """Test unchanged files are one object across commits and binaries and large files are left out."""
+        url, shas = remote
+        repo_path = os.path.join(temp_dir, "clone")
+        repo_downloader.clone_history(url, repo_path, 3)
+        commits = [HistoryCommit(sha, "") for sha in shas]
+
+        load_commit_files(repo_path, commits, max_file_bytes=50)
+
+        first, second, _ = commits
+        assert [f.path for f in first.files] == ["pkg/cli.py", "pkg/core.py", "pkg/util.py", "web/app.js"]
+        assert first.files[0] is second.files[0]
+        assert first.files[2] is not second.files[2]
+        assert first.files[2].blob_id == git(repo_path, "rev-parse", f"{shas[0]}:pkg/util.py")
+        # The third commit's core.py is larger than 50 bytes
+        assert "pkg/core.py" not in [f.path for f in commits[2].files]
@@ -0,0 +1,206 @@
+"""
+Unit tests for incremental analysis.
+
+Tests change planning, importer detection and that a report merged from
+stored per-file results matches a full analysis of the same commit.
+"""
+
+import os
+import subprocess
+import sys
+from typing import Any, Dict, Optional
+import pytest
+from backend.services.file_metrics import measure_files
+from backend.services.file_walker import walk_repository
+from backend.services.incremental import (
+    aggregate_records,
+    build_file_records,
+    module_name,
+    plan_analysis,
+)
+from backend.utils.pylint_parser import parse_pylint_json_by_file, parse_pylint_output
+
+UTIL_SOURCE = '''"""Helpers."""
+
+
+def double(value):
+    """Double a value."""
+    return value * 2
+
+
+def triple(value):
+    """Triple a value."""
+    return value * 3
+'''
+
+APP_SOURCE = '''"""Application."""
+from pkg.util import double, triple
+
+
+def run(value):
+    """Run the app."""
+    if value:
+        return double(value) + triple(value)
+    return 0
+'''
+
+STANDALONE_SOURCE = '''"""Standalone module."""
+
+
+def answer():
+    """Return the answer."""
+    return 42
+'''
+
+
+def _write(root, rel_path, content):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+def _make_repo(root):
+    _write(root, "pkg/__init__.py", "")
+    _write(root, "pkg/util.py", UTIL_SOURCE)
+    _write(root, "pkg/app.py", APP_SOURCE)
+    _write(root, "pkg/standalone.py", STANDALONE_SOURCE)
+    _write(root, "web/index.js", "// entry\nconsole.log(1);\n")
+
+
+async def _analyze(repo_path, previous):
+    """Run the analysis pipeline steps the analyzer runs, with pylint on the host."""
+    files = walk_repository(repo_path, [])
+    plan = plan_analysis(files, previous)
+    complexity, _ = await measure_files(plan.changed)
+    pylint: Optional[Dict[str, Dict[str, Any]]] = {}
+    if plan.lint_paths:
+        output = subprocess.run(
+            [sys.executable, "-m", "pylint", "--output-format=json2", "--exit-zero", *plan.lint_paths],
+            cwd=repo_path, capture_output=True, text=True, timeout=120,
+        ).stdout
+        pylint = parse_pylint_json_by_file(output)
+    records = build_file_records(files, plan, complexity, {}, pylint)
+    return plan, {r["path"]: r for r in records}, aggregate_records(records)
+
+
+class TestPlanAnalysis:
+    """Tests for diffing a commit against stored per-file records."""
+
+    def _records(self, files):
+        return {
+            f.path: {"path": f.path, "blob_id": f.blob_id, "imports": [], "pylint": {"issues": [], "counts": {}}}
+            for f in files
+        }
+
+    def test_full_run_without_previous(self, temp_dir):
+        """Test every file is analyzed when there is no stored report."""
+        _make_repo(temp_dir)
+        files = walk_repository(temp_dir, [])
+
+        plan = plan_analysis(files, {})
+
+        assert len(plan.changed) == len(files)
+        assert plan.reused == {}
+        assert plan.lint_paths == sorted(f.path for f in files if f.is_python)
+
+    def test_unchanged_files_reused(self, temp_dir):
+        """Test files with the same blob are not re-analyzed."""
+        _make_repo(temp_dir)
+        files = walk_repository(temp_dir, [])
+        plan = plan_analysis(files, self._records(files))
+
+        assert plan.changed == []
+        assert plan.lint_paths == []
+        assert set(plan.reused) == {f.path for f in files}
+
+    def test_importers_of_changed_module_relinted(self, temp_dir):
+        """Test direct importers of a changed module are re-linted but not re-measured."""
+        _make_repo(temp_dir)
+        previous = self._records(walk_repository(temp_dir, []))
+        previous["pkg/app.py"]["imports"] = ["pkg.util", "pkg.util.double"]
+        _write(temp_dir, "pkg/util.py", UTIL_SOURCE + "\n\nX = 1\n")
+
+        plan = plan_analysis(walk_repository(temp_dir, []), previous)
+
+        assert [f.path for f in plan.changed] == ["pkg/util.py"]
+        assert plan.lint_paths == ["pkg/app.py", "pkg/util.py"]
+
+    def test_importers_followed_transitively(self, temp_dir):
+        """Test modules importing an importer of a changed module are re-linted too."""
+        _make_repo(temp_dir)
+        previous = self._records(walk_repository(temp_dir, []))
+        previous["pkg/app.py"]["imports"] = ["pkg.util"]
+        previous["pkg/standalone.py"]["imports"] = ["app"]
+        _write(temp_dir, "pkg/util.py", UTIL_SOURCE + "\n\nX = 1\n")
+
+        plan = plan_analysis(walk_repository(temp_dir, []), previous)
+
+        assert plan.lint_paths == ["pkg/app.py", "pkg/standalone.py", "pkg/util.py"]
+
+    def test_config_change_relints_everything(self, temp_dir):
+        """Test records linted with another pylint configuration are linted again."""
+        _make_repo(temp_dir)
+        files = walk_repository(temp_dir, [])
+        previous = self._records(files)
+        for record in previous.values():
+            record["pylint_config"] = "old"
+
+        assert plan_analysis(files, previous, "old").lint_paths == []
+        plan = plan_analysis(files, previous, "new")
+        assert plan.changed == []
+        assert plan.lint_paths == sorted(f.path for f in files if f.is_python)
+        records = build_file_records(files, plan, {}, {}, {})
+        assert {r.get("pylint_config") for r in records if r["path"].endswith(".py")} == {"new"}
+
+    def test_deleted_files(self, temp_dir):
+        """Test removed files are dropped and their importers re-linted."""
+        _make_repo(temp_dir)
+        previous = self._records(walk_repository(temp_dir, []))
+        previous["pkg/app.py"]["imports"] = ["pkg.standalone"]
+        os.remove(os.path.join(temp_dir, "pkg", "standalone.py"))
+
+        plan = plan_analysis(walk_repository(temp_dir, []), previous)
+
+        assert plan.deleted == ["pkg/standalone.py"]
+        assert plan.lint_paths == ["pkg/app.py"]
+
+    def test_module_name(self):
+        """Test file paths map to dotted module names."""
+        assert module_name("src/pkg/mod.py") == "src.pkg.mod"
+        assert module_name("pkg/__init__.py") == "pkg"
+
+
+@pytest.mark.asyncio
+class TestIncrementalMatchesFull:
+    """Tests that incremental reports are identical to full runs."""
+
+    async def test_score_matches_pylint_rating(self, temp_dir):
+        """Test the score computed from per-file counts equals pylint's own rating."""
+        _make_repo(temp_dir)
+        _write(temp_dir, "pkg/messy.py", "import os\nx=1\ndef f(a):\n  return a\n")
+        files = walk_repository(temp_dir, [])
+        paths = [f.path for f in files if f.is_python]
+        output = subprocess.run(
+            [sys.executable, "-m", "pylint", "--output-format=text", "--exit-zero", *paths],
+            cwd=temp_dir, capture_output=True, text=True, timeout=120,
+        ).stdout
+
+        _, _, sections = await _analyze(temp_dir, {})
+
+        assert sections["pylint"]["score"] == parse_pylint_output(output)["score"]
+        assert sections["pylint"]["total_issues"] > 0
+
+    async def test_change_in_imported_module(self, temp_dir):
+        """Test removing a function flags its importer exactly as a full run does."""
+        _make_repo(temp_dir)
+        _, previous, _ = await _analyze(temp_dir, {})
+
+        _write(temp_dir, "pkg/util.py", UTIL_SOURCE.split("\n\ndef triple")[0] + "\n")
+        plan, _, incremental = await _analyze(temp_dir, previous)
+        _, _, full = await _analyze(temp_dir, {})
+
+        assert [f.path for f in plan.changed] == ["pkg/util.py"]
+        assert "pkg/standalone.py" not in plan.lint_paths
+        assert any(i["file"] == "pkg/app.py" for i in full["pylint"]["issues"])
+        assert incremental == full
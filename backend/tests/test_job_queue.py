@@ -0,0 +1,241 @@
+"""
+Unit tests for the analysis job queue.
+
+Tests job lifecycle, failure handling and queue bounds.
+"""
+
+import asyncio
+import os
+import pytest
+from backend.services.job_queue import Job, JobQueue, JobState, run_analysis_job
+from backend.utils.exceptions import AnalysisError, RateLimitError
+from backend.utils.metrics import JOB_DURATION_SECONDS, JOB_QUEUE_WAIT_SECONDS, JOB_STAGE_SECONDS
+
+
+async def _wait_until_done(job, timeout: float = 2.0):
+    """Poll a job until it reaches a terminal state."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    while not job.done and loop.time() < deadline:
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+class TestJobQueue:
+    """Tests for JobQueue."""
+
+    async def test_job_succeeds(self):
+        """Test a job runs through the handler and records the report ID."""
+        async def handler(job):
+            job.set_stage("cloning")
+            return 42
+
+        queue = JobQueue(handler, workers=1, max_size=10, retention_seconds=60)
+        await queue.start()
+        try:
+            job = queue.submit("https://github.com/owner/repo")
+            assert job.to_dict()["state"] == JobState.QUEUED.value
+            await _wait_until_done(job)
+        finally:
+            await queue.stop()
+
+        assert job.state == JobState.SUCCEEDED
+        assert job.report_id == 42
+        assert job.stage == "cloning"
+        assert queue.get(job.id) is job
+
+    async def test_timings_observed(self):
+        """Test queue wait, run time and stage times of finished jobs go into the histograms."""
+        def count(histogram, **labels):
+            samples = histogram.collect().samples
+            return next((v for name, l, v in samples if name.endswith("_count") and l == tuple(labels.items())), 0)
+
+        before = (count(JOB_QUEUE_WAIT_SECONDS), count(JOB_DURATION_SECONDS, state="succeeded"),
+                  count(JOB_STAGE_SECONDS, stage="saving"))
+
+        async def handler(job):
+            job.set_stage("saving")
+            return 1
+
+        queue = JobQueue(handler, workers=1, max_size=10, retention_seconds=60)
+        await queue.start()
+        try:
+            job = queue.submit("https://github.com/owner/repo")
+            await _wait_until_done(job)
+        finally:
+            await queue.stop()
+
+        after = (count(JOB_QUEUE_WAIT_SECONDS), count(JOB_DURATION_SECONDS, state="succeeded"),
+                 count(JOB_STAGE_SECONDS, stage="saving"))
+        assert [b - a for a, b in zip(before, after)] == [1, 1, 1]
+
+    async def test_job_failure_is_recorded(self):
+        """Test handler exceptions mark the job as failed."""
+        async def handler(job):
+            raise ValueError("boom")
+
+        queue = JobQueue(handler, workers=1, max_size=10, retention_seconds=60)
+        await queue.start()
+        try:
+            job = queue.submit("https://github.com/owner/repo")
+            await _wait_until_done(job)
+        finally:
+            await queue.stop()
+
+        assert job.state == JobState.FAILED
+        assert job.error == "boom"
+        assert job.report_id is None
+
+    async def test_full_queue_rejects_submission(self):
+        """Test submissions beyond the queue bound are rejected."""
+        async def handler(job):
+            return 1
+
+        # Workers are never started, so jobs stay queued
+        queue = JobQueue(handler, workers=1, max_size=1, retention_seconds=60)
+        queue.submit("https://github.com/owner/repo")
+
+        with pytest.raises(RateLimitError):
+            queue.submit("https://github.com/owner/other")
+        assert queue.depth == 1
+
+    async def test_full_queue_retry_after_from_run_times(self):
+        """Test the rejection carries a Retry-After based on observed job durations."""
+        async def handler(job):
+            job.set_stage("running_tools")
+            await asyncio.sleep(0.05)
+            return 1
+
+        queue = JobQueue(handler, workers=2, max_size=1, retention_seconds=60)
+        await queue.start()
+        try:
+            job = queue.submit("https://github.com/owner/repo")
+            await _wait_until_done(job)
+        finally:
+            await queue.stop()
+
+        stats = queue.stats()
+        assert stats["avg_run_seconds"] >= 0.05
+        assert stats["avg_stage_seconds"]["running_tools"] >= 0.05
+        assert stats["avg_wait_seconds"] is not None
+        assert job.stage == "running_tools"
+
+        queue.submit("https://github.com/owner/repo")
+        with pytest.raises(RateLimitError) as exc_info:
+            queue.submit("https://github.com/owner/other")
+        assert exc_info.value.details["retry_after_seconds"] == 1
+        assert queue.stats()["rejected"] == 1
+
+    async def test_same_key_coalesced(self):
+        """Test submissions with the key of an in-flight job share that job."""
+        release = asyncio.Event()
+        calls = []
+
+        async def handler(job):
+            calls.append(job.id)
+            await release.wait()
+            return 42
+
+        queue = JobQueue(handler, workers=2, max_size=10, retention_seconds=60)
+        await queue.start()
+        try:
+            key = ("https://github.com/owner/repo", "abc123", False)
+            first = queue.submit("https://github.com/owner/repo", key=key)
+            await asyncio.sleep(0.01)
+            second = queue.submit("https://github.com/owner/repo", key=key)
+            other = queue.submit("https://github.com/owner/repo", key=(key[0], "def456", False))
+            release.set()
+            await _wait_until_done(first)
+            await _wait_until_done(other)
+            third = queue.submit("https://github.com/owner/repo", key=key)
+        finally:
+            await queue.stop()
+
+        assert second is first
+        assert first.report_id == 42 and first.coalesced_requests == 1
+        assert other is not first
+        assert third is not first
+        assert len(calls) == 2
+        assert queue.stats()["coalesced"] == 1
+
+    async def test_events_follow_job_progress(self):
+        """Test a reader waiting on the event log sees stages, partial results and the outcome."""
+        async def handler(job):
+            job.set_stage("running_tools")
+            job.publish_partial("cloc", {"code": 10})
+            await asyncio.sleep(0.01)
+            return 42
+
+        queue = JobQueue(handler, workers=1, max_size=10, retention_seconds=60)
+        job = queue.submit("https://github.com/owner/repo")
+        seen = []
+
+        async def read():
+            after = 0
+            while True:
+                events = await job.wait_events(after, timeout=2)
+                if not events:
+                    return
+                seen.extend(events)
+                after = events[-1]["seq"]
+
+        reader = asyncio.create_task(read())
+        await queue.start()
+        try:
+            await asyncio.wait_for(reader, 2)
+        finally:
+            await queue.stop()
+
+        assert [e["type"] for e in seen] == [
+            "queued", "started", "stage_started", "partial_result", "stage_finished", "succeeded"
+        ]
+        assert [e["seq"] for e in seen] == list(range(1, 7))
+        assert seen[3]["section"] == "cloc" and seen[3]["data"] == {"code": 10}
+        assert seen[4]["stage"] == "running_tools" and seen[4]["seconds"] >= 0.01
+        assert seen[5]["report_id"] == 42
+
+    async def test_unknown_job(self):
+        """Test looking up an unknown job returns None."""
+        async def handler(job):
+            return 1
+
+        queue = JobQueue(handler, workers=1, max_size=1, retention_seconds=60)
+        assert queue.get("missing") is None
+
+
+@pytest.mark.asyncio
+class TestRunAnalysisJob:
+    """Tests for run_analysis_job with uploaded archives."""
+
+    async def test_archive_job_analyzes_and_discards_upload(self, temp_dir, mocker):
+        """Test the archive and its digest reach the analyzer and the upload is deleted afterwards."""
+        archive = os.path.join(temp_dir, "upload.archive")
+        open(archive, "wb").close()
+        lookup = mocker.patch("backend.services.job_queue.find_existing_report", return_value=None)
+        analyze = mocker.patch(
+            "backend.services.job_queue.analyze_single_repo",
+            return_value={"error": "stop before saving"},
+        )
+        job = Job(id="job", repo_url="upload://abc", options={"archive_path": archive, "commit_sha": "digest"})
+
+        with pytest.raises(AnalysisError):
+            await run_analysis_job(job)
+
+        lookup.assert_called_once_with("upload://abc", "digest")
+        kwargs = analyze.call_args.kwargs
+        assert kwargs["archive_path"] == archive and kwargs["commit_sha"] == "digest"
+        assert not os.path.exists(archive)
+
+    async def test_dirty_local_directory_skips_report_lookup(self, mocker):
+        """Test directories without a commit are never matched to stored reports."""
+        lookup = mocker.patch("backend.services.job_queue.find_existing_report")
+        mocker.patch(
+            "backend.services.job_queue.analyze_single_repo",
+            return_value={"error": "stop before saving"},
+        )
+        job = Job(id="job", repo_url="local:///ci/repo", options={"local_path": "/ci/repo"})
+
+        with pytest.raises(AnalysisError):
+            await run_analysis_job(job)
+
+        lookup.assert_not_called()
@@ -0,0 +1,95 @@
+"""
+Unit tests for the native line counter.
+
+Tests per-language counting rules, mmap-backed counting and the
+aggregated CLOC-compatible structure.
+"""
+
+import os
+import pytest
+from backend.services import line_counter
+from backend.services.file_metrics import measure_files
+from backend.services.file_walker import walk_repository
+from backend.services.line_counter import count_file, count_lines
+from backend.utils.cloc_parser import aggregate_loc
+
+PYTHON_SOURCE = b'''"""Module docstring.
+
+Spans lines.
+"""
+import os  # trailing comments keep the line as code
+
+# a comment
+
+
+def f():
+    """One-line docstring."""
+    return os.sep
+'''
+
+
+class TestCountLines:
+    """Tests for count_lines."""
+
+    def test_python(self):
+        """Test docstrings and hash comments count as comments."""
+        assert count_lines(PYTHON_SOURCE, "Python") == {"code": 3, "comment": 5, "blank": 4}
+
+    def test_c_style_block_comments(self):
+        """Test block comments spanning lines and code after a closing marker."""
+        source = b"int a; /* starts here\n   continues\n*/ int b;\n// line\n\n/* whole */\n"
+        assert count_lines(source, "C") == {"code": 2, "comment": 3, "blank": 1}
+
+    def test_blank_lines_inside_block_comment(self):
+        """Test blank lines inside comments are blank, as in cloc."""
+        assert count_lines(b"/*\n\n*/\nx();\n", "JavaScript") == {"code": 1, "comment": 2, "blank": 1}
+
+    def test_language_without_comments(self):
+        """Test languages without comment syntax count every non-blank line as code."""
+        assert count_lines(b'{\n  "a": "# not a comment"\n}\n\n', "JSON") == {
+            "code": 3, "comment": 0, "blank": 1
+        }
+
+    def test_crlf_and_missing_final_newline(self):
+        """Test Windows line endings and a last line without newline."""
+        assert count_lines(b"-- c\r\nSELECT 1;\r\n\r\nSELECT 2;", "SQL") == {
+            "code": 2, "comment": 1, "blank": 1
+        }
+
+    def test_block_opener_checked_before_line_marker(self):
+        """Test block markers that start with the line marker open a block."""
+        assert count_lines(b"--[[\nnote\n]]\nprint(1)\n", "Lua") == {"code": 1, "comment": 3, "blank": 0}
+
+
+class TestCountFile:
+    """Tests for counting files on disk."""
+
+    def test_mmap_matches_in_memory(self, temp_dir, monkeypatch):
+        """Test memory-mapped counting gives the same result as counting bytes."""
+        path = os.path.join(temp_dir, "big.py")
+        with open(path, "wb") as f:
+            f.write(PYTHON_SOURCE * 50)
+        monkeypatch.setattr(line_counter, "MMAP_THRESHOLD_BYTES", 1)
+
+        assert count_file(path, "Python") == count_lines(PYTHON_SOURCE * 50, "Python")
+
+
+@pytest.mark.asyncio
+class TestAggregate:
+    """Tests for repository-level line counts."""
+
+    async def test_cloc_structure(self, temp_dir):
+        """Test per-file counts aggregate into the parse_cloc_output structure."""
+        for i in range(20):
+            with open(os.path.join(temp_dir, f"mod_{i}.py"), "wb") as f:
+                f.write(PYTHON_SOURCE + b"X = %d\n" % i)
+        with open(os.path.join(temp_dir, "app.js"), "wb") as f:
+            f.write(b"// entry\nrun();\n")
+
+        _, per_file = await measure_files(walk_repository(temp_dir, []))
+        result = aggregate_loc(per_file)
+
+        assert per_file["app.js"] == {"language": "JavaScript", "code": 1, "comment": 1, "blank": 0}
+        assert result["languages"]["Python"] == {"code": 80, "comment": 100, "blank": 80, "files": 20}
+        assert result["total_files"] == 21
+        assert result["code"] == 81
@@ -0,0 +1,65 @@
+"""
+Unit tests for Prometheus metrics.
+
+Tests histogram buckets, label escaping and rendering of collected metric
+families in the text exposition format.
+"""
+
+from backend.utils.metrics import Histogram, MetricFamily, Registry
+
+
+class TestHistogram:
+    """Tests for Histogram."""
+
+    def test_buckets_are_cumulative(self):
+        """Test every bucket counts the observations up to its bound, and sum and count are kept."""
+        registry = Registry()
+        histogram = registry.register(Histogram("stage_seconds", "Stage time", ["stage"], buckets=(1, 10)))
+
+        for seconds in (0.5, 2, 20):
+            histogram.observe(seconds, stage="clone")
+
+        assert registry.render().splitlines() == [
+            "# HELP stage_seconds Stage time",
+            "# TYPE stage_seconds histogram",
+            'stage_seconds_bucket{stage="clone",le="1"} 1',
+            'stage_seconds_bucket{stage="clone",le="10"} 2',
+            'stage_seconds_bucket{stage="clone",le="+Inf"} 3',
+            'stage_seconds_sum{stage="clone"} 22.5',
+            'stage_seconds_count{stage="clone"} 3',
+        ]
+
+    def test_label_sets_kept_apart(self):
+        """Test each label value gets its own series."""
+        histogram = Histogram("tool_seconds", "Tool time", ["tool"], buckets=(1,))
+        histogram.observe(0.1, tool="radon")
+        histogram.observe(0.2, tool="pylint")
+
+        counts = [s for s in histogram.collect().samples if s[0] == "tool_seconds_count"]
+        assert counts == [
+            ("tool_seconds_count", (("tool", "pylint"),), 1),
+            ("tool_seconds_count", (("tool", "radon"),), 1),
+        ]
+
+
+class TestRegistry:
+    """Tests for Registry collectors."""
+
+    def test_collected_families_rendered(self):
+        """Test collector samples are rendered with escaped labels and unknown values left out."""
+        registry = Registry()
+        registry.add_collector(lambda: [
+            MetricFamily("cache_hits_total", "Cache hits", "counter", ["tool"])
+            .add(3, 'say "hi"')
+            .add(None, "unknown"),
+            MetricFamily("queue_depth", "Queued\njobs").add(0),
+        ])
+
+        assert registry.render() == (
+            "# HELP cache_hits_total Cache hits\n"
+            "# TYPE cache_hits_total counter\n"
+            'cache_hits_total{tool="say \\"hi\\""} 3\n'
+            "# HELP queue_depth Queued\\njobs\n"
+            "# TYPE queue_depth gauge\n"
+            "queue_depth 0\n"
+        )
@@ -0,0 +1,177 @@
+"""
+Unit tests for the repository mirror store.
+
+Tests mirror creation and incremental updates, per-job worktrees, sparse
+checkouts, concurrent use and LRU eviction against local file:// remotes.
+"""
+
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+from backend.services import mirror_store
+from backend.services.mirror_store import MirrorStore
+from backend.utils import repo_downloader
+from backend.utils.exceptions import RepositoryError
+
+
+def _files(path):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), path).replace(os.sep, "/")
+        for root, _, names in os.walk(path)
+        for name in names
+        if name != ".git"
+    )
+
+
+@pytest.fixture
+def store(temp_dir):
+    return MirrorStore(os.path.join(temp_dir, "mirrors"), max_bytes=1024 * 1024 * 1024)
+
+
+class TestMirrorStore:
+    """Tests for MirrorStore."""
+
+    def test_checkout_creates_mirror_and_worktree(self, store, make_remote, temp_dir, git):
+        """Test the first checkout clones a mirror and checks out HEAD into the worktree."""
+        url, _, sha = make_remote("app", {"pkg/app.py": b"print(1)\n"})
+        dest = os.path.join(temp_dir, "job1")
+
+        path, commit_sha = store.checkout(url, dest)
+
+        assert (path, commit_sha) == (dest, sha)
+        assert _files(dest) == ["pkg/app.py"]
+        assert os.path.isdir(store.mirror_path(url))
+        assert store.stats()["misses"] == 1 and store.stats()["active_worktrees"] == 1
+
+        store.release(dest)
+        assert not os.path.exists(dest)
+        assert store.stats()["active_worktrees"] == 0
+        assert "job1" not in git(store.mirror_path(url), "worktree", "list")
+
+    def test_update_fetches_new_commit(self, store, make_remote, temp_dir, git, commit_files):
+        """Test re-checking out a repository fetches its new commits into the same mirror."""
+        url, work, _ = make_remote("app", {"pkg/app.py": b"print(1)\n"})
+        store.release(store.checkout(url, os.path.join(temp_dir, "job1"))[0])
+        new_sha = commit_files(work, {"pkg/extra.py": b"print(2)\n"})
+        git(work, "push", "-q", "origin", "HEAD")
+
+        dest, commit_sha = store.checkout(url, os.path.join(temp_dir, "job2"))
+
+        assert commit_sha == new_sha
+        assert _files(dest) == ["pkg/app.py", "pkg/extra.py"]
+        assert store.stats()["hits"] == 1 and store.stats()["mirrors"] == 1
+
+    def test_sparse_worktree(self, store, make_remote, temp_dir):
+        """Test sparse checkouts from a mirror leave out assets and excluded directories."""
+        url, _, _ = make_remote("app", {
+            "pkg/app.py": b"print(1)\n",
+            "assets/logo.png": os.urandom(4096),
+            "node_modules/lib/index.js": b"module.exports = 1;\n",
+        })
+        dest, _ = store.checkout(url, os.path.join(temp_dir, "job"), sparse=True, exclude_dirs=["node_modules"])
+
+        assert _files(dest) == ["pkg/app.py"]
+
+    def test_full_worktree_fetches_blobs_in_one_batch(self, store, make_remote, temp_dir, mocker):
+        """Test a non-sparse checkout fetches the mirror's missing blobs in one request, once."""
+        url, _, _ = make_remote("app", {
+            "pkg/app.py": b"print(1)\n",
+            "pkg/util.py": b"X = 1\n",
+            "assets/logo.png": os.urandom(4096),
+        })
+        fetch = mocker.spy(repo_downloader, "fetch_blobs")
+
+        dest, _ = store.checkout(url, os.path.join(temp_dir, "job1"))
+
+        assert _files(dest) == ["assets/logo.png", "pkg/app.py", "pkg/util.py"]
+        assert [len(call.args[1]) for call in fetch.call_args_list] == [3]
+
+        store.release(dest)
+        fetch.reset_mock()
+        measure = mocker.spy(mirror_store, "_directory_size")
+        store.checkout(url, os.path.join(temp_dir, "job2"))
+        assert not fetch.called
+        assert not measure.called
+
+    def test_files_checked_out_without_mirror_lock(self, store, make_remote, temp_dir, mocker):
+        """Test the mirror lock is released while files are written, and taken for blob fetches."""
+        url, _, _ = make_remote("app", {"pkg/app.py": b"print(1)\n"})
+        lock_held = []
+        checkout = mirror_store.checkout_files
+        fetch = repo_downloader.fetch_blobs
+
+        def _checkout(*args, **kwargs):
+            lock_held.append(store._mirror_lock(store.mirror_path(url)).locked())
+            return checkout(*args, **kwargs)
+
+        def _fetch(*args, **kwargs):
+            lock_held.append(store._mirror_lock(store.mirror_path(url)).locked())
+            return fetch(*args, **kwargs)
+
+        mocker.patch.object(mirror_store, "checkout_files", side_effect=_checkout)
+        mocker.patch.object(repo_downloader, "fetch_blobs", side_effect=_fetch)
+
+        store.checkout(url, os.path.join(temp_dir, "job"))
+
+        assert lock_held == [False, True]
+
+    def test_size_limit(self, store, make_remote, temp_dir, git):
+        """Test an oversized checkout is refused and leaves no worktree behind."""
+        url, _, _ = make_remote("big", {"data.bin": os.urandom(2 * 1024 * 1024)})
+
+        with pytest.raises(RepositoryError):
+            store.checkout(url, os.path.join(temp_dir, "job"), max_size_mb=1)
+
+        assert store.stats()["active_worktrees"] == 0
+        assert git(store.mirror_path(url), "worktree", "list").count("\n") == 0
+
+    def test_concurrent_checkouts(self, store, make_remote, temp_dir):
+        """Test concurrent jobs for one repository share a single mirror clone."""
+        url, _, sha = make_remote("app", {"pkg/app.py": b"print(1)\n"})
+        dests = [os.path.join(temp_dir, f"job{n}") for n in range(4)]
+
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            results = list(pool.map(lambda dest: store.checkout(url, dest), dests))
+
+        assert [commit_sha for _, commit_sha in results] == [sha] * 4
+        assert all(_files(dest) == ["pkg/app.py"] for dest in dests)
+        assert store.stats()["misses"] == 1 and store.stats()["hits"] == 3
+
+    def test_lru_eviction_skips_mirrors_in_use(self, temp_dir, make_remote):
+        """Test mirrors are evicted least recently used first, except those with worktrees."""
+        store = MirrorStore(os.path.join(temp_dir, "mirrors"), max_bytes=1)
+        url_a, _, _ = make_remote("a", {"a.py": b"a = 1\n"})
+        url_b, _, _ = make_remote("b", {"b.py": b"b = 1\n"})
+        url_c, _, _ = make_remote("c", {"c.py": b"c = 1\n"})
+
+        held, _ = store.checkout(url_a, os.path.join(temp_dir, "a"))
+        store.release(store.checkout(url_b, os.path.join(temp_dir, "b"))[0])
+        store.release(store.checkout(url_c, os.path.join(temp_dir, "c"))[0])
+
+        assert os.path.isdir(store.mirror_path(url_a))
+        assert not os.path.exists(store.mirror_path(url_b))
+        assert store.stats()["evictions"] >= 1
+
+        store.release(held)
+        store.release(store.checkout(url_b, os.path.join(temp_dir, "b2"))[0])
+        assert not os.path.exists(store.mirror_path(url_a))
+
+    def test_failed_clone(self, store, temp_dir):
+        """Test an unreachable repository raises and leaves nothing behind."""
+        url = "file://" + os.path.join(temp_dir, "missing.git")
+
+        with pytest.raises(RepositoryError):
+            store.checkout(url, os.path.join(temp_dir, "job"))
+
+        assert not os.path.exists(store.mirror_path(url))
+        assert store.stats()["mirrors"] == 0 and store._in_use == {}
+
+    def test_existing_mirrors_found_after_restart(self, store, make_remote, temp_dir):
+        """Test a new store instance reuses mirrors left on disk."""
+        url, _, _ = make_remote("app", {"pkg/app.py": b"print(1)\n"})
+        store.release(store.checkout(url, os.path.join(temp_dir, "job1"))[0])
+
+        restarted = MirrorStore(store.root, max_bytes=store.max_bytes)
+        assert restarted.stats()["mirrors"] == 1
+        restarted.checkout(url, os.path.join(temp_dir, "job2"))
+        assert restarted.stats()["hits"] == 1
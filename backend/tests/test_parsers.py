@@ -4,10 +4,16 @@ Unit tests for parser modules.
 Tests radon, pylint, and CLOC parsers with various input scenarios.
 """
 
+import json
 import pytest
 from backend.utils.radon_parser import parse_radon_output
-from backend.utils.pylint_parser import parse_pylint_output
-from backend.utils.cloc_parser import parse_cloc_output
+from backend.utils.pylint_parser import (
+    build_pylint_result,
+    compute_pylint_score,
+    parse_pylint_json_by_file,
+    parse_pylint_output,
+)
+from backend.utils.cloc_parser import aggregate_loc, parse_cloc_output
 
 
 class TestRadonParser:
@@ -98,6 +104,24 @@ Your code has been rated at 5.00/10
         assert result["issue_counts"]["convention"] == 1
         assert result["issue_counts"]["refactor"] == 1
 
+    def test_compute_score(self):
+        """Test pylint's default evaluation expression."""
+        assert compute_pylint_score({"E": 1, "C": 5}, 100) == 9.0
+        assert compute_pylint_score({"W": 50}, 10) == 0.0
+        assert compute_pylint_score({"F": 1}, 100) == 0.0
+
+    def test_build_result(self):
+        """Test per-file results aggregate into the report structure."""
+        per_file = [
+            {"issues": [{"code": "C0114"}], "counts": {"C": 1}},
+            {"issues": [{"code": "E1101"}], "counts": {"E": 1}},
+        ]
+        result = build_pylint_result(per_file, 20)
+
+        assert result["score"] == 7.0
+        assert result["issue_counts"] == {"error": 1, "warning": 0, "convention": 1, "refactor": 0}
+        assert result["total_issues"] == 2
+
 
 class TestClocParser:
     """Tests for CLOC output parser."""
@@ -142,3 +166,88 @@ class TestClocParser:
         assert len(result["languages"]) == 2
         assert "Python" in result["languages"]
         assert "JavaScript" in result["languages"]
+
+    def test_aggregate_loc(self):
+        """Test per-file counts aggregate into the CLOC structure by language."""
+        per_file = {
+            "pkg/a.py": {"language": "Python", "code": 10, "comment": 1, "blank": 2},
+            "web/app.js": {"language": "JavaScript", "code": 5, "comment": 0, "blank": 0},
+        }
+        result = aggregate_loc(per_file)
+
+        assert result["code"] == 15
+        assert result["total_files"] == 2
+        assert result["languages"]["Python"] == {"code": 10, "comment": 1, "blank": 2, "files": 1}
+
+
+def _json_message(path, code, symbol, message, line=1):
+    kinds = {"C": "convention", "W": "warning", "E": "error", "R": "refactor", "I": "info"}
+    return {
+        "type": kinds[code[0]], "symbol": symbol, "message": message, "messageId": code,
+        "confidence": "HIGH", "module": path[:-3].replace("/", "."), "obj": "",
+        "line": line, "column": 4, "endLine": line, "endColumn": 9,
+        "path": path, "absolutePath": f"/repo/{path}",
+    }
+
+
+@pytest.fixture
+def pylint_json_output() -> str:
+    """Pylint json2 output, pretty-printed as the reporter prints it."""
+    return json.dumps({
+        "messages": [
+            _json_message("pkg/a.py", "C0114", "missing-module-docstring", "Missing module docstring"),
+            _json_message("pkg/a.py", "W0511", "fixme", "TODO: handle a:b: c {x}", line=3),
+            _json_message("pkg/b.py", "E1101", "no-member", "Instance of 'dict' has no 'x' member"),
+            _json_message("pkg/b.py", "I0021", "useless-suppression", "Useless suppression"),
+        ],
+        "statistics": {
+            "messageTypeCount": {"fatal": 0, "error": 1, "warning": 1, "refactor": 0, "convention": 1, "info": 1},
+            "modulesLinted": 2,
+            "score": 3.3333333,
+        },
+    }, indent=4)
+
+
+class TestPylintJsonParser:
+    """Tests for the pylint json2 parser."""
+
+    def test_parse_by_file(self, pylint_json_output):
+        """Test issues are grouped per file with counts per category, info messages left out."""
+        result = parse_pylint_json_by_file(pylint_json_output)
+
+        assert result is not None
+        assert set(result) == {"pkg/a.py", "pkg/b.py"}
+        assert result["pkg/a.py"]["counts"] == {"C": 1, "W": 1}
+        assert result["pkg/b.py"]["counts"] == {"E": 1}
+        assert len(result["pkg/a.py"]["issues"]) == 2
+        fixme = result["pkg/a.py"]["issues"][1]
+        assert fixme["message"] == "TODO: handle a:b: c {x}"
+        assert (fixme["symbol"], fixme["line"], fixme["end_line"], fixme["end_column"]) == ("fixme", 3, 3, 9)
+
+    def test_compact_output(self, pylint_json_output):
+        """Test output that is not pretty-printed parses the same."""
+        compact = json.dumps(json.loads(pylint_json_output))
+        assert parse_pylint_json_by_file(compact) == parse_pylint_json_by_file(pylint_json_output)
+
+    def test_reported_issues_bounded(self):
+        """Test only the reported issues are kept, however many messages there are."""
+        messages = [
+            _json_message(f"pkg/m{n % 10}.py", "C0103", "invalid-name", "Invalid name", line=n) for n in range(10000)
+        ]
+        output = json.dumps({"messages": messages, "statistics": {"score": 0}})
+
+        result = parse_pylint_json_by_file(output)
+        assert result is not None
+        assert all(entry["counts"] == {"C": 1000} for entry in result.values())
+        assert all(len(entry["issues"]) == 50 for entry in result.values())
+
+    def test_incomplete_output(self, pylint_json_output):
+        """Test output cut off, or without statistics, is treated as a failed run."""
+        lines = pylint_json_output.split("\n")
+        cut = lines[:lines.index('    "statistics": {') + 2]
+        without_statistics = json.dumps({"messages": json.loads(pylint_json_output)["messages"]})
+
+        assert parse_pylint_json_by_file("\n".join(cut)) is None
+        assert parse_pylint_json_by_file(without_statistics) is None
+        assert parse_pylint_json_by_file("not json") is None
+
@@ -0,0 +1,89 @@
+"""
+Unit tests for the asyncio subprocess runner.
+
+Tests output capture, the output cap and that timeouts and cancellation
+kill the whole process group.
+"""
+
+import asyncio
+import os
+import sys
+import time
+import pytest
+from backend.services import process_runner
+from backend.services.process_runner import run_process
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="uses POSIX process groups")
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+async def _wait_dead(pid: int, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while _alive(pid) and time.monotonic() < deadline:
+        await asyncio.sleep(0.02)
+    return not _alive(pid)
+
+
+@pytest.mark.asyncio
+class TestRunProcess:
+    """Tests for run_process."""
+
+    async def test_captures_output_and_exit_code(self, temp_dir):
+        """Test stdout, stderr and the exit code are returned."""
+        result = await run_process(
+            [sys.executable, "-c", "import os, sys; print(os.getcwd()); sys.stderr.write('err'); sys.exit(3)"],
+            cwd=temp_dir,
+        )
+        assert result.exit_code == 3
+        assert result.stdout.strip() == os.path.realpath(temp_dir)
+        assert result.stderr == "err"
+        assert not result.timed_out and not result.truncated
+
+    async def test_output_capped_and_spilled(self, monkeypatch):
+        """Test capture stops at the cap while the process still runs to completion."""
+        monkeypatch.setattr(process_runner, "SPOOL_MEMORY_BYTES", 1024)
+        result = await run_process(
+            [sys.executable, "-c", "import sys; sys.stdout.write('x' * 500000); print('done', file=sys.stderr)"],
+            max_output_bytes=100000,
+        )
+        assert result.exit_code == 0
+        assert len(result.stdout) == 100000
+        assert result.truncated
+        assert result.stderr.strip() == "done"
+
+    async def test_timeout_kills_process_group(self, temp_dir):
+        """Test a timeout kills the tool and the children it started."""
+        pid_file = os.path.join(temp_dir, "child.pid")
+        script = (
+            "import subprocess, sys, time\n"
+            "child = subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)'])\n"
+            f"open({pid_file!r}, 'w').write(str(child.pid))\n"
+            "time.sleep(30)\n"
+        )
+        started = time.monotonic()
+        result = await run_process([sys.executable, "-c", script], timeout=0.5)
+
+        assert result.timed_out
+        assert time.monotonic() - started < 10
+        with open(pid_file) as f:
+            assert await _wait_dead(int(f.read()))
+
+    async def test_cancellation_kills_process(self, temp_dir):
+        """Test cancelling the awaiting task kills the process."""
+        pid_file = os.path.join(temp_dir, "tool.pid")
+        script = f"import os, time; open({pid_file!r}, 'w').write(str(os.getpid())); time.sleep(30)"
+        task = asyncio.create_task(run_process([sys.executable, "-c", script]))
+        while not os.path.exists(pid_file) or not os.path.getsize(pid_file):
+            await asyncio.sleep(0.02)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        with open(pid_file) as f:
+            assert await _wait_dead(int(f.read()))
@@ -0,0 +1,55 @@
+"""
+Unit tests for the per-client rate limiter.
+"""
+
+import pytest
+from backend.utils.exceptions import RateLimitError
+from backend.utils.rate_limiter import RateLimiter
+
+
+class FakeClock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRateLimiter:
+    """Tests for RateLimiter."""
+
+    def test_limit_per_client(self):
+        """Test a client is rejected past its limit while others are not."""
+        limiter = RateLimiter(2, 60, clock=FakeClock())
+        limiter.check("a")
+        limiter.check("a")
+
+        with pytest.raises(RateLimitError) as exc_info:
+            limiter.check("a")
+        assert exc_info.value.status_code == 429
+        assert exc_info.value.details["retry_after_seconds"] == 60
+        limiter.check("b")
+
+    def test_window_slides(self):
+        """Test requests leave the window and Retry-After counts down to that."""
+        clock = FakeClock()
+        limiter = RateLimiter(2, 60, clock=clock)
+        limiter.check("a")
+        clock.now = 40
+        limiter.check("a")
+
+        clock.now = 50
+        with pytest.raises(RateLimitError) as exc_info:
+            limiter.check("a")
+        assert exc_info.value.details["retry_after_seconds"] == 10
+
+        clock.now = 61
+        limiter.check("a")
+
+    def test_disabled(self):
+        """Test a disabled limiter allows everything."""
+        limiter = RateLimiter(1, 60, enabled=False)
+        for _ in range(5):
+            limiter.check("a")
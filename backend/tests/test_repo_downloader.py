@@ -0,0 +1,163 @@
+"""
+Unit tests for repository helpers.
+
+Tests remote HEAD resolution and its TTL cache without network access,
+and cloning (full and sparse) from a local repository.
+"""
+
+import os
+import pytest
+from git import GitCommandError
+from backend.utils import repo_downloader
+from backend.utils.exceptions import RepositoryError
+
+
+@pytest.fixture(autouse=True)
+def clear_remote_cache():
+    """Start every test with an empty remote HEAD cache."""
+    repo_downloader._remote_head_cache.clear()
+    yield
+    repo_downloader._remote_head_cache.clear()
+
+
+class TestResolveRemoteHead:
+    """Tests for resolve_remote_head."""
+
+    def test_resolves_sha(self, mocker):
+        """Test the SHA is taken from ls-remote output."""
+        git = mocker.patch.object(repo_downloader, "Git")
+        git.return_value.ls_remote.return_value = "abc123\tHEAD"
+
+        assert repo_downloader.resolve_remote_head("https://github.com/owner/repo") == "abc123"
+
+    def test_result_is_cached(self, mocker):
+        """Test repeated lookups within the TTL skip ls-remote."""
+        git = mocker.patch.object(repo_downloader, "Git")
+        git.return_value.ls_remote.return_value = "abc123\tHEAD"
+
+        repo_downloader.resolve_remote_head("https://github.com/owner/repo")
+        repo_downloader.resolve_remote_head("https://github.com/owner/repo.git")
+
+        assert git.return_value.ls_remote.call_count == 1
+
+    def test_expired_entry_is_refreshed(self, mocker):
+        """Test a zero TTL always queries the remote."""
+        git = mocker.patch.object(repo_downloader, "Git")
+        git.return_value.ls_remote.return_value = "abc123\tHEAD"
+
+        repo_downloader.resolve_remote_head("https://github.com/owner/repo", ttl_seconds=0)
+        repo_downloader.resolve_remote_head("https://github.com/owner/repo", ttl_seconds=0)
+
+        assert git.return_value.ls_remote.call_count == 2
+
+    def test_git_failure_raises(self, mocker):
+        """Test ls-remote failures surface as RepositoryError."""
+        git = mocker.patch.object(repo_downloader, "Git")
+        git.return_value.ls_remote.side_effect = GitCommandError("ls-remote", 128)
+
+        with pytest.raises(RepositoryError):
+            repo_downloader.resolve_remote_head("https://github.com/owner/repo")
+
+
+def _write(root, rel_path, content: bytes):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(content)
+
+
+@pytest.fixture
+def remote(make_remote):
+    """A served repository with source files, a vendored directory and a large asset."""
+    url, _, _ = make_remote("repo", {
+        "pkg/app.py": b"print('hi')\n",
+        "pkg/Legacy.PY": b"x = 1\n",
+        "Dockerfile": b"FROM python:3.11\n",
+        ".pylintrc": b"[MAIN]\n",
+        "node_modules/lib/index.js": b"module.exports = 1;\n",
+        "assets/data.bin": os.urandom(2 * 1024 * 1024),
+    })
+    return url
+
+
+def _checked_out(path):
+    return sorted(
+        os.path.relpath(os.path.join(root, name), path).replace(os.sep, "/")
+        for root, dirs, names in os.walk(path)
+        if ".git" not in root.split(os.sep)
+        for name in names
+    )
+
+
+class TestLocalCommitSha:
+    """Tests for identifying a local checkout by its HEAD commit."""
+
+    def test_untracked_source_file_is_dirty(self, temp_dir, git, commit_files):
+        """Test untracked files the analyzers read make a checkout unidentifiable, others do not."""
+        git(temp_dir, "init", "-q")
+        sha = commit_files(temp_dir, {"app.py": b"print(1)\n"})
+        _write(temp_dir, "node_modules/lib.js", b"module.exports = 1;\n")
+        _write(temp_dir, "logo.png", b"\x89PNG")
+
+        assert repo_downloader.local_commit_sha(temp_dir, ["node_modules"]) == sha
+
+        _write(temp_dir, "pkg/new.py", b"print(3)\n")
+        assert repo_downloader.local_commit_sha(temp_dir, ["node_modules"]) is None
+
+
+class TestCloneRepo:
+    """Tests for clone_repo against a local remote."""
+
+    def test_full_clone(self, remote, temp_dir):
+        """Test a full clone checks out every file."""
+        dest = os.path.join(temp_dir, "full")
+        path, sha = repo_downloader.clone_repo(remote, dest)
+
+        assert path == dest and len(sha) == 40
+        assert "assets/data.bin" in _checked_out(dest)
+
+    def test_sparse_clone_fetches_only_analyzable_files(self, remote, temp_dir, git):
+        """Test a sparse clone leaves out assets and excluded directories, without fetching them."""
+        dest = os.path.join(temp_dir, "sparse")
+        repo_downloader.clone_repo(remote, dest, sparse=True, exclude_dirs=["node_modules"])
+
+        assert _checked_out(dest) == [".pylintrc", "Dockerfile", "pkg/Legacy.PY", "pkg/app.py"]
+        missing = git(dest, "rev-list", "--objects", "--missing=print", "HEAD")
+        assert len([line for line in missing.splitlines() if line.startswith("?")]) == 2
+
+    def test_size_limit_checked_before_checkout(self, remote, temp_dir):
+        """Test a checkout over the size limit is refused before any file is written."""
+        dest = os.path.join(temp_dir, "big")
+        with pytest.raises(RepositoryError) as exc:
+            repo_downloader.clone_repo(remote, dest, max_size_mb=1)
+
+        assert exc.value.details["max_size_mb"] == 1
+        assert _checked_out(dest) == []
+
+    def test_sparse_size_counts_selected_files(self, remote, temp_dir):
+        """Test files left out of a sparse checkout do not count against the limit."""
+        dest = os.path.join(temp_dir, "sparse")
+        repo_downloader.clone_repo(remote, dest, sparse=True, max_size_mb=1)
+
+        assert "pkg/app.py" in _checked_out(dest)
+
+    def test_oversized_sparse_checkout_stops_fetching(self, make_remote, temp_dir, git, monkeypatch):
+        """Test fetching stops at the batch of blobs that takes a checkout over the limit."""
+        url, _, _ = make_remote("big", {f"mod{i}.py": os.urandom(600 * 1024) for i in range(4)})
+        monkeypatch.setattr(repo_downloader, "FETCH_BATCH_BLOBS", 1)
+        dest = os.path.join(temp_dir, "sparse")
+        with pytest.raises(RepositoryError):
+            repo_downloader.clone_repo(url, dest, sparse=True, max_size_mb=1)
+
+        missing = git(dest, "rev-list", "--objects", "--missing=print", "HEAD")
+        assert len([line for line in missing.splitlines() if line.startswith("?")]) == 1
+        assert _checked_out(dest) == []
+
+    def test_patterns_match_predicate(self):
+        """Test the sparse patterns and the path predicate agree on excluded directories."""
+        patterns = repo_downloader.sparse_checkout_patterns(["node_modules"])
+
+        assert "*.[pP][yY]" in patterns and "!**/node_modules/**" in patterns
+        assert repo_downloader.is_analyzable_path("a/b.Py", {"node_modules"})
+        assert not repo_downloader.is_analyzable_path("a/node_modules/b.py", {"node_modules"})
+        assert not repo_downloader.is_analyzable_path("logo.png")
@@ -0,0 +1,127 @@
+"""
+Unit tests for the content-addressed file result cache.
+
+Tests storage, hit/miss accounting, eviction and cache use by the
+complexity engine and line counter.
+"""
+
+import os
+import sqlite3
+import pytest
+from backend.services import db_service, file_metrics, result_cache
+from backend.services.file_walker import walk_repository
+from backend.services.result_cache import FileResultCache, config_hash
+
+
+def _write(root, rel_path, content):
+    path = os.path.join(root, rel_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as f:
+        f.write(content)
+
+
+class TestFileResultCache:
+    """Tests for FileResultCache."""
+
+    def test_round_trip_and_counters(self, temp_db):
+        """Test stored results are returned and lookups are counted."""
+        cache = FileResultCache(max_bytes=1024 * 1024)
+        cache.put_many("cloc", "1.0", {("blob1", "cfg"): {"code": 3}})
+
+        found = cache.get_many("cloc", "1.0", [("blob1", "cfg"), ("blob2", "cfg")])
+
+        assert found == {("blob1", "cfg"): {"code": 3}}
+        stats = cache.stats()
+        assert stats["hits"] == {"cloc": 1}
+        assert stats["misses"] == {"cloc": 1}
+        assert stats["entries"] == 1
+
+    def test_key_includes_version_and_config(self, temp_db):
+        """Test results from another tool version or configuration are not returned."""
+        cache = FileResultCache(max_bytes=1024 * 1024)
+        cache.put_many("cloc", "1.0", {("blob1", "cfg"): {"code": 3}})
+
+        assert cache.get_many("cloc", "2.0", [("blob1", "cfg")]) == {}
+        assert cache.get_many("cloc", "1.0", [("blob1", "other")]) == {}
+        assert cache.get_many("complexity", "1.0", [("blob1", "cfg")]) == {}
+
+    def test_evicts_least_recently_used(self, temp_db):
+        """Test the cache is trimmed to its budget, keeping recently used entries."""
+        cache = FileResultCache(max_bytes=10 ** 9)
+        payload = {"data": os.urandom(2000).hex()}
+        for i in range(3):
+            cache.put_many("t", "1", {(f"blob{i}", "c"): payload})
+        cache.get_many("t", "1", [("blob0", "c")])
+
+        cache.max_bytes = cache.stats()["size_bytes"] - 1
+        cache.put_many("t", "1", {("blob3", "c"): {"small": 1}})
+
+        remaining = cache.get_many("t", "1", [(f"blob{i}", "c") for i in range(4)])
+        assert ("blob1", "c") not in remaining
+        assert {("blob0", "c"), ("blob3", "c")} <= set(remaining)
+        assert cache.stats()["evictions"] >= 1
+
+    def test_size_kept_without_scanning(self, temp_db, mocker):
+        """Test the running size matches the stored entries and eviction only runs over budget."""
+        cache = FileResultCache(max_bytes=10 ** 9)
+        evict = mocker.spy(result_cache, "evict_cached_results")
+        cache.put_many("t", "1", {("blob0", "c"): {"v": "x" * 500}, ("blob1", "c"): {"v": 1}})
+        cache.put_many("t", "1", {("blob0", "c"): {"v": 2}})
+        assert not evict.called
+
+        cache.max_bytes = 1
+        cache.put_many("t", "1", {("blob2", "c"): {"v": 3}})
+
+        conn = sqlite3.connect(temp_db)
+        actual = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM file_cache").fetchone()
+        conn.close()
+        assert evict.call_count == 1
+        assert db_service.get_cache_size() == actual
+        assert actual[1] <= 1
+
+    def test_disabled(self, temp_db):
+        """Test a disabled cache neither stores nor counts."""
+        cache = FileResultCache(max_bytes=1024, enabled=False)
+        cache.put_many("t", "1", {("blob", "c"): {}})
+
+        assert cache.get_many("t", "1", [("blob", "c")]) == {}
+        assert cache.stats()["hits"] == {}
+
+    def test_config_hash_is_stable(self):
+        """Test configuration hashes do not depend on dict ordering."""
+        assert config_hash({"a": 1, "b": 2}) == config_hash({"b": 2, "a": 1})
+        assert config_hash("x") != config_hash("y")
+
+
+@pytest.mark.asyncio
+class TestEngineCache:
+    """Tests for cached complexity analysis and line counts."""
+
+    async def test_hits_skip_analysis(self, temp_db, temp_dir, mocker):
+        """Test cached files are not read again, even under another path."""
+        source = "def f(x):\n    if x:\n        return 1\n    return 0\n"
+        _write(temp_dir, "a/mod.py", source)
+        cache = FileResultCache(max_bytes=1024 * 1024)
+        first, first_loc = await file_metrics.measure_files(walk_repository(temp_dir, []), cache=cache)
+
+        _write(temp_dir, "b/copy.py", source)
+        spy = mocker.spy(file_metrics, "_measure_chunk")
+        second, second_loc = await file_metrics.measure_files(walk_repository(temp_dir, []), cache=cache)
+
+        assert spy.call_args.args[0] == []
+        assert second["a/mod.py"] == first["a/mod.py"]
+        assert second["b/copy.py"]["blocks"][0]["file"] == "b/copy.py"
+        assert second_loc["b/copy.py"] == first_loc["a/mod.py"]
+        # Both files share one blob, looked up once
+        assert cache.stats()["hits"] == {"complexity": 1, "loc": 1}
+
+    async def test_duplicates_analyzed_once(self, temp_dir, mocker):
+        """Test identical files in one tree are read and parsed once."""
+        for name in ("one.py", "two.py"):
+            _write(temp_dir, name, "x = 1\n")
+        spy = mocker.spy(file_metrics, "_measure_chunk")
+
+        results, loc = await file_metrics.measure_files(walk_repository(temp_dir, []))
+
+        assert len(spy.call_args.args[0]) == 1
+        assert set(results) == set(loc) == {"one.py", "two.py"}
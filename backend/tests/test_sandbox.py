@@ -0,0 +1,358 @@
+"""
+Unit tests for the warm sandbox container pool.
+
+Uses an in-memory stand-in for the Docker client so container reuse,
+health checks, recycling, file copies and per-analysis sessions can be
+tested without a daemon.
+"""
+
+import os
+import tarfile
+import threading
+import uuid
+from collections import namedtuple
+from types import SimpleNamespace
+from typing import Any, Dict
+import pytest
+from backend.services.sandbox import (
+    REPO_MOUNT, RESET_COMMAND, SANDBOX_UID, SCRATCH_DIRS, SandboxPool, dedicated_session
+)
+from backend.utils.exceptions import TimeoutError
+
+# Shape of docker's Container.exec_run return value
+ExecResult = namedtuple("ExecResult", ["exit_code", "output"])
+
+
+class FakeExecAPI:
+    """Low-level exec calls, answered by the container's exec_run with the output in one chunk."""
+
+    def __init__(self, container):
+        self.container = container
+        self.execs = {}
+
+    def exec_create(self, container_id, cmd, workdir=None):
+        assert container_id == self.container.id
+        exec_id = uuid.uuid4().hex
+        self.execs[exec_id] = {"cmd": cmd, "workdir": workdir}
+        return {"Id": exec_id}
+
+    def exec_start(self, exec_id, stream=False, demux=False):
+        assert stream and demux
+        entry = self.execs[exec_id]
+        entry["exit_code"], output = self.container.exec_run(entry["cmd"], workdir=entry["workdir"], demux=True)
+        return iter([output])
+
+    def exec_inspect(self, exec_id):
+        return {"ExitCode": self.execs[exec_id]["exit_code"]}
+
+
+class FakeContainer:
+    """Records exec calls and archives like a running container would receive them."""
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = "running"
+        self.removed = False
+        self.execs = []
+        self.files = {}
+        self.copied = set()
+        self.client = SimpleNamespace(api=FakeExecAPI(self))
+        self.run_kwargs: Dict[str, Any] = {}
+
+    def exec_run(self, cmd, workdir=None, demux=False):
+        self.execs.append(cmd)
+        if cmd == RESET_COMMAND:
+            self.files = {
+                path: data for path, data in self.files.items()
+                if not any(path.startswith(root + "/") for root in SCRATCH_DIRS)
+            }
+        return ExecResult(0, (b"out", b"") if demux else b"")
+
+    def write(self, path, data):
+        """Write a file as a job would; only the tmpfs scratch mounts are writable."""
+        if not any(path.startswith(root + "/") for root in SCRATCH_DIRS):
+            raise PermissionError(f"Read-only file system: {path}")
+        self.files[path] = data
+
+    def put_archive(self, path, data):
+        with tarfile.open(fileobj=data) as tar:
+            for member in tar.getmembers():
+                if member.isfile():
+                    target = os.path.normpath(os.path.join(path, member.name))
+                    source = tar.extractfile(member)
+                    assert source is not None
+                    self.files[target] = source.read()
+                    self.copied.add(target)
+        return True
+
+    def reload(self):
+        pass
+
+    def remove(self, force=False):
+        self.removed = True
+
+
+class FakeClient:
+    """Minimal docker client exposing containers.run."""
+
+    def __init__(self):
+        self.created = []
+        self.fail_create = False
+        self.containers = SimpleNamespace(run=self._run)
+
+    def _run(self, image, **kwargs):
+        if self.fail_create:
+            raise RuntimeError("image not found")
+        assert kwargs["detach"] and kwargs["network_mode"] == "none"
+        container = FakeContainer()
+        container.run_kwargs = kwargs
+        self.created.append(container)
+        return container
+
+
+def _pool(client, **overrides):
+    options: Dict[str, Any] = dict(size=2, max_jobs_per_container=3, mem_limit="512m", exec_timeout=60,
+                                   health_check_interval=0)
+    options.update(overrides)
+    return SandboxPool(client, "devpulse-sandbox", **options)
+
+
+class TestSandboxPool:
+    """Tests for SandboxPool."""
+
+    def test_start_creates_containers(self):
+        """Test the pool pre-starts its configured number of containers."""
+        client = FakeClient()
+        pool = _pool(client)
+        pool.start()
+        pool.start()
+
+        assert len(client.created) == 2
+        assert pool.stats()["idle"] == 2
+
+    def test_containers_are_reused(self):
+        """Test jobs run in existing containers instead of new ones."""
+        client = FakeClient()
+        pool = _pool(client, size=1, max_jobs_per_container=10)
+
+        for _ in range(3):
+            with pool.acquire():
+                pass
+
+        assert len(client.created) == 1
+        assert pool.stats()["jobs"] == 3
+
+    def test_recycled_after_max_jobs(self):
+        """Test a container is replaced once it ran its job limit."""
+        client = FakeClient()
+        pool = _pool(client, size=1, max_jobs_per_container=2)
+
+        for _ in range(2):
+            with pool.acquire():
+                pass
+
+        assert client.created[0].removed
+        assert len(client.created) == 2
+        assert pool.stats()["containers_recycled"] == 1
+
+    def test_failed_job_replaces_container(self):
+        """Test a container is not reused after a job failed in it."""
+        client = FakeClient()
+        pool = _pool(client, size=1)
+
+        with pytest.raises(RuntimeError):
+            with pool.acquire():
+                raise RuntimeError("tool crashed")
+
+        assert client.created[0].removed
+        assert pool.stats()["failed_jobs"] == 1
+        assert pool.stats()["idle"] == 1
+
+    def test_unhealthy_container_skipped(self):
+        """Test containers that stopped are replaced before being handed out."""
+        client = FakeClient()
+        pool = _pool(client, size=1)
+        pool.start()
+        client.created[0].status = "exited"
+
+        with pool.acquire() as pooled:
+            assert pooled.container is client.created[1]
+
+        assert pool.stats()["unhealthy"] == 1
+
+    def test_acquire_times_out(self):
+        """Test waiting for a busy pool gives up after the timeout."""
+        pool = _pool(FakeClient(), size=1)
+        with pool.acquire():
+            with pytest.raises(TimeoutError):
+                with pool.acquire(timeout=0.05):
+                    pass
+
+    def test_recovers_after_failed_start(self):
+        """Test containers that could not be started are created on demand later."""
+        client = FakeClient()
+        client.fail_create = True
+        pool = _pool(client, size=1)
+        pool.start()
+        client.fail_create = False
+
+        with pool.acquire():
+            pass
+        assert len(client.created) == 1
+
+    def test_concurrent_jobs_bounded_by_size(self):
+        """Test no more containers than the pool size are ever busy."""
+        client = FakeClient()
+        pool = _pool(client, size=2, max_jobs_per_container=100)
+        peak = []
+
+        def job():
+            with pool.acquire(timeout=5):
+                peak.append(pool.stats()["busy"])
+
+        threads = [threading.Thread(target=job) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        assert max(peak) <= 2
+        assert len(client.created) == 2
+
+    def test_containers_unprivileged_and_read_only(self):
+        """Test pooled containers run as an unprivileged user with only tmpfs mounts writable."""
+        client = FakeClient()
+        with _pool(client, size=1).acquire():
+            pass
+
+        run_kwargs = client.created[0].run_kwargs
+        assert run_kwargs["user"] == f"{SANDBOX_UID}:{SANDBOX_UID}"
+        assert run_kwargs["read_only"] is True
+        assert set(run_kwargs["tmpfs"]) == set(SCRATCH_DIRS)
+        assert all(options.endswith(",size=512m") for options in run_kwargs["tmpfs"].values())
+
+    def test_job_leftovers_not_visible_to_next_job(self, temp_dir):
+        """Test files a job writes outside its work directory are gone before the next job."""
+        client = FakeClient()
+        pool = _pool(client, size=1, max_jobs_per_container=10)
+
+        with pool.session(temp_dir) as session:
+            container = client.created[0]
+            with pytest.raises(PermissionError):
+                container.write("/usr/lib/python3/sitecustomize.py", b"import evil")
+            container.write("/tmp/sitecustomize.py", b"import evil")
+            container.write(f"{session.work_dir}/../plugin.py", b"import evil")
+
+        with pool.session(temp_dir):
+            assert client.created == [container]
+            assert container.files == {}
+        assert container.execs.count(RESET_COMMAND) == 2
+
+    def test_recycled_when_reset_fails(self):
+        """Test a container that could not be reset after a job is replaced."""
+        client = FakeClient()
+        pool = _pool(client, size=1, max_jobs_per_container=10)
+        pool.start()
+        client.created[0].exec_run = lambda cmd, **kwargs: ExecResult(1 if cmd == RESET_COMMAND else 0, b"")
+
+        with pool.acquire():
+            pass
+
+        assert len(client.created) == 2
+        assert client.created[0].removed
+
+    def test_session_copies_files_and_cleans_up(self, temp_dir):
+        """Test a session copies the directory, executes in it and removes it."""
+        os.makedirs(os.path.join(temp_dir, "pkg"))
+        os.makedirs(os.path.join(temp_dir, ".git"))
+        with open(os.path.join(temp_dir, "pkg", "a.py"), "w") as f:
+            f.write("x = 1\n")
+        with open(os.path.join(temp_dir, ".git", "HEAD"), "w") as f:
+            f.write("ref")
+        client = FakeClient()
+        pool = _pool(client, size=1, health_check_interval=60)
+
+        with pool.session(temp_dir) as session:
+            result = session.exec(["pylint", "."])
+
+        container = client.created[0]
+        work_dir = container.execs[0][-1]
+        assert result.stdout == "out"
+        assert container.copied == {f"{work_dir}/pkg/a.py"}
+        assert container.execs[1][:2] == ["timeout", "60"]
+        assert container.execs[-2] == ["rm", "-rf", work_dir]
+        assert container.execs[-1] == RESET_COMMAND
+        assert pool.stats()["utilisation"] >= 0
+
+
+class ToolContainer(FakeContainer):
+    """Container whose commands print their tool name, or fail for "crash"."""
+
+    def exec_run(self, cmd, workdir=None, demux=False):
+        self.execs.append(cmd)
+        tool = cmd[2]
+        if tool == "crash":
+            raise RuntimeError("exec failed")
+        return ExecResult(1 if tool == "pylint" else 0, (tool.encode(), b""))
+
+
+class TestSandboxSession:
+    """Tests for running an analysis' tools in one container."""
+
+    def test_tools_share_one_container(self, temp_dir):
+        """Test every tool runs in the same container with outputs tagged per tool."""
+        client = FakeClient()
+        pool = _pool(client, size=1, health_check_interval=60)
+
+        def _run(image, **kwargs):
+            client.created.append(ToolContainer())
+            return client.created[-1]
+
+        client.containers.run = _run
+
+        with pool.session(temp_dir) as session:
+            results = session.run_tools({
+                "pylint": ["pylint", temp_dir],
+                "radon": ["radon", "cc", "."],
+                "broken": ["crash"],
+            })
+
+        assert len(client.created) == 1
+        assert results["pylint"].stdout == "pylint" and results["pylint"].exit_code == 1
+        assert results["radon"].stdout == "radon"
+        assert results["broken"].exit_code == -1 and "exec failed" in results["broken"].stderr
+        pylint_exec = next(cmd for cmd in client.created[0].execs if cmd[2] == "pylint")
+        assert pylint_exec[-1] == session.work_dir
+
+    def test_output_capped(self, temp_dir):
+        """Test output past the cap is discarded per stream and the result marked truncated."""
+        client = FakeClient()
+        pool = _pool(client, size=1, max_output_bytes=4)
+        pool.start()
+        container = client.created[0]
+        container.client.api.exec_start = lambda exec_id, **kwargs: iter([
+            (b"abc", None), (b"def", b"e"), (None, b"rr")
+        ])
+        container.client.api.exec_inspect = lambda exec_id: {"ExitCode": 0}
+
+        with pool.session(temp_dir) as session:
+            result = session.exec(["pylint", "."])
+
+        assert (result.stdout, result.stderr) == ("abcd", "err")
+        assert result.truncated
+
+    def test_dedicated_session_mounts_read_only(self, temp_dir):
+        """Test a dedicated container mounts the repository read-only and is removed."""
+        client = FakeClient()
+
+        with dedicated_session(client, "devpulse-sandbox", temp_dir, "512m", 60) as session:
+            result = session.exec(["pylint", temp_dir])
+
+        container = client.created[0]
+        assert container.run_kwargs["network_mode"] == "none"
+        assert container.run_kwargs["volumes"] == {
+            os.path.abspath(temp_dir): {"bind": REPO_MOUNT, "mode": "ro"}
+        }
+        assert container.execs[0] == ["timeout", "60", "pylint", REPO_MOUNT]
+        assert result.stdout == "out"
+        assert container.removed
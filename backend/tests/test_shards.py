@@ -0,0 +1,202 @@
+"""
+Unit tests for monorepo sharding.
+
+Tests shard detection, the shard cache keys, packing shards into pylint
+processes and per-shard report sections, and a sharded analysis of a local
+directory in which pylint is replaced by a recorder of what it linted.
+"""
+
+import json
+import os
+from typing import Any, Dict, List
+import pytest
+from backend.config import reload_settings
+from backend.services import analyzer
+from backend.services.analyzer import analyze_single_repo
+from backend.services.shards import (
+    ROOT_SHARD, detect_shards, group_by_shard, pack_shards, shard_digests, shard_of, shard_sections
+)
+
+MONOREPO = {
+    "pyproject.toml": "[project]\nname = 'mono'\n",
+    "tools/release.py": "VERSION = 1\n",
+    "libs/shared/setup.py": "from setuptools import setup\n\nsetup()\n",
+    "libs/shared/shared/util.py": "def double(x):\n    return 2 * x\n",
+    "services/api/pyproject.toml": "[project]\nname = 'api'\n",
+    "services/api/app.py": "from shared.util import double\n\nprint(double(2))\n",
+    "web/package.json": "{}\n",
+    "web/index.js": "console.log(1);\n",
+}
+
+
+class TestShardLayout:
+    """Tests for detect_shards, shard_of and group_by_shard."""
+
+    def test_detect_shards(self):
+        """Test directories with a project file are shards and the root always is one."""
+        assert detect_shards(MONOREPO) == [".", "libs/shared", "services/api", "web"]
+        assert detect_shards(["app.py", "lib/util.py"]) == [ROOT_SHARD]
+
+    def test_innermost_shard_wins(self):
+        """Test files belong to the deepest enclosing shard and others to the root."""
+        roots = {".", "libs", "libs/shared"}
+        assert shard_of("libs/shared/shared/util.py", roots) == "libs/shared"
+        assert shard_of("libs/other/x.py", roots) == "libs"
+        assert shard_of("libs.py", roots) == "."
+        assert group_by_shard(["a.py", "libs/b.py"], roots) == {".": ["a.py"], "libs": ["libs/b.py"]}
+
+
+class TestShardDigests:
+    """Tests for shard_digests."""
+
+    BLOBS = {"api/app.py": "a1", "shared/util.py": "u1", "tools/release.py": "r1"}
+    SHARDS = {"api": ["api/app.py"], "shared": ["shared/util.py"], ".": ["tools/release.py"]}
+    IMPORTS = {"api/app.py": ["shared.util"]}
+
+    def test_dependency_changes_key(self):
+        """Test a shard's key changes with the modules it imports but not with unrelated ones."""
+        before = shard_digests(self.SHARDS, self.BLOBS, self.IMPORTS, "cfg")
+        after = shard_digests(self.SHARDS, {**self.BLOBS, "shared/util.py": "u2"}, self.IMPORTS, "cfg")
+
+        assert before["api"] != after["api"]
+        assert before["shared"] != after["shared"]
+        assert before["."] == after["."]
+
+    def test_config_changes_every_key(self):
+        """Test a different pylint configuration changes every shard's key."""
+        before = shard_digests(self.SHARDS, self.BLOBS, self.IMPORTS, "cfg")
+        after = shard_digests(self.SHARDS, self.BLOBS, self.IMPORTS, "other")
+        assert all(before[root] != after[root] for root in self.SHARDS)
+
+
+class TestPackShards:
+    """Tests for pack_shards."""
+
+    def test_balanced_processes(self):
+        """Test shards are spread over at most the given number of processes, largest first."""
+        shards = {"a": ["a/1.py", "a/2.py", "a/3.py"], "b": ["b/1.py", "b/2.py"], "c": ["c/1.py"]}
+
+        assert pack_shards(shards, 2) == [["a/1.py", "a/2.py", "a/3.py"], ["b/1.py", "b/2.py", "c/1.py"]]
+        assert len(pack_shards(shards, 8)) == 3
+        assert pack_shards(shards, 0) == [sorted(p for paths in shards.values() for p in paths)]
+        assert pack_shards({}, 4) == []
+
+
+def test_shard_sections():
+    """Test each shard's section aggregates only its own files."""
+    records: List[Dict[str, Any]] = [
+        {"path": "app.py", "language": "Python", "statements": 4, "blocks": [],
+         "loc": {"language": "Python", "code": 4, "comment": 0, "blank": 0},
+         "pylint": {"issues": [], "counts": {"C": 2}}},
+        {"path": "web/index.js", "language": "JavaScript",
+         "loc": {"language": "JavaScript", "code": 1, "comment": 0, "blank": 0}},
+    ]
+
+    sections = shard_sections(records, [".", "web"], cached={"web"})
+
+    assert [s["root"] for s in sections] == [".", "web"]
+    assert sections[0]["files"] == 1 and sections[0]["pylint"]["total_issues"] == 2
+    assert sections[1]["cloc"]["languages"] == {"JavaScript": {"files": 1, "code": 1, "comment": 0, "blank": 0}}
+    assert sections[1]["pylint_cached"] is True
+    assert "blocks" not in sections[0]["radon"]
+
+
+@pytest.fixture
+def monorepo(temp_dir):
+    for rel_path, content in MONOREPO.items():
+        path = os.path.join(temp_dir, rel_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    return temp_dir
+
+
+@pytest.fixture
+def pylint_processes(mocker, monkeypatch):
+    """Record the paths of every pylint process; each linted module gets one message."""
+    monkeypatch.setenv("SHARD_WORKERS", "4")
+    reload_settings()
+    processes = []
+
+    async def _run(commands, repo_path, timeout=None):
+        outputs = {}
+        for tool, command in commands.items():
+            paths = [arg for arg in command if arg.endswith(".py")]
+            processes.append(paths)
+            messages = [
+                {"type": "convention", "messageId": "C0114", "symbol": "missing-module-docstring",
+                 "message": "Missing module docstring", "path": path, "line": 1, "column": 0}
+                for path in paths
+            ]
+            outputs[tool] = json.dumps({"messages": messages, "statistics": {"score": 9.0}}, indent=2)
+        return outputs
+
+    mocker.patch.object(analyzer, "run_sandboxed_tools", side_effect=_run)
+    mocker.patch.object(analyzer, "generate_ai_metrics", return_value={
+        "ai_probability": 0.0, "ai_risk_notes": "", "recommendations": []
+    })
+    return processes
+
+
+@pytest.mark.asyncio
+class TestShardedAnalysis:
+    """Tests for analyze_single_repo on a repository with subprojects."""
+
+    async def test_shards_linted_in_parallel_and_reported(self, monorepo, pylint_processes, temp_db):
+        """Test every shard is linted by its own process and gets its own section and scores."""
+        result = await analyze_single_repo("local:///mono", local_path=monorepo, incremental=False)
+
+        assert sorted(pylint_processes) == [
+            ["libs/shared/setup.py", "libs/shared/shared/util.py"], ["services/api/app.py"], ["tools/release.py"]
+        ]
+        shards = {s["root"]: s for s in result["shards"]}
+        assert list(shards) == [".", "libs/shared", "services/api", "web"]
+        assert result["pylint"]["total_issues"] == 4
+        assert shards["services/api"]["pylint"]["total_issues"] == 1
+        assert shards["web"]["cloc"]["languages"]["JavaScript"]["code"] == 1
+        assert all(0 <= s["code_health_score"] <= 100 for s in shards.values())
+        assert not any(s["pylint_cached"] for s in shards.values())
+        assert {"tools.pylint", "parsing"} <= set(result["analysis_meta"]["stage_seconds"])
+
+    async def test_unchanged_shards_come_from_cache(self, monorepo, pylint_processes, temp_db):
+        """Test a rerun lints only the shards whose files or dependencies changed."""
+        first = await analyze_single_repo("local:///mono", local_path=monorepo, incremental=False)
+        pylint_processes.clear()
+
+        again = await analyze_single_repo("local:///mono", local_path=monorepo, incremental=False)
+        assert pylint_processes == []
+        assert again["pylint"]["total_issues"] == first["pylint"]["total_issues"]
+        assert all(s["pylint_cached"] for s in again["shards"] if s["root"] != "web")
+
+        with open(os.path.join(monorepo, "libs/shared/shared/util.py"), "a", encoding="utf-8") as f:
+            f.write("\nTRIPLE = 3\n")
+        await analyze_single_repo("local:///mono", local_path=monorepo, incremental=False)
+        # The API imports the changed module, the release tool does not
+        assert sorted(pylint_processes) == [
+            ["libs/shared/setup.py", "libs/shared/shared/util.py"], ["services/api/app.py"]
+        ]
+
+    async def test_single_project_not_sharded(self, monorepo, pylint_processes, temp_db):
+        """Test repositories without subprojects, or with sharding off, are linted as before."""
+        os.remove(os.path.join(monorepo, "web/package.json"))
+        os.remove(os.path.join(monorepo, "libs/shared/setup.py"))
+        os.remove(os.path.join(monorepo, "services/api/pyproject.toml"))
+
+        result = await analyze_single_repo("local:///mono", local_path=monorepo, incremental=False)
+
+        assert result["shards"] is None
+        assert len(pylint_processes) == 1
+
+    @pytest.mark.parametrize("sharded", [True, False])
+    async def test_failed_pylint_marks_report_incomplete(self, monorepo, pylint_processes, temp_db, mocker, sharded):
+        """Test a pylint run that fails leaves the report incomplete instead of clean."""
+        if not sharded:
+            os.remove(os.path.join(monorepo, "web/package.json"))
+            os.remove(os.path.join(monorepo, "libs/shared/setup.py"))
+            os.remove(os.path.join(monorepo, "services/api/pyproject.toml"))
+        mocker.patch.object(analyzer, "run_sandboxed_tools", side_effect=RuntimeError("sandbox unavailable"))
+
+        result = await analyze_single_repo("local:///mono", local_path=monorepo, incremental=False)
+
+        assert result["analysis_meta"]["incomplete_stages"] == ["tools.pylint"]
+        assert result["file_metrics"] is not None
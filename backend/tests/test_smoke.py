@@ -4,9 +4,18 @@ Smoke tests for DevPulse API.
 Basic tests to ensure the application starts and endpoints are accessible.
 """
 
+import hashlib
+import io
+import json
+import os
+import subprocess
+import zipfile
 import pytest
 from fastapi.testclient import TestClient
+from backend.config import reload_settings
 from backend.main import app
+from backend.services.job_queue import Job, JobState, analysis_queue
+from backend.utils.rate_limiter import rate_limiter
 
 client = TestClient(app)
 
@@ -39,6 +48,22 @@ class TestBasicEndpoints:
         response = client.get("/reports/999999")
         assert response.status_code == 404
     
+    def test_stats_endpoint(self):
+        """Test pipeline statistics are exposed."""
+        response = client.get("/stats")
+        assert response.status_code == 200
+        assert "hits" in response.json()["file_cache"]
+        assert "depth" in response.json()["analysis_queue"]
+
+    def test_metrics_endpoint(self):
+        """Test timings and pipeline statistics are exposed in the Prometheus text format."""
+        response = client.get("/metrics")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert "# TYPE devpulse_analysis_stage_seconds histogram" in response.text
+        assert 'devpulse_executor_utilisation{pool="io"}' in response.text
+        assert "devpulse_job_queue_depth 0" in response.text
+
     def test_invalid_report_id(self):
         """Test invalid report ID format."""
         response = client.get("/reports/invalid")
@@ -66,6 +91,309 @@ class TestAnalyzeEndpoint:
         # Should reject non-GitHub URLs
         assert response.status_code in [400, 422, 500]
 
+    def test_analyze_returns_job(self, mocker):
+        """Test analyze endpoint queues a job and returns immediately."""
+        mocker.patch("backend.main.resolve_head", return_value="abc123")
+        mocker.patch("backend.main.find_existing_report", return_value=None)
+        response = client.post("/analyze", json={"repo_url": "https://github.com/test/repo"})
+        assert response.status_code == 202
+        data = response.json()
+        assert data["state"] == "queued"
+        assert data["status_url"] == f"/jobs/{data['job_id']}"
+
+        job = client.get(data["status_url"])
+        assert job.status_code == 200
+        assert job.json()["repo_url"] == "https://github.com/test/repo"
+
+    def test_analyze_returns_stored_report(self, mocker, mock_analysis_result):
+        """Test an already analyzed commit is answered from the database."""
+        report = {"id": 7, **mock_analysis_result}
+        mocker.patch("backend.main.resolve_head", return_value="abc123")
+        mocker.patch("backend.main.find_existing_report", return_value=report)
+
+        response = client.post("/analyze", json={"repo_url": "https://github.com/test/repo"})
+        assert response.status_code == 200
+        data = response.json()
+        assert data["cached"] is True
+        assert data["report_id"] == 7
+
+    def test_unresolved_head_skips_stored_report(self, mocker):
+        """Test a HEAD that cannot be resolved is not looked up a second time."""
+        mocker.patch("backend.main.resolve_head", return_value=None)
+        lookup = mocker.patch("backend.main.find_existing_report")
+
+        response = client.post("/analyze", json={"repo_url": "https://github.com/test/repo"})
+        assert response.status_code == 202
+        lookup.assert_not_called()
+
+    def test_analyze_force_skips_stored_report(self, mocker):
+        """Test force=true always queues a fresh analysis."""
+        lookup = mocker.patch("backend.main.find_existing_report")
+
+        response = client.post(
+            "/analyze?force=true", json={"repo_url": "https://github.com/test/repo"}
+        )
+        assert response.status_code == 202
+        lookup.assert_not_called()
+
+    def test_duplicate_requests_share_job(self, mocker):
+        """Test concurrent requests for the same commit attach to one job."""
+        mocker.patch("backend.main.resolve_head", return_value="coalesce-sha")
+        mocker.patch("backend.main.find_existing_report", return_value=None)
+
+        first = client.post("/analyze", json={"repo_url": "https://github.com/test/repo"}).json()
+        second = client.post("/analyze", json={"repo_url": "https://github.com/test/repo/"}).json()
+
+        assert second["job_id"] == first["job_id"]
+        assert second["coalesced_requests"] == 1
+
+    def test_client_rate_limit(self, mocker):
+        """Test clients over their request limit get 429 with Retry-After."""
+        mocker.patch("backend.main.resolve_head", return_value="abc123")
+        mocker.patch("backend.main.find_existing_report", return_value=None)
+        mocker.patch(
+            "backend.main.analysis_queue.submit",
+            return_value=Job(id="job", repo_url="https://github.com/test/repo"),
+        )
+        mocker.patch.object(rate_limiter, "max_requests", 2)
+
+        codes = [
+            client.post("/analyze", json={"repo_url": "https://github.com/test/repo"})
+            for _ in range(3)
+        ]
+        assert [r.status_code for r in codes[:2]] == [202, 202]
+        assert codes[2].status_code == 429
+        assert int(codes[2].headers["Retry-After"]) >= 1
+
+    def test_job_events_stream(self, mocker):
+        """Test job progress is streamed as server-sent events and resumable."""
+        job = Job(id="job", repo_url="https://github.com/test/repo")
+        job.emit("queued", repo_url=job.repo_url)
+        job.set_stage("cloning")
+        job.state = JobState.SUCCEEDED
+        job.emit("succeeded", report_id=3)
+        mocker.patch("backend.main.analysis_queue.get", return_value=job)
+
+        response = client.get("/jobs/job/events")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert "event: stage_started" in response.text
+        assert 'id: 3\nevent: succeeded\ndata: {"seq": 3, "type": "succeeded"' in response.text
+
+        resumed = client.get("/jobs/job/events", headers={"Last-Event-ID": "2"})
+        assert resumed.text.count("event:") == 1
+
+    def test_job_events_unknown_job(self):
+        """Test streaming events of a non-existent job returns 404."""
+        assert client.get("/jobs/does-not-exist/events").status_code == 404
+
+    def test_batch_streams_results(self, mocker):
+        """Test the batch endpoint streams one line per repository and a summary."""
+        mocker.patch("backend.services.batch.resolve_head", return_value="abc123")
+        mocker.patch("backend.services.batch.find_existing_report", return_value={"id": 5})
+
+        # Entering the client runs the lifespan, which creates the batch slots
+        with TestClient(app) as lifespan_client:
+            response = lifespan_client.post("/analyze/batch", json={"repo_urls": [
+                "https://github.com/test/repo", "https://github.com/test/repo", "https://github.com/test/other"
+            ]})
+        assert response.status_code == 200
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [line["type"] for line in lines] == ["result", "result", "summary"]
+        assert lines[-1]["cached"] == 2 and lines[-1]["duplicates"] == 1
+
+    def test_batch_larger_than_rate_limit(self, mocker):
+        """Test a batch of more repositories than the client's request limit defers none of them."""
+        mocker.patch("backend.services.batch.resolve_head", return_value="abc123")
+        mocker.patch("backend.services.batch.find_existing_report", return_value=None)
+
+        def _submit(repo_url, key, force):
+            job = Job(id=repo_url, repo_url=repo_url)
+            job.state = JobState.SUCCEEDED
+            return job
+
+        mocker.patch.object(analysis_queue, "submit", side_effect=_submit)
+        urls = [f"https://github.com/test/repo{i}" for i in range(rate_limiter.max_requests * 3)]
+
+        with TestClient(app) as lifespan_client:
+            response = lifespan_client.post("/analyze/batch", json={"repo_urls": urls})
+        assert response.status_code == 200
+        summary = json.loads(response.text.splitlines()[-1])
+        assert summary["succeeded"] == len(urls) and summary["deferred"] == 0
+
+    def test_batch_rejects_empty(self):
+        """Test an empty batch is rejected."""
+        response = client.post("/analyze/batch", json={"repo_urls": []})
+        assert response.status_code == 400
+
+    def test_nonexistent_job(self):
+        """Test fetching non-existent job returns 404."""
+        response = client.get("/jobs/does-not-exist")
+        assert response.status_code == 404
+
+
+def _zip_bytes(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, content in files.items():
+            archive.writestr(name, content)
+    return buffer.getvalue()
+
+
+class TestUploadEndpoints:
+    """Test analysis of uploaded archives and local directories."""
+
+    @pytest.fixture
+    def uploads(self, temp_dir, monkeypatch):
+        path = os.path.join(temp_dir, "uploads")
+        monkeypatch.setenv("UPLOAD_DIR", path)
+        monkeypatch.setenv("UPLOAD_MAX_MB", "1")
+        reload_settings()
+        return path
+
+    def test_upload_queues_job(self, uploads, mocker):
+        """Test an uploaded archive is stored and handed to a queued job."""
+        mocker.patch("backend.main.find_existing_report", return_value=None)
+        body = _zip_bytes({"app.py": "print(1)\n"})
+
+        response = client.post("/analyze/upload", content=body)
+
+        assert response.status_code == 202
+        job = analysis_queue.get(response.json()["job_id"])
+        assert job is not None
+        digest = hashlib.sha256(body).hexdigest()
+        assert job.repo_url == f"upload://{digest[:16]}"
+        assert job.options["commit_sha"] == digest
+        with open(job.options["archive_path"], "rb") as f:
+            assert f.read() == body
+
+    def test_identical_upload_shares_job(self, uploads, mocker):
+        """Test re-uploading the same archive attaches to the job and keeps one copy."""
+        mocker.patch("backend.main.find_existing_report", return_value=None)
+        body = _zip_bytes({"app.py": "print('shared')\n"})
+        url = "/analyze/upload?repo_url=https://github.com/test/repo"
+
+        first = client.post(url, content=body).json()
+        second = client.post(url, content=body).json()
+
+        assert second["job_id"] == first["job_id"]
+        assert len(os.listdir(uploads)) == 1
+        job = analysis_queue.get(first["job_id"])
+        assert job is not None and job.repo_url == "https://github.com/test/repo"
+
+    def test_upload_returns_stored_report(self, uploads, mocker, mock_analysis_result):
+        """Test an already analyzed archive is answered from the database."""
+        mocker.patch("backend.main.find_existing_report", return_value={"id": 9, **mock_analysis_result})
+
+        response = client.post("/analyze/upload", content=_zip_bytes({"app.py": "x = 1\n"}))
+
+        assert response.status_code == 200
+        assert response.json()["report_id"] == 9
+        assert os.listdir(uploads) == []
+
+    def test_upload_too_large(self, uploads):
+        """Test uploads over the limit are rejected with 413 and not kept."""
+        response = client.post("/analyze/upload", content=b"0" * (2 * 1024 * 1024))
+        assert response.status_code == 413
+
+        # Without a Content-Length the limit applies while streaming
+        chunks = (b"0" * 64 * 1024 for _ in range(32))
+        response = client.post("/analyze/upload", content=chunks)
+        assert response.status_code == 413
+        assert os.listdir(uploads) == []
+
+    def test_upload_not_an_archive(self, uploads):
+        """Test uploads that are not archives are rejected."""
+        response = client.post("/analyze/upload", content=b"hello")
+
+        assert response.status_code == 400
+        assert os.listdir(uploads) == []
+
+    def test_local_path_disabled_by_default(self, temp_dir):
+        """Test local analysis is refused unless roots are configured."""
+        response = client.post("/analyze/local", json={"path": temp_dir})
+        assert response.status_code == 400
+
+    def test_local_path_outside_roots(self, temp_dir, monkeypatch):
+        """Test paths outside the configured roots are refused."""
+        monkeypatch.setenv("LOCAL_ANALYSIS_ROOTS", json.dumps([os.path.join(temp_dir, "ci")]))
+        reload_settings()
+
+        response = client.post("/analyze/local", json={"path": os.path.join(temp_dir, "ci", "..")})
+        assert response.status_code == 400
+
+    def test_local_checkout_queues_job(self, temp_dir, monkeypatch, mocker):
+        """Test a clean checkout is analyzed in place under its HEAD commit."""
+        checkout = os.path.join(temp_dir, "ci", "repo")
+        os.makedirs(checkout)
+        with open(os.path.join(checkout, "app.py"), "w") as f:
+            f.write("print(1)\n")
+        git = ["git", "-c", "user.email=dev@example.com", "-c", "user.name=dev"]
+        subprocess.run(git + ["init", "-q"], cwd=checkout, check=True)
+        subprocess.run(git + ["add", "-A"], cwd=checkout, check=True)
+        subprocess.run(git + ["commit", "-qm", "init"], cwd=checkout, check=True)
+        sha = subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=checkout, check=True, capture_output=True, text=True
+        ).stdout.strip()
+        monkeypatch.setenv("LOCAL_ANALYSIS_ROOTS", json.dumps([os.path.join(temp_dir, "ci")]))
+        reload_settings()
+        mocker.patch("backend.main.find_existing_report", return_value=None)
+
+        response = client.post(
+            "/analyze/local", json={"path": checkout, "repo_url": "https://github.com/test/local"}
+        )
+
+        assert response.status_code == 202
+        job = analysis_queue.get(response.json()["job_id"])
+        assert job is not None
+        assert job.repo_url == "https://github.com/test/local"
+        assert job.options["local_path"] == os.path.realpath(checkout)
+        assert job.options["commit_sha"] == sha
+
+
+class TestHistoryEndpoints:
+    """Test commit-history analysis requests and the score series."""
+
+    def test_history_queues_job(self):
+        """Test a history request queues a job with the number of commits."""
+        response = client.post("/analyze/history", json={"repo_url": "https://github.com/test/history", "commits": 5})
+
+        assert response.status_code == 202
+        job = analysis_queue.get(response.json()["job_id"])
+        assert job is not None
+        assert job.options["history_commits"] == 5
+
+    def test_history_commit_limit(self, monkeypatch):
+        """Test the number of commits must be within the configured limit."""
+        monkeypatch.setenv("HISTORY_MAX_COMMITS", "10")
+        reload_settings()
+
+        for commits in (0, 11):
+            response = client.post(
+                "/analyze/history", json={"repo_url": "https://github.com/test/history", "commits": commits}
+            )
+            assert response.status_code == 400
+
+    def test_report_series(self, temp_db):
+        """Test the series lists history reports per commit in commit order."""
+        from backend.services.db_service import save_report
+
+        def _save(sha, date, score):
+            return save_report(
+                "https://github.com/test/series", sha, {}, {}, {}, {}, score, 0.2,
+                analysis_meta={"mode": "history", "commit_date": date},
+            )
+
+        _save("b", "2024-01-02T00:00:00+00:00", 60.0)
+        _save("a", "2024-01-01T00:00:00+00:00", 50.0)
+        newest_b = _save("b", "2024-01-02T00:00:00+00:00", 61.0)
+
+        response = client.get("/reports/history", params={"repo_url": "https://github.com/test/series"})
+
+        assert response.status_code == 200
+        assert [(e["git_sha"], e["code_health_score"]) for e in response.json()] == [("a", 50.0), ("b", 61.0)]
+        assert response.json()[1]["report_id"] == newest_b
+
 
 @pytest.mark.asyncio
 class TestAsyncEndpoints:
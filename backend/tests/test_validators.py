@@ -4,13 +4,15 @@ Unit tests for validators module.
 Tests input validation and sanitization functions.
 """
 
+import os
 import pytest
 from backend.utils.validators import (
     validate_github_url,
     validate_api_key,
     sanitize_string,
     validate_report_id,
-    validate_pagination_params
+    validate_pagination_params,
+    validate_local_path
 )
 from backend.utils.exceptions import ValidationError
 
@@ -206,3 +208,38 @@ class TestPaginationValidation:
         with pytest.raises(ValidationError) as exc_info:
             validate_pagination_params(offset=-1)
         assert "non-negative" in str(exc_info.value).lower()
+
+
+class TestValidateLocalPath:
+    """Tests for validate_local_path."""
+
+    def test_disabled_without_roots(self, temp_dir):
+        """Test local paths are refused when no roots are configured."""
+        with pytest.raises(ValidationError, match="disabled"):
+            validate_local_path(temp_dir, [])
+
+    def test_path_inside_root(self, temp_dir):
+        """Test directories under a root are accepted and resolved."""
+        repo = os.path.join(temp_dir, "ci", "repo")
+        os.makedirs(repo)
+        assert validate_local_path(os.path.join(repo, "."), [os.path.join(temp_dir, "ci")]) == os.path.realpath(repo)
+
+    def test_symlink_out_of_root(self, temp_dir):
+        """Test symlinks pointing outside the roots are refused."""
+        os.makedirs(os.path.join(temp_dir, "ci"))
+        os.symlink("/etc", os.path.join(temp_dir, "ci", "escape"))
+        with pytest.raises(ValidationError, match="outside"):
+            validate_local_path(os.path.join(temp_dir, "ci", "escape"), [os.path.join(temp_dir, "ci")])
+
+    def test_sibling_with_common_prefix(self, temp_dir):
+        """Test a sibling directory sharing the root's name prefix is refused."""
+        os.makedirs(os.path.join(temp_dir, "ci-other"))
+        with pytest.raises(ValidationError, match="outside"):
+            validate_local_path(os.path.join(temp_dir, "ci-other"), [os.path.join(temp_dir, "ci")])
+
+    def test_not_a_directory(self, temp_dir):
+        """Test files are refused."""
+        path = os.path.join(temp_dir, "file.py")
+        open(path, "w").close()
+        with pytest.raises(ValidationError, match="not a directory"):
+            validate_local_path(path, [temp_dir])
@@ -0,0 +1,203 @@
+"""
+Unit tests for analysis workspaces.
+
+Tests RAM/disk placement, the RAM budget, background deletion, directory
+reuse and cleanup of leftovers from earlier processes.
+"""
+
+import os
+import shutil
+import tempfile
+import pytest
+from backend.config import reload_settings
+from backend.services import analyzer
+from backend.services.workspace import DISK, RAM, TRASH_DIR, WorkspaceManager, _is_ram_backed
+from backend.utils.exceptions import RepositoryError
+
+MB = 1024 * 1024
+
+
+@pytest.fixture
+def ram_dir():
+    """A directory on tmpfs, if this machine has one."""
+    if not os.path.isdir("/dev/shm") or not _is_ram_backed("/dev/shm"):
+        pytest.skip("no tmpfs available")
+    path = tempfile.mkdtemp(dir="/dev/shm")
+    yield path
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _fill(workspace, size=1024):
+    os.makedirs(os.path.join(workspace.path, "repo", ".git"))
+    with open(os.path.join(workspace.path, "repo", "app.py"), "wb") as f:
+        f.write(b"x" * size)
+
+
+class TestWorkspaceManager:
+    """Tests for WorkspaceManager."""
+
+    def test_release_empties_and_reuses_directory(self, temp_dir):
+        """Test released workspaces are emptied in the background and handed out again."""
+        manager = WorkspaceManager(os.path.join(temp_dir, "disk"))
+        workspace = manager.acquire()
+        assert workspace.storage == DISK and os.listdir(workspace.path) == []
+        _fill(workspace)
+
+        manager.release(workspace)
+        assert manager.wait_for_deletions(timeout=10)
+        assert os.listdir(os.path.join(manager.disk_root, TRASH_DIR)) == []
+
+        again = manager.acquire()
+        assert again.path == workspace.path and os.listdir(again.path) == []
+        assert manager.stats()["recycled"] == 1 and manager.stats()["deleted"] == 1
+
+    def test_release_twice_is_noop(self, temp_dir):
+        """Test releasing an already released workspace does nothing."""
+        manager = WorkspaceManager(os.path.join(temp_dir, "disk"))
+        workspace = manager.acquire()
+        manager.release(workspace)
+        manager.release(workspace)
+        assert manager.stats()["idle"][DISK] == 1
+
+    def test_directory_removed_by_user(self, temp_dir):
+        """Test a workspace whose directory was deleted (e.g. a removed worktree) is recreated."""
+        manager = WorkspaceManager(os.path.join(temp_dir, "disk"))
+        workspace = manager.acquire()
+        os.rmdir(workspace.path)
+
+        manager.release(workspace)
+        assert manager.acquire().path == workspace.path
+        assert os.path.isdir(workspace.path)
+
+    def test_no_reuse_beyond_max_idle(self, temp_dir):
+        """Test directories beyond max_idle are deleted entirely."""
+        manager = WorkspaceManager(os.path.join(temp_dir, "disk"), max_idle=0)
+        workspace = manager.acquire()
+        _fill(workspace)
+
+        manager.release(workspace)
+        assert manager.wait_for_deletions(timeout=10)
+        assert not os.path.exists(workspace.path)
+        assert manager.acquire().path != workspace.path
+
+    def test_ram_workspaces_within_budget(self, temp_dir, ram_dir):
+        """Test workspaces go to RAM until the budget is used, then to disk."""
+        manager = WorkspaceManager(
+            os.path.join(temp_dir, "disk"), ram_root=ram_dir, ram_max_bytes=2 * MB, ram_reserve_bytes=MB
+        )
+        first, second, third = manager.acquire(), manager.acquire(), manager.acquire()
+
+        assert [first.storage, second.storage, third.storage] == [RAM, RAM, DISK]
+        assert first.path.startswith(ram_dir)
+        assert manager.stats()["ram_fallbacks"] == 1
+
+        manager.release(second)
+        assert manager.acquire().storage == RAM
+
+    def test_measure_replaces_reservation(self, temp_dir, ram_dir):
+        """Test measured sizes count against the RAM budget instead of the reservation."""
+        manager = WorkspaceManager(
+            os.path.join(temp_dir, "disk"), ram_root=ram_dir, ram_max_bytes=4 * MB, ram_reserve_bytes=MB
+        )
+        workspace = manager.acquire()
+        _fill(workspace, size=7 * MB // 2)
+
+        assert manager.measure(workspace) >= 3 * MB
+        stats = manager.stats()
+        assert stats["ram_bytes"] == workspace.used_bytes
+        assert stats["workspaces"][0]["storage"] == RAM
+        assert stats["workspaces"][0]["used_bytes"] == workspace.used_bytes
+        assert manager.acquire().storage == DISK
+
+    def test_ram_allowance_claims_rest_of_budget(self, temp_dir, ram_dir):
+        """Test a RAM workspace may fill what others leave of the budget, and claims it."""
+        manager = WorkspaceManager(
+            os.path.join(temp_dir, "disk"), ram_root=ram_dir, ram_max_bytes=4 * MB, ram_reserve_bytes=MB
+        )
+        first, second = manager.acquire(), manager.acquire()
+
+        assert manager.ram_allowance(first) == 3 * MB
+        assert manager.ram_allowance(second) == MB
+        assert manager.ram_allowance(manager.acquire(DISK)) is None
+
+        _fill(first, size=1024)
+        manager.measure(first)
+        assert manager.ram_allowance(second) == 4 * MB - first.used_bytes
+
+    def test_move_to_disk(self, temp_dir, ram_dir):
+        """Test a RAM workspace is swapped for a disk one and its RAM returned to the budget."""
+        manager = WorkspaceManager(
+            os.path.join(temp_dir, "disk"), ram_root=ram_dir, ram_max_bytes=2 * MB, ram_reserve_bytes=MB
+        )
+        workspace = manager.acquire()
+        manager.ram_allowance(workspace)
+        _fill(workspace)
+
+        moved = manager.move_to_disk(workspace)
+
+        assert moved.storage == DISK and os.listdir(moved.path) == []
+        assert manager.stats()["ram_bytes"] == 0
+        assert manager.acquire().storage == RAM
+
+    def test_ram_root_on_disk_falls_back(self, temp_dir):
+        """Test a configured RAM directory that is not on tmpfs is not used."""
+        ram_root = os.path.join(temp_dir, "not-ram")
+        if _is_ram_backed(temp_dir):
+            pytest.skip("temporary directory is on tmpfs")
+        manager = WorkspaceManager(
+            os.path.join(temp_dir, "disk"), ram_root=ram_root, ram_max_bytes=MB, ram_reserve_bytes=1
+        )
+
+        assert manager.acquire().storage == DISK
+        assert manager.stats()["ram_root"] is None
+
+    def test_leftovers_of_dead_processes_deleted(self, temp_dir):
+        """Test workspaces and trash left by processes that no longer run are deleted."""
+        root = os.path.join(temp_dir, "disk")
+        dead_pid = 2 ** 31 - 1
+        os.makedirs(os.path.join(root, f"ws-{dead_pid}-abc", "repo"))
+        os.makedirs(os.path.join(root, TRASH_DIR, f"{dead_pid}-def"))
+        os.makedirs(os.path.join(root, f"ws-{os.getppid()}-live"))
+        os.makedirs(os.path.join(root, "unrelated"))
+
+        manager = WorkspaceManager(root)
+        manager.acquire()
+        assert manager.wait_for_deletions(timeout=10)
+
+        assert not os.path.exists(os.path.join(root, f"ws-{dead_pid}-abc"))
+        assert os.listdir(os.path.join(root, TRASH_DIR)) == []
+        assert os.path.isdir(os.path.join(root, f"ws-{os.getppid()}-live"))
+        assert os.path.isdir(os.path.join(root, "unrelated"))
+
+
+@pytest.mark.asyncio
+async def test_checkout_too_large_for_ram_moves_to_disk(temp_dir, ram_dir, mocker, monkeypatch, temp_db):
+    """Test a clone is capped at the RAM left and redone on disk when it does not fit."""
+    monkeypatch.setenv("MAX_REPO_SIZE_MB", "50")
+    reload_settings()
+    manager = WorkspaceManager(
+        os.path.join(temp_dir, "disk"), ram_root=ram_dir, ram_max_bytes=4 * MB, ram_reserve_bytes=MB
+    )
+    mocker.patch.object(analyzer, "WORKSPACES", manager)
+    clones = []
+
+    async def _clone(repo_url, dest, timeout=None, max_size_mb=None):
+        clones.append((dest, max_size_mb))
+        if max_size_mb < 10:
+            raise RepositoryError("Repository is too large", details={"size_mb": 10, "max_size_mb": max_size_mb})
+        with open(os.path.join(dest, "app.py"), "w", encoding="utf-8") as f:
+            f.write("X = 1\n")
+        return dest, "abc123"
+
+    mocker.patch.object(analyzer, "clone_repo_async", side_effect=_clone)
+    mocker.patch.object(analyzer, "run_sandboxed_tools", return_value={"pylint": ""})
+    mocker.patch.object(analyzer, "generate_ai_metrics", return_value={
+        "ai_probability": 0.0, "ai_risk_notes": "", "recommendations": []
+    })
+
+    result = await analyzer.analyze_single_repo("https://github.com/test/big", incremental=False)
+
+    assert [limit for _, limit in clones] == [4, 50]
+    assert clones[0][0].startswith(ram_dir) and not clones[1][0].startswith(ram_dir)
+    assert result["cloc"]["code"] == 1
+    assert manager.stats()["ram_fallbacks"] == 1
@@ -0,0 +1,181 @@
+"""
+Extraction of uploaded source archives.
+
+Zip and tar archives (plain or gzip/bzip2/xz compressed) are read entry by
+entry in a single pass. Only regular files the analyzers read are written,
+the same selection a sparse clone checks out; directories are created as
+needed, and links, devices and entries whose names would escape the
+destination are skipped. The entry count and the number of bytes written
+are limited while extracting, so archives that misstate their sizes cannot
+exceed the limits either.
+"""
+
+import hashlib
+import os
+import posixpath
+import stat
+import tarfile
+import time
+import zipfile
+from functools import partial
+from typing import IO, Callable, Dict, Iterable, Iterator, Optional, Tuple
+
+from backend.utils.exceptions import TimeoutError, ValidationError
+from backend.utils.logger import setup_logger
+from backend.utils.repo_downloader import is_analyzable_path
+
+logger = setup_logger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+# (name, is a regular file, opener of its contents) for each archive entry
+Entry = Tuple[str, bool, Optional[Callable[[], Optional[IO[bytes]]]]]
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file's contents, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def archive_format(path: str) -> str:
+    """
+    Detect the format of an archive from its contents.
+
+    Returns:
+        ``"zip"`` or ``"tar"``
+
+    Raises:
+        ValidationError: If the file is neither a zip nor a (compressed) tar archive
+    """
+    if zipfile.is_zipfile(path):
+        return "zip"
+    try:
+        with tarfile.open(path, mode="r|*") as tar:
+            tar.next()
+        return "tar"
+    except (tarfile.TarError, EOFError, OSError):
+        raise ValidationError("Upload is not a zip or tar archive", field="archive")
+
+
+def _too_many_entries(max_entries: int) -> ValidationError:
+    return ValidationError(
+        f"Archive has more than {max_entries} entries", field="archive",
+        details={"max_entries": max_entries}
+    )
+
+
+def _safe_name(name: str) -> Optional[str]:
+    """Normalised relative path of an entry, or None if it would leave the destination."""
+    name = name.replace("\\", "/")
+    if name.startswith("/") or (len(name) > 1 and name[1] == ":"):
+        return None
+    parts = [part for part in name.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        return None
+    return posixpath.join(*parts)
+
+
+def _zip_entries(archive: zipfile.ZipFile) -> Iterator[Entry]:
+    for info in archive.infolist():
+        mode = info.external_attr >> 16
+        regular = not info.is_dir() and not stat.S_ISLNK(mode)
+        yield info.filename, regular, partial(archive.open, info) if regular else None
+
+
+def _tar_entries(archive: tarfile.TarFile) -> Iterator[Entry]:
+    for member in archive:
+        regular = member.isreg()
+        yield member.name, regular, partial(archive.extractfile, member) if regular else None
+
+
+def extract_archive(
+    archive_path: str,
+    dest: str,
+    max_bytes: int,
+    max_entries: int,
+    exclude_dirs: Iterable[str] = (),
+    timeout: Optional[float] = None,
+) -> Tuple[str, Dict[str, int]]:
+    """
+    Extract the analyzable files of an archive.
+
+    Args:
+        archive_path: Zip or tar archive
+        dest: Existing, empty directory to extract into
+        max_bytes: Maximum total size of the extracted files
+        max_entries: Maximum number of entries in the archive
+        exclude_dirs: Directory names whose contents are not extracted
+        timeout: Seconds extraction may take
+
+    Returns:
+        Tuple of (root of the extracted tree, statistics). The root is the
+        top-level directory when every entry of the archive is inside the
+        same one, as in GitHub's source archives, and ``dest`` otherwise.
+
+    Raises:
+        ValidationError: If the archive is invalid or exceeds a limit
+        TimeoutError: If extraction takes longer than ``timeout``
+    """
+    started = time.monotonic()
+    exclude_dirs = list(exclude_dirs)
+    stats = {"entries": 0, "files_extracted": 0, "bytes_extracted": 0}
+    # First path component of every entry ("" for files at the top level)
+    top_level = set()
+
+    def _check_time() -> None:
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Extracting the archive exceeded {timeout:.0f}s", timeout_seconds=timeout)
+
+    def _extract(entries: Iterator[Entry]) -> None:
+        for name, regular, opener in entries:
+            stats["entries"] += 1
+            if stats["entries"] > max_entries:
+                raise _too_many_entries(max_entries)
+            _check_time()
+            rel_path = _safe_name(name)
+            if rel_path is not None:
+                first, _, rest = rel_path.partition("/")
+                top_level.add(first if rest or not regular else "")
+            if opener is None or rel_path is None or not is_analyzable_path(rel_path, exclude_dirs):
+                continue
+            source = opener()
+            if source is None:
+                continue
+            target = os.path.join(dest, *rel_path.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with source, open(target, "wb") as out:
+                for chunk in iter(partial(source.read, CHUNK_SIZE), b""):
+                    stats["bytes_extracted"] += len(chunk)
+                    if stats["bytes_extracted"] > max_bytes:
+                        raise ValidationError(
+                            f"Archive contents exceed {max_bytes // (1024 * 1024)} MB", field="archive",
+                            details={"max_bytes": max_bytes}
+                        )
+                    out.write(chunk)
+            stats["files_extracted"] += 1
+
+    try:
+        if archive_format(archive_path) == "zip":
+            with zipfile.ZipFile(archive_path) as zip_archive:
+                if len(zip_archive.infolist()) > max_entries:
+                    raise _too_many_entries(max_entries)
+                _extract(_zip_entries(zip_archive))
+        else:
+            with tarfile.open(archive_path, mode="r|*") as tar_archive:
+                _extract(_tar_entries(tar_archive))
+    except (zipfile.BadZipFile, tarfile.TarError, EOFError, OSError) as e:
+        raise ValidationError(f"Could not extract archive: {e}", field="archive")
+
+    root = dest
+    if len(top_level) == 1 and "" not in top_level:
+        root = os.path.join(dest, top_level.pop())
+        os.makedirs(root, exist_ok=True)
+    logger.info(
+        f"Extracted {os.path.basename(archive_path)}",
+        extra={'extra_data': {**stats, 'seconds': round(time.monotonic() - started, 3)}}
+    )
+    return root, stats
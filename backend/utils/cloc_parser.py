@@ -109,6 +109,30 @@ def _parse_cloc_json(cloc_output: str) -> Dict[str, Any]:
     return result
 
 
+def aggregate_loc(per_file: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Build the CLOC result structure from per-file counts.
+
+    Args:
+        per_file: Mapping of path to language/code/comment/blank counts
+
+    Returns:
+        Totals and per-language breakdown in the same shape as
+        ``parse_cloc_output``
+    """
+    result = _empty_cloc_result()
+    for counts in per_file.values():
+        language = result['languages'].setdefault(
+            counts['language'], {'code': 0, 'comment': 0, 'blank': 0, 'files': 0}
+        )
+        for field in ('code', 'comment', 'blank'):
+            language[field] += counts[field]
+            result[field] += counts[field]
+        language['files'] += 1
+        result['total_files'] += 1
+    return result
+
+
 def parse_radon_raw_output(radon_output: str) -> Dict[str, Any]:
     """
     Parse output from 'radon raw' command (fallback).
@@ -149,6 +149,21 @@ class RateLimitError(DevPulseError):
         )
 
 
+class PayloadTooLargeError(DevPulseError):
+    """Raised when an uploaded request body exceeds its size limit."""
+    
+    def __init__(self, message: str, max_bytes: Optional[int] = None, **kwargs):
+        details = kwargs.pop('details', {})
+        if max_bytes is not None:
+            details['max_bytes'] = max_bytes
+        super().__init__(
+            message=message,
+            error_code="PAYLOAD_TOO_LARGE",
+            details=details,
+            status_code=413
+        )
+
+
 class TimeoutError(DevPulseError):
     """Raised when an operation times out."""
     
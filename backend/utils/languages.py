@@ -0,0 +1,143 @@
+"""
+Source language detection and comment syntax.
+
+Maps file names to the language names used in CLOC reports so every
+analyzer classifies files the same way, and describes how each language
+marks comments for line counting.
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+
+# Extension -> language, using CLOC's language names
+EXTENSION_LANGUAGES: Dict[str, str] = {
+    ".py": "Python",
+    ".pyi": "Python",
+    ".pyx": "Cython",
+    ".js": "JavaScript",
+    ".mjs": "JavaScript",
+    ".cjs": "JavaScript",
+    ".jsx": "JSX",
+    ".ts": "TypeScript",
+    ".tsx": "TypeScript",
+    ".java": "Java",
+    ".kt": "Kotlin",
+    ".kts": "Kotlin",
+    ".scala": "Scala",
+    ".go": "Go",
+    ".rs": "Rust",
+    ".rb": "Ruby",
+    ".php": "PHP",
+    ".c": "C",
+    ".h": "C/C++ Header",
+    ".hpp": "C/C++ Header",
+    ".cc": "C++",
+    ".cpp": "C++",
+    ".cxx": "C++",
+    ".cs": "C#",
+    ".swift": "Swift",
+    ".m": "Objective-C",
+    ".r": "R",
+    ".lua": "Lua",
+    ".pl": "Perl",
+    ".pm": "Perl",
+    ".sh": "Bourne Shell",
+    ".bash": "Bourne Again Shell",
+    ".ps1": "PowerShell",
+    ".sql": "SQL",
+    ".html": "HTML",
+    ".htm": "HTML",
+    ".css": "CSS",
+    ".scss": "SCSS",
+    ".sass": "Sass",
+    ".less": "LESS",
+    ".vue": "Vuejs Component",
+    ".json": "JSON",
+    ".yaml": "YAML",
+    ".yml": "YAML",
+    ".toml": "TOML",
+    ".xml": "XML",
+    ".md": "Markdown",
+    ".ini": "INI",
+    ".cfg": "INI",
+    ".ipynb": "Jupyter Notebook",
+}
+
+# Files recognised by their full name rather than extension
+FILENAME_LANGUAGES: Dict[str, str] = {
+    "Dockerfile": "Dockerfile",
+    "Makefile": "make",
+    "makefile": "make",
+    "CMakeLists.txt": "CMake",
+}
+
+
+# Comment markers: (line comment prefixes, (block open, block close) pairs)
+CommentSyntax = Tuple[Tuple[bytes, ...], Tuple[Tuple[bytes, bytes], ...]]
+
+_HASH: CommentSyntax = ((b"#",), ())
+_C_STYLE: CommentSyntax = ((b"//",), ((b"/*", b"*/"),))
+_MARKUP: CommentSyntax = ((), ((b"<!--", b"-->"),))
+_NONE: CommentSyntax = ((), ())
+
+COMMENT_SYNTAX: Dict[str, CommentSyntax] = {
+    # Docstrings count as comments, as in CLOC
+    "Python": ((b"#",), ((b'"""', b'"""'), (b"'''", b"'''"))),
+    "Cython": ((b"#",), ((b'"""', b'"""'), (b"'''", b"'''"))),
+    "JavaScript": _C_STYLE,
+    "JSX": _C_STYLE,
+    "TypeScript": _C_STYLE,
+    "Java": _C_STYLE,
+    "Kotlin": _C_STYLE,
+    "Scala": _C_STYLE,
+    "Go": _C_STYLE,
+    "Rust": _C_STYLE,
+    "Ruby": ((b"#",), ((b"=begin", b"=end"),)),
+    "PHP": ((b"//", b"#"), ((b"/*", b"*/"),)),
+    "C": _C_STYLE,
+    "C/C++ Header": _C_STYLE,
+    "C++": _C_STYLE,
+    "C#": _C_STYLE,
+    "Swift": _C_STYLE,
+    "Objective-C": _C_STYLE,
+    "R": _HASH,
+    "Lua": ((b"--",), ((b"--[[", b"]]"),)),
+    "Perl": ((b"#",), ((b"=pod", b"=cut"), (b"=head", b"=cut"))),
+    "Bourne Shell": _HASH,
+    "Bourne Again Shell": _HASH,
+    "PowerShell": ((b"#",), ((b"<#", b"#>"),)),
+    "SQL": ((b"--",), ((b"/*", b"*/"),)),
+    "HTML": _MARKUP,
+    "CSS": ((), ((b"/*", b"*/"),)),
+    "SCSS": _C_STYLE,
+    "Sass": _C_STYLE,
+    "LESS": _C_STYLE,
+    "Vuejs Component": ((b"//",), ((b"/*", b"*/"), (b"<!--", b"-->"))),
+    "JSON": _NONE,
+    "YAML": _HASH,
+    "TOML": _HASH,
+    "XML": _MARKUP,
+    "Markdown": _MARKUP,
+    "INI": ((b";", b"#"), ()),
+    "Jupyter Notebook": _NONE,
+    "Dockerfile": _HASH,
+    "make": _HASH,
+    "CMake": ((b"#",), ((b"#[[", b"]]"),)),
+}
+
+
+def detect_language(filename: str) -> Optional[str]:
+    """
+    Detect the language of a file from its name.
+
+    Args:
+        filename: File name or path
+
+    Returns:
+        CLOC language name, or None if the file is not a recognised source file
+    """
+    basename = os.path.basename(filename)
+    if basename in FILENAME_LANGUAGES:
+        return FILENAME_LANGUAGES[basename]
+    _, ext = os.path.splitext(basename)
+    return EXTENSION_LANGUAGES.get(ext.lower())
@@ -0,0 +1,181 @@
+"""
+Prometheus metrics.
+
+A small implementation of the Prometheus text exposition format (0.0.4):
+histograms with labels that any thread may update, and collectors that
+turn snapshots such as the pipeline's ``stats()`` counters into metric
+families each time ``/metrics`` is scraped.
+"""
+
+import math
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Upper bounds in seconds, from a quick parse to a slow clone or pylint run
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+LabelValues = Tuple[str, ...]
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape_help(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+def _escape(value: str) -> str:
+    return _escape_help(str(value)).replace('"', '\\"')
+
+
+def _labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class MetricFamily:
+    """
+    Samples of one metric, for collectors to fill at scrape time.
+
+    Args:
+        name: Metric name
+        documentation: Help text
+        kind: ``gauge``, ``counter`` or ``histogram``
+        labelnames: Names of the labels every sample carries
+    """
+
+    def __init__(self, name: str, documentation: str, kind: str = "gauge", labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+        self.samples: List[Tuple[str, Labels, float]] = []
+
+    def add(self, value: Optional[float], *labelvalues: str) -> "MetricFamily":
+        """Add a sample (values that are not known yet are left out)."""
+        if value is not None:
+            self.samples.append((self.name, tuple(zip(self.labelnames, map(str, labelvalues))), float(value)))
+        return self
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {_escape_help(self.documentation)}", f"# TYPE {self.name} {self.kind}"]
+        for name, labels, value in self.samples:
+            lines.append(f"{name}{_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Histogram of observed values with labels.
+
+    Args:
+        name: Metric name
+        documentation: Help text
+        labelnames: Names of the labels every observation carries
+        buckets: Increasing upper bounds (``+Inf`` is added)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._lock = threading.Lock()
+        # Per label values: count per bucket (not cumulative), sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        """Record one observation."""
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * len(self.buckets), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def collect(self) -> MetricFamily:
+        family = MetricFamily(self.name, self.documentation, "histogram", self.labelnames)
+        with self._lock:
+            values = {key: (list(counts), total[0]) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                family.samples.append((f"{self.name}_bucket", labels + (("le", _format_value(bound)),), cumulative))
+            family.samples.append((f"{self.name}_sum", labels, total))
+            family.samples.append((f"{self.name}_count", labels, cumulative))
+        return family
+
+
+class Registry:
+    """Metrics and collectors rendered together on ``/metrics``."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: List[Histogram] = []
+        self._collectors: List[Callable[[], Iterable[MetricFamily]]] = []
+
+    def register(self, metric: Histogram) -> Histogram:
+        """Add a histogram; returns it for assignment at module level."""
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector: Callable[[], Iterable[MetricFamily]]) -> None:
+        """Add a function returning metric families, called on every scrape."""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def collect(self) -> List[MetricFamily]:
+        with self._lock:
+            metrics, collectors = list(self._metrics), list(self._collectors)
+        families = [metric.collect() for metric in metrics]
+        for collector in collectors:
+            families.extend(collector())
+        return families
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format."""
+        lines = []
+        for family in self.collect():
+            lines.extend(family.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+ANALYSIS_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "devpulse_analysis_stage_seconds",
+    "Duration of analysis pipeline stages (clone, tools and each tool, parsing, ai, scoring)",
+    ["stage"]
+))
+JOB_STAGE_SECONDS = REGISTRY.register(Histogram(
+    "devpulse_job_stage_seconds",
+    "Time analysis jobs spent in each reported stage, including saving the report",
+    ["stage"]
+))
+JOB_QUEUE_WAIT_SECONDS = REGISTRY.register(Histogram(
+    "devpulse_job_queue_wait_seconds",
+    "Time analysis jobs waited in the queue before a worker started them"
+))
+JOB_DURATION_SECONDS = REGISTRY.register(Histogram(
+    "devpulse_job_duration_seconds",
+    "Run time of analysis jobs by final state",
+    ["state"]
+))
@@ -3,14 +3,35 @@ Pylint output parser for code quality analysis.
 
 Parses output from 'pylint' command with comprehensive error handling,
 issue categorization, and severity levels.
+
+The analyzer runs pylint with ``--output-format=json2`` and decodes the
+complete report once pylint has exited, with a single ``json.loads``, into
+issues grouped per file (``parse_pylint_json_by_file``) instead of regex
+matches on text; each issue keeps the message's symbolic name and end
+position. The text parser remains for plain pylint output.
 """
 
+import json
 import re
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterable, List, Optional
 from backend.utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
+# Issues kept in a report, and per file for incremental merging
+MAX_REPORTED_ISSUES = 50
+
+SEVERITY_MAP = {
+    'C': 'convention',
+    'R': 'refactor',
+    'W': 'warning',
+    'E': 'error',
+    'F': 'error'
+}
+
+# Pattern: file:line:col: CODE: message
+ISSUE_PATTERN = re.compile(r'^(.+?):(\d+):(\d+):\s*([CRWEF]\d+):\s*(.+)$')
+
 
 def parse_pylint_output(output: str) -> Dict[str, Any]:
     """
@@ -29,52 +50,129 @@ def parse_pylint_output(output: str) -> Dict[str, Any]:
         logger.warning("Pylint output is empty")
         return _empty_pylint_result()
     
-    
     try:
-        lines = [l for l in output.splitlines() if l.strip()]
         score = None
-        issues: List[Dict[str, Any]] = []
-        issue_counts = {"error": 0, "warning": 0, "convention": 0, "refactor": 0}
-        
-        for line in lines:
+        issues = _IssueCollector()
+        for line in output.splitlines():
             # Look for the rating line
             if "Your code has been rated at" in line:
                 score = _extract_score(line)
                 logger.debug(f"Extracted pylint score: {score}")
-            
+
             # Parse issue lines
             elif line.strip() and not line.startswith("---"):
                 issue = _parse_issue_line(line)
                 if issue:
-                    issues.append(issue)
-                    severity = issue.get('severity', 'warning')
-                    if severity in issue_counts:
-                        issue_counts[severity] += 1
+                    issues.add(issue)
+        return issues.result(score)
         
-        # If no score found, default to 5.0
+    except Exception as e:
+        logger.error(f"Pylint parsing error: {e}", exc_info=True)
+        return _empty_pylint_result()
+
+
+class _IssueCollector:
+    """
+    Running counts of parsed issues, keeping only the first
+    ``MAX_REPORTED_ISSUES`` issues overall and per file.
+    """
+
+    def __init__(self):
+        self.total_issues = 0
+        self.issues: List[Dict[str, Any]] = []
+        self.issue_counts = {"error": 0, "warning": 0, "convention": 0, "refactor": 0}
+        self.per_file: Dict[str, Dict[str, Any]] = {}
+
+    def add(self, issue: Dict[str, Any]) -> None:
+        self.total_issues += 1
+        if len(self.issues) < MAX_REPORTED_ISSUES:
+            self.issues.append(issue)
+        severity = issue.get('severity', 'warning')
+        if severity in self.issue_counts:
+            self.issue_counts[severity] += 1
+
+        path = issue["file"][2:] if issue["file"].startswith("./") else issue["file"]
+        entry = self.per_file.setdefault(path, {"issues": [], "counts": {}})
+        letter = issue["code"][0]
+        entry["counts"][letter] = entry["counts"].get(letter, 0) + 1
+        if len(entry["issues"]) < MAX_REPORTED_ISSUES:
+            entry["issues"].append(issue)
+
+    def add_message(self, message: Dict[str, Any]) -> None:
+        """Add one message of a ``json2`` report (info messages are skipped, as in text output)."""
+        code = message.get("messageId") or ""
+        severity = SEVERITY_MAP.get(code[:1])
+        if not severity:
+            return
+        self.add({
+            "file": message.get("path") or message.get("module") or "unknown",
+            "line": message.get("line") or 0,
+            "column": message.get("column") or 0,
+            "end_line": message.get("endLine"),
+            "end_column": message.get("endColumn"),
+            "code": code,
+            "symbol": message.get("symbol"),
+            "message": (message.get("message") or "").strip(),
+            "severity": severity
+        })
+
+    def result(self, score: Optional[float]) -> Dict[str, Any]:
+        """Summary in the ``parse_pylint_output`` shape."""
         if score is None:
             score = 5.0
             logger.warning("No pylint score found in output, defaulting to 5.0")
-        
-        result = {
-            "score": score,
-            "issues": issues[:50],  # Limit to 50 most important issues
-            "issue_counts": issue_counts,
-            "total_issues": len(issues)
-        }
-        
+
         logger.info(
             f"Pylint parsing complete: score={score}, "
-            f"total_issues={len(issues)}, "
-            f"errors={issue_counts['error']}, "
-            f"warnings={issue_counts['warning']}"
+            f"total_issues={self.total_issues}, "
+            f"errors={self.issue_counts['error']}, "
+            f"warnings={self.issue_counts['warning']}"
         )
-        
-        return result
-        
-    except Exception as e:
-        logger.error(f"Pylint parsing error: {e}", exc_info=True)
-        return _empty_pylint_result()
+        return {
+            "score": score,
+            "issues": list(self.issues),
+            "issue_counts": dict(self.issue_counts),
+            "total_issues": self.total_issues
+        }
+
+
+def _load_json_report(output: str) -> Optional[_IssueCollector]:
+    """
+    Decode complete ``json2`` pylint output.
+
+    Returns:
+        Collector with every message added, or None if the output is not a
+        complete pylint JSON report (no statistics means pylint did not finish)
+    """
+    try:
+        document = json.loads(output)
+        collector = _IssueCollector()
+        for message in document.get("messages", []):
+            collector.add_message(message)
+    except (ValueError, AttributeError, TypeError) as e:
+        logger.error(f"Pylint JSON parsing error: {e}")
+        return None
+    if not isinstance(document.get("statistics"), dict):
+        return None
+    return collector
+
+
+def parse_pylint_json_by_file(output: str) -> Optional[Dict[str, Dict[str, Any]]]:
+    """
+    Group issues of complete ``json2`` pylint output by file for incremental merging.
+
+    Args:
+        output: Raw pylint JSON output
+
+    Returns:
+        Mapping of file path to ``issues`` (first 50) and ``counts`` per
+        message category letter (C/R/W/E/F), or None if the output is not
+        a complete pylint JSON report, meaning pylint did not complete
+    """
+    if not output:
+        return None
+    collector = _load_json_report(output)
+    return collector.per_file if collector else None
 
 
 def _extract_score(line: str) -> float:
@@ -109,22 +207,13 @@ def _parse_issue_line(line: str) -> Dict[str, Any]:
         Dictionary with issue details or None if parsing fails
     """
     try:
-        # Pattern: file:line:col: CODE: message
-        pattern = r'^(.+?):(\d+):(\d+):\s*([CRWEF]\d+):\s*(.+)$'
-        match = re.match(pattern, line)
+        match = ISSUE_PATTERN.match(line)
         
         if match:
             file_path, line_num, col, code, message = match.groups()
             
             # Determine severity from code prefix
-            severity_map = {
-                'C': 'convention',
-                'R': 'refactor',
-                'W': 'warning',
-                'E': 'error',
-                'F': 'error'
-            }
-            severity = severity_map.get(code[0], 'warning')
+            severity = SEVERITY_MAP.get(code[0], 'warning')
             
             return {
                 "file": file_path.strip(),
@@ -140,6 +229,76 @@ def _parse_issue_line(line: str) -> Dict[str, Any]:
     return None
 
 
+def compute_pylint_score(counts: Dict[str, int], statements: int) -> float:
+    """
+    Compute a score with pylint's default evaluation expression.
+
+    ``10 - (5 * error + warning + refactor + convention) / statement * 10``,
+    floored at 0 and forced to 0 by any fatal message.
+
+    Args:
+        counts: Message counts per category letter (C/R/W/E/F)
+        statements: Number of statements analyzed
+
+    Returns:
+        Score rounded to two decimals, as pylint prints it
+    """
+    if counts.get('F', 0):
+        return 0.0
+    if statements <= 0:
+        return 5.0
+    weighted = 5 * counts.get('E', 0) + counts.get('W', 0) + counts.get('R', 0) + counts.get('C', 0)
+    return round(max(0.0, 10.0 - (weighted / statements) * 10), 2)
+
+
+def build_pylint_result(per_file: Iterable[Dict[str, Any]], statements: int) -> Dict[str, Any]:
+    """
+    Aggregate per-file pylint results into the report structure.
+
+    Args:
+        per_file: Per-file entries from ``parse_pylint_json_by_file`` in report order
+        statements: Total statements across all linted files
+
+    Returns:
+        Dictionary in the same shape as ``parse_pylint_output``
+    """
+    counts: Dict[str, int] = {}
+    issues: List[Dict[str, Any]] = []
+    for entry in per_file:
+        for letter, count in entry["counts"].items():
+            counts[letter] = counts.get(letter, 0) + count
+        if len(issues) < MAX_REPORTED_ISSUES:
+            issues.extend(entry["issues"][:MAX_REPORTED_ISSUES - len(issues)])
+
+    issue_counts = {"error": 0, "warning": 0, "convention": 0, "refactor": 0}
+    for letter, count in counts.items():
+        severity = SEVERITY_MAP.get(letter)
+        if severity:
+            issue_counts[severity] += count
+
+    return {
+        "score": compute_pylint_score(counts, statements),
+        "issues": issues,
+        "issue_counts": issue_counts,
+        "total_issues": sum(issue_counts.values())
+    }
+
+
+def format_pylint_summary(pylint_result: Dict[str, Any]) -> str:
+    """
+    Render a pylint result back into pylint's text layout.
+
+    Only used to give the AI prompt a compact, familiar view of the results.
+    """
+    lines = [
+        f"{i['file']}:{i['line']}:{i['column']}: {i['code']}: {i['message']}"
+        for i in pylint_result.get("issues", [])
+    ]
+    if pylint_result.get("score") is not None:
+        lines.append(f"\nYour code has been rated at {pylint_result['score']:.2f}/10")
+    return "\n".join(lines)
+
+
 def _empty_pylint_result() -> Dict[str, Any]:
     """Return empty pylint result structure."""
     return {
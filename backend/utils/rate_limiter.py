@@ -0,0 +1,105 @@
+"""
+Per-client request rate limiting.
+
+Sliding-window limiter keyed by client address, configured by the
+``rate_limit_*`` settings. Analyses started by batch requests are counted
+by a second limiter with the ``batch_rate_limit_repos`` budget.
+"""
+
+import math
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict
+
+from backend.config import get_settings
+from backend.utils.exceptions import RateLimitError
+from backend.utils.logger import setup_logger
+
+logger = setup_logger(__name__)
+
+
+class RateLimiter:
+    """Allow each client at most ``max_requests`` per ``window_seconds``."""
+
+    def __init__(
+        self,
+        max_requests: int,
+        window_seconds: float,
+        enabled: bool = True,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize rate limiter.
+
+        Args:
+            max_requests: Requests a client may make within one window
+            window_seconds: Length of the sliding window
+            enabled: When False every request is allowed
+            clock: Monotonic clock, replaceable in tests
+        """
+        self.max_requests = max_requests
+        self.window_seconds = window_seconds
+        self.enabled = enabled
+        self._clock = clock
+        self._requests: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def check(self, client: str) -> None:
+        """
+        Count a request from a client, rejecting it if the client is over its limit.
+
+        Args:
+            client: Client identifier, usually its address
+
+        Raises:
+            RateLimitError: If the client made too many requests, with the
+                seconds until its oldest request leaves the window
+        """
+        if not self.enabled:
+            return
+        now = self._clock()
+        with self._lock:
+            history = self._requests.setdefault(client, deque())
+            while history and history[0] <= now - self.window_seconds:
+                history.popleft()
+            if len(history) >= self.max_requests:
+                retry_after = max(1, math.ceil(history[0] + self.window_seconds - now))
+                logger.warning(
+                    f"Rate limit exceeded for {client}",
+                    extra={'extra_data': {'client': client, 'retry_after_seconds': retry_after}}
+                )
+                raise RateLimitError(
+                    f"Too many requests, limit is {self.max_requests} per {self.window_seconds}s",
+                    retry_after=retry_after
+                )
+            history.append(now)
+            self._prune(now)
+
+    def reset(self) -> None:
+        """Forget all recorded requests."""
+        with self._lock:
+            self._requests.clear()
+
+    def _prune(self, now: float) -> None:
+        """Drop clients without requests in the current window."""
+        if len(self._requests) < 1024:
+            return
+        cutoff = now - self.window_seconds
+        for client in [c for c, h in self._requests.items() if not h or h[-1] <= cutoff]:
+            del self._requests[client]
+
+
+_settings = get_settings()
+rate_limiter = RateLimiter(
+    _settings.rate_limit_requests,
+    _settings.rate_limit_window,
+    enabled=_settings.rate_limit_enabled,
+)
+
+# Batches start their analyses against a budget of their own
+batch_rate_limiter = RateLimiter(
+    _settings.batch_rate_limit_repos,
+    _settings.rate_limit_window,
+    enabled=_settings.rate_limit_enabled,
+)
@@ -3,17 +3,262 @@ Repository downloader with retry logic and validation.
 
 Handles Git repository cloning with comprehensive error handling,
 retry logic, and validation.
+
+Clones never check files out straight away. The size of what would be
+checked out is estimated from the fetched objects first and checked
+against ``max_repo_size_mb``. In sparse mode the clone is also blobless
+(``--filter=blob:none``): the file list comes from the trees, only blobs
+of files the analyzers read are fetched (in a few growing batches, with
+the size checked after each, so an oversized checkout stops early), and
+a sparse checkout leaves everything else out of the working tree.
 """
 
-from typing import Tuple, Optional
-from git import Repo, GitCommandError
+import os
+import subprocess
+import threading
+import time
+from contextlib import nullcontext
+from typing import ContextManager, Dict, Iterable, List, Set, Tuple, Optional
+from git import Git, Repo, GitCommandError
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
 from backend.utils.logger import setup_logger
 from backend.utils.exceptions import RepositoryError
+from backend.utils.languages import EXTENSION_LANGUAGES, FILENAME_LANGUAGES, detect_language
 from backend.utils.validators import validate_github_url
 
 logger = setup_logger(__name__)
 
+# Remote HEAD lookups cached per URL as (sha, resolved_at)
+_remote_head_cache: Dict[str, Tuple[str, float]] = {}
+_remote_head_lock = threading.Lock()
+REMOTE_RESOLVE_TIMEOUT_SECONDS = 15
+
+GIT_ENV = {"GIT_TERMINAL_PROMPT": "0"}
+
+# Blobs a checkout fetches in its first request; each later request fetches twice as many
+FETCH_BATCH_BLOBS = 64
+
+# Files the tools read without analyzing them (pyproject.toml, setup.cfg
+# and tox.ini are recognised source files already)
+TOOL_CONFIG_FILES = (".pylintrc", "pylintrc")
+
+
+def _any_case(text: str) -> str:
+    """Glob matching ``text`` in any letter case, e.g. ``.[pP][yY]``."""
+    return "".join(f"[{c.lower()}{c.upper()}]" if c.isalpha() else c for c in text)
+
+
+def sparse_checkout_patterns(exclude_dirs: Iterable[str] = ()) -> List[str]:
+    """
+    Non-cone sparse-checkout patterns selecting the files the analyzers read.
+
+    Mirrors ``is_analyzable_path``: recognised source files by extension
+    (any case) or name, tool configuration files, nothing under an
+    excluded directory.
+    """
+    patterns = [f"*{_any_case(ext)}" for ext in EXTENSION_LANGUAGES]
+    patterns += list(FILENAME_LANGUAGES) + list(TOOL_CONFIG_FILES)
+    patterns += [f"!**/{name}/**" for name in exclude_dirs]
+    return patterns
+
+
+def is_analyzable_path(path: str, exclude_dirs: Iterable[str] = ()) -> bool:
+    """Whether a repository-relative path is checked out in sparse mode."""
+    parts = path.split("/")
+    if any(part in exclude_dirs for part in parts[:-1]):
+        return False
+    return parts[-1] in TOOL_CONFIG_FILES or detect_language(parts[-1]) is not None
+
+
+def _run_git(args: List[str], cwd: str, stdin: str, timeout: Optional[float]) -> str:
+    """Run a git command that reads its input from stdin."""
+    try:
+        result = subprocess.run(
+            ["git", *args], cwd=cwd, input=stdin, capture_output=True, text=True,
+            timeout=timeout, env={**os.environ, **GIT_ENV}
+        )
+    except subprocess.TimeoutExpired as e:
+        raise GitCommandError(["git", *args], -1, f"timed out after {timeout}s") from e
+    if result.returncode != 0:
+        raise GitCommandError(["git", *args], result.returncode, result.stderr)
+    return result.stdout
+
+
+def _list_blobs(git: Git, rev: str = "HEAD") -> List[Tuple[str, str]]:
+    """(object id, path) of every file in a commit, read from the trees only."""
+    entries = []
+    for entry in git.ls_tree("-r", "-z", rev).split("\0"):
+        if not entry:
+            continue
+        info, path = entry.split("\t", 1)
+        _, kind, oid = info.split()
+        if kind == "blob":
+            entries.append((oid, path))
+    return entries
+
+
+def list_commit_files(repo_path: str, rev: str) -> List[Tuple[str, str]]:
+    """(object id, path) of every file in a commit, without fetching any contents."""
+    return _list_blobs(Repo(repo_path).git, rev)
+
+
+def missing_blobs(repo_path: str, rev: str = "HEAD", timeout: Optional[float] = None) -> Set[str]:
+    """Object ids of a commit's files not yet fetched into a partial clone (none for a full clone)."""
+    output = _run_git(
+        ["rev-list", "--objects", "--missing=print", "--no-walk", "--stdin"], repo_path, rev + "\n", timeout
+    )
+    return {line[1:].strip() for line in output.splitlines() if line.startswith("?")}
+
+
+def fetch_blobs(repo_path: str, oids: List[str], timeout: Optional[float] = None) -> None:
+    """Fetch blobs into a partial clone in one request instead of one per missing object."""
+    if not oids:
+        return
+    # The same request git makes for missing objects, for all of them at once
+    _run_git(
+        ["-c", "fetch.negotiationAlgorithm=noop", "fetch", "origin", "--no-tags",
+         "--no-write-fetch-head", "--recurse-submodules=no", "--filter=blob:none", "--stdin"],
+        repo_path, "\n".join(oids) + "\n", timeout
+    )
+
+
+def blob_sizes(repo_path: str, oids: List[str], timeout: Optional[float] = None) -> Dict[str, int]:
+    """Sizes of locally present blobs by object id."""
+    if not oids:
+        return {}
+    output = _run_git(
+        ["cat-file", "--batch-check=%(objectname) %(objectsize)"], repo_path, "\n".join(oids) + "\n", timeout
+    )
+    return {oid: int(size) for oid, size in (line.split() for line in output.splitlines())}
+
+
+def read_blobs(repo_path: str, oids: List[str], timeout: Optional[float] = None) -> Dict[str, bytes]:
+    """
+    Contents of locally present blobs, read with a single ``git cat-file --batch``.
+
+    Fetch the blobs of a partial clone first (``fetch_blobs``); git would
+    otherwise fetch each missing one separately.
+    """
+    if not oids:
+        return {}
+    args = ["git", "cat-file", "--batch"]
+    try:
+        result = subprocess.run(
+            args, cwd=repo_path, input=("\n".join(oids) + "\n").encode(), capture_output=True,
+            timeout=timeout, env={**os.environ, **GIT_ENV}
+        )
+    except subprocess.TimeoutExpired as e:
+        raise GitCommandError(args, -1, f"timed out after {timeout}s") from e
+    if result.returncode != 0:
+        raise GitCommandError(args, result.returncode, result.stderr.decode(errors="replace"))
+
+    # Each object is "<oid> <type> <size>\n<contents>\n", or "<name> missing\n"
+    data, pos, blobs = result.stdout, 0, {}
+    while pos < len(data):
+        end = data.index(b"\n", pos)
+        header = data[pos:end].split()
+        pos = end + 1
+        if len(header) != 3:
+            continue
+        size = int(header[2])
+        blobs[header[0].decode()] = data[pos:pos + size]
+        pos += size + 1
+    return blobs
+
+
+def checkout_files(
+    path: str,
+    sparse: bool = False,
+    exclude_dirs: Iterable[str] = (),
+    max_size_mb: Optional[int] = None,
+    timeout: Optional[float] = None,
+    repo_url: Optional[str] = None,
+    fetch: bool = True,
+    fetch_lock: Optional[ContextManager] = None
+) -> Dict[str, int]:
+    """
+    Populate the working tree of a clone or worktree made with ``--no-checkout``.
+
+    The size of the files to be checked out is checked before any is
+    written. A partial clone has no sizes of the blobs it is missing (even
+    ``git ls-tree -l`` fetches them one by one), so those are fetched in
+    growing batches, instead of one request each while git reads them, and
+    the size is checked after every batch: a checkout over the limit stops
+    fetching at the batch that exceeds it. In sparse mode only analyzable
+    files are fetched and checked out.
+
+    Args:
+        path: Working tree whose HEAD is set but whose files are not
+        sparse: Check out only files the analyzers read
+        exclude_dirs: Directory names left out of a sparse checkout
+        max_size_mb: Refuse to check out more than this many MB of files
+        timeout: Seconds the git commands may take together
+        repo_url: Repository URL, for error details
+        fetch: Fetch missing selected blobs first; pass False when the caller
+            already fetched them
+        fetch_lock: Held around each blob fetch, for object stores shared
+            with other checkouts
+
+    Returns:
+        Number of files in the tree, checked out and fetched, and bytes
+        checked out
+
+    Raises:
+        RepositoryError: If the checkout would exceed ``max_size_mb``
+        GitCommandError: If a git command fails
+    """
+    started = time.monotonic()
+
+    def _remaining() -> Optional[float]:
+        if timeout is None:
+            return None
+        return max(1.0, timeout - (time.monotonic() - started))
+
+    repo = Repo(path)
+    blobs = _list_blobs(repo.git)
+
+    if sparse:
+        exclude_dirs = set(exclude_dirs)
+        selected = [oid for oid, blob_path in blobs if is_analyzable_path(blob_path, exclude_dirs)]
+    else:
+        selected = [oid for oid, _ in blobs]
+    missing = missing_blobs(path, timeout=_remaining()) if fetch else set()
+    sizes = blob_sizes(path, sorted(set(selected) - missing), _remaining())
+
+    def _checked_size() -> int:
+        # Files whose blobs are still missing count once they are fetched
+        checkout_bytes = sum(sizes.get(oid, 0) for oid in selected)
+        if max_size_mb is not None and checkout_bytes > max_size_mb * 1024 * 1024:
+            raise RepositoryError(
+                f"Repository is too large to analyze: {checkout_bytes / (1024 * 1024):.0f} MB "
+                f"of files, limit is {max_size_mb} MB",
+                repo_url=repo_url,
+                details={'size_mb': round(checkout_bytes / (1024 * 1024), 1), 'max_size_mb': max_size_mb}
+            )
+        return checkout_bytes
+
+    checkout_bytes = _checked_size()
+    wanted = sorted({oid for oid in selected if oid in missing})
+    fetched = len(wanted)
+    batch = FETCH_BATCH_BLOBS
+    while wanted:
+        chunk, wanted = wanted[:batch], wanted[batch:]
+        with fetch_lock or nullcontext():
+            fetch_blobs(path, chunk, _remaining())
+        sizes.update(blob_sizes(path, chunk, _remaining()))
+        checkout_bytes = _checked_size()
+        batch *= 2
+
+    if sparse:
+        repo.git.sparse_checkout('set', '--no-cone', *sparse_checkout_patterns(exclude_dirs))
+    repo.git.checkout('-q', kill_after_timeout=_remaining(), env=GIT_ENV)
+    return {
+        'files_in_tree': len(blobs),
+        'files_checked_out': len(selected),
+        'blobs_fetched': fetched,
+        'checkout_bytes': checkout_bytes,
+    }
+
 
 @retry(
     stop=stop_after_attempt(3),
@@ -21,7 +266,15 @@ logger = setup_logger(__name__)
     retry=retry_if_exception_type(GitCommandError),
     reraise=True
 )
-def clone_repo(url: str, path: str, shallow: bool = True) -> Tuple[str, str]:
+def clone_repo(
+    url: str,
+    path: str,
+    shallow: bool = True,
+    timeout: Optional[float] = None,
+    sparse: bool = False,
+    exclude_dirs: Iterable[str] = (),
+    max_size_mb: Optional[int] = None
+) -> Tuple[str, str]:
     """
     Clone a Git repository with retry logic.
     
@@ -29,39 +282,64 @@ def clone_repo(url: str, path: str, shallow: bool = True) -> Tuple[str, str]:
         url: Repository URL to clone
         path: Local path to clone into
         shallow: Whether to perform shallow clone (faster, less data)
+        timeout: Seconds the whole clone may take; git is killed after that
+            (no limit if None)
+        sparse: Fetch and check out only files the analyzers read
+        exclude_dirs: Directory names left out of a sparse checkout
+        max_size_mb: Refuse to check out more than this many MB of files
     
     Returns:
         Tuple of (cloned_path, commit_sha)
     
     Raises:
-        RepositoryError: If cloning fails after retries
+        RepositoryError: If cloning fails after retries, or the checkout
+            would exceed ``max_size_mb``
     """
+    started = time.monotonic()
+
+    def _remaining() -> Optional[float]:
+        if timeout is None:
+            return None
+        return max(1.0, timeout - (time.monotonic() - started))
+
     try:
         # Validate URL before attempting clone
         validated_url = validate_github_url(url)
         logger.info(f"Cloning repository: {validated_url} to {path}")
         
-        # Clone with optional shallow clone for performance
-        clone_kwargs = {
-            'depth': 1,
-            'single_branch': True
-        } if shallow else {}
-        
-        repo = Repo.clone_from(validated_url, path, **clone_kwargs)
+        # Clone with optional shallow clone for performance. Run git directly
+        # (not Repo.clone_from) so the process can be killed on timeout
+        clone_args = ['--depth', '1', '--single-branch'] if shallow else []
+        if sparse:
+            clone_args.append('--filter=blob:none')
+        Git().clone(
+            *clone_args, '--no-checkout', '--', validated_url, path,
+            kill_after_timeout=_remaining(),
+            env=GIT_ENV
+        )
+        checkout = checkout_files(
+            path, sparse=sparse, exclude_dirs=exclude_dirs, max_size_mb=max_size_mb,
+            timeout=_remaining(), repo_url=url
+        )
         
         # Get the latest commit SHA
-        commit_sha = repo.head.commit.hexsha
+        commit_sha = Repo(path).head.commit.hexsha
         
         logger.info(
             f"Successfully cloned repository: {validated_url}",
             extra={'extra_data': {
                 'commit_sha': commit_sha,
-                'shallow': shallow
+                'shallow': shallow,
+                'sparse': sparse,
+                **checkout,
+                'seconds': round(time.monotonic() - started, 3)
             }}
         )
         
         return path, commit_sha
         
+    except RepositoryError:
+        raise
     except GitCommandError as e:
         logger.error(
             f"Git command failed while cloning {url}: {e}",
@@ -84,6 +362,66 @@ def clone_repo(url: str, path: str, shallow: bool = True) -> Tuple[str, str]:
         )
 
 
+def clone_history(
+    url: str,
+    path: str,
+    commits: int,
+    timeout: Optional[float] = None
+) -> List[Tuple[str, int]]:
+    """
+    Clone the last commits of a repository's default branch, without file contents.
+
+    The clone is blobless and is not checked out: only commits and trees are
+    transferred, so listing the files of every commit costs no file
+    downloads. Fetch the blobs that are needed with ``fetch_blobs``.
+
+    Args:
+        url: Repository URL to clone
+        path: Local path to clone into
+        commits: Number of commits to clone
+        timeout: Seconds the clone may take; git is killed after that
+
+    Returns:
+        (commit SHA, commit time as a Unix timestamp) of up to ``commits``
+        commits along the first-parent history, newest first
+
+    Raises:
+        RepositoryError: If cloning fails after retries
+    """
+    started = time.monotonic()
+    try:
+        validated_url = validate_github_url(url)
+        Git().clone(
+            '--filter=blob:none', '--no-checkout', '--single-branch', '--depth', str(commits),
+            '--', validated_url, path,
+            kill_after_timeout=timeout,
+            env=GIT_ENV
+        )
+        repo = Repo(path)
+        # Sparse checkouts of several commits are set up side by side in worktrees
+        repo.git.config('extensions.worktreeConfig', 'true')
+        log = repo.git.log('--first-parent', f'-n{commits}', '--format=%H %ct', 'HEAD')
+    except GitCommandError as e:
+        logger.error(f"Git command failed while cloning history of {url}: {e}")
+        raise RepositoryError(
+            f"Failed to clone repository: {str(e)}",
+            repo_url=url,
+            details={'git_error': str(e)}
+        )
+
+    history = [(sha, int(timestamp)) for sha, timestamp in (line.split() for line in log.splitlines())]
+    logger.info(
+        f"Cloned history of {validated_url}",
+        extra={'extra_data': {'commits': len(history), 'seconds': round(time.monotonic() - started, 3)}}
+    )
+    return history
+
+
+def add_worktree(repo_path: str, dest: str, rev: str) -> None:
+    """Add a detached worktree of a commit without checking any files out (see ``checkout_files``)."""
+    Repo(repo_path).git.worktree('add', '-q', '--detach', '--no-checkout', dest, rev)
+
+
 def get_repo_info(repo_path: str) -> dict:
     """
     Get information about a cloned repository.
@@ -113,4 +451,82 @@ def get_repo_info(repo_path: str) -> dict:
         raise RepositoryError(
             f"Failed to read repository information: {str(e)}",
             details={'repo_path': repo_path}
-        )
\ No newline at end of file
+        )
+
+def local_commit_sha(repo_path: str, exclude_dirs: Iterable[str] = ()) -> Optional[str]:
+    """
+    Commit checked out in a local repository, if the analyzed files match it.
+
+    Args:
+        repo_path: Directory to be analyzed
+        exclude_dirs: Directory names the analyzers skip
+
+    Returns:
+        HEAD commit SHA, or None when the directory is not the root of a git
+        repository, has uncommitted changes to tracked files or contains
+        untracked (and not ignored) files the analyzers would read
+    """
+    try:
+        repo = Repo(repo_path)
+        working_tree = repo.working_tree_dir
+        if working_tree is None or os.path.realpath(working_tree) != os.path.realpath(repo_path):
+            return None
+        if repo.is_dirty(untracked_files=False):
+            return None
+        excluded = set(exclude_dirs)
+        if any(is_analyzable_path(path, excluded) for path in repo.untracked_files):
+            return None
+        return repo.head.commit.hexsha
+    except Exception as e:
+        logger.debug(f"No commit for local path {repo_path}: {e}")
+        return None
+
+
+def resolve_remote_head(url: str, ttl_seconds: int = 60) -> str:
+    """
+    Resolve the commit SHA of a remote repository's HEAD without cloning.
+
+    Uses ``git ls-remote`` and caches the answer per URL for ``ttl_seconds``
+    so repeated requests for the same repository skip the network round trip.
+
+    Args:
+        url: Repository URL
+        ttl_seconds: How long a resolved SHA stays valid
+
+    Returns:
+        Commit SHA of the remote HEAD
+
+    Raises:
+        RepositoryError: If the remote cannot be queried
+    """
+    validated_url = validate_github_url(url)
+    now = time.monotonic()
+
+    with _remote_head_lock:
+        cached = _remote_head_cache.get(validated_url)
+    if cached and now - cached[1] < ttl_seconds:
+        return cached[0]
+
+    try:
+        output = Git().ls_remote(
+            validated_url,
+            "HEAD",
+            kill_after_timeout=REMOTE_RESOLVE_TIMEOUT_SECONDS,
+            env=GIT_ENV
+        )
+    except GitCommandError as e:
+        logger.warning(f"git ls-remote failed for {validated_url}: {e}")
+        raise RepositoryError(
+            f"Failed to resolve remote HEAD: {str(e)}",
+            repo_url=url,
+            details={'git_error': str(e)}
+        )
+
+    sha = output.split()[0] if output.strip() else ""
+    if not sha:
+        raise RepositoryError("Remote repository has no HEAD", repo_url=url)
+
+    with _remote_head_lock:
+        _remote_head_cache[validated_url] = (sha, now)
+    logger.debug(f"Resolved remote HEAD of {validated_url}: {sha}")
+    return sha
@@ -5,8 +5,9 @@ Provides comprehensive validation for URLs, configurations,
 and user inputs with security best practices.
 """
 
+import os
 import re
-from typing import Optional, Any
+from typing import Iterable, Optional, Any
 from urllib.parse import urlparse
 from backend.utils.exceptions import ValidationError
 
@@ -94,6 +95,41 @@ def validate_github_url(url: str, allow_private: bool = False) -> str:
     return clean_url
 
 
+def validate_local_path(path: str, allowed_roots: Iterable[str]) -> str:
+    """
+    Validate a directory requested for in-place analysis.
+    
+    Args:
+        path: Directory on the server
+        allowed_roots: Directories whose contents may be analyzed in place
+    
+    Returns:
+        Resolved absolute path (symlinks followed)
+    
+    Raises:
+        ValidationError: If local analysis is disabled, or the path is not a
+            directory inside one of the allowed roots
+    """
+    roots = [os.path.realpath(root) for root in allowed_roots]
+    if not roots:
+        raise ValidationError("Local path analysis is disabled", field="path")
+    
+    if not path or not isinstance(path, str) or "\0" in path:
+        raise ValidationError("Path is required", field="path")
+    
+    resolved = os.path.realpath(path)
+    if not any(os.path.commonpath([resolved, root]) == root for root in roots):
+        raise ValidationError(
+            "Path is outside the directories allowed for local analysis",
+            field="path"
+        )
+    
+    if not os.path.isdir(resolved):
+        raise ValidationError("Path is not a directory", field="path")
+    
+    return resolved
+
+
 def validate_api_key(api_key: Optional[str], service_name: str) -> None:
     """
     Validate API key format.
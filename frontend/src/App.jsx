@@ -8,6 +8,34 @@ import ComplexityChart from "./components/ComplexityChart";
 import "./App.css";
 import "./components.css";
 
+const API_BASE = "http://127.0.0.1:8000";
+const POLL_INTERVAL_MS = 2000;
+
+const readError = async (res) => {
+  const errorData = await res
+    .json()
+    .catch(() => ({ detail: res.statusText }));
+  return errorData.detail || res.statusText;
+};
+
+// Poll a queued analysis job until it finishes and return its report ID
+const waitForJob = async (jobId) => {
+  for (;;) {
+    const res = await fetch(`${API_BASE}/jobs/${jobId}`);
+    if (!res.ok) {
+      throw new Error(`Analysis failed: ${await readError(res)}`);
+    }
+    const job = await res.json();
+    if (job.state === "succeeded") {
+      return job.report_id;
+    }
+    if (job.state === "failed") {
+      throw new Error(`Analysis failed: ${job.error || "unknown error"}`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+  }
+};
+
 function App() {
   const [results, setResults] = useState(null);
   const [loading, setLoading] = useState(false);
@@ -17,23 +45,29 @@ function App() {
     setLoading(true);
     setError(null);
     try {
-      const res = await fetch("http://127.0.0.1:8000/analyze", {
+      const res = await fetch(`${API_BASE}/analyze`, {
         method: "POST",
         headers: { "Content-Type": "application/json" },
         body: JSON.stringify({ repo_url: repoUrl }),
       });
 
       if (!res.ok) {
-        const errorData = await res
-          .json()
-          .catch(() => ({ detail: res.statusText }));
-        throw new Error(
-          `Analysis failed: ${errorData.detail || res.statusText}`
-        );
+        throw new Error(`Analysis failed: ${await readError(res)}`);
+      }
+
+      const job = await res.json();
+      // An unchanged repository is answered straight from a stored report
+      if (job.cached) {
+        setResults(job.results);
+        return;
       }
+      const reportId = await waitForJob(job.job_id);
 
-      const data = await res.json();
-      setResults(data.results);
+      const reportRes = await fetch(`${API_BASE}/reports/${reportId}`);
+      if (!reportRes.ok) {
+        throw new Error(`Analysis failed: ${await readError(reportRes)}`);
+      }
+      setResults(await reportRes.json());
     } catch (err) {
       setError(err.message);
       console.error("Analysis error:", err);